@@ -0,0 +1,230 @@
+"""
+Background-refreshed analytics payload for /summary/analytics
+The payload is computed off the request path on a schedule and whenever a write
+invalidates one of the tables it reads, then served from memory with
+stale-while-revalidate semantics: a snapshot older than the refresh interval
+(or made dirty by a write) is still returned while a single background refresh
+runs, and only a missing or hopelessly stale snapshot makes a request wait.
+Each snapshot carries a content hash ETag and a Last-Modified time that only
+moves when the payload actually changes, so polling clients get 304s.
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+import logging
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Any, Optional, Callable, Awaitable, FrozenSet, Tuple
+
+from db import get_db_connection
+from summary_service import get_summary_service
+
+logger = logging.getLogger(__name__)
+
+# Tables whose writes change the analytics payload (citizens for demographics,
+# facts and geography for the cube rollups)
+ANALYTICS_TABLES = frozenset({"citizens", "schemes", "enrollments", "disbursements",
+                              "villages", "districts", "states"})
+
+class AnalyticsRefresher:
+    """Keeps the latest analytics payload in memory and refreshes it in the background"""
+
+    def __init__(self, compute: Callable[[FrozenSet[str]], Awaitable[Dict[str, Any]]],
+                 tables: FrozenSet[str] = ANALYTICS_TABLES, db_manager=None):
+        self.compute = compute
+        self.tables = tables
+        self._db_manager = db_manager
+        self.refresh_seconds = float(os.getenv("SUMMARY_ANALYTICS_REFRESH_SECONDS", "60"))
+        self.max_stale_seconds = float(os.getenv("SUMMARY_ANALYTICS_MAX_STALE_SECONDS", "900"))
+        self.debounce_seconds = float(os.getenv("SUMMARY_ANALYTICS_DEBOUNCE_SECONDS", "2"))
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._dirty_tables: set = set()
+        self._lock = threading.Lock()
+        self._listening = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "unchanged_refreshes": 0,
+            "refresh_failures": 0,
+            "not_modified": 0,
+            "data_changes": 0
+        }
+
+    @property
+    def db_manager(self):
+        return self._db_manager or get_db_connection()
+
+    def _listen(self) -> None:
+        if not self._listening:
+            self.db_manager.result_cache.add_invalidation_listener(self._on_invalidate)
+            self._listening = True
+
+    def _on_invalidate(self, tables: FrozenSet[str]) -> None:
+        """Result cache listener; runs on whichever thread performed the write"""
+        if tables and not tables & self.tables:
+            return
+        with self._lock:
+            self._dirty_tables.update(tables & self.tables if tables else self.tables)
+            self.stats["data_changes"] += 1
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def start(self) -> None:
+        """Start the refresh loop on the running event loop (called from the app lifespan)"""
+        self._listen()
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        if self._scheduler is None or self._scheduler.done():
+            self._scheduler = asyncio.create_task(self._run(), name="analytics-refresher")
+        logger.info(f"Analytics refresher started (every {self.refresh_seconds:.0f}s and on data changes)")
+
+    async def stop(self) -> None:
+        for task in (self._scheduler, self._task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._scheduler = self._task = None
+        self._loop = self._wakeup = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refresh_seconds)
+                self._wakeup.clear()
+                # Let a burst of writes (an ingest, a batch of inserts) settle into one refresh
+                await asyncio.sleep(self.debounce_seconds)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.refresh()
+            except Exception:
+                pass  # already logged and counted; the previous snapshot keeps being served
+
+    def _start_refresh(self) -> asyncio.Task:
+        """The in-flight refresh task, starting one if none is running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._compute())
+            self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._task
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Recompute now, joining a refresh that is already running"""
+        return await asyncio.shield(self._start_refresh())
+
+    async def _compute(self) -> Dict[str, Any]:
+        with self._lock:
+            changed = frozenset(self._dirty_tables)
+            self._dirty_tables.clear()
+            previous = self._snapshot
+        start = time.perf_counter()
+        try:
+            payload = await self.compute(changed)
+            if payload.get("errors") and previous is not None:
+                raise RuntimeError(f"analytics queries failed: {', '.join(payload['errors'])}")
+        except Exception as e:
+            with self._lock:
+                self._dirty_tables.update(changed)
+                self.stats["refresh_failures"] += 1
+            logger.error(f"Analytics refresh failed: {e}")
+            raise
+        refresh_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        body = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        now = time.time()
+        with self._lock:
+            previous = self._snapshot
+            unchanged = previous is not None and previous["etag"] == etag
+            self._snapshot = {
+                "payload": payload,
+                "etag": etag,
+                # Whole seconds, the resolution of HTTP dates
+                "last_modified": previous["last_modified"] if unchanged else float(int(now)),
+                "computed_at": now,
+                "refresh_ms": refresh_ms
+            }
+            self.stats["refreshes"] += 1
+            if unchanged:
+                self.stats["unchanged_refreshes"] += 1
+            return self._snapshot
+
+    async def get(self) -> Tuple[Dict[str, Any], str]:
+        """
+        The current snapshot and how it was served: "hit", "stale" (returned
+        while a background refresh runs) or "miss" (computed for this request).
+        """
+        self._listen()
+        with self._lock:
+            snapshot = self._snapshot
+            dirty = bool(self._dirty_tables)
+        age = time.time() - snapshot["computed_at"] if snapshot else None
+
+        if snapshot is None or age > self.max_stale_seconds:
+            with self._lock:
+                self.stats["misses"] += 1
+            return await self.refresh(), "miss"
+        if dirty or age > self.refresh_seconds:
+            with self._lock:
+                self.stats["stale_hits"] += 1
+            self._start_refresh()
+            return snapshot, "stale"
+        with self._lock:
+            self.stats["hits"] += 1
+        return snapshot, "hit"
+
+    def not_modified(self, snapshot: Dict[str, Any], if_none_match: Optional[str],
+                     if_modified_since: Optional[str]) -> bool:
+        """Conditional GET check; If-None-Match takes precedence over If-Modified-Since (RFC 9110)"""
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            match = "*" in tags or snapshot["etag"] in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+        elif if_modified_since:
+            try:
+                match = snapshot["last_modified"] <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                match = False
+        else:
+            match = False
+        if match:
+            with self._lock:
+                self.stats["not_modified"] += 1
+        return match
+
+    @staticmethod
+    def response_headers(snapshot: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            "ETag": snapshot["etag"],
+            "Last-Modified": formatdate(snapshot["last_modified"], usegmt=True),
+            "Cache-Control": "no-cache",
+            "Age": str(int(time.time() - snapshot["computed_at"]))
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            snapshot = self._snapshot
+            stats["dirty_tables"] = sorted(self._dirty_tables)
+        stats["running"] = self._scheduler is not None and not self._scheduler.done()
+        stats["etag"] = snapshot["etag"] if snapshot else None
+        stats["age_seconds"] = round(time.time() - snapshot["computed_at"], 1) if snapshot else None
+        stats["last_refresh_ms"] = snapshot["refresh_ms"] if snapshot else None
+        return stats
+
+# Global instance
+analytics_refresher = AnalyticsRefresher(lambda changed: get_summary_service().analytics(changed))
+
+def get_analytics_refresher() -> AnalyticsRefresher:
+    """Get the process-wide AnalyticsRefresher instance"""
+    return analytics_refresher
@@ -0,0 +1,434 @@
+"""
+Embedded DuckDB analytics tier over Parquet snapshots of the welfare tables
+Heavy read-only aggregates (trends, multi-scheme and village statistics) are
+answered in-process by DuckDB's vectorized engine instead of taking a
+connection from the Azure SQL pool that serves officer lookups.
+
+A snapshot streams each table out of the database into Parquet under
+ANALYTICS_SNAPSHOT_DIR. enrollments and disbursements are hive-partitioned by
+the citizen's state and the month of their date column, citizens by state.
+Each snapshot is written to a new directory and swapped in whole, so queries
+never see a half-written snapshot. Write-heavy log tables are not snapshotted;
+queries touching them stay on the OLTP database.
+
+The router only sends a query here when it is a single SELECT with an
+aggregate, every table it reads is in the snapshot and the snapshot is younger
+than the caller's staleness limit. T-SQL is translated to DuckDB first; any
+translation or execution error falls back to the OLTP path.
+
+Answers must not depend on the tier. The snapshot compares strings without case
+(Azure SQL's default collation; LIKE becomes ILIKE) and divides integers like
+SQL Server does (7 / 2 = 3).
+"""
+import os
+import re
+import glob
+import json
+import time
+import shutil
+import threading
+import logging
+from typing import Dict, Any, List, Optional
+
+from db import get_db_connection, DatabaseManager, QueryResultCache, QueryCancelToken
+from local_db import (STRING_LITERAL_PATTERN, FORMAT_TOKENS, REPO_ROOT, _replace_calls, _move_top_to_limit)
+
+try:
+    import duckdb
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+# table -> (date column for the month partition or None, partitioned by state)
+SNAPSHOT_TABLES = {
+    "citizens": (None, True),
+    "enrollments": ("enrollment_date", True),
+    "disbursements": ("disbursed_on", True),
+    "schemes": (None, False),
+    "scheme_eligibility": (None, False),
+    "health_details": (None, False),
+    "bank_accounts": (None, False),
+    "officers": (None, False),
+    "states": (None, False),
+    "districts": (None, False),
+    "villages": (None, False)
+}
+
+STATE_PARTITION_SQL = {
+    "citizens": """
+SELECT t.*, d.state_id AS snapshot_state
+FROM citizens t
+LEFT JOIN villages v ON v.village_id = t.village_id
+LEFT JOIN districts d ON d.district_id = v.district_id
+""",
+    "enrollments": """
+SELECT t.*, d.state_id AS snapshot_state
+FROM enrollments t
+LEFT JOIN citizens c ON c.citizen_id = t.citizen_id
+LEFT JOIN villages v ON v.village_id = c.village_id
+LEFT JOIN districts d ON d.district_id = v.district_id
+""",
+    "disbursements": """
+SELECT t.*, d.state_id AS snapshot_state
+FROM disbursements t
+LEFT JOIN citizens c ON c.citizen_id = t.citizen_id
+LEFT JOIN villages v ON v.village_id = c.village_id
+LEFT JOIN districts d ON d.district_id = v.district_id
+"""
+}
+PARTITION_COLUMNS = ("snapshot_state", "snapshot_month")
+
+AGGREGATE_PATTERN = re.compile(r'\b(COUNT|SUM|AVG|MIN|MAX)\s*\(|\bGROUP\s+BY\b', re.IGNORECASE)
+WRITE_PATTERN = re.compile(r'\b(INSERT|UPDATE|DELETE|MERGE|DROP|ALTER|CREATE|TRUNCATE|EXEC|EXECUTE|INTO)\b', re.IGNORECASE)
+PARAM_PATTERN = re.compile(r'(?<![:\w]):(\w+)')
+LIKE_PATTERN = re.compile(r'\bLIKE\b', re.IGNORECASE)
+# Per-cursor settings (a DuckDB cursor is its own session); default_collation is database-wide
+SESSION_SETTINGS = ("SET integer_division = true",)
+DATE_PART_NAMES = {
+    "year": "year", "yy": "year", "yyyy": "year", "quarter": "quarter", "qq": "quarter", "q": "quarter",
+    "month": "month", "mm": "month", "m": "month", "week": "week", "wk": "week", "ww": "week",
+    "day": "day", "dd": "day", "d": "day", "hour": "hour", "hh": "hour",
+    "minute": "minute", "mi": "minute", "n": "minute", "second": "second", "ss": "second", "s": "second"
+}
+
+def translate_tsql_to_duckdb(sql: str) -> str:
+    """Translate the SQL Server constructs used by generated queries into DuckDB syntax, :name params -> $name"""
+    literals: List[str] = []
+
+    def mask(match):
+        literal = match.group()
+        literals.append(literal[1:] if literal.startswith("N") else literal)
+        return f"\x00{len(literals) - 1}\x00"
+
+    masked = STRING_LITERAL_PATTERN.sub(mask, sql)
+    unmask = lambda text: re.sub(r"\x00(\d+)\x00", lambda m: literals[int(m.group(1))], text)
+
+    def datediff(args: List[str]) -> Optional[str]:
+        part = DATE_PART_NAMES.get(args[0].lower()) if len(args) == 3 else None
+        return f"date_diff('{part}', {args[1]}, {args[2]})" if part else None
+
+    def dateadd(args: List[str]) -> Optional[str]:
+        part = DATE_PART_NAMES.get(args[0].lower()) if len(args) == 3 else None
+        return f"({args[2]} + INTERVAL ({args[1]}) {part.upper()})" if part else None
+
+    def format_date(args: List[str]) -> Optional[str]:
+        if len(args) != 2 or not unmask(args[1]).startswith("'"):
+            return None
+        pattern = unmask(args[1])[1:-1]
+        for dotnet, strftime_token in FORMAT_TOKENS:
+            pattern = pattern.replace(dotnet, strftime_token)
+        return f"strftime({args[0]}, '{pattern}')"
+
+    masked = re.sub(r'\[(\w+)\]', r'"\1"', masked)
+    masked = re.sub(r'\b(GETDATE|SYSDATETIME)\s*\(\s*\)', "CAST(current_timestamp AS TIMESTAMP)", masked, flags=re.IGNORECASE)
+    masked = re.sub(r'\bISNULL\s*\(', "COALESCE(", masked, flags=re.IGNORECASE)
+    masked = re.sub(r'\bLEN\s*\(', "LENGTH(", masked, flags=re.IGNORECASE)
+    masked = re.sub(r'\bN?VARCHAR\s*\(\s*MAX\s*\)|\bNVARCHAR\b', "VARCHAR", masked, flags=re.IGNORECASE)
+    masked = _replace_calls(masked, "DATEDIFF", datediff)
+    masked = _replace_calls(masked, "DATEADD", dateadd)
+    masked = _replace_calls(masked, "FORMAT", format_date)
+    masked = _move_top_to_limit(masked)
+    masked = LIKE_PATTERN.sub("ILIKE", masked)
+    masked = PARAM_PATTERN.sub(r'$\1', masked)
+    return unmask(masked)
+
+class AnalyticsTier:
+    """Parquet snapshot + DuckDB views, and the router deciding which queries it answers"""
+
+    def __init__(self, db_manager=None, snapshot_dir: Optional[str] = None):
+        self._db_manager = db_manager
+        self.enabled = os.getenv("ANALYTICS_TIER_ENABLED", "true").lower() == "true" and duckdb is not None
+        self.snapshot_dir = snapshot_dir or os.getenv(
+            "ANALYTICS_SNAPSHOT_DIR", os.path.join(REPO_ROOT, "database", "analytics_snapshot"))
+        self.max_staleness = float(os.getenv("ANALYTICS_MAX_STALENESS_SECONDS", "900"))
+        self.refresh_interval = float(os.getenv("ANALYTICS_SNAPSHOT_INTERVAL", "300"))
+        self.batch_rows = int(os.getenv("ANALYTICS_SNAPSHOT_BATCH_ROWS", "200000"))
+        self.row_cap = int(os.getenv("QUERY_ROW_CAP", "10000"))
+        self._connection = None
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.stats = {
+            "snapshots": 0,
+            "snapshot_failures": 0,
+            "routed": 0,
+            "fallbacks": 0,
+            "skipped": {},
+            "total_query_ms": 0.0
+        }
+
+    @property
+    def db_manager(self):
+        return self._db_manager or get_db_connection()
+
+    def _count(self, name: str, reason: Optional[str] = None) -> None:
+        with self._lock:
+            if reason is None:
+                self.stats[name] += 1
+            else:
+                self.stats[name][reason] = self.stats[name].get(reason, 0) + 1
+
+    def _date_columns(self, table: str) -> Dict[str, str]:
+        schema = self.db_manager.get_table_schema(table)
+        if schema.get("status") != "success":
+            return {}
+        date_columns = {}
+        for column in schema["data"]:
+            data_type = (column.get("DATA_TYPE") or "").lower()
+            if data_type == "date":
+                date_columns[column["COLUMN_NAME"]] = "date"
+            elif "datetime" in data_type or "timestamp" in data_type:
+                date_columns[column["COLUMN_NAME"]] = "timestamp"
+        return date_columns
+
+    @staticmethod
+    def _to_arrow(rows: List[Dict[str, Any]], columns: List[str], date_columns: Dict[str, str],
+                  month_column: Optional[str]) -> "pa.Table":
+        table = pa.table({column: [row[column] for row in rows] for column in columns})
+        # stream_query hands dates back as ISO strings; restore real date/timestamp columns
+        for column, kind in date_columns.items():
+            if column in table.column_names and pa.types.is_string(table.schema.field(column).type):
+                if kind == "date":
+                    text, target, date_format = pc.utf8_slice_codeunits(table[column], 0, 10), pa.date32(), "%Y-%m-%d"
+                else:
+                    text = pc.replace_substring(pc.utf8_slice_codeunits(table[column], 0, 19), " ", "T")
+                    target, date_format = pa.timestamp("us"), "%Y-%m-%dT%H:%M:%S"
+                parsed = pc.cast(pc.strptime(text, format=date_format, unit="us", error_is_null=True), target)
+                table = table.set_column(table.column_names.index(column), column, parsed)
+        if "snapshot_state" in table.column_names:
+            table = table.set_column(table.column_names.index("snapshot_state"), "snapshot_state",
+                                     pc.fill_null(pc.cast(table["snapshot_state"], pa.int64()), 0))
+        if month_column:
+            dates = pc.cast(table[month_column], pa.timestamp("us"))
+            month = pc.add(pc.multiply(pc.year(dates), 100), pc.month(dates))
+            table = table.append_column("snapshot_month", pc.fill_null(month, 0))
+        return table
+
+    def _write_table(self, table: str, target_dir: str) -> int:
+        month_column, by_state = SNAPSHOT_TABLES[table]
+        query = STATE_PARTITION_SQL[table] if by_state else f"SELECT * FROM {table}"
+        partitioning = [column for column, used in zip(PARTITION_COLUMNS, (by_state, month_column)) if used]
+        date_columns = self._date_columns(table)
+        table_dir = os.path.join(target_dir, table)
+        rows_written, columns = 0, []
+        for batch_index, (columns, rows) in enumerate(self.db_manager.stream_query(query, batch_size=self.batch_rows)):
+            if not rows and batch_index > 0:
+                continue
+            arrow_table = self._to_arrow(rows, columns, date_columns, month_column)
+            if partitioning and len(arrow_table):
+                ds.write_dataset(arrow_table, table_dir, format="parquet", partitioning=partitioning,
+                                 partitioning_flavor="hive", basename_template=f"part-{batch_index:05d}-{{i}}.parquet",
+                                 existing_data_behavior="overwrite_or_ignore")
+            else:
+                os.makedirs(table_dir, exist_ok=True)
+                pq.write_table(arrow_table, os.path.join(table_dir, f"part-{batch_index:05d}.parquet"))
+            rows_written += len(arrow_table)
+        return rows_written
+
+    @staticmethod
+    def _load_snapshot(path: str) -> "duckdb.DuckDBPyConnection":
+        """
+        In-memory DuckDB database holding the snapshot's tables. The Parquet files are
+        read once here: scanning hundreds of small state x month files on every query
+        costs more in file opens than the aggregate itself.
+        """
+        connection = duckdb.connect()
+        connection.execute("SET default_collation = 'nocase'")
+        for table, (month_column, by_state) in SNAPSHOT_TABLES.items():
+            files = os.path.join(path, table, "**", "*.parquet")
+            partition_columns = ["snapshot_state"] * by_state + ["snapshot_month"] * bool(month_column)
+            columns = f"* EXCLUDE ({', '.join(partition_columns)})" if partition_columns else "*"
+            connection.execute(
+                f"CREATE TABLE {table} AS SELECT {columns} FROM read_parquet('{files}', "
+                f"hive_partitioning = {str(bool(partition_columns)).lower()}, union_by_name = true)"
+            )
+        return connection
+
+    def _swap(self, connection, snapshot: Dict[str, Any]) -> None:
+        with self._lock:
+            self._connection, self._snapshot = connection, snapshot
+        for path in glob.glob(os.path.join(self.snapshot_dir, "snapshot-*")):
+            if path != snapshot["path"]:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def take_snapshot(self) -> Dict[str, Any]:
+        """Write a fresh Parquet snapshot of SNAPSHOT_TABLES and swap the DuckDB tables onto it"""
+        if duckdb is None:
+            raise RuntimeError("duckdb and pyarrow are required for the analytics tier")
+
+        with self._snapshot_lock:
+            start = time.perf_counter()
+            taken_at = time.time()
+            target_dir = os.path.join(self.snapshot_dir, f"snapshot-{int(taken_at * 1000)}")
+            os.makedirs(target_dir, exist_ok=True)
+            try:
+                row_counts = {table: self._write_table(table, target_dir) for table in SNAPSHOT_TABLES}
+                connection = self._load_snapshot(target_dir)
+            except Exception:
+                self._count("snapshot_failures")
+                shutil.rmtree(target_dir, ignore_errors=True)
+                raise
+
+            snapshot = {
+                "path": target_dir,
+                "taken_at": taken_at,
+                "row_counts": row_counts,
+                "snapshot_ms": round((time.perf_counter() - start) * 1000, 2)
+            }
+            with open(os.path.join(target_dir, "manifest.json"), "w") as manifest:
+                json.dump(snapshot, manifest, indent=2)
+            self._swap(connection, snapshot)
+            self._count("snapshots")
+            logger.info(f"Analytics snapshot taken in {snapshot['snapshot_ms']} ms: {row_counts}")
+            return snapshot
+
+    def load_latest_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Reuse the newest complete snapshot on disk (e.g. after a restart) if it is within the refresh interval"""
+        manifests = sorted(glob.glob(os.path.join(self.snapshot_dir, "snapshot-*", "manifest.json")))
+        if duckdb is None or not manifests:
+            return None
+        with open(manifests[-1]) as manifest:
+            snapshot = json.load(manifest)
+        if time.time() - snapshot["taken_at"] > self.refresh_interval:
+            return None
+        with self._snapshot_lock:
+            self._swap(self._load_snapshot(snapshot["path"]), snapshot)
+        logger.info(f"Analytics tier reusing snapshot {snapshot['path']}")
+        return snapshot
+
+    def snapshot_age(self) -> Optional[float]:
+        with self._lock:
+            snapshot = self._snapshot
+        return time.time() - snapshot["taken_at"] if snapshot else None
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._background_snapshot, name="analytics-snapshot",
+                                                    daemon=True)
+            self._refresh_thread.start()
+
+    def _background_snapshot(self) -> None:
+        try:
+            if self.snapshot_age() is not None or self.load_latest_snapshot() is None:
+                self.take_snapshot()
+        except Exception as e:
+            logger.error(f"Analytics snapshot failed: {e}")
+
+    def route(self, sql: str, max_staleness: Optional[float] = None) -> Optional[str]:
+        """None when the snapshot may answer sql, otherwise the reason it must go to the OLTP database"""
+        if not self.enabled:
+            return "disabled"
+        age = self.snapshot_age()
+        if age is None or age > self.refresh_interval:
+            self._refresh_in_background()
+        limit = self.max_staleness if max_staleness is None else min(max_staleness, self.max_staleness)
+        statement = sql.strip().rstrip(";")
+        if not re.match(r'^(SELECT|WITH)\b', statement, re.IGNORECASE) or ";" in statement:
+            return "not_select"
+        if WRITE_PATTERN.search(STRING_LITERAL_PATTERN.sub("''", statement)):
+            return "not_read_only"
+        if not AGGREGATE_PATTERN.search(statement):
+            return "not_aggregate"
+        tables = QueryResultCache.tables_in(statement)
+        if not tables or not tables <= set(SNAPSHOT_TABLES):
+            return "tables_not_snapshotted"
+        if age is None:
+            return "no_snapshot"
+        if age > limit:
+            return "stale"
+        return None
+
+    def execute(self, sql: str, params: Optional[Dict] = None, layout: str = "rows",
+                row_cap: Optional[int] = None, cancel_token: Optional[QueryCancelToken] = None) -> Dict[str, Any]:
+        """
+        Run translated sql against the current snapshot, shaped like DatabaseManager.execute_query.
+        At most row_cap rows come back; "truncated" says whether more were available.
+        """
+        with self._lock:
+            connection, snapshot = self._connection, self._snapshot
+        if connection is None:
+            raise RuntimeError("No analytics snapshot available")
+        row_cap = row_cap or self.row_cap
+        start = time.perf_counter()
+        cursor = connection.cursor()
+        if cancel_token is not None:
+            cancel_token.bind(cursor.interrupt)
+        try:
+            if cancel_token is not None and cancel_token.cancelled:
+                # An interrupt before the statement starts is a no-op in DuckDB
+                raise RuntimeError("Analytics query cancelled before it started")
+            for setting in SESSION_SETTINGS:
+                cursor.execute(setting)
+            cursor.execute(translate_tsql_to_duckdb(sql), params or None)
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchmany(row_cap + 1)
+        finally:
+            if cancel_token is not None:
+                cancel_token.unbind()
+            cursor.close()
+        truncated = len(rows) > row_cap
+        rows = rows[:row_cap]
+        elapsed = time.perf_counter() - start
+        if layout == "rows":
+            data = DatabaseManager._rows_to_dicts(rows, columns)
+        else:
+            data = DatabaseManager._rows_to_columns(rows, columns, convert=(layout == "columns"))
+        with self._lock:
+            self.stats["total_query_ms"] += elapsed * 1000
+        return {
+            "status": "success",
+            "message": f"Query executed successfully. {len(rows)} rows returned.",
+            "data": data,
+            "row_count": len(rows),
+            "columns": columns,
+            "truncated": truncated,
+            "execution_time": round(elapsed, 4),
+            "snapshot_age_seconds": round(time.time() - snapshot["taken_at"], 1)
+        }
+
+    def try_execute(self, sql: str, params: Optional[Dict] = None, layout: str = "rows",
+                    max_staleness: Optional[float] = None, row_cap: Optional[int] = None,
+                    cancel_token: Optional[QueryCancelToken] = None) -> Optional[Dict[str, Any]]:
+        """Answer sql from the snapshot when the router allows it; None means use the OLTP database"""
+        reason = self.route(sql, max_staleness)
+        if reason is not None:
+            self._count("skipped", reason)
+            return None
+        try:
+            result = self.execute(sql, params, layout, row_cap=row_cap, cancel_token=cancel_token)
+        except Exception as e:
+            if cancel_token is not None and cancel_token.cancelled:
+                # The caller timed out or went away and has already answered
+                return None
+            logger.warning(f"Analytics tier fell back to OLTP: {e}")
+            self._count("fallbacks")
+            return None
+        self._count("routed")
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, skipped=dict(self.stats["skipped"]))
+            snapshot = self._snapshot
+        stats.update(enabled=self.enabled, max_staleness_seconds=self.max_staleness,
+                     refresh_interval_seconds=self.refresh_interval)
+        stats["avg_query_ms"] = round(stats.pop("total_query_ms") / stats["routed"], 2) if stats["routed"] else None
+        if snapshot is not None:
+            stats.update(snapshot_age_seconds=round(time.time() - snapshot["taken_at"], 1),
+                         snapshot_ms=snapshot["snapshot_ms"], snapshot_rows=snapshot["row_counts"])
+        return stats
+
+# Global instance
+analytics_tier = AnalyticsTier()
+
+def get_analytics_tier() -> AnalyticsTier:
+    """Get the process-wide AnalyticsTier instance"""
+    return analytics_tier
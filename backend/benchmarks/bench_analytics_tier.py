@@ -0,0 +1,70 @@
+"""
+Benchmark: aggregate queries on the DuckDB analytics snapshot vs the OLTP database.
+
+Takes a Parquet snapshot of the configured database, then runs every aggregate
+query from database/test_queries.sql that the router would send to the
+snapshot, timing both tiers and checking they return the same row count.
+
+Usage:
+    DB_ENGINE=sqlite LOCAL_DB_PATH=database/welfare_large.db python benchmarks/bench_analytics_tier.py
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from analytics_tier import AnalyticsTier
+from db import get_db_connection
+
+TEST_QUERIES = os.path.join(os.path.dirname(backend_dir), "database", "test_queries.sql")
+
+def _queries():
+    with open(TEST_QUERIES) as handle:
+        script = re.sub(r'--[^\n]*', '', handle.read())
+    return [statement.strip() for statement in script.split(";") if statement.strip()]
+
+def _median_ms(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def run(repeat: int) -> None:
+    db_manager = get_db_connection()
+    tier = AnalyticsTier(db_manager, snapshot_dir=tempfile.mkdtemp(prefix="analytics-bench-"))
+    snapshot = tier.take_snapshot()
+    print(f"snapshot: {snapshot['snapshot_ms']:.0f} ms, {sum(snapshot['row_counts'].values()):,} rows")
+
+    for number, sql in enumerate(_queries(), 1):
+        reason = tier.route(sql)
+        if reason is not None:
+            print(f"  Q{number:<3} OLTP only ({reason})")
+            continue
+        oltp = db_manager.execute_query(sql, use_cache=False)
+        if oltp["status"] != "success":
+            print(f"  Q{number:<3} skipped: fails on the database too")
+            continue
+        try:
+            analytics = tier.execute(sql)
+        except Exception as e:
+            print(f"  Q{number:<3} falls back: {str(e).splitlines()[0]}")
+            continue
+        tier_ms = _median_ms(lambda: tier.execute(sql), repeat)
+        oltp_ms = _median_ms(lambda: db_manager.execute_query(sql, use_cache=False), repeat)
+        match = "same rows" if min(oltp["row_count"], tier.row_cap) == analytics["row_count"] else "ROW COUNT DIFFERS"
+        print(f"  Q{number:<3} snapshot {tier_ms:8.1f} ms   OLTP {oltp_ms:8.1f} ms   {match}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.repeat)
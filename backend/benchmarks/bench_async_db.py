@@ -0,0 +1,100 @@
+"""
+Benchmark: N concurrent slow queries through async route handlers.
+
+Compares calling the synchronous DatabaseManager.execute_query inside an
+async handler (blocks the event loop) with execute_query_async (bounded
+worker pool). Reports wall time, throughput and the worst event-loop stall
+seen by a heartbeat task, then shows a timed-out query being cancelled.
+
+Runs against a throwaway SQLite file so no Azure SQL is required. Server-side
+work is modelled with a sleep_ms() SQL function, which is what a slow remote
+query looks like to the client thread.
+
+Usage:
+    python benchmarks/bench_async_db.py --concurrency 20 --latency-ms 250
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from db import DatabaseManager
+
+SLOW_QUERY = "SELECT sleep_ms(:latency_ms) AS waited_ms"
+
+RUNAWAY_QUERY = """
+SELECT COUNT(*) AS total FROM (
+    WITH RECURSIVE numbers(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM numbers WHERE x < 100000000)
+    SELECT x FROM numbers
+)
+"""
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000.0)
+    return ms
+
+def _sqlite_manager(path: str) -> DatabaseManager:
+    manager = DatabaseManager()
+    manager.use_local_db = True
+    manager.connection_string = f"sqlite:///{path}"
+    manager._initialize_engine()
+    event.listen(manager.engine, "connect",
+                 lambda dbapi_connection, record: dbapi_connection.create_function("sleep_ms", 1, _sleep_ms))
+    return manager
+
+async def _heartbeat(stop: asyncio.Event, stalls: list) -> None:
+    """Measure how late the event loop wakes a 10ms sleeper"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stalls.append(time.perf_counter() - start - 0.01)
+
+async def _run(label, handler, concurrency: int) -> None:
+    stop, stalls = asyncio.Event(), []
+    beat = asyncio.create_task(_heartbeat(stop, stalls))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(handler() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    ok = sum(r["status"] == "success" for r in results)
+    print(f"{label:<30} {elapsed:6.2f}s  {concurrency / elapsed:6.1f} queries/s  "
+          f"max loop stall={max(stalls, default=0) * 1000:7.1f} ms  ok={ok}/{concurrency}")
+
+async def main(concurrency: int, latency_ms: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = _sqlite_manager(os.path.join(tmp, "bench.db"))
+        params = {"latency_ms": latency_ms}
+
+        async def blocking_handler():
+            return manager.execute_query(SLOW_QUERY, params)
+
+        async def async_handler():
+            return await manager.execute_query_async(SLOW_QUERY, params)
+
+        print(f"{concurrency} concurrent queries, {latency_ms} ms server time each, "
+              f"{manager.executor._max_workers} worker threads")
+        await _run("sync execute_query", blocking_handler, concurrency)
+        await _run("execute_query_async", async_handler, concurrency)
+
+        start = time.perf_counter()
+        result = await manager.execute_query_async(RUNAWAY_QUERY, timeout=0.2)
+        print(f"timeout=0.2s query returned after {time.perf_counter() - start:.2f}s: "
+              f"{result.get('error_type')} - {result['message']}")
+        manager.executor.shutdown(wait=True)
+        manager.engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=int, default=250)
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.latency_ms))
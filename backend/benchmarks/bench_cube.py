@@ -0,0 +1,68 @@
+"""
+Benchmark: dashboard rollups from the cube vs GROUP BY over the OLTP tables.
+
+Builds the rollup cube from the configured database (set DB_ENGINE=sqlite and
+LOCAL_DB_PATH to a synthetic_data.py load for a large run), then times the
+dashboard's scheme / state / monthly rollups both as SQL GROUP BYs and as cube
+queries, plus an incremental refresh with nothing new to apply.
+
+Usage:
+    DB_ENGINE=sqlite LOCAL_DB_PATH=database/welfare_large.db python benchmarks/bench_cube.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from cube import RollupCube
+from db import get_db_connection
+
+ROLLUPS = [
+    ("by scheme",
+     "SELECT scheme_id, COUNT(*) AS n, SUM(amount) AS amount, COUNT(DISTINCT citizen_id) AS beneficiaries "
+     "FROM disbursements GROUP BY scheme_id",
+     {"level": "all", "by_scheme": True}),
+    ("by state",
+     "SELECT d.state_id, COUNT(*) AS n, SUM(f.amount) AS amount, COUNT(DISTINCT f.citizen_id) AS beneficiaries "
+     "FROM disbursements f JOIN citizens c ON c.citizen_id = f.citizen_id "
+     "JOIN villages v ON v.village_id = c.village_id JOIN districts d ON d.district_id = v.district_id "
+     "GROUP BY d.state_id",
+     {"level": "state"}),
+    ("by month",
+     "SELECT substr(disbursed_on, 1, 7) AS month, COUNT(*) AS n, SUM(amount) AS amount "
+     "FROM disbursements GROUP BY substr(disbursed_on, 1, 7)",
+     {"level": "all", "by_month": True, "measures": ["disbursement_count", "disbursed_amount"]}),
+]
+
+def _median_ms(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def run(repeat: int, run_sql: bool) -> None:
+    db_manager = get_db_connection()
+    cube = RollupCube(db_manager, max_age_seconds=float("inf"))
+    build = cube.refresh(full=True)
+    print(f"full build: {build['refresh_ms']:.0f} ms, cells {build['cells']}, watermarks {build['watermarks']}")
+    print(f"incremental refresh (open month only): {_median_ms(cube.refresh, repeat):.0f} ms")
+
+    for name, sql, query in ROLLUPS:
+        line = f"  {name:<10} cube {_median_ms(lambda: cube.query(**query), repeat):8.2f} ms"
+        if run_sql and db_manager.engine.dialect.name == "sqlite":
+            line += f"   GROUP BY {_median_ms(lambda: db_manager.execute_query(sql, use_cache=False), repeat):8.1f} ms"
+        print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-sql", action="store_true", help="Only time the cube")
+    args = parser.parse_args()
+    run(args.repeat, not args.skip_sql)
@@ -0,0 +1,103 @@
+"""
+Benchmark: vectorized eligibility evaluation over synthetic citizens.
+
+Builds columnar citizen arrays in memory (no database) and times evaluating the
+scheme_eligibility rules from data.sql, the per-scheme summary, turning the
+outcomes into eligibility_log reason strings, and what-if simulations against
+the cached predicate masks.
+
+Usage:
+    python benchmarks/bench_eligibility.py --citizens 2000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from eligibility import CitizenArrays, EligibilitySimulator, SchemeRule, evaluate_rules
+
+SIMULATIONS = [
+    (1, {"max_age": 70}, "state"),
+    (3, {"min_age": 21}, "district"),
+    (3, {"gender": None}, "village"),
+    (5, {"min_age": 55, "disability_required": False}, "district"),
+]
+
+RULES = [
+    {"scheme_id": 1, "name": "MGNREGA", "min_age": 18, "max_age": 65, "gender": None,
+     "category_required": "BPL", "min_income": None, "disability_required": None},
+    {"scheme_id": 2, "name": "PMAY", "min_age": None, "max_age": None, "gender": None,
+     "category_required": "BPL/EWS/LIG", "min_income": 600000, "disability_required": None},
+    {"scheme_id": 3, "name": "Ujjwala Yojana", "min_age": 18, "max_age": None, "gender": "Female",
+     "category_required": "BPL", "min_income": None, "disability_required": None},
+    {"scheme_id": 4, "name": "Ayushman Bharat - PMJAY", "min_age": None, "max_age": None, "gender": None,
+     "category_required": "APL/BPL", "min_income": 1000000, "disability_required": None},
+    {"scheme_id": 5, "name": "NSAP", "min_age": 60, "max_age": None, "gender": None,
+     "category_required": "BPL", "min_income": None, "disability_required": "Yes"},
+]
+
+def _citizens(count: int) -> CitizenArrays:
+    rng = np.random.default_rng(7)
+    # 1000 villages, 20 per district, 4 districts per state
+    village_id = rng.integers(1, 1001, count).astype(np.int32)
+    district_id = (village_id - 1) // 20 + 1
+    return CitizenArrays(
+        citizen_id=np.arange(1, count + 1, dtype=np.int64),
+        age=rng.integers(0, 95, count).astype(np.int16),
+        gender=np.array(["male", "female"])[rng.integers(0, 2, count)],
+        village_id=village_id,
+        district_id=district_id,
+        state_id=(district_id - 1) // 4 + 1,
+        has_disability=rng.random(count) < 0.05
+    )
+
+def run(citizen_count: int, repeat: int) -> None:
+    citizens = _citizens(citizen_count)
+    rules = [SchemeRule(rule) for rule in RULES]
+    evaluate_times, summary_times, reason_times = [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = evaluate_rules(citizens, rules)
+        evaluate_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        summary = result.summary()
+        summary_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        reasons = np.stack([rule.reasons for rule in rules])[result.rule_index.astype(np.int64), result.reason_code]
+        reason_times.append(time.perf_counter() - start)
+
+    print(f"{len(result):,} citizen x scheme evaluations ({citizen_count:,} citizens x {len(rules)} schemes)")
+    print(f"  evaluate: {statistics.median(evaluate_times) * 1000:8.1f} ms  "
+          f"({len(result) / statistics.median(evaluate_times) / 1e6:.0f}M evaluations/s)")
+    print(f"  summary : {statistics.median(summary_times) * 1000:8.1f} ms")
+    print(f"  reasons : {statistics.median(reason_times) * 1000:8.1f} ms  ({len(reasons):,} strings)")
+    for scheme in summary:
+        print(f"  {scheme['name']:<26} eligible {scheme['eligible']:>10,} / {scheme['evaluated']:,}")
+
+    simulator = EligibilitySimulator()
+    start = time.perf_counter()
+    simulator.load_snapshot(citizens, rules, {"state": {}, "district": {}, "village": {}})
+    print(f"simulation snapshot (predicate masks): {(time.perf_counter() - start) * 1000:.1f} ms")
+    for scheme_id, changes, breakdown in SIMULATIONS:
+        timings = []
+        for _ in range(repeat):
+            simulation = simulator.simulate(scheme_id, changes, breakdown=breakdown)
+            timings.append(simulation["simulate_ms"])
+        print(f"  scheme {scheme_id} {changes} by {breakdown}: net {simulation['net_change']:+,} "
+              f"over {simulation['regions_changed']} regions in {statistics.median(timings):.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--citizens", type=int, default=2_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.citizens, args.repeat)
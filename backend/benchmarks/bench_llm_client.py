@@ -0,0 +1,113 @@
+"""
+Benchmark: per-request overhead of a fresh PromptEngine/AzureOpenAI client
+versus the shared, pooled client.
+
+By default a local keep-alive HTTP stub stands in for Azure OpenAI so the
+numbers isolate client construction and connection setup. Point
+AZURE_OPENAI_ENDPOINT/AZURE_OPENAI_API_KEY at a real deployment and pass
+--real to include the TLS handshake to Azure.
+
+Usage:
+    python benchmarks/bench_llm_client.py --requests 200
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "bench",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": "SELECT COUNT(*) AS total FROM citizens"}
+    }],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+}
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Minimal chat-completions endpoint that keeps connections alive"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = json.dumps(COMPLETION).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _summarize(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} mean={statistics.mean(samples) * 1000:8.2f} ms  "
+          f"p50={statistics.median(samples) * 1000:8.2f} ms  p95={p95 * 1000:8.2f} ms")
+    return statistics.mean(samples)
+
+def run(requests: int, real: bool) -> None:
+    server = None
+    if not real:
+        server = _start_stub_server()
+        os.environ["AZURE_OPENAI_ENDPOINT"] = f"http://127.0.0.1:{server.server_address[1]}"
+        os.environ.setdefault("AZURE_OPENAI_API_KEY", "bench-key")
+
+    from prompt_engine import PromptEngine
+
+    query = "how many citizens are enrolled in pmay"
+
+    # Before: a new engine (schemas + AzureOpenAI client + connection) per request
+    per_request = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        engine = PromptEngine()
+        engine._try_azure_openai(query)
+        per_request.append(time.perf_counter() - start)
+        engine.close()
+
+    # After: one shared engine holding a pooled keep-alive client
+    shared_engine = PromptEngine()
+    shared_engine._try_azure_openai(query)  # warm the pool
+    shared = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        shared_engine._try_azure_openai(query)
+        shared.append(time.perf_counter() - start)
+
+    print(f"{requests} NL->SQL calls against {os.environ['AZURE_OPENAI_ENDPOINT']}")
+    before = _summarize("fresh engine per request", per_request)
+    after = _summarize("shared pooled engine", shared)
+    print(f"per-request overhead saved: {(before - after) * 1000:.2f} ms ({before / after:.1f}x)")
+    print(f"shared client stats: {shared_engine.get_client_stats()}")
+
+    shared_engine.close()
+    if server:
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--real", action="store_true", help="Use the configured Azure OpenAI endpoint")
+    args = parser.parse_args()
+    run(args.requests, args.real)
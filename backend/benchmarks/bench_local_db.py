@@ -0,0 +1,61 @@
+"""
+Benchmark: build the offline SQLite database and run the reference queries on it.
+
+Loads database/schema.sql and database/data.sql into a fresh SQLite file
+(executemany in one transaction, WAL journal), then runs every statement from
+database/test_queries.sql through the T-SQL -> SQLite translation.
+
+Usage:
+    python benchmarks/bench_local_db.py --repeat 5
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from local_db import REPO_ROOT, load_local_database, split_sql_script, translate_tsql
+
+TEST_QUERIES_PATH = os.path.join(REPO_ROOT, "database", "test_queries.sql")
+
+def run(repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "welfare_local.db")
+        timings = []
+        for _ in range(repeat):
+            result = load_local_database(path, force=True)
+            timings.append(result["load_seconds"])
+        print(f"loaded {sum(result['rows'].values())} rows into {len(result['rows'])} tables")
+        print(f"load time over {repeat} runs: mean={statistics.mean(timings) * 1000:.1f} ms  "
+              f"max={max(timings) * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        reused = load_local_database(path)
+        print(f"reuse check: {reused['status']} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        with open(TEST_QUERIES_PATH, encoding="utf-8") as queries_file:
+            queries = split_sql_script(queries_file.read())
+        connection = sqlite3.connect(path)
+        passed = 0
+        for number, query in enumerate(queries, 1):
+            try:
+                start = time.perf_counter()
+                rows = connection.execute(translate_tsql(query)).fetchall()
+                passed += 1
+                print(f"  query {number:>2}: {len(rows):>4} rows in {(time.perf_counter() - start) * 1000:6.2f} ms")
+            except sqlite3.Error as e:
+                print(f"  query {number:>2}: failed - {e}")
+        connection.close()
+        print(f"{passed}/{len(queries)} reference queries ran on SQLite")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.repeat)
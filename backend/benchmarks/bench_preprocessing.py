@@ -0,0 +1,222 @@
+"""
+Benchmark: question preprocessing and SQL validation, compiled pipeline vs per-call regexes.
+
+Builds a corpus of logged questions (access_log.query_text from the configured
+database with --from-db, a file with --corpus, plus the reference questions in
+database/test_queries.sql), expanded with year phrases, scheme names, amounts
+and disability thresholds to the requested size. Each question goes through
+PromptEngine._preprocess_query and each SQL statement (the reference queries
+and the template SQL for the questions, with LIMIT and table-prefix variants)
+through _validate_and_fix_sql. Both stages are timed against the previous
+implementation, kept below as the reference, and every output is checked to be
+identical.
+
+Usage:
+    python benchmarks/bench_preprocessing.py --size 100000
+    DB_ENGINE=sqlite LOCAL_DB_PATH=database/welfare_large.db python benchmarks/bench_preprocessing.py --from-db
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from prompt_engine import PromptEngine
+
+TEST_QUERIES = os.path.join(os.path.dirname(backend_dir), "database", "test_queries.sql")
+
+# Phrases that exercise every rewrite rule
+DECORATIONS = [
+    "this year", "in current year", "last year", "for next year", "in 2023", "for 2024", "in 2019 and 2020",
+    "above 5 lakh", "more than ₹ 50000", "₹2 lakh", "with disability above 70%", "disabled senior citizens",
+    "in rural areas", "urban districts", "under PMAY", "for nsap", "mgnrega workers", "ujjwala", "ayushman cards",
+    "how many", "show me", "find", "Rural-Urban split", "  with extra   spaces  "
+]
+
+def legacy_preprocess(query: str) -> str:
+    """_preprocess_query before the compiled pipeline"""
+    query = query.lower().strip()
+    current_year = datetime.now().year
+    query = re.sub(r'\b(this year|current year)\b', f'{current_year}', query)
+    query = re.sub(r'\blast year\b', f'{current_year - 1}', query)
+    query = re.sub(r'\bnext year\b', f'{current_year + 1}', query)
+    query = re.sub(r'\bpmay\b', 'PMAY housing scheme', query)
+    query = re.sub(r'\bnsap\b', 'NSAP pension scheme', query)
+    query = re.sub(r'\bmgnrega\b', 'MGNREGA employment scheme', query)
+    query = re.sub(r'\bujjwala\b', 'Ujjwala gas scheme', query)
+    query = re.sub(r'\bayushman\b', 'Ayushman Bharat health scheme', query)
+    query = re.sub(r'\brural\b', 'rural villages', query)
+    query = re.sub(r'\burban\b', 'urban areas', query)
+    query = re.sub(r'disability.*above.*(\d+)%', r'severe disability conditions above \1 percent', query)
+    query = re.sub(r'disabled.*citizens', 'citizens with disabilities', query)
+    query = re.sub(r'(\d+)\s*lakh', r'\1 hundred thousand rupees', query)
+    query = re.sub(r'₹\s*(\d+)', r'\1 rupees', query)
+    query = re.sub(r'\bin\s+(\d{4})\b', r'during year \1', query)
+    query = re.sub(r'\bfor\s+(\d{4})\b', r'during year \1', query)
+    query = re.sub(r'\bhow many\b', 'count', query)
+    query = re.sub(r'\bshow me\b', 'list', query)
+    query = re.sub(r'\bfind\b', 'select', query)
+    return query
+
+def legacy_fix_group_by_issues(sql: str) -> str:
+    if 'GROUP BY' not in sql.upper():
+        return sql
+    select_match = re.search(r'SELECT\s+(TOP\s+\d+\s+)?(.*?)\s+FROM', sql, re.IGNORECASE | re.DOTALL)
+    group_by_match = re.search(r'GROUP\s+BY\s+(.*?)(?:\s+HAVING|\s+ORDER|\s*$)', sql, re.IGNORECASE | re.DOTALL)
+    if not select_match or not group_by_match:
+        return sql
+    select_part = select_match.group(2) if select_match.group(2) else select_match.group(1)
+    group_by_part = group_by_match.group(1).strip()
+    select_columns = []
+    for col in select_part.split(','):
+        col = col.strip()
+        if not re.search(r'\b(COUNT|SUM|AVG|MAX|MIN|STRING_AGG|FORMAT)\s*\(', col, re.IGNORECASE):
+            if not re.search(r'^\s*CASE\s+', col, re.IGNORECASE):
+                if not re.search(r'^\s*[\'"]\w+[\'"]\s*$', col):
+                    base_col = col
+                    if ' AS ' in col.upper():
+                        base_col = col.split(' AS ')[0].strip()
+                    if base_col and base_col not in ['*']:
+                        select_columns.append(base_col)
+    existing_group_by = [col.strip() for col in group_by_part.split(',') if col.strip()]
+    for col in select_columns:
+        col_found = False
+        for existing_col in existing_group_by:
+            if col in existing_col or existing_col in col:
+                col_found = True
+                break
+        if not col_found and col not in group_by_part:
+            if group_by_part:
+                group_by_part += f", {col}"
+            else:
+                group_by_part = col
+    if group_by_part:
+        sql = re.sub(r'GROUP\s+BY\s+.*?(?=\s+HAVING|\s+ORDER|\s*$)',
+                     f'GROUP BY {group_by_part}', sql, flags=re.IGNORECASE)
+    return sql
+
+def legacy_validate(engine: PromptEngine, sql: str) -> str:
+    """_validate_and_fix_sql before the compiled pipeline"""
+    sql = re.sub(r'\s+', ' ', sql.strip())
+    limit_match = re.search(r"LIMIT\s+(\d+)", sql, re.IGNORECASE)
+    if limit_match:
+        n = limit_match.group(1)
+        sql = re.sub(r"\s*LIMIT\s+\d+\s*;?\s*$", "", sql, flags=re.IGNORECASE)
+        if not re.search(r"SELECT\s+TOP\s+\d+", sql, re.IGNORECASE):
+            sql = re.sub(r"SELECT\b", f"SELECT TOP {n}", sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\benrollment_id\b', 'e.enrollment_id', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'\bdisability_percentage\b', 'disability_status', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'disbursements\s+d\s+ON\s+d\.enrollment_id\s*=\s*e\.enrollment_id',
+                 'disbursements d ON d.citizen_id = e.citizen_id AND d.scheme_id = e.scheme_id', sql, flags=re.IGNORECASE)
+    sql = legacy_fix_group_by_issues(sql)
+    sql = re.sub(r'citizens\.name', 'c.name', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'citizens\.citizen_id', 'c.citizen_id', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'schemes\.name', 's.name', sql, flags=re.IGNORECASE)
+    sql = re.sub(r'HAVING\s+COUNT\s*\(\s*ba\.account_id\s*\)\s*>\s*1',
+                 'HAVING COUNT(DISTINCT ba.account_id) > 1', sql, flags=re.IGNORECASE)
+    if 'village' in sql.lower() and 'citizens' in sql.lower() and 'join villages' not in sql.lower():
+        sql = engine._add_missing_joins(sql, 'villages')
+    if 'district' in sql.lower() and 'join districts' not in sql.lower():
+        sql = engine._add_missing_joins(sql, 'districts')
+    if 'state' in sql.lower() and 'join states' not in sql.lower():
+        sql = engine._add_missing_joins(sql, 'states')
+    if 'disability' in sql.lower() and 'join health_details' not in sql.lower():
+        sql = engine._add_missing_joins(sql, 'health_details')
+    return sql.strip()
+
+def _reference_questions():
+    with open(TEST_QUERIES) as handle:
+        return [match.group(1).strip() for match in re.finditer(r"^--\s*\d+\.\s*(.+)$", handle.read(), re.MULTILINE)]
+
+def _reference_sql():
+    with open(TEST_QUERIES) as handle:
+        script = re.sub(r'--[^\n]*', '', handle.read())
+    return [statement.strip() for statement in script.split(";") if statement.strip()]
+
+def _logged_questions(corpus_path, from_db: bool):
+    questions = []
+    if corpus_path:
+        with open(corpus_path, encoding="utf-8") as handle:
+            questions += [line.strip() for line in handle if line.strip()]
+    if from_db:
+        from db import get_db_connection
+        result = get_db_connection().execute_query(
+            "SELECT query_text FROM access_log WHERE query_text IS NOT NULL", use_cache=False)
+        if result["status"] == "success":
+            questions += [row["query_text"] for row in result["data"]]
+        else:
+            print(f"access_log not readable: {result.get('message')}")
+    return questions
+
+def build_corpus(engine: PromptEngine, base_questions, size: int, seed: int):
+    """size questions and size SQL statements drawn from the base sets with random variations"""
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(size):
+        question = rng.choice(base_questions)
+        for decoration in rng.sample(DECORATIONS, rng.randint(0, 3)):
+            question = f"{question} {decoration}" if rng.random() < 0.7 else f"{decoration} {question}"
+        questions.append(question.upper() if rng.random() < 0.05 else question)
+
+    base_sql = _reference_sql()
+    for question in base_questions:
+        match = engine.templates.match(question)
+        if match:
+            base_sql.append(match["sql"])
+    statements = []
+    for _ in range(size):
+        sql = rng.choice(base_sql)
+        roll = rng.random()
+        if roll < 0.2:
+            sql = re.sub(r"\bTOP\s+\d+\s*", "", sql) + f" LIMIT {rng.randint(1, 500)};"
+        elif roll < 0.3:
+            sql = sql.replace("c.name", "citizens.name").replace("s.name", "schemes.name")
+        elif roll < 0.35:
+            sql = sql.replace("disability_status", "disability_percentage")
+        statements.append(sql)
+    return questions, statements
+
+def _time(label: str, func, items) -> list:
+    start = time.perf_counter()
+    outputs = [func(item) for item in items]
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<32} {elapsed * 1000:9.1f} ms  {elapsed / len(items) * 1e6:7.2f} us/item")
+    return outputs
+
+def run(size: int, seed: int, corpus_path, from_db: bool) -> None:
+    engine = PromptEngine()
+    base_questions = _logged_questions(corpus_path, from_db) + _reference_questions()
+    questions, statements = build_corpus(engine, base_questions, size, seed)
+    print(f"corpus: {len(questions):,} questions from {len(base_questions):,} logged/reference questions, "
+          f"{len(statements):,} SQL statements")
+
+    print("preprocessing")
+    before = _time("per-call re.sub (previous)", legacy_preprocess, questions)
+    after = _time("compiled pipeline", engine._preprocess_query, questions)
+    mismatches = [question for question, old, new in zip(questions, before, after) if old != new]
+    print(f"  identical output: {len(questions) - len(mismatches):,}/{len(questions):,}")
+    for question in mismatches[:5]:
+        print(f"    differs: {question!r}")
+
+    print("validation")
+    before = _time("per-call re.sub (previous)", lambda sql: legacy_validate(engine, sql), statements)
+    after = _time("compiled pipeline", engine._validate_and_fix_sql, statements)
+    mismatches = [sql for sql, old, new in zip(statements, before, after) if old != new]
+    print(f"  identical output: {len(statements) - len(mismatches):,}/{len(statements):,}")
+    for sql in mismatches[:3]:
+        print(f"    differs: {sql[:120]!r}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000, help="Questions and statements in the corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--corpus", help="File of logged questions, one per line")
+    parser.add_argument("--from-db", action="store_true", help="Include access_log.query_text from the configured database")
+    args = parser.parse_args()
+    run(args.size, args.seed, args.corpus, args.from_db)
@@ -0,0 +1,65 @@
+"""
+Benchmark: prompt schema tokens with and without schema pruning.
+
+For a set of typical dashboard questions, shows which tables the pruner keeps
+and how many schema/rules tokens go into the prompt compared to the full
+schema. No LLM call is made; tokens are counted with tiktoken when installed,
+otherwise estimated at ~4 characters per token.
+
+Usage:
+    python benchmarks/bench_prompt_pruning.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from prompt_engine import PromptEngine
+from schema_pruner import count_tokens
+
+QUESTIONS = [
+    "Total disbursement amount by scheme",
+    "Citizens receiving maximum benefits",
+    "Citizens enrolled in multiple schemes",
+    "Officers with highest verification activity",
+    "Female citizens aged 18-30",
+    "Monthly disbursement trends",
+    "How many citizens in Gujarat are enrolled in PMAY?",
+    "Number of beneficiaries per district",
+    "Citizens with disability above 70% receiving pension",
+    "Citizens without a bank account who received payments",
+    "List all schemes in the health sector",
+    "Average age of citizens by state",
+]
+
+def _schema_tokens(engine: PromptEngine, tables) -> int:
+    included = set(tables)
+    rules = (engine.DISBURSEMENT_RULES if "disbursements" in included else "") + \
+            (engine.SCHEME_RULES if "schemes" in included else "")
+    return count_tokens(engine._build_schema_context(tables) + rules)
+
+def run(questions) -> None:
+    engine = PromptEngine()
+    full = _schema_tokens(engine, list(engine.table_schemas))
+    print(f"full schema + rules: {full} tokens, {len(engine.table_schemas)} tables")
+    ratios, select_us = [], []
+    for question in questions:
+        start = time.perf_counter()
+        selection = engine.schema_pruner.select(question)
+        select_us.append((time.perf_counter() - start) * 1e6)
+        tokens = _schema_tokens(engine, selection["tables"])
+        ratios.append(tokens / full)
+        print(f"  {tokens:5d} tokens ({tokens / full:4.0%})  {', '.join(selection['tables']):<60} {question}")
+    print(f"median schema tokens vs full: {statistics.median(ratios):.0%}; "
+          f"table selection {statistics.median(select_us):.0f} us/question")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("questions", nargs="*", help="Questions to try instead of the built-in set")
+    args = parser.parse_args()
+    run(args.questions or QUESTIONS)
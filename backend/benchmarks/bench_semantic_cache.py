@@ -0,0 +1,79 @@
+"""
+Benchmark: SemanticSQLCache lookup latency with a large index.
+
+Fills the index with synthetic welfare questions (scheme x state x gender x
+age range x intent) and times paraphrased hits and unseen misses.
+
+Usage:
+    python benchmarks/bench_semantic_cache.py --entries 100000 --lookups 20000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from semantic_cache import SemanticSQLCache
+
+INTENTS = [
+    ("count {gender} citizens aged {lo}-{hi} enrolled in {scheme} in {place}",
+     "number of {gender_alt} between {lo} and {hi} enrolled in {scheme} in {place}"),
+    ("list {gender} beneficiaries aged {lo}-{hi} of {scheme} in {place}",
+     "show {gender_alt} aged {lo} to {hi} in {scheme} scheme from {place}"),
+    ("total disbursement to {gender} citizens aged {lo}-{hi} under {scheme} in {place}",
+     "sum of payments to {gender_alt} between {lo} and {hi} for {scheme} in {place}"),
+]
+SCHEMES = ["mgnrega", "pmay", "ujjwala", "ayushman", "nsap"] + [f"scheme{i}" for i in range(45)]
+PLACES = [f"place{i}" for i in range(80)]
+GENDERS = [("female", "women"), ("male", "men")]
+AGES = [(lo, lo + span) for lo in range(18, 70, 2) for span in (5, 10, 12)]
+
+def _questions():
+    for (intent, paraphrase), scheme, place, (gender, gender_alt), (lo, hi) in itertools.product(
+            INTENTS, SCHEMES, PLACES, GENDERS, AGES):
+        values = dict(scheme=scheme, place=place, gender=gender, gender_alt=gender_alt, lo=lo, hi=hi)
+        yield intent.format(**values), paraphrase.format(**values)
+
+def _report(label, samples):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<18} mean={statistics.mean(samples) * 1e6:7.1f} us  "
+          f"p50={statistics.median(samples) * 1e6:7.1f} us  p99={p99 * 1e6:7.1f} us")
+
+def run(entries: int, lookups: int) -> None:
+    cache = SemanticSQLCache(max_entries=entries)
+    paraphrases = []
+    start = time.perf_counter()
+    for question, paraphrase in itertools.islice(_questions(), entries):
+        cache.add(question, f"SELECT /* {question} */ 1")
+        paraphrases.append(paraphrase)
+    print(f"indexed {cache.get_stats()['entries']} entries in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(7)
+    hit_times, miss_times, hits = [], [], 0
+    for paraphrase in rng.sample(paraphrases, min(lookups, len(paraphrases))):
+        start = time.perf_counter()
+        hits += cache.lookup(paraphrase) is not None
+        hit_times.append(time.perf_counter() - start)
+    for i in range(lookups):
+        start = time.perf_counter()
+        cache.lookup(f"count officers in unseen district {i}")
+        miss_times.append(time.perf_counter() - start)
+
+    _report("paraphrase lookup", hit_times)
+    _report("unseen lookup", miss_times)
+    print(f"paraphrase hit rate: {hits / len(hit_times):.1%}")
+    print(f"stats: {cache.get_stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.entries, args.lookups)
@@ -0,0 +1,106 @@
+"""
+Benchmark: result-row conversion and JSON encoding for disbursement-shaped rows.
+
+Compares the original per-cell Decimal/datetime loop encoded with the stdlib
+json module (what JSONResponse does) against the column-wise
+DatabaseManager._rows_to_dicts encoded with orjson (ORJSONResponse). Rows are
+synthetic tuples shaped like the disbursements table, as pyodbc returns them.
+
+Usage:
+    python benchmarks/bench_serialization.py --rows 10000 100000 1000000
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from db import DatabaseManager
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COLUMNS = ["disbursement_id", "citizen_id", "scheme_id", "amount", "status",
+           "disbursed_on", "approved_by", "payment_mode"]
+STATUSES = ["Completed", "Pending", "Failed"]
+PAYMENT_MODES = ["DBT", "Cheque", "Cash", "UPI"]
+
+def _synthetic_rows(count: int):
+    start = datetime.date(2022, 1, 1)
+    amounts = [Decimal(f"{500 + i * 25}.00") for i in range(400)]
+    dates = [start + datetime.timedelta(days=i) for i in range(730)]
+    return [
+        (i, 100000 + i % 50000, 1 + i % 12, amounts[i % 400], STATUSES[i % 3],
+         dates[i % 730], None if i % 7 == 0 else 1 + i % 40, PAYMENT_MODES[i % 4])
+        for i in range(count)
+    ]
+
+def _legacy_rows_to_dicts(rows, columns):
+    """The per-cell loop execute_query used before the columnar path"""
+    data = []
+    for row in rows:
+        row_dict = {}
+        for i, value in enumerate(row):
+            column_name = columns[i]
+            if str(type(value).__name__) == 'Decimal':
+                row_dict[column_name] = float(value)
+            elif hasattr(value, 'isoformat'):
+                row_dict[column_name] = value.isoformat()
+            elif hasattr(value, 'strftime'):
+                row_dict[column_name] = value.strftime('%Y-%m-%d')
+            else:
+                row_dict[column_name] = value
+        data.append(row_dict)
+    return data
+
+def _json_dumps(content):
+    # Same arguments starlette's JSONResponse.render uses
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+def _timed(func, *args):
+    gc.collect()
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def run(sizes) -> None:
+    encode = orjson.dumps if orjson is not None else _json_dumps
+    encoder_name = "orjson" if orjson is not None else "json (orjson not installed)"
+    print(f"{'rows':>9} {'path':<22} {'convert':>10} {'encode':>10} {'total':>10} {'rows/s':>12}")
+    for size in sizes:
+        rows = _synthetic_rows(size)
+
+        legacy, legacy_convert = _timed(_legacy_rows_to_dicts, rows, COLUMNS)
+        legacy_body, legacy_encode = _timed(_json_dumps, {"data": legacy})
+        del legacy
+
+        columnar, columnar_convert = _timed(DatabaseManager._rows_to_dicts, rows, COLUMNS)
+        columnar_body, columnar_encode = _timed(encode, {"data": columnar})
+        del columnar
+
+        assert json.loads(legacy_body) == json.loads(columnar_body), "serialized payloads differ"
+
+        for label, convert, encode_time in (("per-cell + json", legacy_convert, legacy_encode),
+                                            (f"columnar + {encoder_name.split()[0]}", columnar_convert, columnar_encode)):
+            total = convert + encode_time
+            print(f"{size:>9} {label:<22} {convert * 1000:8.1f}ms {encode_time * 1000:8.1f}ms "
+                  f"{total * 1000:8.1f}ms {size / total:12,.0f}")
+        speedup = (legacy_convert + legacy_encode) / (columnar_convert + columnar_encode)
+        print(f"{'':>9} speedup {speedup:.1f}x, payload {len(columnar_body) / 1e6:.1f} MB\n")
+    print(f"encoder: {encoder_name}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    run(args.rows)
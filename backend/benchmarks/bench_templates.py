@@ -0,0 +1,76 @@
+"""
+Benchmark: template coverage of the reference questions and match latency.
+
+Runs the numbered questions from the comments in database/test_queries.sql
+(plus any given on the command line) through the template engine, shows which
+template answered each one and reports the coverage rate and the time per
+match. With --execute every template's SQL is also run against the configured
+database to check it executes. No LLM call is made.
+
+Usage:
+    python benchmarks/bench_templates.py
+    DB_ENGINE=sqlite LOCAL_DB_PATH=database/welfare_large.db python benchmarks/bench_templates.py --execute
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from query_templates import TemplateEngine
+from schema_pruner import SchemaPruner
+from prompt_engine import PromptEngine
+from sql_parameterizer import parameterize_sql
+
+TEST_QUERIES = os.path.join(os.path.dirname(backend_dir), "database", "test_queries.sql")
+
+def _questions():
+    """The '-- N. question' comment above each reference query"""
+    with open(TEST_QUERIES) as handle:
+        return [match.group(1).strip() for match in re.finditer(r"^--\s*\d+\.\s*(.+)$", handle.read(), re.MULTILINE)]
+
+def _median_us(engine: TemplateEngine, question: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        engine.match(question)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+def run(questions, repeat: int, execute: bool) -> None:
+    engine = TemplateEngine(SchemaPruner(PromptEngine().table_schemas))
+    db_manager = None
+    if execute:
+        from db import get_db_connection
+        db_manager = get_db_connection()
+
+    hits, timings = 0, []
+    for question in questions:
+        match = engine.match(question)
+        timings.append(_median_us(engine, question, repeat))
+        if match is None:
+            print(f"  miss  {timings[-1]:7.1f} us  {'':<22} {question}")
+            continue
+        hits += 1
+        outcome = ""
+        if db_manager is not None:
+            bound = parameterize_sql(match["sql"])
+            result = db_manager.execute_query(bound.sql, bound.params or None, use_cache=False)
+            outcome = f"  {result['row_count']} rows" if result["status"] == "success" else \
+                f"  FAILED: {result.get('message', '')[:80]}"
+        print(f"  hit   {timings[-1]:7.1f} us  {match['template']:<22} {question}{outcome}")
+    print(f"coverage: {hits}/{len(questions)} ({hits / len(questions):.0%}); "
+          f"median match {statistics.median(timings):.1f} us, max {max(timings):.1f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("questions", nargs="*", help="Questions to try in addition to the reference set")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--execute", action="store_true", help="Run each template's SQL on the configured database")
+    args = parser.parse_args()
+    run(_questions() + args.questions, args.repeat, args.execute)
@@ -0,0 +1,418 @@
+"""
+Pre-aggregated rollup cube over disbursements and enrollments
+Holds counts, sums and distinct citizens at village x scheme x month grain in
+memory so dashboards never GROUP BY the OLTP tables. Every village cell also
+carries its district and state, and villages roll up to both by plain addition
+because a citizen lives in exactly one village. Distinct counts do not add up
+across schemes or months, so each fact also keeps an "all schemes" member
+(scheme_id 0) and a first-seen month per citizen x scheme, which makes distinct
+citizens to date exact at any level.
+
+Refresh is incremental from a date watermark: rows dated on or after the first
+day of the newest loaded month are re-aggregated and replace those months'
+cells, older months are kept. If the cube's row total then disagrees with the
+table (back-dated inserts, deletes) the fact is rebuilt in full.
+"""
+import os
+import time
+import threading
+import logging
+from typing import Dict, Any, List, Optional, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+from db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+CUBE_FACTS = {
+    "disbursements": {
+        "date_column": "disbursed_on",
+        "sql": """
+SELECT f.citizen_id, f.scheme_id, f.disbursed_on AS event_date, f.amount, c.village_id
+FROM disbursements f
+LEFT JOIN citizens c ON c.citizen_id = f.citizen_id
+""",
+        "count": "disbursement_count",
+        "sum": "disbursed_amount",
+        "distinct": "beneficiaries",
+        "new": "new_beneficiaries"
+    },
+    "enrollments": {
+        "date_column": "enrollment_date",
+        "sql": """
+SELECT f.citizen_id, f.scheme_id, f.enrollment_date AS event_date, c.village_id
+FROM enrollments f
+LEFT JOIN citizens c ON c.citizen_id = f.citizen_id
+""",
+        "count": "enrollment_count",
+        "sum": None,
+        "distinct": "enrollees",
+        "new": "new_enrollees"
+    }
+}
+
+# measure -> (fact, kind); kind is count/sum (additive), distinct or new
+MEASURES = {
+    spec[kind]: (fact, kind)
+    for fact, spec in CUBE_FACTS.items()
+    for kind in ("count", "sum", "distinct", "new")
+    if spec[kind]
+}
+DEFAULT_MEASURES = ["disbursement_count", "disbursed_amount", "beneficiaries", "enrollment_count", "enrollees"]
+
+LEVELS = ("all", "state", "district", "village")
+LEVEL_KEYS = {"state": "state_id", "district": "district_id", "village": "village_id"}
+CELL_KEYS = ["village_id", "scheme_id", "month"]
+
+# citizen_id and scheme_id packed into one int64 for first-seen lookups
+SCHEME_KEY_BITS = 20
+
+DIMENSIONS_SQL = {
+    "villages": "SELECT village_id, name, district_id FROM villages",
+    "districts": "SELECT district_id, name, state_id FROM districts",
+    "states": "SELECT state_id, name FROM states",
+    "schemes": "SELECT scheme_id, name FROM schemes"
+}
+
+def parse_month(value: Union[str, int, None]) -> Optional[int]:
+    """'YYYY-MM' (or a yyyymm int) -> yyyymm int"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        month = value
+    else:
+        parts = str(value).strip().split("-")
+        if len(parts) < 2 or not parts[0].isdigit() or not parts[1].isdigit():
+            raise ValueError(f"Invalid month '{value}', expected YYYY-MM")
+        month = int(parts[0]) * 100 + int(parts[1])
+    if not 1 <= month % 100 <= 12:
+        raise ValueError(f"Invalid month '{value}', expected YYYY-MM")
+    return month
+
+def format_month(month: int) -> str:
+    return f"{month // 100:04d}-{month % 100:02d}"
+
+def _months(values: list) -> np.ndarray:
+    """Driver date values (date objects or ISO strings) -> yyyymm ints, 0 when unparseable"""
+    dates = pd.to_datetime(pd.Series(values, dtype=object), errors="coerce")
+    return (dates.dt.year * 100 + dates.dt.month).fillna(0).to_numpy(np.int32)
+
+class FactCube:
+    """Cells and first-seen state of one fact table"""
+
+    def __init__(self, cells: pd.DataFrame, first_keys: np.ndarray, first_months: np.ndarray,
+                 watermark: Optional[int], row_count: int):
+        self.cells = cells
+        self.first_keys = first_keys
+        self.first_months = first_months
+        self.watermark = watermark
+        self.row_count = row_count
+
+class RollupCube:
+    """
+    In-memory rollup store answering drill-down and roll-up queries over
+    state/district/village x scheme x month.
+    """
+
+    def __init__(self, db_manager=None, max_age_seconds: Optional[float] = None):
+        self._db_manager = db_manager
+        self.max_age_seconds = (max_age_seconds if max_age_seconds is not None
+                                else float(os.getenv("CUBE_MAX_AGE_SECONDS", "300")))
+        self._facts: Dict[str, FactCube] = {}
+        self._names: Dict[str, Dict[int, str]] = {}
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.stats = {
+            "queries": 0,
+            "incremental_refreshes": 0,
+            "full_rebuilds": 0,
+            "rows_aggregated": 0,
+            "last_refresh_ms": None
+        }
+
+    @property
+    def db_manager(self):
+        return self._db_manager or get_db_connection()
+
+    def _columns(self, query: str, params: Optional[Dict] = None) -> Dict[str, list]:
+        result = self.db_manager.execute_query(query, params, layout="typed_columns", use_cache=False)
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+        return result["data"]
+
+    def _load_dimensions(self) -> Dict[str, pd.DataFrame]:
+        return {name: pd.DataFrame(self._columns(query)) for name, query in DIMENSIONS_SQL.items()}
+
+    def _load_events(self, fact: str, since_month: Optional[int]) -> pd.DataFrame:
+        spec = CUBE_FACTS[fact]
+        query, params = spec["sql"], None
+        if since_month is not None:
+            query += f"WHERE f.{spec['date_column']} >= :since"
+            params = {"since": f"{format_month(since_month)}-01"}
+        columns = self._columns(query, params)
+        events = pd.DataFrame({
+            "citizen_id": np.asarray(columns["citizen_id"], dtype=np.int64),
+            "scheme_id": np.asarray(columns["scheme_id"], dtype=np.int64),
+            "village_id": pd.Series(columns["village_id"], dtype="float64").fillna(0).to_numpy(np.int64),
+            "month": _months(columns["event_date"])
+        })
+        if spec["sum"]:
+            events["value"] = np.asarray(columns["amount"], dtype=np.float64)
+        return events
+
+    @staticmethod
+    def _aggregate(spec: Dict[str, Any], events: pd.DataFrame, known_keys: np.ndarray):
+        """Village x scheme x month cells for events plus the citizen x scheme pairs first seen in them"""
+        both = pd.concat([events, events.assign(scheme_id=0)], ignore_index=True)
+        grouped = both.groupby(CELL_KEYS, sort=False)
+        cells = grouped.size().rename(spec["count"]).to_frame()
+        if spec["sum"]:
+            cells[spec["sum"]] = grouped["value"].sum()
+        cells[spec["distinct"]] = (both.drop_duplicates(["scheme_id", "month", "citizen_id"])
+                                   .groupby(CELL_KEYS, sort=False).size())
+
+        both["key"] = (both["citizen_id"].to_numpy() << SCHEME_KEY_BITS) | both["scheme_id"].to_numpy()
+        firsts = both.sort_values("month", kind="stable").drop_duplicates("key")
+        firsts = firsts[~np.isin(firsts["key"].to_numpy(), known_keys)]
+        cells[spec["new"]] = firsts.groupby(CELL_KEYS, sort=False).size()
+        cells[spec["new"]] = cells[spec["new"]].fillna(0).astype(np.int64)
+        return cells.reset_index(), firsts["key"].to_numpy(np.int64), firsts["month"].to_numpy(np.int32)
+
+    def _table_rows(self, fact: str) -> int:
+        columns = self._columns(f"SELECT COUNT(*) AS row_count FROM {fact}")
+        return int(columns["row_count"][0])
+
+    def _refresh_fact(self, fact: str, current: Optional[FactCube], full: bool) -> FactCube:
+        spec = CUBE_FACTS[fact]
+        since_month = None if full or current is None or current.watermark is None else current.watermark
+        events = self._load_events(fact, since_month)
+        self.stats["rows_aggregated"] += len(events)
+
+        if since_month is None:
+            kept_cells = None
+            known_keys = np.empty(0, dtype=np.int64)
+            known_months = np.empty(0, dtype=np.int32)
+        else:
+            kept_cells = current.cells[current.cells["month"] < since_month][CELL_KEYS + self._measure_columns(spec)]
+            keep = current.first_months < since_month
+            known_keys, known_months = current.first_keys[keep], current.first_months[keep]
+
+        cells, new_keys, new_months = self._aggregate(spec, events, known_keys)
+        if kept_cells is not None:
+            cells = pd.concat([kept_cells, cells], ignore_index=True)
+        order = np.argsort(np.concatenate([known_keys, new_keys]), kind="stable")
+        refreshed = FactCube(
+            cells=cells,
+            first_keys=np.concatenate([known_keys, new_keys])[order],
+            first_months=np.concatenate([known_months, new_months])[order],
+            watermark=int(cells["month"].max()) if len(cells) else None,
+            row_count=int(cells.loc[cells["scheme_id"] > 0, spec["count"]].sum())
+        )
+
+        table_rows = self._table_rows(fact)
+        if since_month is not None and refreshed.row_count != table_rows:
+            logger.info(f"Cube {fact} holds {refreshed.row_count} rows but the table has {table_rows}; rebuilding")
+            return self._refresh_fact(fact, None, full=True)
+        if since_month is None:
+            self.stats["full_rebuilds"] += 1
+        else:
+            self.stats["incremental_refreshes"] += 1
+        return refreshed
+
+    @staticmethod
+    def _measure_columns(spec: Dict[str, Any]) -> List[str]:
+        return [spec[kind] for kind in ("count", "sum", "distinct", "new") if spec[kind]]
+
+    def _is_fresh(self, max_age: float) -> bool:
+        with self._lock:
+            refreshed_at = self._refreshed_at
+        return refreshed_at is not None and time.time() - refreshed_at <= max_age
+
+    def refresh(self, full: bool = False, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Bring every fact up to date (incrementally unless full) and re-derive geography.
+        With max_age, a cube refreshed within that many seconds is left as it is: callers
+        that found it stale together wait on the lock and only the first one reloads.
+        """
+        with self._refresh_lock:
+            if max_age is not None and self._is_fresh(max_age):
+                with self._lock:
+                    facts = dict(self._facts)
+                return {"refresh_ms": 0.0, "watermarks": self.watermarks(),
+                        "cells": {fact: len(cube.cells) for fact, cube in facts.items()}}
+            start = time.perf_counter()
+            dimensions = self._load_dimensions()
+            villages, districts = dimensions["villages"], dimensions["districts"]
+            village_district = dict(zip(villages["village_id"], villages["district_id"]))
+            district_state = dict(zip(districts["district_id"], districts["state_id"]))
+
+            with self._lock:
+                current = dict(self._facts)
+            facts = {}
+            for fact in CUBE_FACTS:
+                refreshed = self._refresh_fact(fact, current.get(fact), full)
+                cells = refreshed.cells
+                cells["district_id"] = cells["village_id"].map(village_district).fillna(0).astype(np.int64)
+                cells["state_id"] = cells["district_id"].map(district_state).fillna(0).astype(np.int64)
+                facts[fact] = refreshed
+
+            names = {
+                level: dict(zip(dimensions[table][LEVEL_KEYS.get(level, "scheme_id")].astype(int), dimensions[table]["name"]))
+                for level, table in (("state", "states"), ("district", "districts"),
+                                     ("village", "villages"), ("scheme", "schemes"))
+            }
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+            with self._lock:
+                self._facts, self._names = facts, names
+                self._refreshed_at = time.time()
+                self.stats["last_refresh_ms"] = elapsed_ms
+            return {
+                "refresh_ms": elapsed_ms,
+                "watermarks": self.watermarks(),
+                "cells": {fact: len(cube.cells) for fact, cube in facts.items()}
+            }
+
+    def watermarks(self) -> Dict[str, Optional[str]]:
+        with self._lock:
+            return {fact: format_month(cube.watermark) if cube.watermark else None for fact, cube in self._facts.items()}
+
+    def _current(self):
+        if not self._is_fresh(self.max_age_seconds):
+            self.refresh(max_age=self.max_age_seconds)
+        with self._lock:
+            return self._facts, self._names
+
+    def query(self, measures: Optional[Iterable[str]] = None, level: str = "state",
+              by_scheme: bool = False, by_month: bool = False,
+              filters: Optional[Dict[str, Union[int, List[int]]]] = None,
+              from_month: Union[str, int, None] = None, to_month: Union[str, int, None] = None,
+              limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Aggregate measures at a geography level (all/state/district/village), optionally
+        by scheme and/or month. filters narrow state_id, district_id, village_id and
+        scheme_id to one id or a list; drilling down is the next level with the
+        parent id as a filter. Distinct measures that cannot be answered exactly for
+        the requested shape are returned as null and explained in "unavailable".
+        """
+        start = time.perf_counter()
+        measures = list(measures or DEFAULT_MEASURES)
+        unknown = [measure for measure in measures if measure not in MEASURES]
+        if unknown:
+            raise ValueError(f"Unknown measures: {', '.join(unknown)}. Available: {', '.join(MEASURES)}")
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level '{level}'. Use one of: {', '.join(LEVELS)}")
+        from_month, to_month = parse_month(from_month), parse_month(to_month)
+        filters = {key: [int(v) for v in (value if isinstance(value, (list, tuple)) else [value])]
+                   for key, value in (filters or {}).items() if value is not None}
+        invalid = set(filters) - set(LEVEL_KEYS.values()) - {"scheme_id"}
+        if invalid:
+            raise ValueError(f"Unknown filters: {', '.join(sorted(invalid))}")
+
+        facts, names = self._current()
+        schemes = filters.get("scheme_id", [])
+        multi_scheme = len(schemes) > 1 and not by_scheme
+        dims = ([LEVEL_KEYS[level]] if level != "all" else []) + (["scheme_id"] if by_scheme else []) + \
+               (["month"] if by_month else [])
+
+        unavailable, frames = {}, []
+        for fact, spec in CUBE_FACTS.items():
+            sources = {}
+            for measure in measures:
+                if MEASURES[measure][0] != fact:
+                    continue
+                kind = MEASURES[measure][1]
+                if kind in ("distinct", "new") and multi_scheme:
+                    unavailable[measure] = "citizens in several schemes would be counted once per scheme; group by scheme instead"
+                elif kind == "distinct" and not by_month and from_month is not None:
+                    unavailable[measure] = "distinct citizens over a month range need by_month, or no from_month (to date)"
+                elif kind == "distinct" and not by_month:
+                    sources[measure] = spec["new"]
+                else:
+                    sources[measure] = measure
+            if not sources:
+                continue
+
+            cells = facts[fact].cells
+            scheme_ids, months = cells["scheme_id"].to_numpy(), cells["month"].to_numpy()
+            mask = scheme_ids > 0 if (by_scheme or schemes) else scheme_ids == 0
+            for key, values in filters.items():
+                mask &= np.isin(cells[key].to_numpy(), values)
+            if from_month is not None:
+                mask &= months >= from_month
+            if to_month is not None:
+                mask &= months <= to_month
+            selected = cells[mask]
+
+            source_columns = sorted(set(sources.values()))
+            if dims:
+                totals = selected.groupby(dims)[source_columns].sum()
+            else:
+                totals = selected[source_columns].sum().to_frame().T
+            frames.append(pd.DataFrame({measure: totals[column] for measure, column in sources.items()}))
+
+        if frames:
+            result = frames[0]
+            for frame in frames[1:]:
+                result = result.join(frame, how="outer") if dims else pd.concat([result, frame], axis=1)
+            result = result.fillna(0)
+            result = result.reset_index() if dims else result.reset_index(drop=True)
+        else:
+            result = pd.DataFrame(columns=dims) if dims else pd.DataFrame(index=pd.RangeIndex(1))
+
+        for measure in measures:
+            if measure in unavailable:
+                result[measure] = None
+            elif MEASURES[measure][1] == "sum":
+                result[measure] = result[measure].astype(np.float64).round(2)
+            else:
+                result[measure] = result[measure].astype(np.int64)
+        for level_name, key in LEVEL_KEYS.items():
+            if key in dims:
+                result.insert(result.columns.get_loc(key) + 1, level_name, result[key].map(names[level_name]))
+        if by_scheme:
+            result.insert(result.columns.get_loc("scheme_id") + 1, "scheme", result["scheme_id"].map(names["scheme"]))
+        if by_month:
+            result["month"] = [format_month(int(month)) for month in result["month"]]
+
+        total_rows = len(result)
+        if limit is not None and total_rows > limit:
+            result = result.iloc[:limit]
+        rows = result.to_dict("records")
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        with self._lock:
+            self.stats["queries"] += 1
+
+        next_level = LEVELS[LEVELS.index(level) + 1] if level != "village" else None
+        return {
+            "level": level,
+            "dimensions": dims,
+            "measures": measures,
+            "rows": rows,
+            "row_count": total_rows,
+            "truncated": total_rows > len(rows),
+            "unavailable": unavailable,
+            "drill_down": {"level": next_level, "filter": LEVEL_KEYS.get(level)} if next_level else None,
+            "roll_up": LEVELS[LEVELS.index(level) - 1] if level != "all" else None,
+            "watermarks": self.watermarks(),
+            "query_ms": elapsed_ms
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            facts, refreshed_at = self._facts, self._refreshed_at
+        stats["cells"] = {fact: len(cube.cells) for fact, cube in facts.items()}
+        stats["watermarks"] = {fact: format_month(cube.watermark) if cube.watermark else None
+                               for fact, cube in facts.items()}
+        stats["age_seconds"] = round(time.time() - refreshed_at, 1) if refreshed_at else None
+        return stats
+
+# Global instance
+rollup_cube = RollupCube()
+
+def get_rollup_cube() -> RollupCube:
+    """Get the process-wide RollupCube instance"""
+    return rollup_cube
@@ -3,14 +3,31 @@ Database connection and query execution module for Azure SQL Database
 
 """
 import os
-import pyodbc
+import re
+import sys
+import json
+import math
+import time
+import asyncio
+import functools
+import threading
+from decimal import Decimal
 import pandas as pd
-from typing import Dict, List, Any, Optional
-from sqlalchemy import create_engine, text, MetaData, Table, Column, Integer, String, Text, DateTime, Boolean
-from sqlalchemy.exc import SQLAlchemyError
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple, FrozenSet
+from sqlalchemy import create_engine, event, text, bindparam, MetaData, Table, Column, Integer, String, Text, DateTime, Boolean
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from dotenv import load_dotenv
+from local_db import local_db_requested, local_db_path, load_local_database, translate_tsql
+
+try:
+    import pyodbc  # noqa: F401 - driver for mssql+pyodbc, not needed in local SQLite mode
+except ImportError:
+    pyodbc = None
 
 
 import logging
@@ -25,18 +42,415 @@ logger = logging.getLogger(__name__)
 # SQLAlchemy Base for models
 Base = declarative_base()
 
+# Column value types that JSON encoders handle natively and need no conversion
+NATIVE_JSON_TYPES = frozenset({int, float, str, bool})
+
+# Table names following FROM/JOIN/INTO/UPDATE/TABLE, optionally schema-qualified or bracketed
+TABLE_REFERENCE_PATTERN = re.compile(
+    r'\b(?:FROM|JOIN|INTO|UPDATE|TABLE)\s+((?:[\[`"]?\w+[\]`"]?\.)*[\[`"]?\w+[\]`"]?)',
+    re.IGNORECASE
+)
+# Rows sampled when estimating the memory footprint of a cached result
+RESULT_SIZE_SAMPLE = 50
+
+# Table row counts from the catalog (no table scans; needs VIEW DATABASE STATE)
+CATALOG_ROW_COUNTS_SQL = """
+SELECT t.name AS table_name, SUM(p.row_count) AS row_count
+FROM sys.dm_db_partition_stats p
+JOIN sys.tables t ON t.object_id = p.object_id
+WHERE p.index_id IN (0, 1)
+GROUP BY t.name
+"""
+TABLE_NAME_PATTERN = re.compile(r'^\w+$')
+# Catalog errors that will not go away on retry: missing permission (229, 297, 300) or missing object (208)
+CATALOG_UNAVAILABLE_PATTERN = re.compile(r"permission|denied|Invalid object name|\b42S02\b|\((?:208|229|297|300)\)",
+                                         re.IGNORECASE)
+
+# Query cost estimation
+SHOWPLAN_COST_PATTERN = re.compile(r'StatementSubTreeCost="([0-9.eE+-]+)"')
+SHOWPLAN_ROWS_PATTERN = re.compile(r'StatementEstRows="([0-9.eE+-]+)"')
+# Lookahead so overlapping "FROM table alias" pairs are all found
+SQL_ALIAS_PATTERN = re.compile(r'(?=\b(\w+)\s+(?:AS\s+)?(\w+)\b)', re.IGNORECASE)
+SQL_ALIAS_STOPWORDS = frozenset({"ON", "WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "OUTER",
+                                 "GROUP", "ORDER", "HAVING", "LIMIT", "UNION", "SET", "VALUES", "USING"})
+# Roughly the number of rows SQL Server scans per unit of estimated subtree cost
+SQLITE_ROWS_PER_COST_UNIT = 100000
+# Assumed size of plan sources that are not base tables (subqueries, CTEs)
+SQLITE_UNKNOWN_SOURCE_ROWS = 1000.0
+
+class QueryCancelToken:
+    """Lets an async caller abort a statement that is running in a worker thread"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callback: Optional[Callable[[], Any]] = None
+        self.cancelled = False
+    
+    def bind(self, callback: Callable[[], Any]) -> None:
+        """Register the driver-level cancel for the statement about to run"""
+        with self._lock:
+            self._callback = callback
+            cancel_now = self.cancelled
+        if cancel_now:
+            self._invoke(callback)
+    
+    def unbind(self) -> None:
+        """Forget the statement once its connection goes back to the pool, so a late cancel is a no-op"""
+        with self._lock:
+            self._callback = None
+    
+    def cancel(self) -> None:
+        """Cancel the bound statement (or the next one to bind)"""
+        with self._lock:
+            self.cancelled = True
+            callback = self._callback
+        if callback:
+            self._invoke(callback)
+    
+    @staticmethod
+    def _invoke(callback: Callable[[], Any]) -> None:
+        try:
+            callback()
+        except Exception as e:
+            logger.warning(f"Failed to cancel running statement: {e}")
+
+class QueryResultCache:
+    """
+    Byte-bounded LRU/TTL cache of SELECT results keyed on normalized SQL plus parameters.
+    Each entry records the tables its query reads so writes can invalidate it.
+    """
+    
+    def __init__(self, max_bytes: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('RESULT_CACHE_TTL', '300'))
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._keys_by_table: Dict[str, set] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0,
+                      "invalidations": 0, "oversized": 0}
+        self.table_stats: Dict[str, Dict[str, int]] = {}
+        self._invalidation_listeners: List[Callable[[FrozenSet[str]], None]] = []
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+    
+    @staticmethod
+    def normalize_sql(query: str) -> str:
+        return " ".join(query.split()).rstrip(';').strip()
+    
+    @staticmethod
+    def tables_in(query: str) -> FrozenSet[str]:
+        """Table names referenced after FROM/JOIN/INTO/UPDATE/TABLE, lowercased without schema or brackets"""
+        tables = set()
+        for name in TABLE_REFERENCE_PATTERN.findall(query):
+            name = name.replace('[', '').replace(']', '').replace('`', '').replace('"', '')
+            tables.add(name.rsplit('.', 1)[-1].lower())
+        return frozenset(tables)
+    
+    @classmethod
+    def make_key(cls, query: str, params: Optional[Dict], layout: str) -> Tuple:
+        params_key = json.dumps(params, sort_keys=True, default=str) if params else ""
+        return cls.normalize_sql(query), params_key, layout
+    
+    @staticmethod
+    def estimate_bytes(result: Dict[str, Any]) -> int:
+        """Approximate in-memory size of a result, extrapolated from a sample of its rows"""
+        data = result.get("data") or []
+        if isinstance(data, dict):
+            total = sys.getsizeof(data)
+            for values in data.values():
+                sample = values[:RESULT_SIZE_SAMPLE]
+                per_value = sum(map(sys.getsizeof, sample)) / len(sample) if sample else 0
+                total += sys.getsizeof(values) + int(per_value * len(values))
+            return total
+        sample = data[:RESULT_SIZE_SAMPLE]
+        if not sample:
+            return sys.getsizeof(data)
+        per_row = sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row.values())) for row in sample) / len(sample)
+        return sys.getsizeof(data) + int(per_row * len(data))
+    
+    @staticmethod
+    def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Copy of a result down to its rows / column lists, so neither the caller that
+        stored it nor one that got it can change the cached entry (cell values are immutable)
+        """
+        copy = dict(result)
+        data = result.get("data")
+        if isinstance(data, dict):
+            copy["data"] = {column: list(values) for column, values in data.items()}
+        elif isinstance(data, list):
+            copy["data"] = [dict(row) for row in data]
+        if isinstance(result.get("columns"), list):
+            copy["columns"] = list(result["columns"])
+        return copy
+    
+    def _table_stat(self, table: str) -> Dict[str, int]:
+        return self.table_stats.setdefault(table, {"hits": 0, "misses": 0, "invalidations": 0})
+    
+    def _drop(self, key: Tuple) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
+        for table in entry["tables"]:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+    
+    def get(self, key: Tuple, tables: FrozenSet[str]) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result, or None on miss/expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds > 0 and time.time() - entry["created_at"] > self.ttl_seconds:
+                self._drop(key)
+                self.stats["expirations"] += 1
+                entry = None
+            outcome = "hits" if entry is not None else "misses"
+            self.stats[outcome] += 1
+            for table in tables:
+                self._table_stat(table)[outcome] += 1
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            result = entry["result"]
+        return self._copy_result(result)
+    
+    def put(self, key: Tuple, tables: FrozenSet[str], result: Dict[str, Any]) -> None:
+        """Store a successful SELECT result, evicting least recently used entries past max_bytes"""
+        size = self.estimate_bytes(result)
+        if size > self.max_bytes:
+            with self._lock:
+                self.stats["oversized"] += 1
+            return
+        result = self._copy_result(result)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {"result": result, "tables": tables, "size": size, "created_at": time.time()}
+            self._bytes += size
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            self.stats["stores"] += 1
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+    
+    def invalidate_tables(self, tables: FrozenSet[str]) -> int:
+        """Drop every entry that read one of tables; an empty set drops everything"""
+        with self._lock:
+            if not tables:
+                keys = list(self._entries)
+            else:
+                keys = set()
+                for table in tables:
+                    keys.update(self._keys_by_table.get(table, ()))
+                    self._table_stat(table)["invalidations"] += 1
+            for key in keys:
+                self._drop(key)
+            self.stats["invalidations"] += len(keys)
+            listeners = list(self._invalidation_listeners)
+        for listener in listeners:
+            try:
+                listener(tables)
+            except Exception as e:
+                logger.error(f"Result cache invalidation listener failed: {e}")
+        return len(keys)
+    
+    def add_invalidation_listener(self, callback: Callable[[FrozenSet[str]], None]) -> None:
+        """Call callback(tables) after every write-triggered invalidation (empty set: everything)"""
+        with self._lock:
+            self._invalidation_listeners.append(callback)
+    
+    def clear(self) -> None:
+        self.invalidate_tables(frozenset())
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics, overall and per table"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            tables = {table: dict(counts) for table, counts in self.table_stats.items()}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        for counts in tables.values():
+            table_lookups = counts["hits"] + counts["misses"]
+            counts["hit_ratio"] = round(counts["hits"] / table_lookups, 3) if table_lookups else 0.0
+        stats["tables"] = tables
+        stats["max_bytes"] = self.max_bytes
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+class PoolMonitor:
+    """
+    Connection pool occupancy, checkout latency and wait time from SQLAlchemy pool
+    events, plus the outcome of the background liveness probe.
+    Checkout latency is the whole engine.connect() call; connect time is the part
+    spent opening a new physical connection (ODBC login + TLS) and wait time is
+    the rest, i.e. queueing for a free pooled connection.
+    """
+    
+    LATENCIES = ("checkout_ms", "wait_ms", "connect_ms")
+    
+    def __init__(self, window: Optional[int] = None):
+        window = window if window is not None else int(os.getenv('DB_POOL_METRICS_WINDOW', '1000'))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._engine = None
+        self.stats = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0,
+                      "checkout_timeouts": 0, "checkout_failures": 0, "peak_checked_out": 0,
+                      "warmed_connections": 0}
+        self._latencies = {name: {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "recent": deque(maxlen=window)}
+                           for name in self.LATENCIES}
+        self.probe = {"healthy": None, "checked_at": None, "probe_ms": None, "consecutive_failures": 0,
+                      "last_error": None, "probes": 0, "failures": 0}
+    
+    def attach(self, engine) -> None:
+        self._engine = engine
+        event.listen(engine, "do_connect", self._on_do_connect)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+    
+    def _record(self, name: str, elapsed_ms: float) -> None:
+        entry = self._latencies[name]
+        entry["count"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["recent"].append(elapsed_ms)
+    
+    def _on_do_connect(self, dialect, connection_record, cargs, cparams) -> None:
+        self._local.connect_started = time.perf_counter()
+    
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        started = getattr(self._local, "connect_started", None)
+        elapsed_ms = (time.perf_counter() - started) * 1000 if started is not None else 0.0
+        self._local.connect_ms = getattr(self._local, "connect_ms", 0.0) + elapsed_ms
+        with self._lock:
+            self.stats["connects"] += 1
+            self._record("connect_ms", elapsed_ms)
+    
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        checked_out = self._engine.pool.checkedout() if hasattr(self._engine.pool, "checkedout") else 0
+        with self._lock:
+            self.stats["checkouts"] += 1
+            self.stats["peak_checked_out"] = max(self.stats["peak_checked_out"], checked_out)
+    
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.stats["checkins"] += 1
+    
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.stats["invalidations"] += 1
+    
+    @contextmanager
+    def timed_checkout(self):
+        """Wrap engine.connect() to record checkout latency and pool wait time"""
+        self._local.connect_ms = 0.0
+        start = time.perf_counter()
+        try:
+            yield
+        except PoolTimeoutError:
+            with self._lock:
+                self.stats["checkout_timeouts"] += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.stats["checkout_failures"] += 1
+            raise
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._record("checkout_ms", elapsed_ms)
+            self._record("wait_ms", max(0.0, elapsed_ms - self._local.connect_ms))
+    
+    def record_warmup(self, connections: int) -> None:
+        with self._lock:
+            self.stats["warmed_connections"] += connections
+    
+    def record_probe(self, result: Dict[str, Any], elapsed_ms: float) -> None:
+        healthy = result.get("status") == "success"
+        with self._lock:
+            self.probe["probes"] += 1
+            self.probe["healthy"] = healthy
+            self.probe["checked_at"] = time.time()
+            self.probe["probe_ms"] = round(elapsed_ms, 2)
+            if healthy:
+                self.probe["consecutive_failures"] = 0
+                self.probe["last_error"] = None
+            else:
+                self.probe["failures"] += 1
+                self.probe["consecutive_failures"] += 1
+                self.probe["last_error"] = result.get("message")
+        if not healthy:
+            logger.warning(f"Database liveness probe failed: {result.get('message')}")
+    
+    def recently_healthy(self, max_age_seconds: float) -> bool:
+        """True if the last probe passed no more than max_age_seconds ago"""
+        with self._lock:
+            checked_at = self.probe["checked_at"]
+            return bool(self.probe["healthy"]) and time.time() - checked_at <= max_age_seconds
+    
+    def get_stats(self) -> Dict[str, Any]:
+        pool = self._engine.pool if self._engine is not None else None
+        with self._lock:
+            stats = dict(self.stats)
+            probe = dict(self.probe)
+            latencies = {name: (entry["count"], entry["total_ms"], entry["max_ms"], sorted(entry["recent"]))
+                         for name, entry in self._latencies.items()}
+        for name, (count, total_ms, max_ms, recent) in latencies.items():
+            stats[name] = {
+                "count": count,
+                "avg": round(total_ms / count, 2) if count else 0.0,
+                "p95": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 2) if recent else 0.0,
+                "max": round(max_ms, 2)
+            }
+        stats["pool"] = {"class": type(pool).__name__ if pool is not None else None}
+        for gauge in ("size", "checkedout", "checkedin", "overflow"):
+            if pool is not None and hasattr(pool, gauge):
+                stats["pool"][gauge] = getattr(pool, gauge)()
+        if probe["checked_at"] is not None:
+            probe["age_seconds"] = round(time.time() - probe["checked_at"], 1)
+        stats["probe"] = probe
+        return stats
+
 class DatabaseManager:
     """Enhanced Database Manager with Azure SQL and SQLite support"""
     
     def __init__(self):
-        self.use_local_db = False
-        self.connection_string = self._build_connection_string()
+        self.use_local_db = local_db_requested()
+        self.local_db_info: Optional[Dict[str, Any]] = None
+        if self.use_local_db:
+            self.connection_string = self._prepare_local_db()
+        else:
+            self.connection_string = self._build_connection_string()
         self.engine = None
         self.metadata = MetaData()
+        self.query_timeout = float(os.getenv('DB_QUERY_TIMEOUT', '30'))
+        # Bounded pool of worker threads so blocking driver calls never run on the event loop
+        default_workers = int(os.getenv('DB_POOL_SIZE', '5')) + int(os.getenv('DB_MAX_OVERFLOW', '10'))
+        self.executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('DB_EXECUTOR_WORKERS', str(default_workers))),
+            thread_name_prefix="db-query"
+        )
+        self.result_cache = QueryResultCache()
+        self.pool_monitor = PoolMonitor()
+        self.probe_interval = float(os.getenv('DB_PROBE_INTERVAL_SECONDS', '30'))
+        self._probe_task: Optional[asyncio.Task] = None
+        # Cleared when the catalog row-count view cannot be read (no VIEW DATABASE STATE, no such view);
+        # any other failure only skips it until catalog_retry_at
+        self.catalog_row_counts_available = True
+        self.catalog_retry_seconds = float(os.getenv('CATALOG_ROW_COUNTS_RETRY_SECONDS', '300'))
+        self.catalog_retry_at = 0.0
         self._initialize_engine()
         # self._create_tables_if_not_exist()  # Commented out to avoid SQL Server syntax issues
     
-    def _build_connection_string(self) -> str:
+    @staticmethod
+    def _build_connection_string() -> str:
         from urllib.parse import quote_plus
         
         server = os.getenv('AZURE_SQL_SERVER')
@@ -59,6 +473,27 @@ class DatabaseManager:
 
 
     
+    def _prepare_local_db(self) -> str:
+        """Build (or reuse) the SQLite copy of database/schema.sql + data.sql and return its URL"""
+        path = local_db_path()
+        try:
+            self.local_db_info = load_local_database(path)
+        except Exception as e:
+            logger.error(f"Failed to load local SQLite database at {path}: {e}")
+        return f"sqlite:///{path}"
+    
+    @staticmethod
+    def _configure_sqlite_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+    
+    @staticmethod
+    def _translate_for_sqlite(conn, cursor, statement, parameters, context, executemany):
+        """Run SQL Server flavoured statements (TOP, GETDATE, YEAR, ...) on SQLite"""
+        return translate_tsql(statement), parameters
+    
     def _initialize_engine(self):
         """Initialize SQLAlchemy engine with proper configuration"""
         try:
@@ -72,6 +507,8 @@ class DatabaseManager:
                     echo=os.getenv('DB_ECHO', 'false').lower() == 'true',
                     connect_args={"check_same_thread": False}  # For SQLite threading
                 )
+                event.listen(self.engine, "connect", self._configure_sqlite_connection)
+                event.listen(self.engine, "before_cursor_execute", self._translate_for_sqlite, retval=True)
             else:
                 # Azure SQL configuration
                 logger.info(f"Creating Azure SQL Server engine with connection string: {self.connection_string[:50]}...")
@@ -90,20 +527,137 @@ class DatabaseManager:
                     max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10')),
                     pool_timeout=60,
                     pool_recycle=3600,
+                    # pyodbc sends executemany() parameter arrays in one round trip (bulk_insert)
+                    fast_executemany=True,
                     connect_args={"timeout": 60}
                 )
             
+            event.listen(self.engine, "before_cursor_execute", self._bind_cancel_token)
+            self.pool_monitor.attach(self.engine)
             logger.info("Database engine initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize database engine: {e}")
             self.engine = None
     
+    def _bind_cancel_token(self, conn, cursor, statement, parameters, context, executemany):
+        """Attach the driver-level cancel of the executing statement to its cancel token"""
+        token = conn.info.get("cancel_token")
+        if token is None:
+            return
+        if self.use_local_db:
+            token.bind(conn.connection.dbapi_connection.interrupt)
+        else:
+            token.bind(cursor.cancel)
+    
+    @contextmanager
+    def _connect(self, begin: bool = False) -> Iterator[Any]:
+        """Check a connection out of the pool, timing the checkout (begin: wrap in a transaction)"""
+        with self.pool_monitor.timed_checkout():
+            conn = self.engine.connect()
+        with conn:
+            if begin:
+                with conn.begin():
+                    yield conn
+            else:
+                yield conn
+    
+    def warm_pool(self, connections: Optional[int] = None) -> int:
+        """
+        Open connections up front so the first requests after a deploy do not pay
+        the login handshake. They are held concurrently, then returned to the pool.
+        """
+        if not self.engine:
+            return 0
+        connections = connections if connections is not None else int(os.getenv('DB_POOL_WARMUP_CONNECTIONS',
+                                                                                 os.getenv('DB_POOL_SIZE', '5')))
+        if connections <= 0:
+            return 0
+        start = time.perf_counter()
+        opened = []
+        try:
+            # One connection first so an unreachable server fails once, not once per connection
+            opened.append(self.engine.connect())
+            if connections > 1:
+                # Own threads: this may itself be running on self.executor
+                with ThreadPoolExecutor(max_workers=connections - 1, thread_name_prefix="db-warmup") as warmup:
+                    for future in [warmup.submit(self.engine.connect) for _ in range(connections - 1)]:
+                        try:
+                            opened.append(future.result())
+                        except Exception as e:
+                            logger.warning(f"Pool warm-up connection failed: {e}")
+        except Exception as e:
+            logger.error(f"Pool warm-up failed: {e}")
+        finally:
+            for conn in opened:
+                conn.close()
+        self.pool_monitor.record_warmup(len(opened))
+        logger.info(f"Warmed {len(opened)}/{connections} pooled connections in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return len(opened)
+    
+    async def probe_connection(self) -> Dict[str, Any]:
+        """Run one liveness probe (SELECT 1) and record it on the pool monitor"""
+        start = time.perf_counter()
+        result = await self.run_in_executor(self.test_connection)
+        self.pool_monitor.record_probe(result, (time.perf_counter() - start) * 1000)
+        return result
+    
+    async def check_available(self) -> Dict[str, Any]:
+        """
+        Whether queries can be sent. Trusts a recent passing background probe and
+        only pings the database itself when the last probe failed or is too old.
+        """
+        if self.pool_monitor.recently_healthy(self.probe_interval * 2):
+            return {"status": "success", "message": "Database reachable (background probe)"}
+        return await self.probe_connection()
+    
+    async def _probe_loop(self) -> None:
+        while True:
+            try:
+                await self.probe_connection()
+            except Exception as e:
+                logger.error(f"Database liveness probe error: {e}")
+            await asyncio.sleep(self.probe_interval)
+    
+    async def start_pool(self) -> None:
+        """Warm the pool and start background liveness probing (called from the app lifespan)"""
+        if os.getenv('DB_POOL_WARMUP', 'true').lower() == 'true':
+            await self.run_in_executor(self.warm_pool)
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe_loop(), name="db-liveness-probe")
+    
+    async def stop_pool(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+    
+    @contextmanager
+    def _statement_controls(self, conn, timeout: Optional[float], cancel_token: Optional[QueryCancelToken]):
+        """Apply a server-side statement timeout and cancel token for one checkout"""
+        dbapi_connection = conn.connection.dbapi_connection
+        if cancel_token is not None:
+            conn.info["cancel_token"] = cancel_token
+        if timeout and not self.use_local_db:
+            # pyodbc maps this to SQL_ATTR_QUERY_TIMEOUT for subsequent statements
+            dbapi_connection.timeout = max(1, math.ceil(timeout))
+        try:
+            yield
+        finally:
+            conn.info.pop("cancel_token", None)
+            if cancel_token is not None:
+                cancel_token.unbind()
+            if timeout and not self.use_local_db:
+                dbapi_connection.timeout = 0
+    
     def _create_tables_if_not_exist(self):
         """Create tables if they don't exist, but never insert or overwrite data."""
         if not self.engine:
             return
         try:
-            with self.engine.connect() as conn:
+            with self._connect() as conn:
                 
                 citizens_table = """
                 CREATE TABLE IF NOT EXISTS citizens (
@@ -157,7 +711,7 @@ class DatabaseManager:
             if not self.engine:
                 return {"status": "error", "message": "Database engine not initialized"}
             
-            with self.engine.connect() as conn:
+            with self._connect() as conn:
                 result = conn.execute(text("SELECT 1 as test"))
                 row = result.fetchone()
                 
@@ -179,8 +733,32 @@ class DatabaseManager:
                 "database_type": "SQLite" if self.use_local_db else "Azure SQL"
             }
     
-    def execute_query(self, query: str, params: Optional[Dict] = None) -> Dict[str, Any]:
-        """Execute SQL query and return results with enhanced error handling"""
+    @staticmethod
+    def _statement(query: str, params: Optional[Dict] = None):
+        """
+        text() construct with string parameters typed as String. mssql+pyodbc then binds
+        them as varchar instead of nvarchar, so predicates on varchar columns stay sargable.
+        Parameters the statement does not use are ignored.
+        """
+        statement = text(query)
+        if not params:
+            return statement
+        names = statement.compile().params
+        return statement.bindparams(*(bindparam(name, type_=String()) for name, value in params.items()
+                                      if isinstance(value, str) and name in names))
+    
+    def execute_query(self, query: str, params: Optional[Dict] = None,
+                      timeout: Optional[float] = None,
+                      cancel_token: Optional[QueryCancelToken] = None,
+                      layout: str = "rows", use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Execute SQL query and return results with enhanced error handling.
+        layout selects the shape of "data" for SELECTs: "rows" (list of dicts),
+        "columns" (column name -> JSON-safe values) or "typed_columns"
+        (column name -> driver values, for Arrow encoding).
+        SELECT results are served from / stored in the result cache unless use_cache
+        is False; any other statement invalidates cached results for the tables it names.
+        """
         try:
             if not self.engine:
                 return {
@@ -189,50 +767,48 @@ class DatabaseManager:
                     "data": []
                 }
             
-            with self.engine.connect() as conn:
+            is_select = query.strip().upper().startswith('SELECT')
+            tables = QueryResultCache.tables_in(query)
+            cache_key = None
+            if is_select and use_cache and self.result_cache.enabled:
+                cache_key = self.result_cache.make_key(query, params, layout)
+                cached = self.result_cache.get(cache_key, tables)
+                if cached is not None:
+                    cached["cached"] = True
+                    return cached
+            
+            with self._connect() as conn, self._statement_controls(conn, timeout, cancel_token):
                 # Prepare parameters
                 query_params = params or {}
                 
                 # Execute query
-                result = conn.execute(text(query), query_params)
+                result = conn.execute(self._statement(query, query_params), query_params)
                 
                 # Handle different query types
-                query_upper = query.strip().upper()
-                if query_upper.startswith('SELECT'):
+                if is_select:
                     # SELECT queries
                     rows = result.fetchall()
                     columns = list(result.keys())
+                    if layout == "rows":
+                        data = self._rows_to_dicts(rows, columns)
+                    else:
+                        data = self._rows_to_columns(rows, columns, convert=(layout == "columns"))
                     
-                    # Convert data with proper JSON serialization for Decimal and datetime
-                    data = []
-                    for row in rows:
-                        row_dict = {}
-                        for i, value in enumerate(row):
-                            column_name = columns[i]
-                            # Handle Decimal types
-                            if str(type(value).__name__) == 'Decimal':
-                                row_dict[column_name] = float(value)
-                            # Handle datetime types
-                            elif hasattr(value, 'isoformat'):
-                                row_dict[column_name] = value.isoformat()
-                            # Handle date types
-                            elif hasattr(value, 'strftime'):
-                                row_dict[column_name] = value.strftime('%Y-%m-%d')
-                            else:
-                                row_dict[column_name] = value
-                        data.append(row_dict)
-                    
-                    return {
+                    query_result = {
                         "status": "success",
-                        "message": f"Query executed successfully. {len(data)} rows returned.",
+                        "message": f"Query executed successfully. {len(rows)} rows returned.",
                         "data": data,
-                        "row_count": len(data),
+                        "row_count": len(rows),
                         "columns": columns
                     }
+                    if cache_key is not None:
+                        self.result_cache.put(cache_key, tables, query_result)
+                    return query_result
                 else:
                     # INSERT, UPDATE, DELETE queries
                     conn.commit()
                     affected_rows = result.rowcount if hasattr(result, 'rowcount') else 0
+                    self.result_cache.invalidate_tables(tables)
                     
                     return {
                         "status": "success",
@@ -258,6 +834,118 @@ class DatabaseManager:
                 "error_type": "UnexpectedError"
             }
     
+    @staticmethod
+    def _convert_value(value):
+        """JSON-safe form of a single cell: Decimal -> float, date/datetime -> ISO string"""
+        if isinstance(value, Decimal):
+            return float(value)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+    
+    @classmethod
+    def _convert_column(cls, values: tuple) -> tuple:
+        """
+        Convert a whole column at once. The converter is chosen from the set of
+        value types in the column, so native columns (int/str/float/None) pass
+        through untouched and typed columns avoid per-cell type dispatch.
+        """
+        types = set(map(type, values))
+        has_nulls = type(None) in types
+        types.discard(type(None))
+        if not types or types <= NATIVE_JSON_TYPES:
+            return values
+        if len(types) > 1:
+            return tuple(map(cls._convert_value, values))
+        
+        column_type = types.pop()
+        if issubclass(column_type, Decimal):
+            converter = float
+        elif hasattr(column_type, 'isoformat'):
+            converter = column_type.isoformat
+        else:
+            return values
+        if has_nulls:
+            return tuple(None if value is None else converter(value) for value in values)
+        return tuple(map(converter, values))
+    
+    @classmethod
+    def _rows_to_dicts(cls, rows, columns: List[str]) -> List[Dict[str, Any]]:
+        """Convert result rows to dicts with proper JSON serialization for Decimal and datetime"""
+        if not rows:
+            return []
+        converted = [cls._convert_column(column) for column in zip(*rows)]
+        return [dict(zip(columns, values)) for values in zip(*converted)]
+    
+    @classmethod
+    def _rows_to_columns(cls, rows, columns: List[str], convert: bool = True) -> Dict[str, list]:
+        """Transpose result rows into column name -> list of values"""
+        if not rows:
+            return {column: [] for column in columns}
+        transposed = zip(*rows)
+        if convert:
+            transposed = map(cls._convert_column, transposed)
+        return {column: list(values) for column, values in zip(columns, transposed)}
+    
+    def stream_query(self, query: str, params: Optional[Dict] = None,
+                     batch_size: Optional[int] = None, timeout: Optional[float] = None,
+                     cancel_token: Optional[QueryCancelToken] = None) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+        """
+        Yield (columns, rows) batches from a server-side cursor without materializing the result.
+        Always yields at least one (possibly empty) batch so callers learn the column names.
+        timeout and cancel_token work as for execute_query; cancelling also stops a fetch in flight.
+        """
+        if not self.engine:
+            raise RuntimeError("Database engine not initialized")
+        
+        batch_size = batch_size or int(os.getenv('DB_STREAM_BATCH_SIZE', '5000'))
+        with self._connect() as conn, self._statement_controls(conn, timeout, cancel_token):
+            streaming_conn = conn.execution_options(stream_results=True, max_row_buffer=batch_size)
+            result = streaming_conn.execute(self._statement(query, params), params or {})
+            columns = list(result.keys())
+            first_batch = True
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    if first_batch:
+                        yield columns, []
+                    break
+                first_batch = False
+                yield columns, self._rows_to_dicts(rows, columns)
+    
+    async def execute_query_async(self, query: str, params: Optional[Dict] = None,
+                                  timeout: Optional[float] = None, layout: str = "rows",
+                                  use_cache: bool = True) -> Dict[str, Any]:
+        """Run execute_query on the worker pool with a timeout, cancelling the statement on expiry"""
+        timeout = self.query_timeout if timeout is None else timeout
+        cancel_token = QueryCancelToken()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor,
+            functools.partial(self.execute_query, query, params, timeout=timeout,
+                              cancel_token=cancel_token, layout=layout, use_cache=use_cache)
+        )
+        try:
+            return await asyncio.wait_for(future, timeout=timeout or None)
+        except asyncio.TimeoutError:
+            cancel_token.cancel()
+            logger.error(f"Query cancelled after exceeding {timeout}s timeout")
+            return {
+                "status": "error",
+                "message": f"Query exceeded the {timeout:g}s timeout and was cancelled",
+                "data": [],
+                "error_type": "QueryTimeout"
+            }
+        except asyncio.CancelledError:
+            # Client went away - stop the statement instead of letting it run to completion
+            cancel_token.cancel()
+            raise
+    
+    async def run_in_executor(self, func: Callable, *args, **kwargs) -> Any:
+        """Run any blocking DatabaseManager call on the worker pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+    
     def execute_query_pandas(self, query: str, params: Optional[Dict] = None) -> pd.DataFrame:
         """Execute query and return results as pandas DataFrame"""
         try:
@@ -273,13 +961,164 @@ class DatabaseManager:
             logger.error(f"Failed to execute query with pandas: {e}")
             return pd.DataFrame()
     
+    def bulk_insert(self, table: str, columns: List[str], rows: List[Tuple],
+                    batch_size: Optional[int] = None) -> int:
+        """
+        Insert rows (tuples in column order) in a single transaction and return the count.
+
+        Rows go through DB-API executemany in slices of DB_BULK_BATCH_SIZE; on SQL Server
+        the engine's fast_executemany turns each slice into one parameter-array round
+        trip. Any failure rolls the whole call back and is raised to the caller. Cached
+        results that read the table are invalidated afterwards.
+        """
+        if not self.engine:
+            raise RuntimeError("Database engine not initialized")
+        if not rows:
+            return 0
+        
+        batch_size = batch_size or int(os.getenv('DB_BULK_BATCH_SIZE', '10000'))
+        statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        with self._connect(begin=True) as conn:
+            for start in range(0, len(rows), batch_size):
+                conn.exec_driver_sql(statement, rows[start:start + batch_size])
+        self.result_cache.invalidate_tables(frozenset({table.lower()}))
+        return len(rows)
+    
+    def fetch_column(self, table: str, column: str, batch_size: int = 100000) -> List[Any]:
+        """All values of one column, fetched in batches without dict conversion"""
+        if not self.engine:
+            raise RuntimeError("Database engine not initialized")
+        values: List[Any] = []
+        with self._connect() as conn:
+            result = conn.execution_options(stream_results=True).exec_driver_sql(f"SELECT {column} FROM {table}")
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                values.extend(row[0] for row in rows)
+        return values
+    
+    def table_row_counts(self, tables: List[str]) -> Dict[str, Any]:
+        """
+        Row counts for several tables in one round trip: catalog counts from
+        sys.dm_db_partition_stats on SQL Server, otherwise (SQLite, or no permission
+        on the catalog view) a single UNION ALL of COUNT(*) statements. A catalog
+        view denied or missing is not queried again; after any other failure it
+        is retried once CATALOG_ROW_COUNTS_RETRY_SECONDS have passed.
+        """
+        invalid = [table for table in tables if not TABLE_NAME_PATTERN.match(table)]
+        if invalid:
+            raise ValueError(f"Invalid table names: {', '.join(invalid)}")
+        
+        if not self.use_local_db and self.catalog_row_counts_available and time.monotonic() >= self.catalog_retry_at:
+            result = self.execute_query(CATALOG_ROW_COUNTS_SQL, use_cache=False)
+            if result["status"] != "success":
+                if CATALOG_UNAVAILABLE_PATTERN.search(result.get("message", "")):
+                    self.catalog_row_counts_available = False
+                    logger.warning("Catalog row counts unavailable, counting rows from now on")
+                else:
+                    self.catalog_retry_at = time.monotonic() + self.catalog_retry_seconds
+                    logger.warning(f"Catalog row counts failed, counting rows for the next {self.catalog_retry_seconds:g}s")
+            else:
+                counts = {row["table_name"].lower(): int(row["row_count"]) for row in result["data"]}
+                missing = [table for table in tables if table.lower() not in counts]
+                if not missing:
+                    return {"status": "success", "source": "catalog",
+                            "data": {table: counts[table.lower()] for table in tables}}
+                logger.info(f"No catalog row counts for {', '.join(missing)}, counting rows instead")
+        
+        query = " UNION ALL ".join(
+            f"SELECT '{table}' AS table_name, COUNT(*) AS row_count FROM {table}" for table in tables
+        )
+        result = self.execute_query(query)
+        if result["status"] != "success":
+            return result
+        return {"status": "success", "source": "count",
+                "data": {row["table_name"]: int(row["row_count"]) for row in result["data"]}}
+    
+    def estimate_query_cost(self, query: str, params: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+        """
+        Estimated cost of a statement without executing it: StatementSubTreeCost from
+        SHOWPLAN_XML on SQL Server, or a rows-touched heuristic over EXPLAIN QUERY PLAN
+        on SQLite scaled to comparable units. Returns None when no estimate is available.
+        """
+        if not self.engine:
+            return None
+        try:
+            dialect = self.engine.dialect.name
+            if dialect == "mssql":
+                return self._estimate_cost_showplan(query, params)
+            if dialect == "sqlite":
+                return self._estimate_cost_sqlite(query, params)
+        except Exception as e:
+            logger.warning(f"Query cost estimate failed: {e}")
+        return None
+    
+    def _estimate_cost_showplan(self, query: str, params: Optional[Dict]) -> Dict[str, Any]:
+        with self._connect() as conn:
+            conn.exec_driver_sql("SET SHOWPLAN_XML ON")
+            try:
+                rows = conn.execute(self._statement(query, params), params or {}).fetchall()
+            finally:
+                conn.exec_driver_sql("SET SHOWPLAN_XML OFF")
+        plan_xml = "".join(str(row[0]) for row in rows)
+        costs = [float(cost) for cost in SHOWPLAN_COST_PATTERN.findall(plan_xml)]
+        est_rows = [float(count) for count in SHOWPLAN_ROWS_PATTERN.findall(plan_xml)]
+        return {
+            "estimated_cost": round(sum(costs), 4),
+            "estimated_rows": round(max(est_rows, default=0.0), 1),
+            "source": "showplan_xml"
+        }
+    
+    def _estimate_cost_sqlite(self, query: str, params: Optional[Dict]) -> Dict[str, Any]:
+        with self._connect() as conn:
+            plan = conn.execute(self._statement(f"EXPLAIN QUERY PLAN {query}", params), params or {}).fetchall()
+            table_names = {row[0].lower(): row[0] for row in
+                           conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            aliases = dict(table_names)
+            for table, alias in SQL_ALIAS_PATTERN.findall(query):
+                if table.lower() in table_names and alias.upper() not in SQL_ALIAS_STOPWORDS:
+                    aliases[alias.lower()] = table_names[table.lower()]
+            
+            row_counts: Dict[str, float] = {}
+            def table_rows(name: str) -> float:
+                table = aliases.get(name.lower())
+                if table is None:
+                    return SQLITE_UNKNOWN_SOURCE_ROWS
+                if table not in row_counts:
+                    try:
+                        count = conn.exec_driver_sql(f'SELECT MAX(rowid) FROM "{table}"').scalar()
+                    except SQLAlchemyError:
+                        count = conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{table}"').scalar()
+                    row_counts[table] = float(count or 0)
+                return max(row_counts[table], 1.0)
+            
+            # Plan steps run as nested loops: every step is repeated once per row of the steps before it
+            rows_touched, loop_rows = 0.0, 1.0
+            for row in plan:
+                detail = row[-1]
+                words = detail.split()
+                if words[0] == "SCAN" and len(words) > 1:
+                    rows = table_rows(words[1])
+                    rows_touched += loop_rows * rows
+                    loop_rows *= rows
+                elif words[0] == "SEARCH" and len(words) > 1:
+                    rows_touched += loop_rows * math.log2(table_rows(words[1]) + 1)
+                elif "TEMP B-TREE" in detail:
+                    rows_touched += loop_rows * math.log2(loop_rows + 1)
+        return {
+            "estimated_cost": round(rows_touched / SQLITE_ROWS_PER_COST_UNIT, 4),
+            "estimated_rows": round(loop_rows, 1),
+            "source": "explain_query_plan"
+        }
+    
     def get_table_schema(self, table_name: str) -> Dict[str, Any]:
         """Get schema information for a specific table"""
         try:
             if self.use_local_db:
                 # SQLite schema query
-                schema_query = f"PRAGMA table_info({table_name})"
-                result = self.execute_query(schema_query)
+                schema_query = 'SELECT name, type, "notnull", dflt_value FROM pragma_table_info(:table_name)'
+                result = self.execute_query(schema_query, {"table_name": table_name})
                 
                 if result["status"] == "success":
                     # Convert SQLite schema to standard format
@@ -358,19 +1197,14 @@ class DatabaseManager:
                 info["tables"] = tables_result["data"]
                 info["total_tables"] = len(tables_result["data"])
             
-            # Get record counts for main tables
+            # Get record counts for main tables in one statement
             main_tables = ["citizens", "officers", "schemes"]
-            record_counts = {}
-            
-            for table in main_tables:
-                try:
-                    count_result = self.execute_query(f"SELECT COUNT(*) as count FROM {table}")
-                    if count_result["status"] == "success" and count_result["data"]:
-                        record_counts[table] = count_result["data"][0]["count"]
-                except:
-                    record_counts[table] = "Error"
-            
-            info["record_counts"] = record_counts
+            counts_result = self.table_row_counts(main_tables)
+            if counts_result["status"] == "success":
+                info["record_counts"] = counts_result["data"]
+                info["record_count_source"] = counts_result["source"]
+            else:
+                info["record_counts"] = {table: "Error" for table in main_tables}
             
             return {
                 "status": "success",
@@ -395,10 +1229,23 @@ def execute_sql(query: str, params: Optional[Dict] = None):
     """Execute SQL query using global database manager"""
     return db_manager.execute_query(query, params)
 
+async def execute_sql_async(query: str, params: Optional[Dict] = None, timeout: Optional[float] = None,
+                            layout: str = "rows"):
+    """Execute SQL query off the event loop using global database manager"""
+    return await db_manager.execute_query_async(query, params, timeout=timeout, layout=layout)
+
 def test_db_connection():
     """Test database connection using global database manager"""
     return db_manager.test_connection()
 
+async def test_db_connection_async():
+    """Test database connection off the event loop"""
+    return await db_manager.run_in_executor(db_manager.test_connection)
+
+async def check_db_available_async():
+    """Database availability from the background liveness probe, pinging only if it is stale or failing"""
+    return await db_manager.check_available()
+
 def get_database_info():
     """Get comprehensive database information"""
     return db_manager.get_database_info()
@@ -0,0 +1,510 @@
+"""
+Batch eligibility engine over scheme_eligibility
+Loads citizens (age, gender, state, disability from health_details) into
+columnar numpy arrays, evaluates every scheme's rules across all citizens with
+boolean masks and bulk-writes the outcomes and reasons to eligibility_log.
+
+The schema has no citizen category or income columns, so category_required and
+min_income cannot be checked; they are reported as unverified in the reason
+text instead of silently passing or failing citizens.
+"""
+import os
+import time
+import threading
+import logging
+import multiprocessing
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+CITIZEN_COLUMNS_SQL = """
+SELECT c.citizen_id, c.age, c.gender, c.village_id, v.district_id, d.state_id, h.disability_status
+FROM citizens c
+JOIN villages v ON v.village_id = c.village_id
+JOIN districts d ON d.district_id = v.district_id
+LEFT JOIN health_details h ON h.citizen_id = c.citizen_id
+"""
+
+RULES_SQL = """
+SELECT e.scheme_id, s.name, e.min_age, e.max_age, e.gender, e.category_required,
+       e.min_income, e.disability_required
+FROM scheme_eligibility e
+JOIN schemes s ON s.scheme_id = e.scheme_id
+ORDER BY e.scheme_id
+"""
+
+# Reason bits: a citizen x scheme outcome is ineligible when any bit is set
+BELOW_MIN_AGE = 1
+ABOVE_MAX_AGE = 2
+GENDER_MISMATCH = 4
+DISABILITY_MISSING = 8
+REASON_CODES = 16
+
+# Rule criteria that can be checked against recorded citizen data, with the bit each one sets
+PREDICATE_BITS = {
+    "min_age": BELOW_MIN_AGE,
+    "max_age": ABOVE_MAX_AGE,
+    "gender": GENDER_MISMATCH,
+    "disability_required": DISABILITY_MISSING
+}
+
+NO_DISABILITY_VALUES = frozenset({"", "none", "no", "nil", "n/a"})
+
+ELIGIBILITY_LOG_COLUMNS = ["log_id", "citizen_id", "scheme_id", "eligibility_result", "reason", "checked_on"]
+
+class CitizenArrays:
+    """Columnar snapshot of the citizen attributes the rules look at"""
+
+    __slots__ = ("citizen_id", "age", "gender", "village_id", "district_id", "state_id", "has_disability")
+
+    def __init__(self, citizen_id: np.ndarray, age: np.ndarray, gender: np.ndarray, village_id: np.ndarray,
+                 district_id: np.ndarray, state_id: np.ndarray, has_disability: np.ndarray):
+        self.citizen_id = citizen_id
+        self.age = age
+        # Lower-cased gender strings; compared once per scheme, not per row in Python
+        self.gender = gender
+        self.village_id = village_id
+        self.district_id = district_id
+        self.state_id = state_id
+        self.has_disability = has_disability
+
+    def __len__(self) -> int:
+        return len(self.citizen_id)
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, list]) -> "CitizenArrays":
+        disability = np.char.lower(np.char.strip(np.asarray([value or "" for value in columns["disability_status"]], dtype=str)))
+        return cls(
+            citizen_id=np.asarray(columns["citizen_id"], dtype=np.int64),
+            age=np.asarray([-1 if age is None else age for age in columns["age"]], dtype=np.int16),
+            gender=np.char.lower(np.asarray([gender or "" for gender in columns["gender"]], dtype=str)),
+            village_id=np.asarray(columns["village_id"], dtype=np.int32),
+            district_id=np.asarray(columns["district_id"], dtype=np.int32),
+            state_id=np.asarray(columns["state_id"], dtype=np.int32),
+            has_disability=~np.isin(disability, list(NO_DISABILITY_VALUES))
+        )
+
+class SchemeRule:
+    """One scheme_eligibility row plus its precomputed reason strings"""
+
+    def __init__(self, row: Dict[str, Any]):
+        self.scheme_id = int(row["scheme_id"])
+        self.name = row["name"]
+        self.min_age = row["min_age"]
+        self.max_age = row["max_age"]
+        self.gender = (row["gender"] or "").strip() or None
+        self.category_required = (row["category_required"] or "").strip() or None
+        self.min_income = row["min_income"]
+        disability = (row["disability_required"] or "").strip()
+        self.disability_required = disability.lower() not in NO_DISABILITY_VALUES
+        self.reasons = np.array([self._reason(code) for code in range(REASON_CODES)], dtype=object)
+
+    def criteria(self) -> Dict[str, Any]:
+        """Checkable criteria keyed like PREDICATE_BITS"""
+        return {"min_age": self.min_age, "max_age": self.max_age, "gender": self.gender,
+                "disability_required": self.disability_required}
+
+    def unverified(self) -> List[str]:
+        notes = []
+        if self.category_required:
+            notes.append(f"category {self.category_required}")
+        if self.min_income is not None:
+            notes.append(f"income limit {float(self.min_income):.0f}")
+        return notes
+
+    def _reason(self, code: int) -> str:
+        if code:
+            failures = []
+            if code & BELOW_MIN_AGE:
+                failures.append(f"below minimum age {self.min_age}")
+            if code & ABOVE_MAX_AGE:
+                failures.append(f"above maximum age {self.max_age}")
+            if code & GENDER_MISMATCH:
+                failures.append(f"scheme is for {self.gender} applicants")
+            if code & DISABILITY_MISSING:
+                failures.append("no recorded disability")
+            return "Ineligible: " + "; ".join(failures)
+        checks = []
+        if self.min_age is not None or self.max_age is not None:
+            checks.append(f"age {self.min_age if self.min_age is not None else 0}-"
+                          f"{self.max_age if self.max_age is not None else 'any'}")
+        if self.gender:
+            checks.append(f"gender {self.gender}")
+        if self.disability_required:
+            checks.append("disability")
+        reason = "Meets " + ", ".join(checks) if checks else "No checkable criteria"
+        notes = self.unverified()
+        if notes:
+            reason += "; not verified (not recorded): " + ", ".join(notes)
+        return reason
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"scheme_id": self.scheme_id, "name": self.name, "min_age": self.min_age, "max_age": self.max_age,
+                "gender": self.gender, "disability_required": self.disability_required,
+                "unverified": self.unverified()}
+
+class EligibilityResult:
+    """Flat citizen x scheme outcome arrays, scheme-major"""
+
+    def __init__(self, rules: List[SchemeRule], citizen_id: np.ndarray, rule_index: np.ndarray,
+                 reason_code: np.ndarray, evaluate_seconds: float):
+        self.rules = rules
+        self.citizen_id = citizen_id
+        self.rule_index = rule_index
+        self.reason_code = reason_code
+        self.evaluate_seconds = evaluate_seconds
+
+    def __len__(self) -> int:
+        return len(self.citizen_id)
+
+    @property
+    def eligible(self) -> np.ndarray:
+        return self.reason_code == 0
+
+    @classmethod
+    def concatenate(cls, results: List["EligibilityResult"]) -> "EligibilityResult":
+        rules = results[0].rules
+        return cls(rules,
+                   np.concatenate([result.citizen_id for result in results]),
+                   np.concatenate([result.rule_index for result in results]),
+                   np.concatenate([result.reason_code for result in results]),
+                   max(result.evaluate_seconds for result in results))
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-scheme evaluated / eligible counts and a breakdown by reason"""
+        counts = np.bincount(self.rule_index.astype(np.int64) * REASON_CODES + self.reason_code,
+                             minlength=len(self.rules) * REASON_CODES).reshape(len(self.rules), REASON_CODES)
+        schemes = []
+        for index, rule in enumerate(self.rules):
+            row = counts[index]
+            schemes.append({
+                "scheme_id": rule.scheme_id,
+                "name": rule.name,
+                "evaluated": int(row.sum()),
+                "eligible": int(row[0]),
+                "ineligible": int(row[1:].sum()),
+                "reasons": {rule.reasons[code]: int(row[code]) for code in np.flatnonzero(row)},
+                "unverified": rule.unverified()
+            })
+        return schemes
+
+def predicate_mask(citizens: CitizenArrays, predicate: str, value: Any) -> Optional[np.ndarray]:
+    """Boolean array of citizens passing one criterion, or None when the criterion is not set"""
+    if predicate == "min_age":
+        return None if value is None else citizens.age >= value
+    if predicate == "max_age":
+        return None if value is None else citizens.age <= value
+    if predicate == "gender":
+        return citizens.gender == value.strip().lower() if value else None
+    if predicate == "disability_required":
+        return citizens.has_disability if value else None
+    raise ValueError(f"Unknown eligibility predicate: {predicate}")
+
+def evaluate_rules(citizens: CitizenArrays, rules: List[SchemeRule]) -> EligibilityResult:
+    """Evaluate every rule against every citizen with vectorized masks"""
+    start = time.perf_counter()
+    size = len(citizens)
+    codes = np.empty((len(rules), size), dtype=np.uint8)
+    for index, rule in enumerate(rules):
+        code = codes[index]
+        code.fill(0)
+        for predicate, value in rule.criteria().items():
+            passed = predicate_mask(citizens, predicate, value)
+            if passed is not None:
+                code |= (~passed).astype(np.uint8) * PREDICATE_BITS[predicate]
+    result = EligibilityResult(
+        rules,
+        np.tile(citizens.citizen_id, len(rules)),
+        np.repeat(np.arange(len(rules), dtype=np.uint8), size),
+        codes.reshape(-1),
+        time.perf_counter() - start
+    )
+    return result
+
+class EligibilityEngine:
+    """Loads rules and citizens, evaluates them and writes eligibility_log"""
+
+    def __init__(self, db_manager=None):
+        self._db_manager = db_manager
+        self.write_batch_rows = int(os.getenv("ELIGIBILITY_WRITE_BATCH_ROWS", "100000"))
+        self._write_lock = threading.Lock()
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    @property
+    def db_manager(self):
+        return self._db_manager or get_db_connection()
+
+    def _columns(self, query: str, params: Optional[Dict] = None) -> Dict[str, list]:
+        result = self.db_manager.execute_query(query, params, layout="typed_columns", use_cache=False)
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+        return result["data"]
+
+    def load_rules(self) -> List[SchemeRule]:
+        columns = self._columns(RULES_SQL)
+        return [SchemeRule(dict(zip(columns, values))) for values in zip(*columns.values())]
+
+    def load_citizens(self, state_id: Optional[int] = None) -> CitizenArrays:
+        if state_id is None:
+            return CitizenArrays.from_columns(self._columns(CITIZEN_COLUMNS_SQL))
+        return CitizenArrays.from_columns(self._columns(CITIZEN_COLUMNS_SQL + "WHERE d.state_id = :state_id",
+                                                        {"state_id": state_id}))
+
+    def state_ids(self) -> List[int]:
+        return [int(state_id) for state_id in self._columns("SELECT state_id FROM states ORDER BY state_id")["state_id"]]
+
+    def evaluate(self, state_id: Optional[int] = None, processes: int = 1,
+                 rules: Optional[List[SchemeRule]] = None) -> EligibilityResult:
+        """
+        Evaluate all rules for all citizens (or one state's). With processes > 1 the
+        citizens are sharded by state: each worker loads and evaluates its states and
+        sends the outcome arrays back.
+        """
+        rules = rules or self.load_rules()
+        if processes <= 1 or state_id is not None:
+            return evaluate_rules(self.load_citizens(state_id), rules)
+
+        # Workers are spawned, not forked: a fork of the server could inherit a lock held by one
+        # of its threads, and each worker opens its own engine instead of sharing this one's pool
+        context = multiprocessing.get_context(os.getenv("ELIGIBILITY_START_METHOD", "spawn"))
+        with context.Pool(processes, initializer=_init_worker, initargs=(rules,)) as pool:
+            results = [result for result in pool.imap_unordered(_evaluate_state, self.state_ids()) if len(result)]
+        if not results:
+            return evaluate_rules(CitizenArrays.from_columns(dict.fromkeys(
+                ["citizen_id", "age", "gender", "village_id", "district_id", "state_id", "disability_status"], [])), rules)
+        return EligibilityResult.concatenate(results)
+
+    def write_results(self, result: EligibilityResult, checked_on: Optional[datetime] = None) -> int:
+        """
+        Append outcomes to eligibility_log with consecutive log_ids after the current
+        maximum, one bulk_insert transaction per ELIGIBILITY_WRITE_BATCH_ROWS rows
+        """
+        if not len(result):
+            return 0
+        checked_on = (checked_on or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+        scheme_ids = np.array([rule.scheme_id for rule in result.rules], dtype=np.int64)
+        reasons = np.stack([rule.reasons for rule in result.rules])
+        outcomes = np.array(["Ineligible", "Eligible"], dtype=object)
+
+        with self._write_lock:
+            next_id = self._columns("SELECT MAX(log_id) AS max_id FROM eligibility_log")["max_id"][0] or 0
+            written = 0
+            for start in range(0, len(result), self.write_batch_rows):
+                stop = min(start + self.write_batch_rows, len(result))
+                rule_index = result.rule_index[start:stop].astype(np.int64)
+                code = result.reason_code[start:stop]
+                rows = list(zip(
+                    range(next_id + start + 1, next_id + stop + 1),
+                    result.citizen_id[start:stop].tolist(),
+                    scheme_ids[rule_index].tolist(),
+                    outcomes[(code == 0).astype(np.int64)],
+                    reasons[rule_index, code],
+                    repeat(checked_on)
+                ))
+                written += self.db_manager.bulk_insert("eligibility_log", ELIGIBILITY_LOG_COLUMNS, rows)
+        return written
+
+    def run(self, write: bool = True, state_id: Optional[int] = None, processes: int = 1) -> Dict[str, Any]:
+        """Evaluate and optionally persist; returns counts and timings"""
+        start = time.perf_counter()
+        rules = self.load_rules()
+        result = self.evaluate(state_id=state_id, processes=processes, rules=rules)
+        evaluated = time.perf_counter()
+        written = self.write_results(result) if write else 0
+        finished = time.perf_counter()
+        self.last_run = {
+            "evaluations": len(result),
+            "citizens": len(result) // max(len(rules), 1),
+            "schemes": result.summary(),
+            "rows_written": written,
+            "state_id": state_id,
+            "processes": processes,
+            "timings_ms": {
+                "load_and_evaluate": round((evaluated - start) * 1000, 2),
+                "evaluate": round(result.evaluate_seconds * 1000, 2),
+                "write": round((finished - evaluated) * 1000, 2),
+                "total": round((finished - start) * 1000, 2)
+            }
+        }
+        return self.last_run
+
+REGION_LEVELS = {
+    "state": ("state_id", "SELECT state_id AS id, name FROM states"),
+    "district": ("district_id", "SELECT district_id AS id, name FROM districts"),
+    "village": ("village_id", "SELECT village_id AS id, name FROM villages")
+}
+
+class EligibilitySimulator:
+    """
+    What-if simulation of rule changes against a cached citizen snapshot.
+
+    For every scheme the pass mask of each checkable predicate and the resulting
+    eligible mask are kept in memory. A simulated change recomputes only the
+    predicates it touches, ANDs them with the cached ones and counts gained and
+    lost citizens per state, district or village with bincount.
+    """
+
+    def __init__(self, engine: Optional[EligibilityEngine] = None, ttl_seconds: Optional[float] = None):
+        self._engine = engine
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("ELIGIBILITY_SNAPSHOT_TTL", "600"))
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self.stats = {"simulations": 0, "snapshot_builds": 0}
+
+    @property
+    def engine(self) -> EligibilityEngine:
+        return self._engine or get_eligibility_engine()
+
+    def refresh(self) -> Dict[str, Any]:
+        """Reload citizens, rules and region names from the database and rebuild the masks"""
+        start = time.perf_counter()
+        engine = self.engine
+        names = {}
+        for level, (_, query) in REGION_LEVELS.items():
+            columns = engine._columns(query)
+            names[level] = dict(zip((int(region_id) for region_id in columns["id"]), columns["name"]))
+        return self.load_snapshot(engine.load_citizens(), engine.load_rules(), names, start)
+
+    def load_snapshot(self, citizens: CitizenArrays, rules: List[SchemeRule],
+                      names: Dict[str, Dict[int, str]], started: Optional[float] = None) -> Dict[str, Any]:
+        """Build predicate and eligible masks for every rule over citizens and make them current"""
+        start = started or time.perf_counter()
+        rules = {rule.scheme_id: rule for rule in rules}
+        masks, eligible = {}, {}
+        for scheme_id, rule in rules.items():
+            masks[scheme_id] = {predicate: predicate_mask(citizens, predicate, value)
+                                for predicate, value in rule.criteria().items()}
+            eligible[scheme_id] = self._combine(masks[scheme_id], len(citizens))
+        snapshot = {
+            "citizens": citizens,
+            "rules": rules,
+            "masks": masks,
+            "eligible": eligible,
+            "names": names,
+            "built_at": time.time(),
+            "build_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+        with self._lock:
+            self._snapshot = snapshot
+            self.stats["snapshot_builds"] += 1
+        return snapshot
+
+    def _current(self) -> Dict[str, Any]:
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None or time.time() - snapshot["built_at"] > self.ttl_seconds:
+            snapshot = self.refresh()
+        return snapshot
+
+    @staticmethod
+    def _combine(masks: Dict[str, Optional[np.ndarray]], size: int) -> np.ndarray:
+        eligible = np.ones(size, dtype=bool)
+        for mask in masks.values():
+            if mask is not None:
+                eligible &= mask
+        return eligible
+
+    def simulate(self, scheme_id: int, changes: Dict[str, Any], breakdown: str = "state",
+                 top: int = 20) -> Dict[str, Any]:
+        """
+        Apply changes (predicate -> new value, None removes the criterion) to one
+        scheme's rule and return baseline/simulated eligible counts plus the
+        per-region delta. Blocking on the first call while the snapshot loads.
+        """
+        unknown = set(changes) - set(PREDICATE_BITS)
+        if unknown:
+            raise ValueError(f"Cannot simulate {', '.join(sorted(unknown))}: only "
+                             f"{', '.join(PREDICATE_BITS)} can be checked against recorded citizen data")
+        if breakdown not in REGION_LEVELS:
+            raise ValueError(f"breakdown must be one of {', '.join(REGION_LEVELS)}")
+
+        snapshot = self._current()
+        rule = snapshot["rules"].get(scheme_id)
+        if rule is None:
+            raise KeyError(f"Scheme {scheme_id} has no eligibility rule")
+
+        start = time.perf_counter()
+        citizens = snapshot["citizens"]
+        masks = dict(snapshot["masks"][scheme_id])
+        for predicate, value in changes.items():
+            masks[predicate] = predicate_mask(citizens, predicate, value)
+        baseline = snapshot["eligible"][scheme_id]
+        simulated = self._combine(masks, len(citizens))
+        gained = simulated & ~baseline
+        lost = baseline & ~simulated
+
+        region_ids = getattr(citizens, REGION_LEVELS[breakdown][0])
+        length = int(region_ids.max()) + 1 if len(region_ids) else 1
+        gained_by_region = np.bincount(region_ids[gained], minlength=length)
+        lost_by_region = np.bincount(region_ids[lost], minlength=length)
+        net = gained_by_region - lost_by_region
+        changed = np.flatnonzero(gained_by_region | lost_by_region)
+        changed = changed[np.argsort(-np.abs(net[changed]), kind="stable")][:top]
+        names = snapshot["names"][breakdown]
+        regions = [{"id": int(region_id), "name": names.get(int(region_id)),
+                    "gained": int(gained_by_region[region_id]), "lost": int(lost_by_region[region_id]),
+                    "net": int(net[region_id])} for region_id in changed]
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        with self._lock:
+            self.stats["simulations"] += 1
+        baseline_count, gained_count, lost_count = int(baseline.sum()), int(gained.sum()), int(lost.sum())
+        return {
+            "scheme_id": scheme_id,
+            "scheme": rule.name,
+            "baseline_rule": rule.criteria(),
+            "simulated_rule": {**rule.criteria(), **changes},
+            "unverified": rule.unverified(),
+            "citizens": len(citizens),
+            "baseline_eligible": baseline_count,
+            "simulated_eligible": baseline_count + gained_count - lost_count,
+            "gained": gained_count,
+            "lost": lost_count,
+            "net_change": gained_count - lost_count,
+            "breakdown": breakdown,
+            "regions": regions,
+            "regions_changed": int(np.count_nonzero(gained_by_region | lost_by_region)),
+            "simulate_ms": elapsed_ms,
+            "snapshot_age_seconds": round(time.time() - snapshot["built_at"], 1)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            snapshot = self._snapshot
+        if snapshot is not None:
+            stats.update(citizens=len(snapshot["citizens"]), build_ms=snapshot["build_ms"],
+                         snapshot_age_seconds=round(time.time() - snapshot["built_at"], 1))
+        return stats
+
+# Worker state for sharded evaluation, set once per process by _init_worker
+_WORKER_RULES: Optional[List[SchemeRule]] = None
+_WORKER_ENGINE: Optional[EligibilityEngine] = None
+
+def _init_worker(rules: List[SchemeRule]) -> None:
+    """Runs in the spawned worker: its DatabaseManager (and engine) is created by this process's import of db"""
+    global _WORKER_RULES, _WORKER_ENGINE
+    _WORKER_RULES = rules
+    _WORKER_ENGINE = EligibilityEngine(get_db_connection())
+
+def _evaluate_state(state_id: int) -> EligibilityResult:
+    return evaluate_rules(_WORKER_ENGINE.load_citizens(state_id), _WORKER_RULES)
+
+# Global instance
+eligibility_engine = EligibilityEngine()
+
+def get_eligibility_engine() -> EligibilityEngine:
+    """Get the process-wide EligibilityEngine instance"""
+    return eligibility_engine
+
+eligibility_simulator = EligibilitySimulator()
+
+def get_eligibility_simulator() -> EligibilitySimulator:
+    """Get the process-wide EligibilitySimulator instance"""
+    return eligibility_simulator
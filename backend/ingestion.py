@@ -0,0 +1,383 @@
+"""
+Bulk ingestion of enrollment and disbursement files
+Streams CSV / NDJSON uploads in fixed-size batches, validates each batch with
+vectorized pandas checks against in-memory key sets (citizens, schemes,
+officers, existing primary keys) and loads the valid rows through
+DatabaseManager.bulk_insert, one transaction per batch
+"""
+import io
+import os
+import json
+import time
+import asyncio
+import threading
+import logging
+from typing import Dict, Any, List, Tuple, Optional, AsyncIterator
+
+import numpy as np
+import pandas as pd
+
+from db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Column kinds: "int", "decimal", "date" (YYYY-MM-DD) and "str"
+INGEST_TABLES: Dict[str, Dict[str, Any]] = {
+    "enrollments": {
+        "primary_key": "enrollment_id",
+        "columns": {
+            "enrollment_id": "int",
+            "citizen_id": "int",
+            "scheme_id": "int",
+            "enrollment_date": "date",
+            "status": "str",
+            "last_verified_on": "date",
+            "verified_by": "int"
+        },
+        "required": ["enrollment_id", "citizen_id", "scheme_id", "enrollment_date", "status"],
+        "foreign_keys": {
+            "citizen_id": ("citizens", "citizen_id"),
+            "scheme_id": ("schemes", "scheme_id"),
+            "verified_by": ("officers", "officer_id")
+        }
+    },
+    "disbursements": {
+        "primary_key": "disbursement_id",
+        "columns": {
+            "disbursement_id": "int",
+            "citizen_id": "int",
+            "scheme_id": "int",
+            "amount": "decimal",
+            "status": "str",
+            "disbursed_on": "date",
+            "approved_by": "int",
+            "payment_mode": "str"
+        },
+        "required": ["disbursement_id", "citizen_id", "scheme_id", "amount", "status", "disbursed_on", "payment_mode"],
+        "foreign_keys": {
+            "citizen_id": ("citizens", "citizen_id"),
+            "scheme_id": ("schemes", "scheme_id"),
+            "approved_by": ("officers", "officer_id")
+        }
+    }
+}
+
+INGEST_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+MAX_TEXT_LENGTH = 255
+
+class IngestionError(Exception):
+    """Upload that cannot be processed at all (unknown table, bad header, unsupported format)"""
+
+class KeyIndex:
+    """
+    Sorted numpy arrays of the key values of referenced tables.
+
+    Loaded lazily from the database, refreshed after INGEST_KEY_TTL seconds and
+    extended in place with the primary keys of rows this process inserts.
+    Membership tests are a vectorized binary search.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("INGEST_KEY_TTL", "300"))
+        self._keys: Dict[Tuple[str, str], Tuple[np.ndarray, float]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "keys_loaded": 0}
+
+    def _get(self, db_manager, table: str, column: str) -> np.ndarray:
+        with self._lock:
+            entry = self._keys.get((table, column))
+        if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+            return entry[0]
+        values = db_manager.fetch_column(table, column)
+        keys = np.unique(np.asarray([value for value in values if value is not None], dtype=np.int64))
+        with self._lock:
+            self._keys[(table, column)] = (keys, time.monotonic())
+            self.stats["loads"] += 1
+            self.stats["keys_loaded"] += len(keys)
+        return keys
+
+    def contains(self, db_manager, table: str, column: str, values: np.ndarray) -> np.ndarray:
+        keys = self._get(db_manager, table, column)
+        if len(keys) == 0:
+            return np.zeros(len(values), dtype=bool)
+        positions = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+        return keys[positions] == values
+
+    def add(self, table: str, column: str, values: np.ndarray) -> None:
+        with self._lock:
+            entry = self._keys.get((table, column))
+            if entry is not None:
+                self._keys[(table, column)] = (np.union1d(entry[0], values), entry[1])
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+def _last_record_end(buffer: bytes, quoted: bool) -> int:
+    """Index just past the last complete line; CSV newlines inside quotes do not end a record"""
+    end = buffer.rfind(b"\n")
+    while quoted and end >= 0 and buffer.count(b'"', 0, end) % 2:
+        end = buffer.rfind(b"\n", 0, end)
+    return end + 1
+
+async def iter_record_batches(chunks: AsyncIterator[bytes], file_format: str,
+                              batch_rows: int) -> AsyncIterator[Tuple[bytes, Optional[bytes]]]:
+    """
+    Regroup an upload byte stream into (records, csv_header) batches of roughly
+    batch_rows complete records without holding the whole file in memory
+    """
+    quoted = file_format == "csv"
+    header: Optional[bytes] = None
+    buffer = b""
+    pending: List[bytes] = []
+    pending_rows = 0
+
+    async for chunk in chunks:
+        buffer += chunk
+        if quoted and header is None:
+            if b"\n" not in buffer:
+                continue
+            header, buffer = buffer.split(b"\n", 1)
+            header += b"\n"
+        end = _last_record_end(buffer, quoted)
+        if not end:
+            continue
+        complete, buffer = buffer[:end], buffer[end:]
+        pending.append(complete)
+        pending_rows += complete.count(b"\n")
+        if pending_rows >= batch_rows:
+            yield b"".join(pending), header
+            pending, pending_rows = [], 0
+
+    if quoted and header is None:
+        header, buffer = buffer, b""
+    if buffer.strip():
+        pending.append(buffer if buffer.endswith(b"\n") else buffer + b"\n")
+        pending_rows += 1
+    if pending:
+        yield b"".join(pending), header
+
+def parse_batch(records: bytes, header: Optional[bytes], file_format: str,
+                first_row: int) -> Tuple[pd.DataFrame, List[Dict[str, Any]], int]:
+    """
+    Parse one batch into a DataFrame indexed by 1-based file row number, error
+    entries for records that could not be parsed at all, and the record count
+    """
+    if file_format == "csv":
+        frame = pd.read_csv(io.BytesIO(header + records), dtype=str, keep_default_na=False,
+                            na_values=[""], skip_blank_lines=False)
+        frame.columns = [str(column).strip().lower() for column in frame.columns]
+        record_count = len(frame)
+        frame.index = pd.RangeIndex(first_row, first_row + record_count)
+        return frame.dropna(how="all"), [], record_count
+
+    rows, row_numbers, errors = [], [], []
+    lines = records.splitlines()
+    for offset, line in enumerate(lines):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("record is not a JSON object")
+        except ValueError as e:
+            errors.append({"row": first_row + offset, "errors": [f"invalid JSON: {e}"]})
+            continue
+        rows.append({str(key).lower(): value for key, value in record.items()})
+        row_numbers.append(first_row + offset)
+    return pd.DataFrame(rows, index=pd.Index(row_numbers, dtype=np.int64)), errors, len(lines)
+
+def validate_batch(spec: Dict[str, Any], frame: pd.DataFrame, key_index: KeyIndex, db_manager,
+                   table: str) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Vectorized validation of one batch.
+
+    Returns the typed frame (spec columns present in the upload) and a Series of
+    error lists indexed like frame, empty for valid rows. Checks: required
+    values, types, text length, non-negative amounts, foreign keys, duplicate
+    and already-existing primary keys.
+    """
+    size = len(frame)
+    problems: List[Tuple[np.ndarray, str]] = []
+    typed: Dict[str, pd.Series] = {}
+
+    for column, kind in spec["columns"].items():
+        if column not in frame.columns:
+            if column in spec["required"]:
+                problems.append((np.ones(size, dtype=bool), f"{column}: required"))
+            continue
+        raw = frame[column]
+        present = raw.notna().to_numpy() & (raw.astype(str).str.strip() != "").to_numpy()
+        if kind in ("int", "decimal"):
+            numbers = pd.to_numeric(raw, errors="coerce")
+            invalid = present & numbers.isna().to_numpy()
+            if kind == "int":
+                invalid |= present & ~invalid & (numbers.fillna(0) % 1 != 0).to_numpy()
+                problems.append((invalid, f"{column}: not an integer"))
+                typed[column] = numbers.where(present & ~invalid).astype("Int64")
+            else:
+                problems.append((invalid, f"{column}: not a number"))
+                problems.append((present & ~invalid & (numbers.fillna(0) < 0).to_numpy(), f"{column}: negative amount"))
+                typed[column] = numbers.where(present & ~invalid)
+        elif kind == "date":
+            parsed = pd.to_datetime(raw.where(present).astype(str).str.strip(), format="%Y-%m-%d", errors="coerce")
+            invalid = present & parsed.isna().to_numpy()
+            problems.append((invalid, f"{column}: not a YYYY-MM-DD date"))
+            typed[column] = parsed.dt.strftime("%Y-%m-%d").where(present & ~invalid)
+        else:
+            text = raw.where(present).astype(object).where(present, None)
+            text = text.map(lambda value: value if value is None else str(value).strip())
+            problems.append((present & (text.str.len().fillna(0) > MAX_TEXT_LENGTH).to_numpy(),
+                             f"{column}: longer than {MAX_TEXT_LENGTH} characters"))
+            typed[column] = text
+        if column in spec["required"]:
+            problems.append((~present, f"{column}: required"))
+
+    for column, (ref_table, ref_column) in spec["foreign_keys"].items():
+        if column not in typed:
+            continue
+        values = typed[column]
+        check = values.notna().to_numpy()
+        if check.any():
+            known = np.ones(size, dtype=bool)
+            known[check] = key_index.contains(db_manager, ref_table, ref_column,
+                                              values[check].to_numpy(dtype=np.int64))
+            problems.append((~known, f"{column}: unknown {ref_table}.{ref_column}"))
+
+    primary_key = spec["primary_key"]
+    if primary_key in typed:
+        keys = typed[primary_key]
+        check = keys.notna().to_numpy()
+        problems.append((check & keys.duplicated(keep="first").to_numpy(), f"{primary_key}: duplicate in upload"))
+        if check.any():
+            exists = np.zeros(size, dtype=bool)
+            exists[check] = key_index.contains(db_manager, table, primary_key, keys[check].to_numpy(dtype=np.int64))
+            problems.append((exists, f"{primary_key}: already exists"))
+
+    errors = pd.Series([[] for _ in range(size)], index=frame.index, dtype=object)
+    for mask, message in problems:
+        for position in np.flatnonzero(mask):
+            errors.iat[position].append(message)
+    return pd.DataFrame(typed, index=frame.index), errors
+
+class BulkIngestor:
+    """Runs uploads through parse -> validate -> bulk_insert batch by batch"""
+
+    def __init__(self, db_manager=None, batch_rows: Optional[int] = None, max_errors: Optional[int] = None):
+        self._db_manager = db_manager
+        self.batch_rows = batch_rows or int(os.getenv("INGEST_BATCH_ROWS", "5000"))
+        # Row errors listed per batch; the counts always cover every rejected row
+        self.max_errors = max_errors or int(os.getenv("INGEST_MAX_ERRORS_PER_BATCH", "100"))
+        self.key_index = KeyIndex()
+        self._lock = threading.Lock()
+        self.stats = {"uploads": 0, "batches": 0, "failed_batches": 0, "rows_received": 0,
+                      "rows_inserted": 0, "rows_rejected": 0}
+
+    @property
+    def db_manager(self):
+        return self._db_manager or get_db_connection()
+
+    def _count(self, **increments) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def process_batch(self, table: str, number: int, records: bytes, header: Optional[bytes],
+                      file_format: str, first_row: int) -> Dict[str, Any]:
+        """Parse, validate and insert one batch. Blocking - call it on the DB worker pool."""
+        start = time.perf_counter()
+        spec = INGEST_TABLES[table]
+        report: Dict[str, Any] = {"batch": number, "first_row": first_row, "rows": 0, "inserted": 0, "rejected": 0}
+        try:
+            frame, parse_errors, report["records"] = parse_batch(records, header, file_format, first_row)
+            report["rows"] = len(frame) + len(parse_errors)
+            typed, errors = validate_batch(spec, frame, self.key_index, self.db_manager, table)
+            invalid = errors.map(bool).to_numpy()
+            rejected = [{"row": int(row), "errors": row_errors} for row, row_errors in errors[invalid].items()]
+            rejected = sorted(parse_errors + rejected, key=lambda entry: entry["row"])
+            report["rejected"] = len(rejected)
+            if rejected:
+                report["errors"] = rejected[:self.max_errors]
+
+            valid = typed[~invalid]
+            if len(valid):
+                columns = list(valid.columns)
+                values = [valid[column].astype(object).where(valid[column].notna(), None).tolist() for column in columns]
+                report["inserted"] = self.db_manager.bulk_insert(table, columns, list(zip(*values)))
+                primary_key = spec["primary_key"]
+                self.key_index.add(table, primary_key, valid[primary_key].to_numpy(dtype=np.int64))
+        except Exception as e:
+            # The batch transaction was rolled back; later batches still run
+            logger.error(f"Ingestion batch {number} into {table} failed: {e}")
+            report["inserted"] = 0
+            report["rejected"] = report["rows"]
+            report["batch_error"] = str(e)
+            self._count(failed_batches=1)
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        self._count(batches=1, rows_received=report["rows"], rows_inserted=report["inserted"],
+                    rows_rejected=report["rejected"])
+        return report
+
+    async def ingest(self, table: str, chunks: AsyncIterator[bytes], file_format: str) -> Dict[str, Any]:
+        """
+        Ingest an upload stream. Each batch is its own transaction: a batch whose
+        insert fails is reported and rolled back while the rest of the file loads.
+        """
+        if table not in INGEST_TABLES:
+            raise IngestionError(f"Ingestion is not supported for table '{table}'. "
+                                 f"Supported tables: {', '.join(INGEST_TABLES)}")
+        if file_format not in INGEST_MEDIA_TYPES:
+            raise IngestionError(f"Unsupported upload format '{file_format}'. Use csv or ndjson.")
+
+        start = time.perf_counter()
+        spec = INGEST_TABLES[table]
+        batches: List[Dict[str, Any]] = []
+        columns_seen: Optional[List[str]] = None
+        loop = asyncio.get_running_loop()
+        number, next_row = 0, 1
+        async for records, header in iter_record_batches(chunks, file_format, self.batch_rows):
+            if file_format == "csv" and columns_seen is None:
+                columns_seen = [column.strip().strip('"').lower() for column in header.decode("utf-8-sig").strip().split(",")]
+                missing = [column for column in spec["required"] if column not in columns_seen]
+                if missing:
+                    raise IngestionError(f"CSV header is missing required columns: {', '.join(missing)}")
+            number += 1
+            batch = await loop.run_in_executor(
+                self.db_manager.executor, self.process_batch, table, number, records, header, file_format, next_row)
+            # Row numbers count records (blank lines included), so they match the file for every batch
+            next_row += batch.pop("records", 0)
+            batches.append(batch)
+
+        self._count(uploads=1)
+        rows_inserted = sum(batch["inserted"] for batch in batches)
+        rows_rejected = sum(batch["rejected"] for batch in batches)
+        ignored = sorted(set(columns_seen or []) - set(spec["columns"]))
+        return {
+            "table": table,
+            "format": file_format,
+            "rows_received": sum(batch["rows"] for batch in batches),
+            "rows_inserted": rows_inserted,
+            "rows_rejected": rows_rejected,
+            "batch_count": len(batches),
+            "failed_batches": sum(1 for batch in batches if "batch_error" in batch),
+            "ignored_columns": ignored,
+            "batches": batches,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(batch_rows=self.batch_rows, key_index=dict(self.key_index.stats))
+        return stats
+
+# Global instance
+bulk_ingestor = BulkIngestor()
+
+def get_bulk_ingestor() -> BulkIngestor:
+    """Get the process-wide BulkIngestor instance"""
+    return bulk_ingestor
@@ -0,0 +1,324 @@
+"""
+Offline SQLite engine support
+Bulk-loads database/schema.sql and database/data.sql into a local SQLite file and
+translates the SQL Server constructs PromptEngine emits (TOP, GETDATE, YEAR, ...)
+so the API, load tests and benchmarks can run with no Azure SQL
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Optional
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCHEMA_PATH = os.path.join(REPO_ROOT, "database", "schema.sql")
+DEFAULT_DATA_PATH = os.path.join(REPO_ROOT, "database", "data.sql")
+DEFAULT_LOCAL_DB_PATH = os.path.join(REPO_ROOT, "database", "welfare_local.db")
+# _local_db_meta tag of databases bulk-loaded by synthetic_data.py; these are never rebuilt
+SYNTHETIC_SOURCE_PREFIX = "synthetic:"
+
+# Script tokens: quoted strings and comments are matched whole so ';' and '--' inside them are ignored
+SCRIPT_TOKEN_PATTERN = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/|;|[^';\-/]+|.", re.DOTALL)
+CREATE_TABLE_PATTERN = re.compile(r'^\s*CREATE\s+TABLE\s+(\w+)', re.IGNORECASE)
+ALTER_FK_PATTERN = re.compile(r'^\s*ALTER\s+TABLE\s+(\w+)\s+(.*)$', re.IGNORECASE | re.DOTALL)
+ADD_FK_PATTERN = re.compile(r'ADD\s+(FOREIGN\s+KEY\s*\([^)]*\)\s*REFERENCES\s+\w+\s*\([^)]*\)(?:\s+ON\s+DELETE\s+(?:CASCADE|SET\s+NULL|NO\s+ACTION|RESTRICT))?)',
+                            re.IGNORECASE)
+INSERT_PATTERN = re.compile(r'^\s*INSERT\s+INTO\s+(\w+)\s*\(([^)]*)\)\s*VALUES\s*(.*)$', re.IGNORECASE | re.DOTALL)
+VALUE_TOKEN_PATTERN = re.compile(r"\s*(?:'((?:[^']|'')*)'|(NULL)\b|(-?\d+\.\d*|-?\d+)|(\()|(\))|(,))", re.IGNORECASE)
+
+def local_db_requested() -> bool:
+    """Whether the environment selects the local SQLite engine"""
+    return (os.getenv("DB_ENGINE", "").lower() == "sqlite"
+            or os.getenv("USE_LOCAL_DB", "false").lower() == "true")
+
+def local_db_path() -> str:
+    return os.getenv("LOCAL_DB_PATH", DEFAULT_LOCAL_DB_PATH)
+
+def split_sql_script(script: str) -> List[str]:
+    """Split a SQL script into statements, dropping comments; backticks become double quotes"""
+    statements, current = [], []
+    for match in SCRIPT_TOKEN_PATTERN.finditer(script):
+        token = match.group()
+        if token.startswith("--") or token.startswith("/*"):
+            current.append(" ")
+        elif token == ";":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        elif token.startswith("'"):
+            current.append(token)
+        else:
+            current.append(token.replace("`", '"'))
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+def _parse_values(values_sql: str) -> List[Tuple]:
+    """Parse "(1, 'a', NULL), (2, 'b', 3.5)" into Python tuples"""
+    rows, row, position = [], None, 0
+    while position < len(values_sql):
+        match = VALUE_TOKEN_PATTERN.match(values_sql, position)
+        if not match:
+            if values_sql[position:].strip():
+                raise ValueError(f"Unexpected VALUES syntax near: {values_sql[position:position + 40]!r}")
+            break
+        position = match.end()
+        string, null, number, open_paren, close_paren, _ = match.groups()
+        if open_paren:
+            row = []
+        elif close_paren:
+            rows.append(tuple(row))
+            row = None
+        elif string is not None:
+            row.append(string.replace("''", "'"))
+        elif null:
+            row.append(None)
+        elif number is not None:
+            row.append(float(number) if "." in number else int(number))
+    return rows
+
+def _schema_statements(schema_sql: str) -> Tuple[List[str], List[str]]:
+    """CREATE TABLE statements with ALTER TABLE foreign keys folded in, plus CREATE INDEX statements"""
+    tables: Dict[str, str] = {}
+    foreign_keys: Dict[str, List[str]] = {}
+    indexes = []
+    for statement in split_sql_script(schema_sql):
+        create = CREATE_TABLE_PATTERN.match(statement.replace('"', ''))
+        alter = ALTER_FK_PATTERN.match(statement.replace('"', ''))
+        if create:
+            tables[create.group(1).lower()] = statement
+        elif alter:
+            foreign_keys.setdefault(alter.group(1).lower(), []).extend(ADD_FK_PATTERN.findall(alter.group(2)))
+        elif re.match(r'^\s*CREATE\s+(UNIQUE\s+)?INDEX', statement, re.IGNORECASE):
+            indexes.append(statement)
+    creates = []
+    for name, statement in tables.items():
+        constraints = foreign_keys.get(name)
+        if constraints:
+            closing = statement.rindex(")")
+            statement = statement[:closing].rstrip() + ",\n  " + ",\n  ".join(constraints) + "\n" + statement[closing:]
+        creates.append(statement)
+    return creates, indexes
+
+def _source_hash(*paths: str) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+def load_local_database(db_path: Optional[str] = None, schema_path: str = DEFAULT_SCHEMA_PATH,
+                        data_path: str = DEFAULT_DATA_PATH, force: bool = False) -> Dict[str, Any]:
+    """
+    Build the SQLite database from the schema and data scripts.
+
+    Rows are parsed in Python and inserted with executemany inside a single
+    transaction, indexes are created after the data, and the file is left in WAL
+    mode. An existing file built from the same scripts (or by synthetic_data.py) is
+    reused unless force=True.
+    """
+    db_path = db_path or local_db_path()
+    start = time.perf_counter()
+    source_hash = _source_hash(schema_path, data_path)
+
+    if not force and os.path.exists(db_path):
+        try:
+            with sqlite3.connect(db_path) as existing:
+                row = existing.execute("SELECT source_hash FROM _local_db_meta").fetchone()
+            if row and (row[0] == source_hash or row[0].startswith(SYNTHETIC_SOURCE_PREFIX)):
+                return {"status": "reused", "path": db_path, "load_seconds": 0.0, "rows": {}}
+        except sqlite3.Error:
+            pass
+
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    with open(schema_path, encoding="utf-8") as schema_file:
+        creates, indexes = _schema_statements(schema_file.read())
+    with open(data_path, encoding="utf-8") as data_file:
+        data_statements = split_sql_script(data_file.read())
+
+    row_counts: Dict[str, int] = {}
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute("BEGIN")
+        for statement in creates:
+            connection.execute(statement)
+        for statement in data_statements:
+            insert = INSERT_PATTERN.match(statement)
+            if not insert:
+                logger.warning(f"Skipping non-INSERT statement in data script: {statement[:60]}")
+                continue
+            table, columns, values_sql = insert.groups()
+            rows = _parse_values(values_sql)
+            placeholders = ", ".join("?" * len(columns.split(",")))
+            connection.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", rows)
+            row_counts[table] = row_counts.get(table, 0) + len(rows)
+        for statement in indexes:
+            connection.execute(statement)
+        connection.execute("CREATE TABLE _local_db_meta (source_hash TEXT NOT NULL, loaded_at REAL NOT NULL)")
+        connection.execute("INSERT INTO _local_db_meta VALUES (?, ?)", (source_hash, time.time()))
+        connection.execute("COMMIT")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("ANALYZE")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Loaded local SQLite database {db_path} ({sum(row_counts.values())} rows) in {elapsed:.3f}s")
+    return {"status": "loaded", "path": db_path, "load_seconds": round(elapsed, 4), "rows": row_counts}
+
+# ---------------------------------------------------------------------------
+# T-SQL -> SQLite translation
+# ---------------------------------------------------------------------------
+
+STRING_LITERAL_PATTERN = re.compile(r"N?'(?:[^']|'')*'")
+TOP_PATTERN = re.compile(r'\bSELECT(\s+DISTINCT)?\s+TOP\s*(?:\(\s*(\d+)\s*\)|(\d+))', re.IGNORECASE)
+LIMIT_AT_END_PATTERN = re.compile(r'\bLIMIT\s+\d+\s*$', re.IGNORECASE)
+CAST_AS_DATE_PATTERN = re.compile(r'^(.*)\s+AS\s+(DATE|DATETIME|DATETIME2)\s*$', re.IGNORECASE | re.DOTALL)
+FORMAT_TOKENS = [("yyyy", "%Y"), ("yy", "%y"), ("MM", "%m"), ("dd", "%d"), ("HH", "%H"), ("mm", "%M"), ("ss", "%S")]
+
+def _find_call(sql: str, name: str, start: int = 0) -> Optional[Tuple[int, int, List[str]]]:
+    """Locate NAME( ... ) and return (start, end, top-level arguments)"""
+    match = re.compile(rf'\b{name}\s*\(', re.IGNORECASE).search(sql, start)
+    if not match:
+        return None
+    depth, args, arg_start = 1, [], match.end()
+    for position in range(match.end(), len(sql)):
+        char = sql[position]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                args.append(sql[arg_start:position].strip())
+                return match.start(), position + 1, args
+        elif char == "," and depth == 1:
+            args.append(sql[arg_start:position].strip())
+            arg_start = position + 1
+    return None
+
+def _replace_calls(sql: str, name: str, rewrite) -> str:
+    position = 0
+    while True:
+        call = _find_call(sql, name, position)
+        if call is None:
+            return sql
+        start, end, args = call
+        replacement = rewrite(args)
+        if replacement is None:
+            position = end
+            continue
+        sql = sql[:start] + replacement + sql[end:]
+        position = start + len(replacement)
+
+def _part(unit: str, expression: str) -> str:
+    return f"CAST(strftime('{unit}', {expression}) AS INTEGER)"
+
+def _datediff(args: List[str]) -> Optional[str]:
+    if len(args) != 3:
+        return None
+    unit, start, end = args[0].lower(), args[1], args[2]
+    if unit in ("day", "dd", "d"):
+        return f"CAST(julianday({end}) - julianday({start}) AS INTEGER)"
+    if unit in ("year", "yy", "yyyy"):
+        return f"({_part('%Y', end)} - {_part('%Y', start)})"
+    if unit in ("month", "mm", "m"):
+        return f"(({_part('%Y', end)} - {_part('%Y', start)}) * 12 + {_part('%m', end)} - {_part('%m', start)})"
+    return None
+
+def _dateadd(args: List[str]) -> Optional[str]:
+    if len(args) != 3:
+        return None
+    units = {"day": "days", "dd": "days", "d": "days", "month": "months", "mm": "months", "m": "months",
+             "year": "years", "yy": "years", "yyyy": "years"}
+    unit = units.get(args[0].lower())
+    if unit is None:
+        return None
+    return f"date({args[2]}, printf('%+d {unit}', {args[1]}))"
+
+def _cast(args: List[str]) -> Optional[str]:
+    match = CAST_AS_DATE_PATTERN.match(args[0]) if len(args) == 1 else None
+    if not match:
+        return None
+    return f"date({match.group(1)})" if match.group(2).upper() == "DATE" else f"datetime({match.group(1)})"
+
+def _move_top_to_limit(sql: str) -> str:
+    """Rewrite SELECT TOP n ... as SELECT ... LIMIT n at the end of the same (sub)query"""
+    while True:
+        matches = list(TOP_PATTERN.finditer(sql))
+        if not matches:
+            return sql
+        match = matches[-1]   # innermost/last first, so earlier scopes are recomputed after edits
+        count = match.group(2) or match.group(3)
+        depth, scope_end = 0, len(sql)
+        for position in range(match.end(), len(sql)):
+            char = sql[position]
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                if depth == 0:
+                    scope_end = position
+                    break
+                depth -= 1
+        head = "SELECT" + (match.group(1) or "")
+        body = sql[match.end():scope_end].rstrip()
+        if body.endswith(";"):
+            body = body[:-1].rstrip()
+        if not LIMIT_AT_END_PATTERN.search(body):
+            body = f"{body} LIMIT {count}"
+        sql = sql[:match.start()] + head + body + sql[scope_end:]
+
+@lru_cache(maxsize=2048)
+def translate_tsql(sql: str) -> str:
+    """Translate the SQL Server constructs used by generated queries into SQLite syntax"""
+    literals: List[str] = []
+
+    def mask(match):
+        literal = match.group()
+        literals.append(literal[1:] if literal.startswith("N") else literal)
+        return f"\x00{len(literals) - 1}\x00"
+
+    masked = STRING_LITERAL_PATTERN.sub(mask, sql)
+    unmask = lambda text: re.sub(r"\x00(\d+)\x00", lambda m: literals[int(m.group(1))], text)
+
+    def sqlite_format(args: List[str]) -> Optional[str]:
+        if len(args) != 2:
+            return None
+        mask_literal = unmask(args[1])
+        if not mask_literal.startswith("'"):
+            return None
+        pattern = mask_literal[1:-1]
+        for dotnet, strftime_token in FORMAT_TOKENS:
+            pattern = pattern.replace(dotnet, strftime_token)
+        return f"strftime('{pattern}', {args[0]})"
+
+    masked = re.sub(r'\[(\w+)\]', r'"\1"', masked)
+    masked = re.sub(r'\bGETDATE\s*\(\s*\)', "datetime('now', 'localtime')", masked, flags=re.IGNORECASE)
+    masked = re.sub(r'\bSYSDATETIME\s*\(\s*\)', "datetime('now', 'localtime')", masked, flags=re.IGNORECASE)
+    masked = re.sub(r'\bISNULL\s*\(', "IFNULL(", masked, flags=re.IGNORECASE)
+    masked = re.sub(r'\bLEN\s*\(', "LENGTH(", masked, flags=re.IGNORECASE)
+    masked = _replace_calls(masked, "YEAR", lambda args: _part('%Y', args[0]) if len(args) == 1 else None)
+    masked = _replace_calls(masked, "MONTH", lambda args: _part('%m', args[0]) if len(args) == 1 else None)
+    masked = _replace_calls(masked, "DAY", lambda args: _part('%d', args[0]) if len(args) == 1 else None)
+    masked = _replace_calls(masked, "DATEDIFF", _datediff)
+    masked = _replace_calls(masked, "DATEADD", _dateadd)
+    masked = _replace_calls(masked, "CAST", _cast)
+    masked = _replace_calls(masked, "FORMAT", sqlite_format)
+    masked = _move_top_to_limit(masked)
+    return unmask(masked)
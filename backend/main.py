@@ -4,7 +4,7 @@ Main application entry point with comprehensive configuration
 """
 print("FASTAPI CONTAINER STARTUP: main.py loaded")
 
-from openai import AzureOpenAI
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -16,16 +16,12 @@ import time
 import os
 from datetime import datetime
 import azure.cognitiveservices.speech as speechsdk
-from db import execute_sql
+from db import execute_sql, get_db_connection
 from dotenv import load_dotenv
 load_dotenv()
 
-# Instantiate AzureOpenAI client
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-)
+from prompt_engine import get_prompt_engine
+from analytics_refresher import get_analytics_refresher
 
 
 # Configure logging first
@@ -40,11 +36,29 @@ try:
     from routes.query import router as query_router
     from routes.verify import router as verify_router
     from routes.summary import router as summary_router
+    from routes.ingest import router as ingest_router
+    from routes.eligibility import router as eligibility_router
     routes_available = True
 except Exception as e:
     logger.warning(f"Routes not available: {e}")
     routes_available = False
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create process-wide resources at startup and release them on shutdown"""
+    engine = get_prompt_engine()
+    app.state.prompt_engine = engine
+    logger.info("Shared PromptEngine ready")
+    db_manager = get_db_connection()
+    await db_manager.start_pool()
+    refresher = get_analytics_refresher()
+    refresher.start()
+    yield
+    await refresher.stop()
+    await db_manager.stop_pool()
+    engine.close()
+    logger.info("Shared PromptEngine closed")
+
 # Create FastAPI app with enhanced configuration
 
 app = FastAPI(
@@ -63,14 +77,17 @@ app = FastAPI(
     Most endpoints support optional Bearer token authentication for enhanced security.
     
     ## Endpoints
-    * `/query` - Process natural language queries
-    * `/verify` - System health and verification
-    * `/summary` - Data analytics and insights
+    * `/query` - Process natural language queries (`/query/stream` for Server-Sent Events)
+    * `/verify` - System health and verification (`/verify/pool` for connection pool metrics)
+    * `/summary` - Data analytics and insights (`/summary/cube` for pre-aggregated rollups)
+    * `/ingest/{table}` - Bulk CSV/NDJSON loads of enrollments and disbursements
+    * `/eligibility` - Batch evaluation of scheme eligibility rules
     """,
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
-    openapi_url="/openapi.json"
+    openapi_url="/openapi.json",
+    lifespan=lifespan
 )
 
 
@@ -79,6 +96,7 @@ app = FastAPI(
 async def test_openai():
     try:
         prompt = "Say hello from Azure OpenAI."
+        client = get_prompt_engine()._get_client()
         response = client.chat.completions.create(
             model=os.getenv("AZURE_OPENAI_DEPLOYMENT"),
             messages=[{"role": "user", "content": prompt}]
@@ -161,6 +179,8 @@ if routes_available:
     app.include_router(query_router)
     app.include_router(verify_router)
     app.include_router(summary_router)
+    app.include_router(ingest_router)
+    app.include_router(eligibility_router)
     logger.info("All route modules loaded successfully")
 else:
     logger.warning("Route modules not available - running with basic endpoints only")
@@ -169,13 +189,11 @@ else:
 @app.post("/nl2sql")
 async def nl2sql(request: Request):
     try:
-        from prompt_engine import PromptEngine
-        
         data = await request.json()
         nl_query = data.get("query")
         
-        # Use the PromptEngine with proper schema context
-        engine = PromptEngine()
+        # Use the shared PromptEngine with proper schema context
+        engine = get_prompt_engine()
         result = engine.process_query(nl_query)
         
         return result
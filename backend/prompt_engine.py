@@ -4,7 +4,10 @@ Uses Azure OpenAI exclusively for intelligent query processing
 """
 import re
 import os
-from typing import Dict, List, Any, Optional, Tuple
+import json
+import hashlib
+import threading
+from typing import Dict, List, Any, Optional, Tuple, Callable
 import logging
 from datetime import datetime, timedelta
 
@@ -13,11 +16,74 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 try:
+    import httpx
     from openai import AzureOpenAI
 except ImportError:
     logger.error("OpenAI library not installed. Install with: pip install openai")
+    httpx = None
     AzureOpenAI = None
 
+from sql_cache import NL2SQLCache
+from semantic_cache import SemanticSQLCache
+from sql_parameterizer import parameterize_sql, parameterization_enabled
+from schema_pruner import SchemaPruner, count_tokens
+from query_templates import TemplateEngine
+
+# Question preprocessing. Whole-word rewrites share one alternation pass: no
+# replacement contains a word another rule looks for, so this matches applying
+# them one at a time
+YEAR_OFFSETS = {"this year": 0, "current year": 0, "last year": -1, "next year": 1}
+WORD_REWRITES = {
+    # Scheme name normalization (keep flexible)
+    "pmay": "PMAY housing scheme",
+    "nsap": "NSAP pension scheme",
+    "mgnrega": "MGNREGA employment scheme",
+    "ujjwala": "Ujjwala gas scheme",
+    "ayushman": "Ayushman Bharat health scheme",
+    # Location normalization
+    "rural": "rural villages",
+    "urban": "urban areas",
+    # Make query more SQL-friendly
+    "how many": "count",
+    "show me": "list",
+    "find": "select"
+}
+WORD_REWRITE_PATTERN = re.compile(r"\b(" + "|".join(map(re.escape, [*YEAR_OFFSETS, *WORD_REWRITES])) + r")\b")
+# (substring every match contains or None, pattern, replacement), applied in order
+PATTERN_REWRITES = [
+    ("disability", re.compile(r'disability.*above.*(\d+)%'), r'severe disability conditions above \1 percent'),
+    ("disabled", re.compile(r'disabled.*citizens'), 'citizens with disabilities'),
+    ("lakh", re.compile(r'(\d+)\s*lakh'), r'\1 hundred thousand rupees'),
+    ("₹", re.compile(r'₹\s*(\d+)'), r'\1 rupees'),
+    (None, re.compile(r'\b(?:in|for)\s+(\d{4})\b'), r'during year \1')
+]
+
+# Generated SQL validation, compiled once instead of on every call
+LIMIT_PATTERN = re.compile(r"LIMIT\s+(\d+)", re.IGNORECASE)
+TRAILING_LIMIT_PATTERN = re.compile(r"\s*LIMIT\s+\d+\s*;?\s*$", re.IGNORECASE)
+SELECT_TOP_PATTERN = re.compile(r"SELECT\s+TOP\s+\d+", re.IGNORECASE)
+SELECT_PATTERN = re.compile(r"SELECT\b", re.IGNORECASE)
+COLUMN_NAME_FIXES = {"enrollment_id": "e.enrollment_id", "disability_percentage": "disability_status"}
+COLUMN_NAME_PATTERN = re.compile(r'\b(?:enrollment_id|disability_percentage)\b', re.IGNORECASE)
+DISBURSEMENT_JOIN_PATTERN = re.compile(
+    r'disbursements\s+d\s+ON\s+d\.enrollment_id\s*=\s*e\.enrollment_id', re.IGNORECASE)
+SELECT_CLAUSE_PATTERN = re.compile(r'SELECT\s+(TOP\s+\d+\s+)?(.*?)\s+FROM', re.IGNORECASE | re.DOTALL)
+GROUP_BY_CLAUSE_PATTERN = re.compile(r'GROUP\s+BY\s+(.*?)(?:\s+HAVING|\s+ORDER|\s*$)', re.IGNORECASE | re.DOTALL)
+GROUP_BY_REPLACE_PATTERN = re.compile(r'GROUP\s+BY\s+.*?(?=\s+HAVING|\s+ORDER|\s*$)', re.IGNORECASE)
+AGGREGATE_CALL_PATTERN = re.compile(r'\b(COUNT|SUM|AVG|MAX|MIN|STRING_AGG|FORMAT)\s*\(', re.IGNORECASE)
+CASE_START_PATTERN = re.compile(r'^\s*CASE\s+', re.IGNORECASE)
+STRING_LITERAL_PATTERN = re.compile(r'^\s*[\'"]\w+[\'"]\s*$')
+TABLE_REFERENCE_FIXES = {"citizens.name": "c.name", "citizens.citizen_id": "c.citizen_id", "schemes.name": "s.name"}
+TABLE_REFERENCE_PATTERN = re.compile(r'citizens\.name|citizens\.citizen_id|schemes\.name', re.IGNORECASE)
+HAVING_ACCOUNT_COUNT_PATTERN = re.compile(r'HAVING\s+COUNT\s*\(\s*ba\.account_id\s*\)\s*>\s*1', re.IGNORECASE)
+# (table, words that must appear) for the JOINs _validate_and_fix_sql adds when missing
+MISSING_JOIN_CHECKS = [
+    ("villages", ("village", "citizens")),
+    ("districts", ("district",)),
+    ("states", ("state",)),
+    ("health_details", ("disability",))
+]
+
 class PromptEngine:
     """Pure AI-driven natural language to SQL conversion engine"""
     
@@ -30,9 +96,122 @@ class PromptEngine:
         
         # Initialize table schemas with complete structure
         self.table_schemas = self._initialize_table_schemas()
+        self.schema_fingerprint = self._compute_schema_fingerprint()
+        # Picks the tables each question needs so prompts do not carry the whole schema
+        self.schema_pruner = SchemaPruner(self.table_schemas)
+        self._full_schema_token_count: Optional[int] = None
+        # Deterministic templates answer common questions without an LLM call
+        self.templates = TemplateEngine(self.schema_pruner)
+        
+        # Cache of generated SQL in front of the LLM call
+        self.sql_cache = NL2SQLCache()
+        # Similarity index of validated SQL for paraphrased questions
+        self.semantic_cache = SemanticSQLCache()
+        
+        # Shared Azure OpenAI client (created lazily, reused across requests)
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.client_stats = {
+            "clients_created": 0,
+            "requests_sent": 0,
+            "connections_opened": 0,
+            "tls_handshakes": 0
+        }
+        self.prompt_stats = {
+            "requests": 0,
+            "pruned": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "tokens_saved": 0
+        }
         
         logger.info("PromptEngine initialized with AI-driven processing")
 
+    def _compute_schema_fingerprint(self) -> str:
+        """Fingerprint of the schema and model, so cached SQL is dropped when either changes"""
+        payload = json.dumps(self.table_schemas, sort_keys=True) + (self.azure_openai_deployment or "")
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _get_client(self):
+        """Return the shared AzureOpenAI client, creating it on first use"""
+        if self._client is not None:
+            return self._client
+        
+        with self._client_lock:
+            if self._client is None:
+                # One pooled HTTP client with keep-alive so the TCP/TLS handshake
+                # to Azure OpenAI is paid once per connection, not once per request
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "20")),
+                        max_keepalive_connections=int(os.getenv("AZURE_OPENAI_MAX_KEEPALIVE", "10")),
+                        keepalive_expiry=float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY", "60"))
+                    ),
+                    timeout=float(os.getenv("AZURE_OPENAI_TIMEOUT", "30")),
+                    event_hooks={"request": [self._on_request]}
+                )
+                self._client = AzureOpenAI(
+                    api_key=self.azure_openai_key,
+                    api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
+                    azure_endpoint=self.azure_openai_endpoint,
+                    http_client=http_client
+                )
+                self._increment_stat("clients_created")
+                logger.info("Azure OpenAI client created with pooled keep-alive connections")
+        return self._client
+
+    def _on_request(self, request) -> None:
+        """httpx request hook: count requests and trace new connections"""
+        self._increment_stat("requests_sent")
+        request.extensions["trace"] = self._trace_connection
+
+    def _trace_connection(self, event_name: str, info: Dict[str, Any]) -> None:
+        """httpcore trace callback - only fires when a new connection is set up"""
+        if event_name == "connection.connect_tcp.complete":
+            self._increment_stat("connections_opened")
+        elif event_name == "connection.start_tls.complete":
+            self._increment_stat("tls_handshakes")
+
+    def _increment_stat(self, name: str) -> None:
+        with self._stats_lock:
+            self.client_stats[name] += 1
+
+    def get_client_stats(self) -> Dict[str, Any]:
+        """Connection reuse counters for the shared Azure OpenAI client"""
+        with self._stats_lock:
+            stats = dict(self.client_stats)
+        stats["connections_reused"] = max(stats["requests_sent"] - stats["connections_opened"], 0)
+        stats["reuse_ratio"] = round(stats["connections_reused"] / stats["requests_sent"], 3) if stats["requests_sent"] else 0.0
+        stats["client_active"] = self._client is not None
+        return stats
+
+    def get_prompt_stats(self) -> Dict[str, Any]:
+        """Prompt size counters: tokens sent and tokens saved by schema pruning"""
+        with self._stats_lock:
+            stats = dict(self.prompt_stats)
+        stats["avg_prompt_tokens"] = round(stats["prompt_tokens"] / stats["requests"], 1) if stats["requests"] else 0.0
+        stats["pruning_enabled"] = self.schema_pruner.enabled
+        return stats
+
+    def _record_prompt(self, prompt_info: Dict[str, Any]) -> None:
+        with self._stats_lock:
+            self.prompt_stats["requests"] += 1
+            self.prompt_stats["pruned"] += int(prompt_info["pruned"])
+            self.prompt_stats["prompt_tokens"] += prompt_info["prompt_tokens"]
+            self.prompt_stats["completion_tokens"] += prompt_info.get("completion_tokens") or 0
+            self.prompt_stats["tokens_saved"] += prompt_info["tokens_saved"]
+
+    def close(self) -> None:
+        """Close the shared client and its connection pool"""
+        with self._client_lock:
+            if self._client is not None:
+                try:
+                    self._client.close()
+                except Exception as e:
+                    logger.warning(f"Error closing Azure OpenAI client: {e}")
+                self._client = None
+
     def _initialize_table_schemas(self) -> Dict[str, List[str]]:
         """Initialize complete table schemas from actual database"""
         return {
@@ -123,47 +302,30 @@ class PromptEngine:
     def _preprocess_query(self, query: str) -> str:
         """Intelligently preprocess the query to improve understanding"""
         # Normalize common terms
-        original_query = query
         query = query.lower().strip()
         
-        # Dynamic year handling - don't hardcode years
+        # Year phrases, scheme names, locations and SQL-friendly verbs in one pass
+        # (years are dynamic - don't hardcode them)
         current_year = datetime.now().year
-        query = re.sub(r'\b(this year|current year)\b', f'{current_year}', query)
-        query = re.sub(r'\blast year\b', f'{current_year - 1}', query)
-        query = re.sub(r'\bnext year\b', f'{current_year + 1}', query)
-        
-        # Scheme name normalization (keep flexible)
-        query = re.sub(r'\bpmay\b', 'PMAY housing scheme', query)
-        query = re.sub(r'\bnsap\b', 'NSAP pension scheme', query)
-        query = re.sub(r'\bmgnrega\b', 'MGNREGA employment scheme', query)
-        query = re.sub(r'\bujjwala\b', 'Ujjwala gas scheme', query)
-        query = re.sub(r'\bayushman\b', 'Ayushman Bharat health scheme', query)
-        
-        # Location normalization
-        query = re.sub(r'\brural\b', 'rural villages', query)
-        query = re.sub(r'\burban\b', 'urban areas', query)
-        
-        # Disability normalization (make more flexible)
-        query = re.sub(r'disability.*above.*(\d+)%', r'severe disability conditions above \1 percent', query)
-        query = re.sub(r'disabled.*citizens', 'citizens with disabilities', query)
-        
-        # Amount normalization (keep flexible)
-        query = re.sub(r'(\d+)\s*lakh', r'\1 hundred thousand rupees', query)
-        query = re.sub(r'₹\s*(\d+)', r'\1 rupees', query)
-        
-        # Time period normalization
-        query = re.sub(r'\bin\s+(\d{4})\b', r'during year \1', query)
-        query = re.sub(r'\bfor\s+(\d{4})\b', r'during year \1', query)
-        
-        # Make query more SQL-friendly
-        query = re.sub(r'\bhow many\b', 'count', query)
-        query = re.sub(r'\bshow me\b', 'list', query)
-        query = re.sub(r'\bfind\b', 'select', query)
+        query = WORD_REWRITE_PATTERN.sub(
+            lambda match: WORD_REWRITES.get(match.group(1)) or str(current_year + YEAR_OFFSETS[match.group(1)]),
+            query)
+        
+        # Disability, amount and time period normalization, in order: the year
+        # phrases rewritten above feed "in 2024" -> "during year 2024"
+        for marker, pattern, replacement in PATTERN_REWRITES:
+            if marker is None or marker in query:
+                query = pattern.sub(replacement, query)
         
         return query
         
-    def _try_azure_openai(self, query: str) -> Optional[str]:
-        """Use Azure OpenAI to convert natural language to SQL"""
+    def _try_azure_openai(self, query: str, prompt_info: Optional[Dict[str, Any]] = None,
+                          on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Use Azure OpenAI to convert natural language to SQL. prompt_info, if given,
+        is filled with the tables sent and the prompt's token counts. With on_token
+        the completion is streamed and each content delta is passed to it as it arrives.
+        """
         if not self.azure_openai_key or not self.azure_openai_endpoint:
             logger.error("Azure OpenAI credentials not configured")
             return None
@@ -172,14 +334,14 @@ class PromptEngine:
         processed_query = self._preprocess_query(query)
             
         try:
-            client = AzureOpenAI(
-                api_key=self.azure_openai_key,
-                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
-                azure_endpoint=self.azure_openai_endpoint,
-            )
+            client = self._get_client()
             
-            # Create complete schema context
-            schema_context = self._build_schema_context()
+            # Schema context for just the tables this question needs
+            selection = self.schema_pruner.select(query)
+            included = set(selection["tables"])
+            schema_context = self._build_schema_context(selection["tables"])
+            disbursement_rules = self.DISBURSEMENT_RULES if "disbursements" in included else ""
+            scheme_rules = self.SCHEME_RULES if "schemes" in included else ""
             
             prompt = f"""
             You are an expert SQL Server developer. Convert this natural language query to syntactically perfect SQL.
@@ -196,13 +358,7 @@ class PromptEngine:
             - Every non-aggregate column in SELECT MUST be in GROUP BY
             - Use proper JOIN syntax with table aliases
             - Handle NULL values with proper LEFT JOIN or IS NULL checks
-            
-            2. DISBURSEMENTS TABLE CRITICAL:
-            - disbursements table has NO enrollment_id column!
-            - JOIN disbursements: FROM citizens c JOIN disbursements d ON c.citizen_id = d.citizen_id
-            - For scheme filtering: JOIN schemes s ON d.scheme_id = s.scheme_id
-            - NEVER write: d.enrollment_id = e.enrollment_id (this column doesn't exist!)
-            
+            {disbursement_rules}
             3. GROUP BY LOGIC:
             - If SELECT has: c.name, c.citizen_id, COUNT(e.scheme_id)
             - Then GROUP BY must have: c.citizen_id, c.name
@@ -214,15 +370,7 @@ class PromptEngine:
             - Use YEAR(GETDATE()) for current year
             - Use YEAR(date_column) = YEAR(GETDATE()) for current year filtering
             - Use DATEPART or YEAR() functions properly
-            
-            5. FLEXIBLE SCHEME MATCHING:
-            - Use LIKE patterns, not hardcoded IDs
-            - PMAY/housing: (s.name LIKE '%PMAY%' OR s.name LIKE '%housing%' OR s.name LIKE '%Awas%')
-            - Employment: (s.name LIKE '%MGNREGA%' OR s.name LIKE '%employment%' OR s.name LIKE '%work%')
-            - Pension: (s.name LIKE '%NSAP%' OR s.name LIKE '%pension%' OR s.name LIKE '%elderly%')
-            - Gas: (s.name LIKE '%Ujjwala%' OR s.name LIKE '%gas%' OR s.name LIKE '%LPG%')
-            - Health: (s.name LIKE '%Ayushman%' OR s.name LIKE '%health%' OR s.name LIKE '%medical%')
-            
+            {scheme_rules}
             6. ROBUST TABLE RELATIONSHIPS:
             - Geographic hierarchy: citizens → villages → districts → states
             - Program data: citizens → enrollments → schemes
@@ -238,17 +386,38 @@ class PromptEngine:
             Generate ONLY the SQL query (no explanations):
             """
             
+            messages = [
+                {"role": "system", "content": "You are a SQL expert. Convert natural language to SQL queries using the provided schema."},
+                {"role": "user", "content": prompt}
+            ]
+            estimated_tokens = sum(count_tokens(message["content"]) for message in messages)
+            full_schema_tokens = self._full_schema_tokens()
             response = client.chat.completions.create(
                 model=self.azure_openai_deployment,
-                messages=[
-                    {"role": "system", "content": "You are a SQL expert. Convert natural language to SQL queries using the provided schema."},
-                    {"role": "user", "content": prompt}
-                ],
+                messages=messages,
                 max_tokens=500,
-                temperature=0.1
+                temperature=0.1,
+                stream=on_token is not None
             )
             
-            sql = response.choices[0].message.content.strip()
+            if on_token is not None:
+                sql, usage = self._consume_stream(response, on_token)
+            else:
+                sql, usage = response.choices[0].message.content, getattr(response, "usage", None)
+            info = {
+                "tables": selection["tables"],
+                "pruned": selection["pruned"],
+                "prompt_tokens": getattr(usage, "prompt_tokens", None) or estimated_tokens,
+                "completion_tokens": getattr(usage, "completion_tokens", None),
+                "estimated_prompt_tokens": estimated_tokens,
+                "tokens_saved": max(full_schema_tokens - count_tokens(schema_context + disbursement_rules + scheme_rules), 0)
+            }
+            self._record_prompt(info)
+            logger.info(f"LLM prompt: {info['prompt_tokens']} tokens, tables {', '.join(info['tables'])}")
+            if prompt_info is not None:
+                prompt_info.update(info)
+            
+            sql = (sql or "").strip()
             # Clean up the response
             sql = sql.replace("```sql", "").replace("```", "").strip()
             
@@ -258,80 +427,140 @@ class PromptEngine:
             logger.error(f"Azure OpenAI processing failed: {e}")
             return None
 
-    def _build_schema_context(self) -> str:
-        """Build complete schema context for OpenAI prompt"""
+    # Prompt rule blocks that only apply when their table is in the prompt
+    DISBURSEMENT_RULES = """
+            2. DISBURSEMENTS TABLE CRITICAL:
+            - disbursements table has NO enrollment_id column!
+            - JOIN disbursements: FROM citizens c JOIN disbursements d ON c.citizen_id = d.citizen_id
+            - For scheme filtering: JOIN schemes s ON d.scheme_id = s.scheme_id
+            - NEVER write: d.enrollment_id = e.enrollment_id (this column doesn't exist!)
+            """
+    SCHEME_RULES = """
+            5. FLEXIBLE SCHEME MATCHING:
+            - Use LIKE patterns, not hardcoded IDs
+            - PMAY/housing: (s.name LIKE '%PMAY%' OR s.name LIKE '%housing%' OR s.name LIKE '%Awas%')
+            - Employment: (s.name LIKE '%MGNREGA%' OR s.name LIKE '%employment%' OR s.name LIKE '%work%')
+            - Pension: (s.name LIKE '%NSAP%' OR s.name LIKE '%pension%' OR s.name LIKE '%elderly%')
+            - Gas: (s.name LIKE '%Ujjwala%' OR s.name LIKE '%gas%' OR s.name LIKE '%LPG%')
+            - Health: (s.name LIKE '%Ayushman%' OR s.name LIKE '%health%' OR s.name LIKE '%medical%')
+            """
+
+    # Prompt guidance lines, each kept only when the tables it is about are in the prompt
+    # (any of the listed tables; None: always)
+    SCHEMA_GUIDANCE = [
+        ("\n🎯 INTELLIGENT QUERY PATTERNS:\n", ["schemes"]),
+        ("SCHEME RECOGNITION (Use LIKE patterns, NO hardcoded IDs):\n", ["schemes"]),
+        ("- 'PMAY' = 'housing' = 'Awas' → s.name LIKE '%PMAY%' OR s.name LIKE '%housing%'\n", ["schemes"]),
+        ("- 'MGNREGA' = 'employment' = 'work' → s.name LIKE '%MGNREGA%' OR s.name LIKE '%employment%'\n", ["schemes"]),
+        ("- 'NSAP' = 'pension' = 'elderly' → s.name LIKE '%NSAP%' OR s.name LIKE '%pension%'\n", ["schemes"]),
+        ("- 'Ujjwala' = 'gas' = 'LPG' → s.name LIKE '%Ujjwala%' OR s.name LIKE '%gas%'\n", ["schemes"]),
+        ("- 'Ayushman' = 'health' = 'medical' → s.name LIKE '%Ayushman%' OR s.name LIKE '%health%'\n", ["schemes"]),
+        ("\nLOCATION INTELLIGENCE:\n", ["villages", "districts", "states"]),
+        ("- For 'Gujarat citizens': JOIN to states.name LIKE '%Gujarat%'\n", ["states"]),
+        ("- For 'Mumbai district': JOIN to districts.name LIKE '%Mumbai%'\n", ["districts"]),
+        ("- For 'rural areas': villages.name LIKE '%Rural%'\n", ["villages"]),
+        ("\nDISABILITY INTELLIGENCE:\n", ["health_details"]),
+        ("- 'above 70%': disability_status LIKE '%80%' OR LIKE '%90%' OR LIKE '%100%'\n", ["health_details"]),
+        ("- 'disabled': disability_status IS NOT NULL AND != 'None'\n", ["health_details"]),
+        ("- Values: 'Physical disability - 60%', 'Visual impairment - 80%', etc.\n", ["health_details"]),
+        ("\nCRITICAL TABLE STRUCTURE:\n", None),
+        ("- disbursements: NO enrollment_id column! Join using citizen_id + scheme_id\n", ["disbursements"]),
+        ("- citizens: Use village_id to join with villages table\n", ["villages"]),
+        ("- health_details: disability_status field (text like 'Physical disability - 60%')\n", ["health_details"]),
+        ("- Date fields: disbursed_on, enrollment_date, verified_on\n", ["disbursements", "enrollments", "verifications"]),
+        ("- All JOINs must use proper foreign key relationships\n", None),
+        ("\nCORRECT JOIN PATTERNS:\n", ["disbursements", "schemes", "villages", "districts", "states"]),
+        ("- Disbursements: FROM citizens c JOIN disbursements d ON c.citizen_id = d.citizen_id\n", ["disbursements"]),
+        ("- With Schemes: JOIN schemes s ON d.scheme_id = s.scheme_id\n", ["disbursements"]),
+        ("- Location: JOIN villages v ON c.village_id = v.village_id\n", ["villages"]),
+        ("- Districts: JOIN districts dt ON v.district_id = dt.district_id\n", ["districts"]),
+        ("- States: JOIN states st ON dt.state_id = st.state_id\n", ["states"]),
+    ]
+
+    # Relationships listed in the prompt, shown when both ends are included
+    KEY_RELATIONSHIPS = [
+        ("citizens", "village_id", "villages"),
+        ("villages", "district_id", "districts"),
+        ("districts", "state_id", "states"),
+        ("enrollments", "citizen_id", "citizens"),
+        ("enrollments", "scheme_id", "schemes"),
+        ("disbursements", "citizen_id", "citizens"),
+        ("disbursements", "scheme_id", "schemes"),
+        ("health_details", "citizen_id", "citizens"),
+        ("bank_accounts", "citizen_id", "citizens"),
+    ]
+
+    @staticmethod
+    def _consume_stream(response, on_token: Callable[[str], None]) -> Tuple[str, Any]:
+        """Collect a streamed completion, forwarding each content delta; returns (text, usage or None)"""
+        parts = []
+        usage = None
+        for chunk in response:
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                on_token(delta)
+        return "".join(parts), usage
+
+    def _full_schema_tokens(self) -> int:
+        """Tokens the unpruned schema context and rules would cost (computed once)"""
+        if self._full_schema_token_count is None:
+            self._full_schema_token_count = count_tokens(
+                self._build_schema_context() + self.DISBURSEMENT_RULES + self.SCHEME_RULES)
+        return self._full_schema_token_count
+
+    def _build_schema_context(self, tables: Optional[List[str]] = None) -> str:
+        """Build the schema context for the OpenAI prompt (all tables unless a pruned list is given)"""
+        included = set(tables) if tables is not None else set(self.table_schemas)
         context = "DATABASE SCHEMA:\n"
         for table, columns in self.table_schemas.items():
+            if table not in included:
+                continue
             context += f"\n{table.upper()}:\n"
             for column in columns:
                 context += f"  - {column}\n"
         
-        context += "\nKEY RELATIONSHIPS:\n"
-        context += "- citizens.village_id -> villages.village_id\n"
-        context += "- villages.district_id -> districts.district_id\n" 
-        context += "- districts.state_id -> states.state_id\n"
-        context += "- enrollments.citizen_id -> citizens.citizen_id\n"
-        context += "- enrollments.scheme_id -> schemes.scheme_id\n"
-        context += "- disbursements.citizen_id -> citizens.citizen_id\n"
-        context += "- disbursements.scheme_id -> schemes.scheme_id\n"
-        context += "- health_details.citizen_id -> citizens.citizen_id\n"
-        context += "- bank_accounts.citizen_id -> citizens.citizen_id\n"
-        
-        context += "\n🎯 INTELLIGENT QUERY PATTERNS:\n"
-        context += "SCHEME RECOGNITION (Use LIKE patterns, NO hardcoded IDs):\n"
-        context += "- 'PMAY' = 'housing' = 'Awas' → s.name LIKE '%PMAY%' OR s.name LIKE '%housing%'\n"  
-        context += "- 'MGNREGA' = 'employment' = 'work' → s.name LIKE '%MGNREGA%' OR s.name LIKE '%employment%'\n"
-        context += "- 'NSAP' = 'pension' = 'elderly' → s.name LIKE '%NSAP%' OR s.name LIKE '%pension%'\n"
-        context += "- 'Ujjwala' = 'gas' = 'LPG' → s.name LIKE '%Ujjwala%' OR s.name LIKE '%gas%'\n"
-        context += "- 'Ayushman' = 'health' = 'medical' → s.name LIKE '%Ayushman%' OR s.name LIKE '%health%'\n"
-        
-        context += "\nLOCATION INTELLIGENCE:\n"
-        context += "- For 'Gujarat citizens': JOIN to states.name LIKE '%Gujarat%'\n"
-        context += "- For 'Mumbai district': JOIN to districts.name LIKE '%Mumbai%'\n"
-        context += "- For 'rural areas': villages.name LIKE '%Rural%'\n"
-        
-        context += "\nDISABILITY INTELLIGENCE:\n"
-        context += "- 'above 70%': disability_status LIKE '%80%' OR LIKE '%90%' OR LIKE '%100%'\n"
-        context += "- 'disabled': disability_status IS NOT NULL AND != 'None'\n"
-        context += "- Values: 'Physical disability - 60%', 'Visual impairment - 80%', etc.\n"
-        
-        context += "\nCRITICAL TABLE STRUCTURE:\n"
-        context += "- disbursements: NO enrollment_id column! Join using citizen_id + scheme_id\n"
-        context += "- citizens: Use village_id to join with villages table\n"
-        context += "- health_details: disability_status field (text like 'Physical disability - 60%')\n"
-        context += "- Date fields: disbursed_on, enrollment_date, verified_on\n"
-        context += "- All JOINs must use proper foreign key relationships\n"
-        
-        context += "\nCORRECT JOIN PATTERNS:\n"
-        context += "- Disbursements: FROM citizens c JOIN disbursements d ON c.citizen_id = d.citizen_id\n"
-        context += "- With Schemes: JOIN schemes s ON d.scheme_id = s.scheme_id\n"
-        context += "- Location: JOIN villages v ON c.village_id = v.village_id\n"
-        context += "- Districts: JOIN districts dt ON v.district_id = dt.district_id\n"
-        context += "- States: JOIN states st ON dt.state_id = st.state_id\n"
+        relationships = [(child, column, parent) for child, column, parent in self.KEY_RELATIONSHIPS
+                         if child in included and parent in included]
+        if relationships:
+            context += "\nKEY RELATIONSHIPS:\n"
+            for child, column, parent in relationships:
+                context += f"- {child}.{column} -> {parent}.{column}\n"
+        
+        for line, required in self.SCHEMA_GUIDANCE:
+            if required is None or included.intersection(required):
+                context += line
         
         return context
 
     def _validate_and_fix_sql(self, sql: str) -> str:
         """Intelligently validate and fix SQL query"""
-        # Remove duplicate spaces and normalize
-        sql = re.sub(r'\s+', ' ', sql.strip())
+        # Remove duplicate spaces and normalize (split() and \s use the same whitespace set)
+        sql = ' '.join(sql.split())
+        # Case-insensitive fixes below only run when their text is present; none of
+        # them introduces text another one looks for
+        lowered = sql.lower()
         
         # SQL Server specific corrections - LIMIT to TOP
-        limit_match = re.search(r"LIMIT\s+(\d+)", sql, re.IGNORECASE)
+        limit_match = LIMIT_PATTERN.search(sql) if 'limit' in lowered else None
         if limit_match:
             n = limit_match.group(1)
-            sql = re.sub(r"\s*LIMIT\s+\d+\s*;?\s*$", "", sql, flags=re.IGNORECASE)
-            if not re.search(r"SELECT\s+TOP\s+\d+", sql, re.IGNORECASE):
-                sql = re.sub(r"SELECT\b", f"SELECT TOP {n}", sql, flags=re.IGNORECASE)
+            sql = TRAILING_LIMIT_PATTERN.sub("", sql)
+            if not SELECT_TOP_PATTERN.search(sql):
+                sql = SELECT_PATTERN.sub(f"SELECT TOP {n}", sql)
         
         # Fix common column name errors based on actual schema
-        sql = re.sub(r'\benrollment_id\b', 'e.enrollment_id', sql, flags=re.IGNORECASE)
-        sql = re.sub(r'\bdisability_percentage\b', 'disability_status', sql, flags=re.IGNORECASE)
+        if 'enrollment_id' in lowered or 'disability_percentage' in lowered:
+            sql = COLUMN_NAME_PATTERN.sub(lambda match: COLUMN_NAME_FIXES[match.group(0).lower()], sql)
         
         # Fix disbursements table - NO enrollment_id column exists
         # disbursements table has: citizen_id, scheme_id directly (not through enrollment_id)
-        sql = re.sub(r'disbursements\s+d\s+ON\s+d\.enrollment_id\s*=\s*e\.enrollment_id', 
-                    'disbursements d ON d.citizen_id = e.citizen_id AND d.scheme_id = e.scheme_id', sql, flags=re.IGNORECASE)
+        if 'enrollment_id' in lowered:
+            sql = DISBURSEMENT_JOIN_PATTERN.sub(
+                'disbursements d ON d.citizen_id = e.citizen_id AND d.scheme_id = e.scheme_id', sql)
         
         # Fix GROUP BY issues - add missing columns to GROUP BY
         sql = self._fix_group_by_issues(sql)
@@ -340,17 +569,12 @@ class PromptEngine:
         sql = self._fix_column_references(sql)
         
         # Auto-add required JOINs if missing
-        if 'village' in sql.lower() and 'citizens' in sql.lower() and 'join villages' not in sql.lower():
-            sql = self._add_missing_joins(sql, 'villages')
-        
-        if 'district' in sql.lower() and 'join districts' not in sql.lower():
-            sql = self._add_missing_joins(sql, 'districts')
-            
-        if 'state' in sql.lower() and 'join states' not in sql.lower():
-            sql = self._add_missing_joins(sql, 'states')
-            
-        if 'disability' in sql.lower() and 'join health_details' not in sql.lower():
-            sql = self._add_missing_joins(sql, 'health_details')
+        lowered = sql.lower()
+        for table, markers in MISSING_JOIN_CHECKS:
+            if all(marker in lowered for marker in markers) and f'join {table}' not in lowered:
+                fixed = self._add_missing_joins(sql, table)
+                if fixed != sql:
+                    sql, lowered = fixed, fixed.lower()
         
         return sql.strip()
     
@@ -361,8 +585,8 @@ class PromptEngine:
             return sql
             
         # Find SELECT and GROUP BY clauses
-        select_match = re.search(r'SELECT\s+(TOP\s+\d+\s+)?(.*?)\s+FROM', sql, re.IGNORECASE | re.DOTALL)
-        group_by_match = re.search(r'GROUP\s+BY\s+(.*?)(?:\s+HAVING|\s+ORDER|\s*$)', sql, re.IGNORECASE | re.DOTALL)
+        select_match = SELECT_CLAUSE_PATTERN.search(sql)
+        group_by_match = GROUP_BY_CLAUSE_PATTERN.search(sql)
         
         if not select_match or not group_by_match:
             return sql
@@ -375,9 +599,9 @@ class PromptEngine:
         for col in select_part.split(','):
             col = col.strip()
             # Skip aggregate functions, CASE statements, and literals
-            if not re.search(r'\b(COUNT|SUM|AVG|MAX|MIN|STRING_AGG|FORMAT)\s*\(', col, re.IGNORECASE):
-                if not re.search(r'^\s*CASE\s+', col, re.IGNORECASE):
-                    if not re.search(r'^\s*[\'"]\w+[\'"]\s*$', col):  # Skip string literals
+            if not AGGREGATE_CALL_PATTERN.search(col):
+                if not CASE_START_PATTERN.search(col):
+                    if not STRING_LITERAL_PATTERN.search(col):  # Skip string literals
                         # Extract column name (handle aliases)
                         base_col = col
                         if ' AS ' in col.upper():
@@ -405,23 +629,20 @@ class PromptEngine:
         
         # Replace GROUP BY clause
         if group_by_part:
-            sql = re.sub(r'GROUP\s+BY\s+.*?(?=\s+HAVING|\s+ORDER|\s*$)', 
-                        f'GROUP BY {group_by_part}', sql, flags=re.IGNORECASE)
+            sql = GROUP_BY_REPLACE_PATTERN.sub(f'GROUP BY {group_by_part}', sql)
         
         return sql
     
     def _fix_column_references(self, sql: str) -> str:
         """Fix common column reference issues"""
-        # Fix citizens.name references (should be just 'name' based on schema)
-        sql = re.sub(r'citizens\.name', 'c.name', sql, flags=re.IGNORECASE)
-        sql = re.sub(r'citizens\.citizen_id', 'c.citizen_id', sql, flags=re.IGNORECASE)
-        
-        # Fix scheme name references
-        sql = re.sub(r'schemes\.name', 's.name', sql, flags=re.IGNORECASE)
+        lowered = sql.lower()
+        # Fix citizens.name / citizens.citizen_id / schemes.name references to the usual aliases
+        if 'citizens.' in lowered or 'schemes.' in lowered:
+            sql = TABLE_REFERENCE_PATTERN.sub(lambda match: TABLE_REFERENCE_FIXES[match.group(0).lower()], sql)
         
         # Fix common issues with HAVING COUNT
-        sql = re.sub(r'HAVING\s+COUNT\s*\(\s*ba\.account_id\s*\)\s*>\s*1', 
-                    'HAVING COUNT(DISTINCT ba.account_id) > 1', sql, flags=re.IGNORECASE)
+        if 'ba.account_id' in lowered:
+            sql = HAVING_ACCOUNT_COUNT_PATTERN.sub('HAVING COUNT(DISTINCT ba.account_id) > 1', sql)
         
         return sql
     
@@ -518,14 +739,55 @@ ORDER BY total_disbursed DESC"""
         
         return None
 
-    def convert_to_sql(self, query: str) -> Dict[str, Any]:
-        """Main method to convert natural language query to SQL"""
+    def _try_semantic_cache_sql(self, processed_query: str) -> Optional[Dict[str, Any]]:
+        """Reuse previously validated SQL when a paraphrase of the question was seen before"""
+        match = self.semantic_cache.lookup(processed_query)
+        if match:
+            logger.info(f"Semantic cache hit (similarity {match['similarity']}) for: '{match['original_query']}'")
+        return match
+
+    def coalescing_key(self, query: str) -> Tuple[str, str]:
+        """Key under which identical in-flight questions share one conversion"""
+        return self._preprocess_query(query), self.schema_fingerprint
+
+    def remember_validated_sql(self, query: str, sql: str, method: str) -> None:
+        """
+        Record SQL that executed successfully so repeats and paraphrases can reuse it.
+        Only LLM answers go in the exact cache; unexecuted SQL is never cached.
+        """
+        processed_query = self._preprocess_query(query)
+        if method == "azure_openai":
+            self.sql_cache.put(NL2SQLCache.make_key(processed_query, self.schema_fingerprint), {"sql_query": sql})
+        self.semantic_cache.add(processed_query, sql, original_query=query)
+
+    def convert_to_sql(self, query: str, on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """
+        Main method to convert natural language query to SQL. on_token receives
+        the LLM output as it streams (not called for template, cache or pattern answers).
+        """
         try:
             logger.info(f"Processing query: '{query}'")
             
-            # Try Azure OpenAI first
-            sql = self._try_azure_openai(query)
-            method = "azure_openai"
+            # Common question shapes are answered from templates; only misses reach the caches and the LLM
+            template = self.templates.match(query)
+            processed_query = self._preprocess_query(query)
+            cache_key = NL2SQLCache.make_key(processed_query, self.schema_fingerprint)
+            cached = None if template else self.sql_cache.get(cache_key)
+            similar = None if template or cached else self._try_semantic_cache_sql(processed_query)
+            prompt_info: Dict[str, Any] = {}
+            if template:
+                sql = template["sql"]
+                method = "template"
+            elif cached:
+                sql = cached["sql_query"]
+                method = "cache"
+            elif similar:
+                sql = similar["sql_query"]
+                method = "semantic_cache"
+            else:
+                # Try Azure OpenAI first
+                sql = self._try_azure_openai(query, prompt_info, on_token)
+                method = "azure_openai"
             
             # Fallback to pattern-based if Azure OpenAI fails
             if not sql:
@@ -534,15 +796,27 @@ ORDER BY total_disbursed DESC"""
                 method = "pattern_based"
             
             if sql:
-                return {
+                result = {
                     "status": "success",
                     "success": True,
                     "sql_query": sql,
                     "original_query": query,
                     "method": method,
-                    "confidence": 0.8 if method == "azure_openai" else 0.6,
+                    "confidence": {"pattern_based": 0.6, "template": 0.95}.get(method, 0.8),
                     "chart_type": "table"
                 }
+                if template:
+                    result["template"] = {"name": template["template"], "slots": template["slots"],
+                                          "match_us": template["match_us"]}
+                if prompt_info and method == "azure_openai":
+                    result["prompt"] = prompt_info
+                if method == "semantic_cache":
+                    result["similarity"] = similar["similarity"]
+                    result["matched_query"] = similar["original_query"]
+                if parameterization_enabled():
+                    # Bind predicate literals so query variants share one plan on SQL Server
+                    result.update(parameterize_sql(sql).to_dict())
+                return result
             
             # Failed to convert
             return {
@@ -582,6 +856,10 @@ ORDER BY total_disbursed DESC"""
 # Global instance
 prompt_engine = PromptEngine()
 
+def get_prompt_engine() -> PromptEngine:
+    """Get the process-wide PromptEngine instance"""
+    return prompt_engine
+
 def convert_natural_language_to_sql(query: str) -> Dict[str, Any]:
     """Global function to convert natural language to SQL"""
     return prompt_engine.convert_to_sql(query)
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Query governor for generated SQL
+Caps returned rows, bounds statement time and rejects or downgrades statements
+whose estimated plan cost is over budget before they reach the connection pool
+"""
+import os
+import re
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+SELECT_HEAD_PATTERN = re.compile(r'^\s*SELECT\s+(?:(DISTINCT|ALL)\s+)?', re.IGNORECASE)
+TOP_PATTERN = re.compile(r'^\s*SELECT\s+(?:(?:DISTINCT|ALL)\s+)?TOP\s*\(?\s*(\d+)\s*\)?(\s+PERCENT)?', re.IGNORECASE)
+LIMIT_PATTERN = re.compile(r'\bLIMIT\s+(\d+)\s*;?\s*$', re.IGNORECASE)
+SET_OPERATOR_PATTERN = re.compile(r'\b(?:UNION|EXCEPT|INTERSECT)\b', re.IGNORECASE)
+
+NARROWING_SUGGESTIONS = [
+    "Add a filter for a specific state, district or village",
+    "Restrict the question to one scheme",
+    "Limit the time range, e.g. a single year or month",
+    "Ask for totals or counts instead of individual records"
+]
+
+class QueryGovernor:
+    """Applies row caps, statement timeouts and a plan-cost budget to generated SQL"""
+
+    def __init__(self, row_cap: Optional[int] = None, statement_timeout: Optional[float] = None,
+                 cost_budget: Optional[float] = None, reject_factor: Optional[float] = None,
+                 downgrade_row_cap: Optional[int] = None):
+        self.row_cap = row_cap or int(os.getenv("QUERY_ROW_CAP", "10000"))
+        self.statement_timeout = statement_timeout or float(os.getenv("QUERY_STATEMENT_TIMEOUT", "15"))
+        # Budget in SQL Server estimated subtree cost units
+        self.cost_budget = cost_budget or float(os.getenv("QUERY_COST_BUDGET", "50"))
+        # Statements up to budget * reject_factor are downgraded, anything above is rejected
+        self.reject_factor = reject_factor or float(os.getenv("QUERY_COST_REJECT_FACTOR", "10"))
+        self.downgrade_row_cap = downgrade_row_cap or int(os.getenv("QUERY_DOWNGRADE_ROW_CAP", "500"))
+
+        self._estimates: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+        self._estimate_cache_size = int(os.getenv("QUERY_COST_CACHE_SIZE", "512"))
+        self._lock = threading.Lock()
+        self.stats = {"evaluated": 0, "allowed": 0, "downgraded": 0, "rejected": 0,
+                      "capped": 0, "timeouts": 0, "estimate_unavailable": 0}
+
+    def apply_row_cap(self, sql: str, cap: int, dialect: str = "mssql") -> str:
+        """Add or tighten TOP (SQL Server) / LIMIT (SQLite) on a single top-level SELECT"""
+        if not SELECT_HEAD_PATTERN.match(sql) or SET_OPERATOR_PATTERN.search(sql):
+            return sql
+        if dialect == "sqlite" and not TOP_PATTERN.match(sql):
+            # T-SQL TOP is translated to LIMIT by the local engine, so only LIMIT-style SQL is capped here
+            limit = LIMIT_PATTERN.search(sql)
+            if limit:
+                if int(limit.group(1)) <= cap:
+                    return sql
+                return sql[:limit.start(1)] + str(cap) + sql[limit.end(1):]
+            return f"{sql.rstrip().rstrip(';')} LIMIT {cap}"
+
+        top = TOP_PATTERN.match(sql)
+        if top:
+            if top.group(2) or int(top.group(1)) <= cap:
+                return sql
+            return sql[:top.start(1)] + str(cap) + sql[top.end(1):]
+        head = SELECT_HEAD_PATTERN.match(sql)
+        return f"{sql[:head.end()]}TOP {cap} {sql[head.end():]}"
+
+    def _estimate(self, db_manager, sql: str) -> Optional[Dict[str, Any]]:
+        key = " ".join(sql.split())
+        with self._lock:
+            if key in self._estimates:
+                self._estimates.move_to_end(key)
+                return self._estimates[key]
+        estimate = db_manager.estimate_query_cost(sql)
+        with self._lock:
+            self._estimates[key] = estimate
+            while len(self._estimates) > self._estimate_cache_size:
+                self._estimates.popitem(last=False)
+        return estimate
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def evaluate(self, db_manager, execution_sql: str, estimate_sql: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Decide how (or whether) to run a statement. Blocking - call it on the DB worker pool.
+
+        execution_sql is what will run (possibly parameterized); estimate_sql is the
+        literal form used for the plan estimate. Returns a decision dict with action
+        "allow", "downgrade" or "reject", the capped SQL, row cap and timeout.
+        """
+        self._count("evaluated")
+        dialect = db_manager.engine.dialect.name if db_manager.engine is not None else "mssql"
+        estimate = self._estimate(db_manager, self.apply_row_cap(estimate_sql or execution_sql, self.row_cap, dialect))
+        cost = estimate["estimated_cost"] if estimate else None
+
+        decision = {
+            "action": "allow",
+            "row_cap": self.row_cap,
+            "timeout": self.statement_timeout,
+            "estimated_cost": cost,
+            "estimated_rows": estimate.get("estimated_rows") if estimate else None,
+            "cost_source": estimate.get("source") if estimate else None,
+            "cost_budget": self.cost_budget
+        }
+        if cost is None:
+            self._count("estimate_unavailable")
+        elif cost > self.cost_budget * self.reject_factor:
+            decision["action"] = "reject"
+        elif cost > self.cost_budget:
+            decision["action"] = "downgrade"
+            decision["row_cap"] = min(self.row_cap, self.downgrade_row_cap)
+
+        self._count({"allow": "allowed", "downgrade": "downgraded", "reject": "rejected"}[decision["action"]])
+        if decision["action"] != "reject":
+            capped = self.apply_row_cap(execution_sql, decision["row_cap"], dialect)
+            if capped != execution_sql:
+                self._count("capped")
+            decision["sql"] = capped
+        else:
+            logger.warning(f"Query rejected by governor: estimated cost {cost} over budget {self.cost_budget}")
+        return decision
+
+    def snapshot_decision(self) -> Dict[str, Any]:
+        """
+        Row cap and timeout for a statement answered by the analytics snapshot.
+        The plan-cost budget is in SQL Server units, so there is no estimate to apply.
+        """
+        return {
+            "action": "allow",
+            "row_cap": self.row_cap,
+            "timeout": self.statement_timeout,
+            "estimated_cost": None,
+            "estimated_rows": None,
+            "cost_source": "analytics_snapshot",
+            "cost_budget": self.cost_budget
+        }
+
+    def rejection_response(self, decision: Dict[str, Any]) -> Dict[str, Any]:
+        """Structured error body for a statement that is too expensive to run"""
+        return {
+            "success": False,
+            "status": "error",
+            "message": (f"This question would scan too much data (estimated cost {decision['estimated_cost']:g}, "
+                        f"budget {self.cost_budget:g}). Please narrow it down."),
+            "error_type": "query_too_expensive",
+            "governor": decision,
+            "suggestions": NARROWING_SUGGESTIONS
+        }
+
+    def timeout_response(self, decision: Dict[str, Any]) -> Dict[str, Any]:
+        """Structured error body for a statement that ran past its timeout"""
+        self._count("timeouts")
+        return {
+            "success": False,
+            "status": "error",
+            "message": f"The query did not finish within {decision['timeout']:g}s and was cancelled. Please narrow it down.",
+            "error_type": "query_timeout",
+            "governor": decision,
+            "suggestions": NARROWING_SUGGESTIONS
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(row_cap=self.row_cap, statement_timeout=self.statement_timeout,
+                     cost_budget=self.cost_budget, reject_factor=self.reject_factor)
+        return stats
+
+# Global instance
+query_governor = QueryGovernor()
+
+def get_query_governor() -> QueryGovernor:
+    """Get the process-wide QueryGovernor instance"""
+    return query_governor
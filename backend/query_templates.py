@@ -0,0 +1,772 @@
+"""
+Deterministic NL-to-SQL templates for common questions
+A library of query shapes (disbursement, enrollment and citizen aggregates by
+scheme, geography, demographics or time, plus the recurring list questions)
+filled from slots extracted from the question: scheme, state, district, gender,
+age range, year, month, status, payment mode and measure. Matching is a handful
+of regex passes, so covered questions get SQL in microseconds without an LLM
+call. A template only answers when it accounts for the whole question: a word
+that no slot, dimension or template vocabulary consumed, a table the question
+implies that the template does not use, a negation the template does not handle
+or two values for one slot all leave the question to the LLM.
+Templates target the deployed schema (database/schema.sql). Slot values come
+from fixed vocabularies, letters or integers, so they are safe to inline; the
+SQL is parameterized afterwards like any other generated statement.
+"""
+import os
+import re
+import time
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple, Callable, Set
+
+from schema_pruner import SchemaPruner, STATE_NAMES
+
+logger = logging.getLogger(__name__)
+
+# Scheme slot: question words -> scheme name patterns (same groups as the prompt's scheme rules)
+SCHEME_SLOTS = {
+    "housing": (r"pmay|housing|awas", ["PMAY", "housing", "Awas"]),
+    "employment": (r"mgnrega|nrega|employment", ["MGNREGA", "employment"]),
+    "pension": (r"nsap|pensions?|old[- ]age pension", ["NSAP", "pension"]),
+    "gas": (r"ujjwala|gas|lpg", ["Ujjwala", "gas", "LPG"]),
+    "health": (r"ayushman(?: bharat)?|pmjay|health (?:schemes?|insurance|cover)", ["Ayushman", "health", "PMJAY"])
+}
+
+SCHEME_PATTERNS = {name: re.compile(rf"\b(?:{words})\b") for name, (words, _) in SCHEME_SLOTS.items()}
+SCHEME_NOUN_PATTERN = re.compile(r"\b(?:schemes?|yojanas?|programs?|programmes?)\b")
+
+# Status slot: question words -> the status value on each fact table that has one
+STATUS_SLOTS = {
+    "completed": (r"completed|successful", {"disbursements": "Completed"}),
+    "failed": (r"failed|failures?|unsuccessful", {"disbursements": "Failed"}),
+    "processing": (r"processing|in progress", {"disbursements": "Processing"}),
+    "pending": (r"pending", {"disbursements": "Pending", "enrollments": "Pending"}),
+    "active": (r"active", {"enrollments": "Active"}),
+    "approved": (r"approved", {"enrollments": "Approved"}),
+    "under_review": (r"under review", {"enrollments": "Under Review"}),
+    "rejected": (r"rejected|rejections?", {"enrollments": "Rejected"}),
+    "suspended": (r"suspended|suspensions?", {"enrollments": "Suspended"})
+}
+STATUS_PATTERNS = {name: re.compile(rf"\b(?:{words})\b") for name, (words, _) in STATUS_SLOTS.items()}
+# Payment mode slot: question words -> disbursements.payment_mode pattern
+PAYMENT_MODE_SLOTS = {
+    "UPI": r"upi",
+    "Bank Transfer": r"bank transfers?|neft|rtgs|imps",
+    "Cash": r"cash",
+    "Cheque": r"cheques?"
+}
+PAYMENT_MODE_PATTERNS = {name: re.compile(rf"\b(?:{words})\b") for name, words in PAYMENT_MODE_SLOTS.items()}
+# Measure slot: an explicit measure replaces the fact's default measures
+MEASURE_PATTERNS = {
+    "average_age": re.compile(r"\b(?:average|avg|mean) age\b"),
+    "average_amount": re.compile(r"\b(?:average|avg|mean) (?:(?:disbursement|payment) )?"
+                                 r"(?:amounts?|disbursements?|payments?|payouts?)\b")
+}
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august", "september",
+          "october", "november", "december"]
+MONTH_PATTERN = re.compile(
+    r"\b(?:(january|february|march|april|june|july|august|september|october|november|december)"
+    r"|(jan|feb|mar|apr|jun|jul|aug|sept?|oct|nov|dec)\b\.?|(may)(?=,?\s+(?:19|20)\d{2}\b))"
+)
+STATE_PATTERN = re.compile(r"\b(" + "|".join(STATE_NAMES) + r")(?:\s+pradesh)?\b(?:\s+state\b)?")
+YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+RELATIVE_YEAR_PATTERN = re.compile(r"\b(?:this|current|last|previous) year\b")
+
+AGE_RANGE_PATTERNS = [
+    re.compile(r"\b(?:aged?|ages|between the ages of)\s+(\d{1,3})\s*(?:-|–|to|and)\s*(\d{1,3})\b"),
+    re.compile(r"\b(?:between\s+)?(\d{1,3})\s*(?:-|–|to|and)\s*(\d{1,3})\s*(?:years?|yrs?)\b")
+]
+# (pattern, inclusive bound from the number: +1 / -1 for strict comparisons)
+AGE_MIN_PATTERNS = [
+    (re.compile(r"\b(?:aged?|ages)\s+(?:above|over|more than|greater than|older than)\s+(\d{1,3})\b"), 1),
+    (re.compile(r"\b(?:aged?|ages)\s+(?:at least\s+(\d{1,3})|(\d{1,3})\s+(?:and|or)\s+(?:above|over|older))\b"), 0),
+    (re.compile(r"\b(?:above|over|older than)\s+(?:the\s+)?age\s+(?:of\s+)?(\d{1,3})\b"), 1),
+    (re.compile(r"\b(?:citizens?|people|persons|beneficiar\w*|individuals|women|men)\s+(?:above|over|older than)\s+"
+                r"(\d{2})\b(?!\s*(?:%|percent))"), 1),
+    (re.compile(r"\b(\d{1,3})\s*(?:\+|years?\s+(?:and|or)\s+(?:above|older|over))"), 0)
+]
+AGE_MAX_PATTERNS = [
+    (re.compile(r"\b(?:aged?|ages)\s+(?:below|under|less than|younger than)\s+(\d{1,3})\b"), -1),
+    (re.compile(r"\b(?:below|under|younger than)\s+(?:the\s+)?age\s+(?:of\s+)?(\d{1,3})\b"), -1),
+    (re.compile(r"\b(?:under|below)\s+(\d{2})\b(?!\s*(?:%|percent|lakh|thousand|rupees|rs))"), -1)
+]
+AGE_WORDS = [(re.compile(r"\b(?:senior citizens?|seniors|elderly)\b"), (60, None)),
+             (re.compile(r"\b(?:minors|children)\b"), (None, 17))]
+
+DISABILITY_THRESHOLD_PATTERN = re.compile(
+    r"\bdisab\w*[^.%\d]*?\b(above|over|more than|greater than|at least)\s+(\d{1,3})\s*(?:%|percent)")
+DISABILITY_PATTERN = re.compile(r"\bdisab(?:led|ility|ilities)\b")
+CHRONIC_PATTERN = re.compile(r"\bchronic\b|\b(?:health|medical) conditions?\b|\billness(?:es)?\b")
+LIMIT_PATTERN = re.compile(r"\btop\s+(\d{1,4})\b")
+FEMALE_PATTERN = re.compile(r"\b(?:female|females|women|woman|girls?)\b")
+MALE_PATTERN = re.compile(r"\b(?:male|males|men|man|boys?)\b")
+PLACE_STOPWORDS = {"each", "every", "per", "which", "that", "this", "the", "a", "any", "same", "one", "their",
+                   "its", "home", "rural", "urban", "wise", "by", "all", "other", "beneficiaries", "citizens"}
+DISTRICT_PATTERNS = [re.compile(r"\b(?:in|of|from|for)\s+(?:the\s+)?([a-z]{3,}(?:\s[a-z]{3,})?)\s+district\b"),
+                     re.compile(r"\bdistrict\s+of\s+([a-z]{3,}(?:\s[a-z]{3,})?)\b")]
+SECTOR_PATTERN = re.compile(r"\b([a-z]{3,}(?:\s[a-z]{3,})?)\s+sector\b")
+NEGATION_PATTERN = re.compile(r"\b(?:not|without|never|no(?!\.)|non|except|excluding|other than|neither|nor|unless)\b|n't\b")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# Words that carry no meaning a template could drop; every other word must be consumed
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "of", "in", "for", "to", "and", "with", "by", "on", "at", "from", "under", "as", "all",
+    "is", "are", "was", "were", "be", "been", "has", "have", "had", "do", "does", "did", "there", "their",
+    "them", "they", "what", "which", "who", "that", "those", "these", "me", "us", "we", "i", "s", "show",
+    "list", "give", "get", "display", "tell", "find", "fetch", "please", "data", "details", "via", "through",
+    "using", "during", "each", "every", "per", "far"
+})
+CITIZEN_NOUN_PATTERN = re.compile(r"\b(?:citizens?|people|persons|residents|individuals|population|beneficiar\w*)\b")
+
+# Aggregate questions: what is counted, grouped by what
+DISBURSEMENT_CUE = re.compile(r"\b(?:disburs\w*|amounts?|paid|payments?|payouts?|spent|spending|funds?|money|transfers?)\b")
+ENROLLMENT_CUE = re.compile(r"\b(?:enrol\w*|registrations?|registered|beneficiar\w*|participants?|participation)\b")
+STRICT_ENROLLMENT_CUE = re.compile(r"\b(?:enrol\w*|registrations?|registered)\b")
+TOTAL_CUE = re.compile(r"\b(?:total|sum|count|how many|number of|no\. of|summary|statistics|stats|average|avg|overall)\b")
+# Aggregate shape words; "average" is not among them, a measure slot has to say what is averaged
+AGGREGATE_CUE = (r"\b(?:total|sum|counts?|how many|how much|number of|no\. of|overall|summary|statistics|stats"
+                 r"|breakdown|distribution|trends?|analysis|split|profile|overview|figures)\b")
+_GROUP_BY = r"(?:by|per|each|every|across|for each|for every|in each|of each|grouped by|group by)\s+(?:the\s+)?"
+DIMENSION_PATTERNS = {
+    "scheme": [rf"\b{_GROUP_BY}schemes?\b", r"\bscheme[- ]?wise\b"],
+    "sector": [rf"\b{_GROUP_BY}sectors?\b", r"\bsector[- ]?wise\b"],
+    "state": [rf"\b{_GROUP_BY}states?\b", r"\bstate[- ]?wise\b"],
+    "district": [rf"\b{_GROUP_BY}districts?\b", r"\bdistrict[- ]?wise\b"],
+    "village": [rf"\b{_GROUP_BY}villages?\b", r"\bvillage[- ]?wise\b"],
+    "gender": [rf"\b{_GROUP_BY}genders?\b", r"\bgender[- ]?wise\b",
+               r"\bgender (?:distribution|breakdown|split|ratio|analysis|profile)\b"],
+    "age_group": [rf"\b{_GROUP_BY}age(?: groups?| brackets?| bands?)?\b", r"\bage[- ]?wise\b",
+                  r"\bage (?:groups?|brackets?|bands?|distribution|breakdown|analysis|profile)\b"],
+    "year": [rf"\b{_GROUP_BY}years?\b", r"\byear[- ]?wise\b", r"\b(?:yearly|annual|annually|year[- ]on[- ]year)\b"],
+    "month": [rf"\b{_GROUP_BY}months?\b", r"\bmonth[- ]?wise\b", r"\bmonthly\b"],
+    "status": [rf"\b{_GROUP_BY}status(?:es)?\b", r"\bstatus[- ]?wise\b"]
+}
+DIMENSION_PATTERNS = {name: re.compile("|".join(patterns)) for name, patterns in DIMENSION_PATTERNS.items()}
+DIMENSION_TRIGGER = "|".join(pattern.pattern for pattern in DIMENSION_PATTERNS.values())
+TIME_DIMENSIONS = ("year", "month")
+
+AGE_GROUP_SQL = """CASE
+    WHEN c.age < 18 THEN 'Under 18'
+    WHEN c.age BETWEEN 18 AND 30 THEN '18-30'
+    WHEN c.age BETWEEN 31 AND 50 THEN '31-50'
+    WHEN c.age BETWEEN 51 AND 65 THEN '51-65'
+    ELSE 'Over 65'
+END"""
+
+# Slots a question can carry; a template lists the ones it knows how to apply
+ALL_SLOTS = frozenset({"scheme", "sector", "state", "district", "gender", "age", "year", "month",
+                       "disability", "chronic", "limit"})
+AGGREGATE_SLOTS = ALL_SLOTS | {"status", "payment_mode", "measure"}
+CITIZEN_SLOTS = frozenset({"gender", "age", "state", "district", "disability", "chronic"})
+
+def _single(slots: Dict[str, Any], spans: List[Tuple[int, int]], name: str,
+            matches: List[Tuple[Any, Tuple[int, int]]]) -> bool:
+    """Record one slot from its (value, span) matches; False when they disagree"""
+    values = {value for value, _ in matches}
+    if len(values) > 1:
+        return False
+    if values:
+        slots[name] = values.pop()
+        spans += [span for _, span in matches]
+    return True
+
+def extract_slots(question: str) -> Optional[Tuple[Dict[str, Any], List[Tuple[int, int]]]]:
+    """
+    Slot values in a lower-cased question and the character spans of the words
+    they consumed, or None when a slot is given two different values.
+    """
+    slots: Dict[str, Any] = {}
+    spans: List[Tuple[int, int]] = []
+
+    match = LIMIT_PATTERN.search(question)
+    if match:
+        slots["limit"] = int(match.group(1))
+        spans.append(match.span())
+
+    low = high = None
+    for pattern in AGE_RANGE_PATTERNS:
+        match = pattern.search(question)
+        if match:
+            low, high = sorted((int(match.group(1)), int(match.group(2))))
+            spans.append(match.span())
+            break
+    if low is None:
+        for pattern, offset in AGE_MIN_PATTERNS:
+            match = pattern.search(question)
+            if match:
+                low = int(next(group for group in match.groups() if group)) + offset
+                spans.append(match.span())
+                break
+        for pattern, offset in AGE_MAX_PATTERNS:
+            match = pattern.search(question)
+            if match:
+                high = int(match.group(1)) + offset
+                spans.append(match.span())
+                break
+        if low is None and high is None:
+            for pattern, bounds in AGE_WORDS:
+                match = pattern.search(question)
+                if match:
+                    low, high = bounds
+                    spans.append(match.span())
+                    break
+    if low is not None or high is not None:
+        slots["age"] = [low, high]
+
+    match = DISABILITY_THRESHOLD_PATTERN.search(question) if "disab" in question else None
+    if match:
+        percent = int(match.group(2))
+        slots["disability"] = percent + 1 if match.group(1) != "at least" else percent
+        spans.append(match.span())
+    for match in DISABILITY_PATTERN.finditer(question):
+        slots.setdefault("disability", 0)
+        spans.append(match.span())
+    for match in CHRONIC_PATTERN.finditer(question):
+        slots["chronic"] = True
+        spans.append(match.span())
+
+    matches = [(name, match.span()) for name, pattern in SCHEME_PATTERNS.items() for match in pattern.finditer(question)]
+    if not _single(slots, spans, "scheme", matches):
+        return None
+    if "scheme" in slots:
+        spans += [match.span() for match in SCHEME_NOUN_PATTERN.finditer(question)]
+
+    matches = [(name, match.span()) for name, pattern in STATUS_PATTERNS.items() for match in pattern.finditer(question)]
+    if not _single(slots, spans, "status", matches):
+        return None
+    matches = [(name, match.span()) for name, pattern in PAYMENT_MODE_PATTERNS.items()
+               for match in pattern.finditer(question)]
+    if not _single(slots, spans, "payment_mode", matches):
+        return None
+    matches = [(name, match.span()) for name, pattern in MEASURE_PATTERNS.items() for match in pattern.finditer(question)]
+    if not _single(slots, spans, "measure", matches):
+        return None
+
+    matches = [(match.group(1).title(), match.span()) for match in STATE_PATTERN.finditer(question)]
+    if not _single(slots, spans, "state", matches):
+        return None
+
+    for pattern in DISTRICT_PATTERNS if "district" in question else ():
+        match = pattern.search(question)
+        if match and not PLACE_STOPWORDS.intersection(match.group(1).split()):
+            slots["district"] = match.group(1).title()
+            spans.append(match.span())
+            break
+
+    match = SECTOR_PATTERN.search(question) if "sector" in question else None
+    if match and not PLACE_STOPWORDS.intersection(match.group(1).split()[-1:]):
+        slots["sector"] = match.group(1).split()[-1]
+        spans.append((match.end(1) - len(slots["sector"]), match.end()))
+
+    female, male = list(FEMALE_PATTERN.finditer(question)), list(MALE_PATTERN.finditer(question))
+    if female and not male:
+        slots["gender"] = "Female"
+    elif male and not female:
+        slots["gender"] = "Male"
+    if "gender" in slots:
+        spans += [match.span() for match in female + male]
+
+    current = datetime.now().year
+    matches = [(int(match.group(0)), match.span()) for match in YEAR_PATTERN.finditer(question)]
+    matches += [(current if match.group(0).split()[0] in ("this", "current") else current - 1, match.span())
+                for match in RELATIVE_YEAR_PATTERN.finditer(question)]
+    if not _single(slots, spans, "year", matches):
+        return None
+
+    matches = []
+    for match in MONTH_PATTERN.finditer(question):
+        word = next(group for group in match.groups() if group)
+        matches.append((next(index for index, name in enumerate(MONTHS, 1) if name.startswith(word[:3])), match.span()))
+    if not _single(slots, spans, "month", matches):
+        return None
+    return slots, spans
+
+def _unconsumed_word(question: str, spans: List[Tuple[int, int]]) -> bool:
+    """True when the question has a word that is neither filler nor inside a consumed span"""
+    return any(match.group(0) not in FILLER_WORDS
+               and not any(start <= match.start() and match.end() <= end for start, end in spans)
+               for match in WORD_PATTERN.finditer(question))
+
+class SelectBuilder:
+    """Accumulates the pieces of one SELECT and the tables it touches"""
+
+    def __init__(self, table: str, alias: str):
+        self.from_clause = f"{table} {alias}"
+        self.tables: Set[str] = {table}
+        self.aliases: Set[str] = {alias}
+        self.top: Optional[int] = None
+        self.columns: List[str] = []
+        self.joins: List[str] = []
+        self.where: List[str] = []
+        self.group_by: List[str] = []
+        self.having: List[str] = []
+        self.order_by: List[str] = []
+
+    def join(self, alias: str, table: str, condition: str, kind: str = "JOIN") -> None:
+        if alias not in self.aliases:
+            self.joins.append(f"{kind} {table} {alias} ON {condition}")
+            self.aliases.add(alias)
+            self.tables.add(table)
+
+    def render(self) -> str:
+        lines = [("SELECT TOP %d " % self.top if self.top else "SELECT ") + ",\n       ".join(self.columns),
+                 f"FROM {self.from_clause}"]
+        lines += self.joins
+        if self.where:
+            lines.append("WHERE " + "\n  AND ".join(self.where))
+        if self.group_by:
+            lines.append("GROUP BY " + ", ".join(self.group_by))
+        if self.having:
+            lines.append("HAVING " + " AND ".join(self.having))
+        if self.order_by:
+            lines.append("ORDER BY " + ", ".join(self.order_by))
+        return "\n".join(lines)
+
+def _join_citizens(query: SelectBuilder, fact_alias: str) -> None:
+    if fact_alias != "c":
+        query.join("c", "citizens", f"c.citizen_id = {fact_alias}.citizen_id")
+
+def _join_geography(query: SelectBuilder, level: str) -> None:
+    """Citizen geography chain up to village, district or state"""
+    query.join("v", "villages", "v.village_id = c.village_id")
+    if level in ("district", "state"):
+        query.join("dt", "districts", "dt.district_id = v.district_id")
+    if level == "state":
+        query.join("st", "states", "st.state_id = dt.state_id")
+
+def _like_any(column: str, patterns: List[str]) -> str:
+    return "(" + " OR ".join(f"{column} LIKE '%{pattern}%'" for pattern in patterns) + ")"
+
+def _date_filter(column: str, year: Optional[int], month: Optional[int]) -> str:
+    """Range predicates where possible so an index on the date column can be used"""
+    if year is None:
+        return f"MONTH({column}) = {month}"
+    if month is None:
+        return f"{column} >= '{year}-01-01' AND {column} < '{year + 1}-01-01'"
+    end_year, end_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{column} >= '{year}-{month:02d}-01' AND {column} < '{end_year}-{end_month:02d}-01'"
+
+def _apply_filters(query: SelectBuilder, slots: Dict[str, Any], fact_alias: str,
+                   scheme_alias: Optional[str] = None, date_column: Optional[str] = None) -> bool:
+    """Add WHERE clauses (and the joins they need) for the slots; False if a slot cannot apply"""
+    if CITIZEN_SLOTS & slots.keys():
+        _join_citizens(query, fact_alias)
+    if "gender" in slots:
+        query.where.append(f"c.gender = '{slots['gender']}'")
+    if "age" in slots:
+        low, high = slots["age"]
+        if low is not None and high is not None:
+            query.where.append(f"c.age BETWEEN {low} AND {high}")
+        elif low is not None:
+            query.where.append(f"c.age >= {low}")
+        else:
+            query.where.append(f"c.age <= {high}")
+    if "state" in slots:
+        _join_geography(query, "state")
+        query.where.append(f"st.name LIKE '%{slots['state']}%'")
+    if "district" in slots:
+        _join_geography(query, "district")
+        query.where.append(f"dt.name LIKE '%{slots['district']}%'")
+    if "disability" in slots or "chronic" in slots:
+        query.join("h", "health_details", "h.citizen_id = c.citizen_id")
+    if "disability" in slots:
+        if slots["disability"]:
+            # disability_status reads like 'Visual impairment - 80%'
+            percents = [str(percent) for percent in range(10, 101, 10) if percent >= slots["disability"]]
+            if not percents:
+                return False
+            query.where.append(_like_any("h.disability_status", percents))
+        else:
+            query.where.append("h.disability_status IS NOT NULL AND h.disability_status <> 'None'")
+    if "chronic" in slots:
+        query.where.append("h.chronic_conditions IS NOT NULL AND h.chronic_conditions <> 'None'")
+    if "scheme" in slots or "sector" in slots:
+        if scheme_alias is None:
+            return False
+        query.join("s", "schemes", f"s.scheme_id = {scheme_alias}.scheme_id")
+    if "scheme" in slots:
+        query.where.append(_like_any("s.name", SCHEME_SLOTS[slots["scheme"]][1]))
+    if "sector" in slots:
+        query.where.append(f"s.sector LIKE '%{slots['sector']}%'")
+    if "year" in slots or "month" in slots:
+        if date_column is None:
+            return False
+        query.where.append(_date_filter(date_column, slots.get("year"), slots.get("month")))
+    return True
+
+def _dimensions(question: str) -> List[str]:
+    """Group-by dimensions named in the question, in the order they appear"""
+    found = []
+    for name, pattern in DIMENSION_PATTERNS.items():
+        match = pattern.search(question)
+        if match:
+            found.append((match.start(), name))
+    return [name for _, name in sorted(found)]
+
+# Aggregate facts: table, alias, date column, measures (first one orders the result)
+FACTS = {
+    "disbursements": ("disbursements", "d", "d.disbursed_on", [
+        "SUM(d.amount) AS total_amount", "COUNT(d.disbursement_id) AS disbursement_count",
+        "COUNT(DISTINCT d.citizen_id) AS beneficiaries", "AVG(d.amount) AS average_amount"]),
+    "enrollments": ("enrollments", "e", "e.enrollment_date", [
+        "COUNT(e.enrollment_id) AS enrollment_count", "COUNT(DISTINCT e.citizen_id) AS beneficiaries"]),
+    "citizens": ("citizens", "c", None, [
+        "COUNT(c.citizen_id) AS citizen_count", "AVG(c.age) AS average_age"])
+}
+
+def _aggregate(slots: Dict[str, Any], question: str) -> Optional[SelectBuilder]:
+    """Disbursement, enrollment or citizen totals, optionally grouped by up to two dimensions"""
+    dimensions = _dimensions(question)
+    if len(dimensions) > 2:
+        return None
+    paid, enrolled = DISBURSEMENT_CUE.search(question), ENROLLMENT_CUE.search(question)
+    if paid and STRICT_ENROLLMENT_CUE.search(question):
+        return None
+    if paid:
+        fact = "disbursements"
+    elif enrolled or "scheme" in slots or "sector" in slots or {"scheme", "sector", "status"} & set(dimensions):
+        fact = "enrollments"
+    else:
+        fact = "citizens"
+    table, alias, date_column, measures = FACTS[fact]
+    if "status" in slots and table not in STATUS_SLOTS[slots["status"]][1]:
+        return None
+    if "payment_mode" in slots and fact != "disbursements":
+        return None
+    if "measure" in slots:
+        if slots["measure"] == "average_amount" and fact != "disbursements":
+            return None
+        measures = [next(measure for measure in FACTS[fact][3] + FACTS["citizens"][3]
+                         if measure.endswith(" AS " + slots["measure"]))]
+    if "month" in dimensions and "year" not in dimensions and "year" not in slots:
+        dimensions.insert(dimensions.index("month"), "year")
+
+    query = SelectBuilder(table, alias)
+    scheme_alias = alias if alias != "c" else None
+    for dimension in dimensions:
+        if dimension in ("scheme", "sector"):
+            query.join("s", "schemes", f"s.scheme_id = {alias}.scheme_id")
+            column = "s.name AS scheme_name" if dimension == "scheme" else "s.sector"
+            query.columns.append(column)
+            query.group_by += ["s.scheme_id", "s.name"] if dimension == "scheme" else ["s.sector"]
+        elif dimension in ("state", "district", "village"):
+            _join_citizens(query, alias)
+            _join_geography(query, dimension)
+            prefix = {"state": "st", "district": "dt", "village": "v"}[dimension]
+            query.columns.append(f"{prefix}.name AS {dimension}_name")
+            query.group_by += [f"{prefix}.{dimension}_id", f"{prefix}.name"]
+        elif dimension == "gender":
+            _join_citizens(query, alias)
+            query.columns.append("c.gender")
+            query.group_by.append("c.gender")
+        elif dimension == "age_group":
+            _join_citizens(query, alias)
+            query.columns.append(f"{AGE_GROUP_SQL} AS age_group")
+            query.group_by.append(AGE_GROUP_SQL)
+        elif dimension in TIME_DIMENSIONS:
+            if date_column is None:
+                return None
+            function = dimension.upper()
+            query.columns.append(f"{function}({date_column}) AS {dimension}_number")
+            query.group_by.append(f"{function}({date_column})")
+            query.order_by.append(f"{dimension}_number")
+        elif dimension == "status":
+            if alias == "c":
+                return None
+            query.columns.append(f"{alias}.status")
+            query.group_by.append(f"{alias}.status")
+    query.columns += measures
+    if "c.age" in measures[0]:
+        _join_citizens(query, alias)
+    if "status" in slots:
+        query.where.append(f"{alias}.status = '{STATUS_SLOTS[slots['status']][1][table]}'")
+    if "payment_mode" in slots:
+        query.where.append(f"d.payment_mode LIKE '%{slots['payment_mode']}%'")
+    if not _apply_filters(query, slots, alias, scheme_alias, date_column):
+        return None
+    if query.group_by and not query.order_by:
+        query.order_by.append(measures[0].rsplit(" AS ", 1)[1] + " DESC")
+    query.top = slots.get("limit")
+    return query
+
+def _verification_backlog(slots: Dict[str, Any], question: str) -> Optional[SelectBuilder]:
+    """Pending enrollments per assigned officer and scheme"""
+    if slots.get("status", "pending") not in ("pending", "under_review"):
+        return None
+    query = SelectBuilder("enrollments", "e")
+    query.join("o", "officers", "o.officer_id = e.verified_by")
+    query.join("s", "schemes", "s.scheme_id = e.scheme_id")
+    query.columns += ["o.name AS officer_name", "o.designation", "s.name AS scheme_name",
+                      "COUNT(e.enrollment_id) AS pending_verifications",
+                      "MIN(e.enrollment_date) AS oldest_pending"]
+    query.where.append("e.status IN ('Pending', 'Under Review')")
+    if not _apply_officer_filters(query, slots, "e.enrollment_date"):
+        return None
+    query.group_by += ["o.officer_id", "o.name", "o.designation", "s.scheme_id", "s.name"]
+    query.order_by.append("pending_verifications DESC")
+    query.top = slots.get("limit")
+    # The deployed schema records verifications on enrollments (verified_by, last_verified_on)
+    query.tables.add("verifications")
+    return query
+
+def _officer_verifications(slots: Dict[str, Any], question: str) -> Optional[SelectBuilder]:
+    """Verifications completed per officer"""
+    query = SelectBuilder("officers", "o")
+    query.join("e", "enrollments", "e.verified_by = o.officer_id")
+    query.join("dt", "districts", "dt.district_id = o.district_id")
+    query.columns += ["o.officer_id", "o.name AS officer_name", "o.designation", "dt.name AS district_name",
+                      "COUNT(e.enrollment_id) AS verification_count"]
+    query.where.append("e.last_verified_on IS NOT NULL")
+    if not _apply_officer_filters(query, slots, "e.last_verified_on"):
+        return None
+    query.group_by += ["o.officer_id", "o.name", "o.designation", "dt.name"]
+    query.order_by.append("verification_count DESC")
+    superlative = re.search(r"\b(?:highest|most|top|maximum|busiest)\b", question)
+    query.top = slots.get("limit") or (10 if superlative else None)
+    query.tables.add("verifications")
+    return query
+
+def _apply_officer_filters(query: SelectBuilder, slots: Dict[str, Any], date_column: str) -> bool:
+    """Scheme, officer location and date filters for the officer templates"""
+    if "scheme" in slots:
+        query.join("s", "schemes", "s.scheme_id = e.scheme_id")
+        query.where.append(_like_any("s.name", SCHEME_SLOTS[slots["scheme"]][1]))
+    if "district" in slots or "state" in slots:
+        query.join("dt", "districts", "dt.district_id = o.district_id")
+    if "district" in slots:
+        query.where.append(f"dt.name LIKE '%{slots['district']}%'")
+    if "state" in slots:
+        query.join("st", "states", "st.state_id = dt.state_id")
+        query.where.append(f"st.name LIKE '%{slots['state']}%'")
+    if "year" in slots or "month" in slots:
+        query.where.append(_date_filter(date_column, slots.get("year"), slots.get("month")))
+    return True
+
+def _top_beneficiaries(slots: Dict[str, Any], question: str) -> Optional[SelectBuilder]:
+    """Citizens with the largest disbursed totals"""
+    query = SelectBuilder("citizens", "c")
+    query.join("d", "disbursements", "d.citizen_id = c.citizen_id")
+    query.columns += ["c.citizen_id", "c.name", "c.gender", "c.age",
+                      "COUNT(DISTINCT d.scheme_id) AS schemes_count", "SUM(d.amount) AS total_amount_received",
+                      "MAX(d.disbursed_on) AS last_disbursement_date"]
+    if not _apply_filters(query, slots, "c", "d", "d.disbursed_on"):
+        return None
+    query.group_by += ["c.citizen_id", "c.name", "c.gender", "c.age"]
+    query.order_by.append("total_amount_received DESC")
+    query.top = slots.get("limit", 10)
+    query.tables.add("schemes")
+    return query
+
+def _multi_scheme_citizens(slots: Dict[str, Any], question: str) -> Optional[SelectBuilder]:
+    """Citizens enrolled in more than one scheme, with bank details when asked for"""
+    return _scheme_count_citizens(slots, question, "COUNT(DISTINCT e.scheme_id) > 1")
+
+def _all_schemes_citizens(slots: Dict[str, Any], question: str) -> Optional[SelectBuilder]:
+    """Citizens enrolled in every scheme"""
+    return _scheme_count_citizens(slots, question, "COUNT(DISTINCT e.scheme_id) = (SELECT COUNT(*) FROM schemes)")
+
+def _scheme_count_citizens(slots: Dict[str, Any], question: str, having: str) -> Optional[SelectBuilder]:
+    query = SelectBuilder("citizens", "c")
+    query.join("e", "enrollments", "e.citizen_id = c.citizen_id")
+    query.columns += ["c.citizen_id", "c.name AS citizen_name", "c.aadhaar_no"]
+    query.group_by += ["c.citizen_id", "c.name", "c.aadhaar_no"]
+    if re.search(r"\bbank\b|\baccounts?\b", question):
+        query.join("ba", "bank_accounts", "ba.citizen_id = c.citizen_id", kind="LEFT JOIN")
+        query.columns += ["ba.bank_name", "ba.account_no", "ba.ifsc_code"]
+        query.group_by += ["ba.bank_name", "ba.account_no", "ba.ifsc_code"]
+    query.columns.append("COUNT(DISTINCT e.scheme_id) AS scheme_count")
+    if not _apply_filters(query, slots, "c"):
+        return None
+    query.having.append(having)
+    query.order_by.append("scheme_count DESC")
+    query.top = slots.get("limit")
+    query.tables.add("schemes")
+    return query
+
+def _unbanked_citizens(slots: Dict[str, Any], question: str) -> Optional[SelectBuilder]:
+    """Citizens with no bank account; with their disbursed totals when the question is about payments"""
+    query = SelectBuilder("citizens", "c")
+    query.join("ba", "bank_accounts", "ba.citizen_id = c.citizen_id", kind="LEFT JOIN")
+    query.columns += ["c.citizen_id", "c.name", "c.mobile_no", "c.email"]
+    query.where.append("ba.account_id IS NULL")
+    if DISBURSEMENT_CUE.search(question) or re.search(r"\breceiv", question):
+        query.join("d", "disbursements", "d.citizen_id = c.citizen_id")
+        query.columns += ["COUNT(d.disbursement_id) AS disbursement_count", "SUM(d.amount) AS total_disbursed"]
+        query.group_by += ["c.citizen_id", "c.name", "c.mobile_no", "c.email"]
+        query.order_by.append("total_disbursed DESC")
+        if not _apply_filters(query, slots, "c", "d", "d.disbursed_on"):
+            return None
+    else:
+        query.order_by.append("c.citizen_id")
+        if not _apply_filters(query, slots, "c"):
+            return None
+    query.top = slots.get("limit")
+    return query
+
+def _schemes_list(slots: Dict[str, Any], question: str) -> Optional[SelectBuilder]:
+    """The scheme catalogue, optionally narrowed by scheme group or sector"""
+    query = SelectBuilder("schemes", "s")
+    query.columns += ["s.scheme_id", "s.name", "s.sector", "s.frequency", "s.benefit_type"]
+    if not _apply_filters(query, slots, "s", "s"):
+        return None
+    query.order_by.append("s.scheme_id")
+    return query
+
+def _citizen_list(slots: Dict[str, Any], question: str) -> Optional[SelectBuilder]:
+    """Citizens matching demographic, location, health and scheme filters"""
+    if not CITIZEN_SLOTS & slots.keys() and "scheme" not in slots:
+        return None
+    if TOTAL_CUE.search(question) or _dimensions(question):
+        return None
+    query = SelectBuilder("citizens", "c")
+    query.columns += ["c.citizen_id", "c.name", "c.gender", "c.age", "c.mobile_no"]
+    scheme_alias = None
+    if "scheme" in slots or ENROLLMENT_CUE.search(question):
+        query.join("e", "enrollments", "e.citizen_id = c.citizen_id")
+        query.join("s", "schemes", "s.scheme_id = e.scheme_id")
+        query.columns += ["s.name AS scheme_name", "e.enrollment_date", "e.status"]
+        scheme_alias = "e"
+    if "state" in slots or "district" in slots:
+        _join_geography(query, "state")
+        query.columns += ["dt.name AS district_name", "st.name AS state_name"]
+    if "disability" in slots or "chronic" in slots:
+        query.join("h", "health_details", "h.citizen_id = c.citizen_id")
+        query.columns += ["h.chronic_conditions", "h.disability_status"]
+    if not _apply_filters(query, slots, "c", scheme_alias):
+        return None
+    query.order_by.append("c.age" if "age" in slots else "c.citizen_id")
+    query.top = slots.get("limit", 100)
+    return query
+
+class QueryTemplate:
+    """
+    One question shape: a trigger pattern, the slots it can apply, the words it
+    accounts for besides its slots and citizen nouns, and its SQL builder
+    """
+
+    __slots__ = ("name", "pattern", "slots", "vocabulary", "negation", "build")
+
+    def __init__(self, name: str, pattern: str, slots, vocabulary: str,
+                 build: Callable[[Dict[str, Any], str], Optional[SelectBuilder]], negation: bool = False):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.slots = frozenset(slots)
+        self.vocabulary = re.compile(vocabulary)
+        self.negation = negation
+        self.build = build
+
+FACT_VOCABULARY = rf"{DISBURSEMENT_CUE.pattern}|{ENROLLMENT_CUE.pattern}|\breceiv\w*"
+
+# First match wins, so specific shapes come before the general aggregate and list shapes
+TEMPLATES = [
+    QueryTemplate("verification_backlog",
+                  r"^(?=.*\bverif)(?=.*\b(?:backlog|pending|outstanding|awaiting|under review)\b)",
+                  {"scheme", "state", "district", "year", "month", "limit", "status"},
+                  r"\b(?:verif\w*|backlogs?|pending|outstanding|awaiting|under review|officers?|assigned|schemes?)\b",
+                  _verification_backlog),
+    QueryTemplate("officer_verifications", r"\bofficers?\b.*\bverif|\bverif\w*\b.*\b(?:by|per|each)\s+officers?\b",
+                  {"scheme", "state", "district", "year", "month", "limit"},
+                  r"\b(?:officers?|verif\w*|highest|most|top|maximum|busiest|number of|count|total|completed|done"
+                  r"|performed|conducted|activity)\b",
+                  _officer_verifications),
+    QueryTemplate("unbanked_citizens",
+                  r"\b(?:without|no|missing)\s+(?:a\s+|any\s+)?bank(?:\s+accounts?)?\b|\bunbanked\b",
+                  ALL_SLOTS - {"sector"},
+                  rf"\b(?:without|no|missing|any|bank|accounts?|unbanked)\b|{FACT_VOCABULARY}",
+                  _unbanked_citizens, negation=True),
+    QueryTemplate("top_beneficiaries",
+                  r"\b(?:maximum|max|highest|most|largest|biggest)\s+(?:total\s+)?benefits?\b"
+                  r"|\b(?:top|highest[- ]paid|biggest)\s+(?:\d+\s+)?(?:beneficiar\w*|recipients?)\b",
+                  ALL_SLOTS - {"sector"},
+                  rf"\b(?:maximum|max|highest|most|largest|biggest|top|total|benefits?|recipients?|highest[- ]paid)\b"
+                  rf"|{FACT_VOCABULARY}",
+                  _top_beneficiaries),
+    QueryTemplate("all_schemes_citizens",
+                  r"\b(?:enrol\w*|registered)\s+(?:in|for|under)\s+(?:all|every)\s+(?:(?:the|available|of the)\s+)*schemes?\b",
+                  {"state", "district", "gender", "age", "disability", "chronic", "limit"},
+                  r"\b(?:enrol\w*|registered|available|schemes?)\b",
+                  _all_schemes_citizens),
+    QueryTemplate("multi_scheme_citizens",
+                  r"\b(?:multiple|several|more than one|two or more)\s+schemes\b",
+                  {"state", "district", "gender", "age", "disability", "chronic", "limit"},
+                  r"\b(?:multiple|several|more than one|two or more|schemes|enrol\w*|registered|bank|accounts?)\b",
+                  _multi_scheme_citizens),
+    QueryTemplate("aggregate", rf"{AGGREGATE_CUE}|\b(?:average|avg|mean)\b|{DIMENSION_TRIGGER}", AGGREGATE_SLOTS,
+                  rf"{AGGREGATE_CUE}|{DIMENSION_TRIGGER}|{FACT_VOCABULARY}", _aggregate),
+    QueryTemplate("schemes_list",
+                  r"^\s*(?:list|show|display|what are|which are|give me|get|all|available)\b.*\bschemes?\b",
+                  {"scheme", "sector"}, r"\b(?:schemes?|available|programs?|programmes?)\b", _schemes_list),
+    QueryTemplate("citizen_list", r"\b(?:citizens?|people|persons|residents|beneficiar\w*|individuals|women|men)\b",
+                  ALL_SLOTS - {"year", "month", "sector"},
+                  r"\b(?:enrol\w*|registered|living|residing|live|names?|having|aged)\b", _citizen_list)
+]
+
+class TemplateEngine:
+    """Answers covered questions from the template library; misses go on to the LLM"""
+
+    def __init__(self, pruner: SchemaPruner, templates: List[QueryTemplate] = TEMPLATES):
+        self.pruner = pruner
+        self.templates = templates
+        self.enabled = os.getenv("QUERY_TEMPLATES_ENABLED", "true").lower() == "true"
+        self._lock = threading.Lock()
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "match_us_total": 0.0,
+            "by_template": {}
+        }
+
+    def match(self, question: str) -> Optional[Dict[str, Any]]:
+        """{"sql", "template", "slots"} for a covered question, else None"""
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        result = self._match(question.lower().strip())
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        with self._lock:
+            self.stats["lookups"] += 1
+            self.stats["match_us_total"] += elapsed_us
+            if result:
+                self.stats["hits"] += 1
+                self.stats["by_template"][result["template"]] = self.stats["by_template"].get(result["template"], 0) + 1
+            else:
+                self.stats["misses"] += 1
+        if result:
+            result["match_us"] = round(elapsed_us, 1)
+        return result
+
+    def _match(self, question: str) -> Optional[Dict[str, Any]]:
+        extracted = extract_slots(question)
+        if extracted is None:
+            return None
+        slots, spans = extracted
+        spans += [match.span() for match in CITIZEN_NOUN_PATTERN.finditer(question)]
+        negated = NEGATION_PATTERN.search(question) is not None
+        implied = set(self.pruner.matched_tables(question)) - {"citizens"}
+        for template in self.templates:
+            if (negated and not template.negation) or slots.keys() - template.slots:
+                continue
+            if not template.pattern.search(question):
+                continue
+            if _unconsumed_word(question, spans + [match.span() for match in template.vocabulary.finditer(question)]):
+                continue
+            query = template.build(slots, question)
+            # Every table the question implies must be one the template actually used
+            if query is None or implied - query.tables:
+                continue
+            return {"sql": query.render(), "template": template.name, "slots": slots}
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["by_template"] = dict(self.stats["by_template"])
+        lookups = stats["lookups"]
+        stats["coverage_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["avg_match_us"] = round(stats.pop("match_us_total") / lookups, 1) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        stats["templates"] = len(self.templates)
+        return stats
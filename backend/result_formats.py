@@ -0,0 +1,77 @@
+"""
+Columnar result encodings for query responses
+Apache Arrow IPC stream (when pyarrow is installed) and column-oriented JSON,
+so clients can build DataFrames without re-pivoting row dicts
+"""
+import json
+import time
+import logging
+from decimal import Decimal
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNAR_JSON_MEDIA_TYPE = "application/json"
+
+# Schema metadata key carrying the non-data part of the response in Arrow payloads
+ARROW_METADATA_KEY = b"response"
+
+def arrow_available() -> bool:
+    """Whether Arrow IPC encoding is possible in this process"""
+    return pa is not None
+
+def _arrow_array(values: List[Any]):
+    """Build an Arrow array for one column, matching the JSON path's value types"""
+    try:
+        array = pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type column (possible on SQLite) - ship it as text
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+    if pa.types.is_decimal(array.type):
+        # JSON responses expose DECIMAL as float; keep Arrow consistent and numeric for charts
+        return array.cast(pa.float64())
+    return array
+
+def encode_arrow(columns: List[str], data: Dict[str, List[Any]],
+                 metadata: Optional[Dict[str, Any]] = None) -> Tuple[bytes, float]:
+    """
+    Encode typed columns as an Arrow IPC stream.
+    Returns (payload, encode_ms); metadata is stored as JSON in the schema metadata.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed")
+    start = time.perf_counter()
+    table = pa.table({column: _arrow_array(data[column]) for column in columns})
+    if metadata:
+        table = table.replace_schema_metadata({ARROW_METADATA_KEY: json.dumps(metadata, default=str)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    payload = sink.getvalue().to_pybytes()
+    return payload, (time.perf_counter() - start) * 1000
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_columnar_json(content: Dict[str, Any]) -> Tuple[bytes, float]:
+    """Encode a response whose "data" is column name -> values. Returns (payload, encode_ms)"""
+    start = time.perf_counter()
+    if orjson is not None:
+        payload = orjson.dumps(content, default=_json_default)
+    else:
+        payload = json.dumps(content, default=_json_default, separators=(",", ":")).encode("utf-8")
+    return payload, (time.perf_counter() - start) * 1000
@@ -0,0 +1,172 @@
+"""
+Eligibility endpoints: batch evaluation and what-if simulation of scheme_eligibility rules
+"""
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import JSONResponse
+from typing import Optional
+from pydantic import BaseModel
+import logging
+
+import sys
+import os
+
+# Add parent directory to path for imports
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from db import get_db_connection
+from auth import verify_token, check_permission
+from eligibility import get_eligibility_engine, get_eligibility_simulator
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+class EligibilityRunRequest(BaseModel):
+    """Request model for a batch eligibility run"""
+    write: bool = True
+    state_id: Optional[int] = None
+    processes: int = 1
+
+class EligibilitySimulationRequest(BaseModel):
+    """What-if change to one scheme's rule; fields left out keep their current value, null removes a criterion"""
+    scheme_id: int
+    min_age: Optional[int] = None
+    max_age: Optional[int] = None
+    gender: Optional[str] = None
+    disability_required: Optional[bool] = None
+    category_required: Optional[str] = None
+    min_income: Optional[float] = None
+    breakdown: str = "state"
+    top: int = 20
+
+SIMULATION_FIELDS = ("min_age", "max_age", "gender", "disability_required", "category_required", "min_income")
+
+def _authorize(token: Optional[str], permission: str) -> None:
+    if not token:
+        raise HTTPException(status_code=401, detail="Authentication required for eligibility runs")
+    clean_token = token.replace("Bearer ", "") if token.startswith("Bearer ") else token
+    auth_result = verify_token(clean_token)
+    if auth_result["status"] != "success":
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+    if not check_permission(clean_token, permission):
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+@router.post("/eligibility/run")
+async def run_eligibility(
+    request: EligibilityRunRequest,
+    token: Optional[str] = Header(None, alias="Authorization")
+):
+    """
+    Evaluate every scheme's eligibility rules for all citizens (or one state) and,
+    when write is true, append the outcomes to eligibility_log.
+    processes > 1 shards the evaluation by state across worker processes.
+    """
+    try:
+        _authorize(token, "write" if request.write else "read")
+        processes = max(1, min(request.processes, os.cpu_count() or 1))
+        engine = get_eligibility_engine()
+        run = await get_db_connection().run_in_executor(
+            engine.run, write=request.write, state_id=request.state_id, processes=processes
+        )
+        message = f"Evaluated {run['evaluations']} citizen x scheme pairs"
+        if request.write:
+            message += f", wrote {run['rows_written']} eligibility_log rows"
+        return JSONResponse(content={
+            "success": True,
+            "status": "success",
+            "message": message,
+            **run
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Eligibility run failed: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "status": "error",
+                "message": f"Eligibility run failed: {str(e)}",
+                "error_type": "eligibility_failed"
+            }
+        )
+
+@router.post("/eligibility/simulate")
+async def simulate_eligibility(
+    request: EligibilitySimulationRequest,
+    token: Optional[str] = Header(None, alias="Authorization")
+):
+    """
+    How many citizens would gain or lose eligibility if a scheme's rule changed,
+    broken down by state, district or village. Only the changed predicates are
+    recomputed against cached per-rule masks.
+    """
+    try:
+        if token:
+            _authorize(token, "read")
+        changes = {field: getattr(request, field) for field in SIMULATION_FIELDS if field in request.model_fields_set}
+        if not changes:
+            raise HTTPException(status_code=400, detail=f"Specify at least one of: {', '.join(SIMULATION_FIELDS)}")
+
+        simulation = await get_db_connection().run_in_executor(
+            get_eligibility_simulator().simulate, request.scheme_id, changes,
+            breakdown=request.breakdown, top=max(1, request.top)
+        )
+        return JSONResponse(content={
+            "success": True,
+            "status": "success",
+            "message": (f"{simulation['scheme']}: {simulation['net_change']:+d} eligible citizens "
+                        f"({simulation['baseline_eligible']} -> {simulation['simulated_eligible']})"),
+            **simulation
+        })
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "status": "error", "message": str(e), "error_type": "invalid_simulation"}
+        )
+    except KeyError as e:
+        return JSONResponse(
+            status_code=404,
+            content={"success": False, "status": "error", "message": str(e.args[0]), "error_type": "unknown_scheme"}
+        )
+    except Exception as e:
+        logger.error(f"Eligibility simulation failed: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "status": "error",
+                "message": f"Eligibility simulation failed: {str(e)}",
+                "error_type": "simulation_failed"
+            }
+        )
+
+@router.get("/eligibility/rules")
+async def get_eligibility_rules(token: Optional[str] = Header(None, alias="Authorization")):
+    """Scheme rules as the engine reads them, including criteria it cannot verify"""
+    try:
+        if token:
+            _authorize(token, "read")
+        rules = await get_db_connection().run_in_executor(get_eligibility_engine().load_rules)
+        return JSONResponse(content={
+            "success": True,
+            "status": "success",
+            "rules": [rule.to_dict() for rule in rules]
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to load eligibility rules: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "status": "error",
+                "message": f"Failed to load eligibility rules: {str(e)}"
+            }
+        )
@@ -0,0 +1,106 @@
+"""
+Bulk ingestion endpoint for enrollment and disbursement batch files
+"""
+from fastapi import APIRouter, HTTPException, Header, Query, Request
+from fastapi.responses import JSONResponse
+from typing import Optional
+import logging
+
+import sys
+import os
+
+# Add parent directory to path for imports
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from auth import verify_token, check_permission
+from ingestion import INGEST_TABLES, INGEST_MEDIA_TYPES, IngestionError, get_bulk_ingestor
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _upload_format(requested: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """Upload format from ?format= or the Content-Type header; CSV when neither says otherwise"""
+    if requested:
+        return requested.lower()
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    for name, media_type in INGEST_MEDIA_TYPES.items():
+        if content_type == media_type:
+            return name
+    if content_type in ("application/jsonl", "application/json-lines"):
+        return "ndjson"
+    return "csv"
+
+@router.post("/ingest/{table}")
+async def ingest_table(
+    table: str,
+    request: Request,
+    token: Optional[str] = Header(None, alias="Authorization"),
+    format: Optional[str] = Query(None, description="Upload format: csv or ndjson (default from Content-Type)")
+):
+    """
+    Bulk-load a CSV or NDJSON file into enrollments or disbursements.
+
+    The request body is the raw file (e.g. curl --data-binary @batch.csv). Rows are
+    validated and inserted in batches; invalid rows and failed batches are listed
+    in the response while the rest of the file is still loaded.
+    """
+    try:
+        if not token:
+            raise HTTPException(status_code=401, detail="Authentication required for bulk ingestion")
+
+        clean_token = token.replace("Bearer ", "") if token.startswith("Bearer ") else token
+        auth_result = verify_token(clean_token)
+        if auth_result["status"] != "success":
+            raise HTTPException(status_code=401, detail="Invalid authentication token")
+
+        if not check_permission(clean_token, "write"):
+            raise HTTPException(status_code=403, detail="Insufficient permissions for bulk ingestion")
+
+        table = table.lower()
+        if table not in INGEST_TABLES:
+            raise HTTPException(status_code=404, detail=f"Ingestion is not supported for table '{table}'. "
+                                                        f"Supported tables: {', '.join(INGEST_TABLES)}")
+
+        upload_format = _upload_format(format, request.headers.get("content-type"))
+        report = await get_bulk_ingestor().ingest(table, request.stream(), upload_format)
+
+        if report["rows_rejected"] == 0:
+            status, message = "success", f"Ingested {report['rows_inserted']} rows into {table}"
+        elif report["rows_inserted"]:
+            status, message = "partial", (f"Ingested {report['rows_inserted']} rows into {table}; "
+                                          f"{report['rows_rejected']} rows rejected")
+        else:
+            status, message = "error", f"No rows ingested into {table}; {report['rows_rejected']} rows rejected"
+
+        return JSONResponse(content={
+            "success": status != "error",
+            "status": status,
+            "message": message,
+            **report
+        })
+
+    except HTTPException:
+        raise
+    except IngestionError as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "success": False,
+                "status": "error",
+                "message": str(e),
+                "error_type": "invalid_upload"
+            }
+        )
+    except Exception as e:
+        logger.error(f"Bulk ingestion into {table} failed: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "status": "error",
+                "message": f"Bulk ingestion failed: {str(e)}",
+                "error_type": "ingestion_failed"
+            }
+        )
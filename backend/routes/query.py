@@ -2,40 +2,308 @@
 Query endpoint for natural language to SQL conversion and execution
 """
 from fastapi import APIRouter, Query, HTTPException, Header
-from fastapi.responses import JSONResponse
-from typing import Optional, Dict, Any
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from starlette.concurrency import iterate_in_threadpool
+from typing import Optional, Dict, Any, Iterator, AsyncIterator, List, Tuple
 from pydantic import BaseModel
+import asyncio
+import csv
+import functools
+import io
+import json
 import logging
+import time
 
 import sys
 import os
 
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as ResultResponse
+except ImportError:
+    orjson = None
+    ResultResponse = JSONResponse
+
 # Add parent directory to path for imports
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if backend_dir not in sys.path:
     sys.path.insert(0, backend_dir)
 
-from db import execute_sql, test_db_connection
-from prompt_engine import PromptEngine
+from db import execute_sql_async, check_db_available_async, get_db_connection, QueryCancelToken
+from prompt_engine import get_prompt_engine
 from auth import verify_token, check_permission
+from query_governor import get_query_governor
+from analytics_tier import get_analytics_tier
+from singleflight import get_nl2sql_flight, get_execution_flight
+from result_formats import (
+    ARROW_MEDIA_TYPE, COLUMNAR_JSON_MEDIA_TYPE, arrow_available, encode_arrow, encode_columnar_json
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+# Whole-result columnar formats and the execute_query layout each one needs
+COLUMNAR_LAYOUTS = {
+    "arrow": "typed_columns",
+    "columnar": "columns"
+}
+
+# Conversions not added to the semantic cache: its own hits, and template answers,
+# which the template library reproduces without it
+UNREMEMBERED_METHODS = ("semantic_cache", "template")
+
 class QueryRequest(BaseModel):
     """Request model for natural language queries"""
     query: str
     execute: bool = True
     return_chart_suggestion: bool = True
+    response_format: Optional[str] = None
+    # Oldest analytics snapshot (seconds) acceptable for aggregate queries; 0 always reads the live database
+    max_staleness_seconds: Optional[float] = None
 
 class SqlRequest(BaseModel):
     """Request model for direct SQL execution"""
     sql_query: str
+    response_format: Optional[str] = None
+
+def _negotiate_format(response_format: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """
+    Pick a non-default result format from the explicit request field or the Accept header.
+    Returns a STREAM_MEDIA_TYPES or COLUMNAR_LAYOUTS key, or None for row-oriented JSON.
+    """
+    if response_format:
+        requested = response_format.lower()
+        if requested not in STREAM_MEDIA_TYPES and requested not in COLUMNAR_LAYOUTS:
+            return None
+    elif accept and ARROW_MEDIA_TYPE in accept:
+        requested = "arrow"
+    elif accept:
+        requested = next((name for name, media_type in STREAM_MEDIA_TYPES.items() if media_type in accept), None)
+    else:
+        return None
+    
+    if requested == "arrow" and not arrow_available():
+        logger.warning("Arrow result requested but pyarrow is not installed; sending columnar JSON")
+        return "columnar"
+    return requested
+
+def _columnar_response(content: Dict[str, Any], result_format: str, columns: List[str]) -> Response:
+    """Encode a successful result as an Arrow IPC stream or column-oriented JSON"""
+    content["columns"] = columns
+    content["data_format"] = result_format
+    if result_format == "arrow":
+        metadata = {key: value for key, value in content.items() if key != "data"}
+        payload, encode_ms = encode_arrow(columns, content["data"], metadata)
+        media_type = ARROW_MEDIA_TYPE
+    else:
+        payload, encode_ms = encode_columnar_json(content)
+        media_type = COLUMNAR_JSON_MEDIA_TYPE
+    return Response(
+        content=payload,
+        media_type=media_type,
+        headers={
+            "X-Result-Format": result_format,
+            "X-Row-Count": str(content.get("row_count", 0)),
+            "X-Payload-Bytes": str(len(payload)),
+            "X-Encode-Ms": f"{encode_ms:.2f}"
+        }
+    )
+
+Batch = Tuple[List[str], List[Dict[str, Any]]]
+
+def _ndjson_lines(rows: List[Dict[str, Any]]) -> bytes:
+    """Encode a batch of rows as newline-delimited JSON"""
+    if orjson is not None:
+        return b"".join(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+    return "".join(json.dumps(row) + "\n" for row in rows).encode("utf-8")
+
+def _encode_ndjson(first_batch: Batch, batches: Iterator[Batch]) -> Iterator[bytes]:
+    """One JSON object per row, flushed per fetchmany batch"""
+    try:
+        _, rows = first_batch
+        yield _ndjson_lines(rows)
+        for _, rows in batches:
+            yield _ndjson_lines(rows)
+    except Exception as e:
+        logger.error(f"Streaming query failed mid-result: {e}")
+        yield _ndjson_lines([{"error": str(e), "error_type": "sql_execution_failed"}])
+
+def _encode_csv(first_batch: Batch, batches: Iterator[Batch]) -> Iterator[str]:
+    """Header row followed by CSV rows, flushed per fetchmany batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns, rows = first_batch
+    writer.writerow(columns)
+    try:
+        writer.writerows([row[column] for column in columns] for row in rows)
+        yield buffer.getvalue()
+        for _, rows in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows([row[column] for column in columns] for row in rows)
+            yield buffer.getvalue()
+    except Exception as e:
+        # CSV has no in-band error channel; the truncated body plus the log is all we can offer
+        logger.error(f"Streaming query failed mid-result: {e}")
+
+async def _release_stream(db_manager, batches: Iterator[Batch], cancel_token: QueryCancelToken) -> None:
+    """
+    Cancel a stream_query statement that is still running and release its cursor
+    and pooled connection (a no-op cancel once the stream has been read to the end)
+    """
+    cancel_token.cancel()
+    try:
+        await db_manager.run_in_executor(batches.close)
+    except ValueError:
+        pass  # a fetch is still running in a worker; the cancel makes it raise, which closes the generator
+
+async def _relay_stream(db_manager, chunks: Iterator, batches: Iterator[Batch],
+                        cancel_token: QueryCancelToken) -> AsyncIterator:
+    """Encoded chunks for the response body; a client that goes away cancels the statement"""
+    try:
+        async for chunk in iterate_in_threadpool(chunks):
+            yield chunk
+    finally:
+        await _release_stream(db_manager, batches, cancel_token)
+
+async def _stream_sql_result(sql_query: str, stream_format: str,
+                             headers: Optional[Dict[str, str]] = None,
+                             params: Optional[Dict[str, Any]] = None,
+                             decision: Optional[Dict[str, Any]] = None):
+    """
+    Execute SQL on a server-side cursor and stream the rows as NDJSON or CSV,
+    under the governor decision's statement timeout (the default query timeout without one)
+    """
+    db_manager = get_db_connection()
+    timeout = decision["timeout"] if decision else db_manager.query_timeout
+    cancel_token = QueryCancelToken()
+    batches = db_manager.stream_query(sql_query, params, timeout=timeout, cancel_token=cancel_token)
+    try:
+        # Run the statement and fetch the first batch before committing to a 200 response
+        first_batch = await asyncio.wait_for(db_manager.run_in_executor(next, batches), timeout=timeout or None)
+    except asyncio.TimeoutError:
+        await _release_stream(db_manager, batches, cancel_token)
+        logger.error(f"Streaming query cancelled after exceeding {timeout}s timeout")
+        content = get_query_governor().timeout_response(decision) if decision else {
+            "success": False,
+            "status": "error",
+            "message": f"Query exceeded the {timeout:g}s timeout and was cancelled",
+            "error_type": "query_timeout"
+        }
+        return JSONResponse(status_code=504, content=dict(content, sql_query=sql_query))
+    except Exception as e:
+        await _release_stream(db_manager, batches, cancel_token)
+        logger.error(f"Streaming query failed: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "status": "error",
+                "message": f"SQL execution error: {str(e)}",
+                "sql_query": sql_query,
+                "error_type": "sql_execution_failed"
+            }
+        )
+    
+    encoder = _encode_ndjson if stream_format == "ndjson" else _encode_csv
+    response_headers = dict(headers or {})
+    if stream_format == "csv":
+        response_headers["Content-Disposition"] = "attachment; filename=query_result.csv"
+    return StreamingResponse(
+        _relay_stream(db_manager, encoder(first_batch, batches), batches, cancel_token),
+        media_type=STREAM_MEDIA_TYPES[stream_format],
+        headers=response_headers
+    )
+
+async def _execute_on_snapshot(execution_sql: str, execution_params: Optional[Dict[str, Any]],
+                               layout: str, max_staleness: Optional[float]) -> Optional[Dict[str, Any]]:
+    """
+    Answer from the analytics snapshot under the governor's row cap and timeout,
+    interrupting DuckDB on expiry. Returns an outcome dict like _execute_generated_sql,
+    or None when the OLTP database must answer.
+    """
+    db_manager = get_db_connection()
+    governor = get_query_governor()
+    decision = governor.snapshot_decision()
+    cancel_token = QueryCancelToken()
+    try:
+        execution_result = await asyncio.wait_for(
+            db_manager.run_in_executor(
+                get_analytics_tier().try_execute, execution_sql, execution_params, layout=layout,
+                max_staleness=max_staleness, row_cap=decision["row_cap"], cancel_token=cancel_token
+            ),
+            timeout=decision["timeout"] or None
+        )
+    except asyncio.TimeoutError:
+        cancel_token.cancel()
+        logger.error(f"Analytics query cancelled after exceeding {decision['timeout']}s timeout")
+        return {"tier": "analytics", "error": {"status_code": 504, "content": governor.timeout_response(decision)}}
+    except asyncio.CancelledError:
+        cancel_token.cancel()
+        raise
+    if execution_result is None:
+        return None
+    decision["truncated"] = execution_result.pop("truncated")
+    return {"tier": "analytics", "result": execution_result, "decision": decision}
+
+async def _execute_generated_sql(execution_sql: str, execution_params: Optional[Dict[str, Any]],
+                                 sql_query: str, result_format: Optional[str],
+                                 max_staleness: Optional[float]) -> Dict[str, Any]:
+    """
+    The execution stage of /query: analytics snapshot if it can answer, else the
+    liveness check, the governor and the OLTP database. Returns an outcome dict
+    (tier plus result, or error and the error body) that concurrent identical
+    requests can share. For streaming formats it stops after the governor and
+    hands back the capped SQL to stream.
+    """
+    db_manager = get_db_connection()
+    # Read-only aggregates are answered from the analytics snapshot when it is fresh enough
+    if result_format not in STREAM_MEDIA_TYPES:
+        outcome = await _execute_on_snapshot(execution_sql, execution_params,
+                                             COLUMNAR_LAYOUTS.get(result_format, "rows"), max_staleness)
+        if outcome is not None:
+            return outcome
+    
+    # Background liveness probe result; only pings if it is stale or failing
+    db_test = await check_db_available_async()
+    if db_test["status"] != "success":
+        return {"tier": "oltp", "error": {
+            "status_code": 500,
+            "content": {
+                "success": False,
+                "status": "error",
+                "message": "Database connection failed",
+                "error_type": "database_connection_failed"
+            }
+        }}
+    # Row cap, timeout and cost budget before the statement takes a pooled connection
+    governor = get_query_governor()
+    decision = await db_manager.run_in_executor(governor.evaluate, db_manager, execution_sql, sql_query)
+    if decision["action"] == "reject":
+        return {"tier": "oltp", "error": {"status_code": 422, "content": governor.rejection_response(decision)}}
+    capped_sql = decision.pop("sql")
+    if result_format in STREAM_MEDIA_TYPES:
+        return {"tier": "oltp", "decision": decision, "sql": capped_sql}
+    
+    execution_result = await execute_sql_async(
+        capped_sql, execution_params, timeout=decision["timeout"],
+        layout=COLUMNAR_LAYOUTS.get(result_format, "rows")
+    )
+    if execution_result.get("error_type") == "QueryTimeout":
+        return {"tier": "oltp", "error": {"status_code": 504, "content": governor.timeout_response(decision)}}
+    decision["truncated"] = execution_result.get("row_count", 0) >= decision["row_cap"]
+    return {"tier": "oltp", "result": execution_result, "decision": decision}
 
 @router.post("/query")
 async def query_endpoint(
     request: QueryRequest,
-    token: Optional[str] = Header(None, alias="Authorization")
+    token: Optional[str] = Header(None, alias="Authorization"),
+    accept: Optional[str] = Header(None)
 ):
     """
     Process natural language query and optionally execute SQL
@@ -52,9 +320,14 @@ async def query_endpoint(
             if not check_permission(clean_token, "read"):
                 raise HTTPException(status_code=403, detail="Insufficient permissions")
 
-        # Convert natural language to SQL
-        engine = PromptEngine()
-        sql_result = engine.process_query(request.query)
+        # Convert natural language to SQL off the event loop; identical questions
+        # in flight at the same time share one conversion (and one LLM call)
+        engine = get_prompt_engine()
+        loop = asyncio.get_running_loop()
+        sql_result, conversion_shared = await get_nl2sql_flight().do(
+            engine.coalescing_key(request.query),
+            lambda: loop.run_in_executor(None, engine.process_query, request.query)
+        )
 
         if sql_result["status"] != "success":
             return JSONResponse(
@@ -78,25 +351,57 @@ async def query_endpoint(
             "confidence": sql_result.get("confidence", 0.8),
             "chart_type": sql_result.get("chart_type", "table") if request.return_chart_suggestion else None
         }
+        if "query_fingerprint" in sql_result:
+            response_data["query_fingerprint"] = sql_result["query_fingerprint"]
+            response_data["parameterized_sql"] = sql_result["parameterized_sql"]
+            response_data["sql_params"] = sql_result["sql_params"]
+        if "prompt" in sql_result:
+            # Tables sent to the LLM and the prompt's token count
+            response_data["prompt"] = sql_result["prompt"]
+        if "template" in sql_result:
+            # Template that answered without an LLM call and the slots it filled
+            response_data["template"] = sql_result["template"]
+        # Execute the parameterized form when available so SQL Server reuses one plan per query shape
+        execution_sql = sql_result.get("parameterized_sql", sql_result["sql_query"])
+        execution_params = sql_result.get("sql_params") or None
 
         # Execute SQL if requested
         if request.execute:
-            # Test database connection first
-            db_test = test_db_connection()
-            if db_test["status"] != "success":
-                return JSONResponse(
-                    status_code=500,
-                    content={
-                        "success": False,
-                        "status": "error",
-                        "message": "Database connection failed",
-                        "sql_query": sql_result["sql_query"],
-                        "original_query": request.query,
-                        "error_type": "database_connection_failed"
-                    }
+            result_format = _negotiate_format(request.response_format, accept)
+            execute = functools.partial(
+                _execute_generated_sql, execution_sql, execution_params, sql_result["sql_query"],
+                result_format, request.max_staleness_seconds
+            )
+            if result_format in STREAM_MEDIA_TYPES:
+                # A stream cannot be shared between responses
+                outcome, execution_shared = await execute(), False
+            else:
+                execution_key = (execution_sql, json.dumps(execution_params, sort_keys=True, default=str),
+                                 result_format, request.max_staleness_seconds)
+                outcome, execution_shared = await get_execution_flight().do(execution_key, execute)
+            response_data["coalesced"] = {"nl2sql": conversion_shared, "execution": execution_shared}
+            
+            if "error" in outcome:
+                content = dict(outcome["error"]["content"], sql_query=sql_result["sql_query"],
+                               original_query=request.query)
+                return JSONResponse(status_code=outcome["error"]["status_code"], content=content)
+            response_data["execution_tier"] = outcome["tier"]
+            response_data["governor"] = outcome["decision"]
+            if outcome["tier"] == "analytics":
+                response_data["snapshot_age_seconds"] = outcome["result"]["snapshot_age_seconds"]
+            if "sql" in outcome:
+                response = await _stream_sql_result(
+                    outcome["sql"],
+                    result_format,
+                    headers={"X-Query-Method": sql_result["method"]},
+                    params=execution_params,
+                    decision=outcome["decision"]
                 )
-            # Execute the SQL query
-            execution_result = execute_sql(sql_result["sql_query"])
+                # The statement has run and returned its first batch by the time the stream starts
+                if isinstance(response, StreamingResponse) and sql_result["method"] not in UNREMEMBERED_METHODS:
+                    engine.remember_validated_sql(request.query, sql_result["sql_query"], sql_result["method"])
+                return response
+            execution_result = outcome["result"]
             response_data.update({
                 "execution_status": execution_result["status"],
                 "data": execution_result.get("data", []),
@@ -104,13 +409,18 @@ async def query_endpoint(
                 "execution_time": execution_result.get("execution_time"),
                 "summary": f"Query executed successfully. Retrieved {execution_result.get('row_count', 0)} records."
             })
+            if execution_result["status"] == "success" and sql_result["method"] not in UNREMEMBERED_METHODS \
+                    and not execution_shared:
+                engine.remember_validated_sql(request.query, sql_result["sql_query"], sql_result["method"])
             if execution_result["status"] != "success":
                 response_data.update({
                     "success": False,
                     "execution_error": execution_result.get("message", "SQL execution failed"),
                     "error_type": "sql_execution_failed"
                 })
-        return JSONResponse(content=response_data)
+            elif result_format in COLUMNAR_LAYOUTS:
+                return _columnar_response(response_data, result_format, execution_result.get("columns", []))
+        return ResultResponse(content=response_data)
     except HTTPException:
         raise
     except Exception as e:
@@ -129,13 +439,172 @@ async def query_endpoint(
 async def process_query_get(
     question: str = Query(..., description="Natural language question to convert to SQL"),
     token: Optional[str] = Header(None, alias="Authorization"),
-    execute: bool = Query(True, description="Whether to execute the generated SQL")
+    execute: bool = Query(True, description="Whether to execute the generated SQL"),
+    format: Optional[str] = Query(None, description="Result format: 'ndjson', 'csv', 'arrow' or 'columnar'"),
+    accept: Optional[str] = Header(None)
 ):
     """
     Process natural language query via GET (backwards compatibility)
     """
-    request = QueryRequest(query=question, execute=execute)
-    return await query_endpoint(request, token)
+    request = QueryRequest(query=question, execute=execute, response_format=format)
+    return await query_endpoint(request, token, accept)
+
+def _sse(event: str, data: Dict[str, Any]) -> bytes:
+    """One Server-Sent Events frame"""
+    if orjson is not None:
+        payload = orjson.dumps(data, default=str)
+    else:
+        payload = json.dumps(data, default=str).encode("utf-8")
+    return b"event: " + event.encode("ascii") + b"\ndata: " + payload + b"\n\n"
+
+async def _query_events(request: QueryRequest) -> AsyncIterator[bytes]:
+    """
+    token events while the LLM writes the SQL, then one sql event with the
+    validated statement, rows events as batches are fetched and a final done
+    (or error) event. Every event carries elapsed_ms since the request started.
+    """
+    start = time.perf_counter()
+    
+    def elapsed() -> float:
+        return round((time.perf_counter() - start) * 1000, 1)
+    
+    loop = asyncio.get_running_loop()
+    tokens: asyncio.Queue = asyncio.Queue()
+    engine = get_prompt_engine()
+    # The LLM call blocks for seconds, so it runs on the default executor rather than the DB pool
+    conversion = loop.run_in_executor(None, functools.partial(
+        engine.convert_to_sql, request.query,
+        lambda text: loop.call_soon_threadsafe(tokens.put_nowait, text)
+    ))
+    conversion.add_done_callback(lambda _: tokens.put_nowait(None))
+    while (text := await tokens.get()) is not None:
+        yield _sse("token", {"text": text, "elapsed_ms": elapsed()})
+    
+    sql_result = conversion.result()
+    if sql_result["status"] != "success":
+        yield _sse("error", {
+            "message": sql_result.get("message", "Failed to convert query to SQL"),
+            "suggestions": sql_result.get("suggestions", []),
+            "error_type": "query_conversion_failed",
+            "elapsed_ms": elapsed()
+        })
+        return
+    sql_event = {
+        "sql_query": sql_result["sql_query"],
+        "method": sql_result["method"],
+        "confidence": sql_result.get("confidence", 0.8),
+        "chart_type": sql_result.get("chart_type", "table") if request.return_chart_suggestion else None,
+        "elapsed_ms": elapsed()
+    }
+    if "prompt" in sql_result:
+        sql_event["prompt"] = sql_result["prompt"]
+    if "template" in sql_result:
+        sql_event["template"] = sql_result["template"]
+    yield _sse("sql", sql_event)
+    if not request.execute:
+        yield _sse("done", {"row_count": 0, "elapsed_ms": elapsed()})
+        return
+    
+    execution_sql = sql_result.get("parameterized_sql", sql_result["sql_query"])
+    execution_params = sql_result.get("sql_params") or None
+    db_manager = get_db_connection()
+    batch_rows = int(os.getenv("QUERY_STREAM_BATCH_ROWS", "500"))
+    row_count = 0
+    done: Dict[str, Any] = {}
+    try:
+        outcome = await _execute_on_snapshot(execution_sql, execution_params, "rows", request.max_staleness_seconds)
+        if outcome is not None and "error" in outcome:
+            yield _sse("error", dict(outcome["error"]["content"], elapsed_ms=elapsed()))
+            return
+        if outcome is not None:
+            execution_result = outcome["result"]
+            done.update(execution_tier="analytics", snapshot_age_seconds=execution_result["snapshot_age_seconds"],
+                        governor=outcome["decision"])
+            rows = execution_result.get("data", [])
+            columns = execution_result.get("columns") or (list(rows[0]) if rows else [])
+            for offset in range(0, max(len(rows), 1), batch_rows):
+                yield _sse("rows", {"columns": columns, "rows": rows[offset:offset + batch_rows],
+                                    "offset": offset, "elapsed_ms": elapsed()})
+            row_count = len(rows)
+        else:
+            db_test = await check_db_available_async()
+            if db_test["status"] != "success":
+                yield _sse("error", {"message": "Database connection failed",
+                                     "error_type": "database_connection_failed", "elapsed_ms": elapsed()})
+                return
+            governor = get_query_governor()
+            decision = await db_manager.run_in_executor(
+                governor.evaluate, db_manager, execution_sql, sql_result["sql_query"]
+            )
+            if decision["action"] == "reject":
+                yield _sse("error", dict(governor.rejection_response(decision), elapsed_ms=elapsed()))
+                return
+            cancel_token = QueryCancelToken()
+            batches = db_manager.stream_query(decision.pop("sql"), execution_params, batch_size=batch_rows,
+                                              timeout=decision["timeout"], cancel_token=cancel_token)
+            try:
+                try:
+                    batch = await asyncio.wait_for(db_manager.run_in_executor(next, batches, None),
+                                                   timeout=decision["timeout"] or None)
+                except asyncio.TimeoutError:
+                    logger.error(f"Streaming query cancelled after exceeding {decision['timeout']}s timeout")
+                    yield _sse("error", dict(governor.timeout_response(decision), elapsed_ms=elapsed()))
+                    return
+                while batch is not None:
+                    columns, rows = batch
+                    yield _sse("rows", {"columns": columns, "rows": rows, "offset": row_count, "elapsed_ms": elapsed()})
+                    row_count += len(rows)
+                    batch = await db_manager.run_in_executor(next, batches, None)
+            finally:
+                # Client disconnects and timeouts land here too; stop the statement and release its connection
+                await _release_stream(db_manager, batches, cancel_token)
+            decision["truncated"] = row_count >= decision["row_cap"]
+            done.update(execution_tier="oltp", governor=decision)
+    except Exception as e:
+        logger.error(f"Streaming query failed: {e}")
+        yield _sse("error", {"message": f"SQL execution error: {str(e)}", "error_type": "sql_execution_failed",
+                             "elapsed_ms": elapsed()})
+        return
+    
+    if sql_result["method"] not in UNREMEMBERED_METHODS:
+        engine.remember_validated_sql(request.query, sql_result["sql_query"], sql_result["method"])
+    done.update(row_count=row_count, elapsed_ms=elapsed())
+    yield _sse("done", done)
+
+@router.post("/query/stream")
+async def query_stream_endpoint(
+    request: QueryRequest,
+    token: Optional[str] = Header(None, alias="Authorization")
+):
+    """
+    Process a natural language query as a Server-Sent Events stream:
+    LLM tokens as they are generated, the SQL, result rows in batches, then done
+    """
+    if token:
+        clean_token = token.replace("Bearer ", "") if token.startswith("Bearer ") else token
+        auth_result = verify_token(clean_token)
+        if auth_result["status"] != "success":
+            raise HTTPException(status_code=401, detail="Invalid authentication token")
+        if not check_permission(clean_token, "read"):
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+    
+    return StreamingResponse(
+        _query_events(request),
+        media_type="text/event-stream",
+        # No proxy buffering, or the stream arrives in one piece at the end
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/query/stream")
+async def query_stream_get(
+    question: str = Query(..., description="Natural language question to convert to SQL"),
+    token: Optional[str] = Header(None, alias="Authorization"),
+    execute: bool = Query(True, description="Whether to execute the generated SQL")
+):
+    """
+    Server-Sent Events stream via GET, for EventSource clients
+    """
+    return await query_stream_endpoint(QueryRequest(query=question, execute=execute), token)
 
 @router.get("/query/samples")
 async def get_query_samples():
@@ -164,7 +633,8 @@ async def get_query_samples():
 @router.post("/query/execute")
 async def execute_custom_sql(
     request: SqlRequest,
-    token: Optional[str] = Header(None, alias="Authorization")
+    token: Optional[str] = Header(None, alias="Authorization"),
+    accept: Optional[str] = Header(None)
 ):
     """
     Execute custom SQL query directly (for advanced users)
@@ -219,10 +689,14 @@ async def execute_custom_sql(
                 detail="Only SELECT statements are allowed for custom SQL execution"
             )
         
+        result_format = _negotiate_format(request.response_format, accept)
+        if result_format in STREAM_MEDIA_TYPES:
+            return await _stream_sql_result(sql_query, result_format)
+        
         # Execute the SQL query
-        result = execute_sql(sql_query)
+        result = await execute_sql_async(sql_query, layout=COLUMNAR_LAYOUTS.get(result_format, "rows"))
         
-        return JSONResponse(content={
+        content = {
             "success": result["status"] == "success",
             "status": result["status"],
             "sql_query": sql_query,
@@ -231,7 +705,10 @@ async def execute_custom_sql(
             "message": result.get("message", ""),
             "execution_type": "custom_sql",
             "execution_time": result.get("execution_time")
-        })
+        }
+        if result_format in COLUMNAR_LAYOUTS and result["status"] == "success":
+            return _columnar_response(content, result_format, result.get("columns", []))
+        return ResultResponse(content=content)
         
     except HTTPException:
         raise
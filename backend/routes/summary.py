@@ -2,9 +2,10 @@
 Summary endpoint for data insights and analytics
 """
 from fastapi import APIRouter, HTTPException, Header, Query
-from fastapi.responses import JSONResponse
-from typing import Optional, Dict, Any
+from fastapi.responses import JSONResponse, Response
+from typing import Optional, Dict, Any, List
 import logging
+from datetime import datetime, timezone
 
 import sys
 import os
@@ -14,8 +15,11 @@ backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if backend_dir not in sys.path:
     sys.path.insert(0, backend_dir)
 
-from db import execute_sql, get_db_connection
+from db import execute_sql_async, get_db_connection
 from auth import verify_token, check_permission
+from cube import get_rollup_cube
+from summary_service import get_summary_service
+from analytics_refresher import get_analytics_refresher
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -69,58 +73,47 @@ async def get_data_summary(
 async def _get_overall_summary() -> Dict[str, Any]:
     """Get overall database summary"""
     try:
-        summary = {
-            "tables": {},
-            "total_records": 0,
-            "database_info": {}
-        }
-        
-        # Get table counts
-        table_queries = [
-            ("citizens", "SELECT COUNT(*) as count FROM citizens"),
-            ("officers", "SELECT COUNT(*) as count FROM officers"), 
-            ("schemes", "SELECT COUNT(*) as count FROM schemes")
-        ]
-        
-        for table_name, query in table_queries:
-            try:
-                result = execute_sql(query)
-                if result["status"] == "success" and result["data"]:
-                    count = result["data"][0]["count"]
-                    summary["tables"][table_name] = {
-                        "record_count": count,
-                        "status": "accessible"
-                    }
-                    summary["total_records"] += count
-                else:
-                    summary["tables"][table_name] = {
-                        "record_count": 0,
-                        "status": "error",
-                        "message": result.get("message", "Unknown error")
-                    }
-            except Exception as e:
-                summary["tables"][table_name] = {
-                    "record_count": 0,
-                    "status": "error", 
-                    "message": str(e)
-                }
-        
-        # Get database metadata
-        try:
-            db_manager = get_db_connection()
-            tables_result = db_manager.list_tables()
-            if tables_result["status"] == "success":
-                summary["database_info"]["total_tables"] = len(tables_result["data"])
-                summary["database_info"]["table_names"] = [t["TABLE_NAME"] for t in tables_result["data"]]
-        except Exception as e:
-            logger.error(f"Error getting database metadata: {e}")
-        
-        return summary
-        
+        return await get_summary_service().overview()
     except Exception as e:
         logger.error(f"Error in _get_overall_summary: {e}")
         return {"error": str(e)}
 
+@router.get("/summary/dashboard")
+async def get_dashboard_summary(
+    token: Optional[str] = Header(None, alias="Authorization")
+):
+    """
+    Headline KPIs and per-scheme totals for the reports dashboard, fetched
+    concurrently with the latency of each query
+    """
+    try:
+        if token:
+            auth_result = verify_token(token.replace("Bearer ", "") if token.startswith("Bearer ") else token)
+            if auth_result["status"] != "success":
+                raise HTTPException(status_code=401, detail="Invalid authentication token")
+            
+            if not check_permission(token.replace("Bearer ", "") if token.startswith("Bearer ") else token, "read"):
+                raise HTTPException(status_code=403, detail="Insufficient permissions")
+        
+        dashboard = await get_summary_service().dashboard()
+        return JSONResponse(content={
+            "status": "success" if not dashboard["errors"] else "partial",
+            "message": f"Dashboard summary generated in {dashboard['total_ms']} ms",
+            **dashboard
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating dashboard summary: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "message": f"Failed to generate dashboard summary: {str(e)}"
+            }
+        )
+
 async def _get_table_summary(table_name: str) -> Dict[str, Any]:
     """Get summary for specific table"""
     try:
@@ -133,7 +126,7 @@ async def _get_table_summary(table_name: str) -> Dict[str, Any]:
         
         # Get record count
         count_query = f"SELECT COUNT(*) as count FROM {table_name}"
-        count_result = execute_sql(count_query)
+        count_result = await execute_sql_async(count_query)
         
         if count_result["status"] == "success" and count_result["data"]:
             summary["record_count"] = count_result["data"][0]["count"]
@@ -141,7 +134,7 @@ async def _get_table_summary(table_name: str) -> Dict[str, Any]:
         # Get table schema
         try:
             db_manager = get_db_connection()
-            schema_result = db_manager.get_table_schema(table_name)
+            schema_result = await db_manager.run_in_executor(db_manager.get_table_schema, table_name)
             if schema_result["status"] == "success":
                 summary["schema"] = schema_result["data"]
         except Exception as e:
@@ -149,7 +142,7 @@ async def _get_table_summary(table_name: str) -> Dict[str, Any]:
         
         # Get sample data (first 5 records)
         sample_query = f"SELECT TOP 5 * FROM {table_name}"
-        sample_result = execute_sql(sample_query)
+        sample_result = await execute_sql_async(sample_query)
         
         if sample_result["status"] == "success":
             summary["sample_data"] = sample_result["data"]
@@ -162,10 +155,14 @@ async def _get_table_summary(table_name: str) -> Dict[str, Any]:
 
 @router.get("/summary/analytics")
 async def get_analytics_summary(
-    token: Optional[str] = Header(None, alias="Authorization")
+    token: Optional[str] = Header(None, alias="Authorization"),
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None)
 ):
     """
     Get advanced analytics and insights
+    Served from a background-refreshed snapshot; send If-None-Match or
+    If-Modified-Since to get a 304 when nothing changed.
     """
     try:
         # Authentication check
@@ -178,13 +175,19 @@ async def get_analytics_summary(
             if not check_permission(token.replace("Bearer ", "") if token.startswith("Bearer ") else token, "read"):
                 raise HTTPException(status_code=403, detail="Insufficient permissions")
         
-        analytics = await _get_analytics_data()
+        refresher = get_analytics_refresher()
+        snapshot, cache_status = await refresher.get()
+        headers = refresher.response_headers(snapshot)
+        headers["X-Analytics-Cache"] = cache_status
+        if refresher.not_modified(snapshot, if_none_match, if_modified_since):
+            return Response(status_code=304, headers=headers)
         
         return JSONResponse(content={
             "status": "success",
-            "analytics": analytics,
+            "analytics": snapshot["payload"],
+            "last_modified": datetime.fromtimestamp(snapshot["last_modified"], timezone.utc).isoformat(),
             "message": "Analytics summary generated successfully"
-        })
+        }, headers=headers)
         
     except HTTPException:
         raise
@@ -198,56 +201,86 @@ async def get_analytics_summary(
             }
         )
 
-async def _get_analytics_data() -> Dict[str, Any]:
-    """Generate analytics insights"""
+def _id_list(value: Optional[str]) -> Optional[List[int]]:
+    """Comma-separated ids from a query parameter"""
+    if not value:
+        return None
     try:
-        analytics = {
-            "demographic_insights": {},
-            "distribution_analysis": {},
-            "trends": {}
-        }
-        
-        # Citizens age distribution
-        try:
-            age_query = """
-                SELECT 
-                    CASE 
-                        WHEN age < 18 THEN 'Under 18'
-                        WHEN age BETWEEN 18 AND 30 THEN '18-30'
-                        WHEN age BETWEEN 31 AND 50 THEN '31-50'
-                        WHEN age BETWEEN 51 AND 65 THEN '51-65'
-                        ELSE 'Over 65'
-                    END as age_group,
-                    COUNT(*) as count
-                FROM citizens 
-                GROUP BY 
-                    CASE 
-                        WHEN age < 18 THEN 'Under 18'
-                        WHEN age BETWEEN 18 AND 30 THEN '18-30'
-                        WHEN age BETWEEN 31 AND 50 THEN '31-50'
-                        WHEN age BETWEEN 51 AND 65 THEN '51-65'
-                        ELSE 'Over 65'
-                    END
-                ORDER BY count DESC
-            """
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise ValueError(f"Invalid id list '{value}'")
+
+@router.get("/summary/cube")
+async def get_cube_summary(
+    token: Optional[str] = Header(None, alias="Authorization"),
+    level: str = Query("state", description="Geography level: all, state, district or village"),
+    measures: Optional[str] = Query(None, description="Comma-separated measures (default: disbursement and enrollment counts, amount, distinct citizens)"),
+    by_scheme: bool = Query(False, description="Break down by scheme"),
+    by_month: bool = Query(False, description="Break down by month"),
+    state_id: Optional[str] = Query(None, description="Comma-separated state ids"),
+    district_id: Optional[str] = Query(None, description="Comma-separated district ids"),
+    village_id: Optional[str] = Query(None, description="Comma-separated village ids"),
+    scheme_id: Optional[str] = Query(None, description="Comma-separated scheme ids"),
+    from_month: Optional[str] = Query(None, description="First month (YYYY-MM)"),
+    to_month: Optional[str] = Query(None, description="Last month (YYYY-MM)"),
+    limit: int = Query(1000, ge=1, le=100000),
+    refresh: bool = Query(False, description="Apply new rows from the watermark before answering")
+):
+    """
+    Query the disbursement/enrollment rollup cube. Drill down by requesting the next
+    level with the parent's id as a filter (e.g. level=district&state_id=3); roll up
+    by requesting the parent level.
+    """
+    try:
+        if token:
+            auth_result = verify_token(token.replace("Bearer ", "") if token.startswith("Bearer ") else token)
+            if auth_result["status"] != "success":
+                raise HTTPException(status_code=401, detail="Invalid authentication token")
             
-            age_result = execute_sql(age_query)
-            if age_result["status"] == "success":
-                analytics["demographic_insights"]["age_distribution"] = age_result["data"]
-        except Exception as e:
-            logger.error(f"Error getting age distribution: {e}")
+            if not check_permission(token.replace("Bearer ", "") if token.startswith("Bearer ") else token, "read"):
+                raise HTTPException(status_code=403, detail="Insufficient permissions")
         
-        # Gender distribution
-        try:
-            gender_query = "SELECT gender, COUNT(*) as count FROM citizens GROUP BY gender"
-            gender_result = execute_sql(gender_query)
-            if gender_result["status"] == "success":
-                analytics["demographic_insights"]["gender_distribution"] = gender_result["data"]
-        except Exception as e:
-            logger.error(f"Error getting gender distribution: {e}")
+        cube = get_rollup_cube()
+        db_manager = get_db_connection()
+        if refresh:
+            await db_manager.run_in_executor(cube.refresh)
+        
+        filters = {
+            "state_id": _id_list(state_id),
+            "district_id": _id_list(district_id),
+            "village_id": _id_list(village_id),
+            "scheme_id": _id_list(scheme_id)
+        }
+        result = await db_manager.run_in_executor(
+            cube.query,
+            measures=[m.strip() for m in measures.split(",") if m.strip()] if measures else None,
+            level=level.lower(), by_scheme=by_scheme, by_month=by_month, filters=filters,
+            from_month=from_month, to_month=to_month, limit=limit
+        )
         
-        return analytics
+        return JSONResponse(content={
+            "status": "success",
+            "message": f"{result['row_count']} cube rows at {result['level']} level",
+            **result
+        })
         
+    except HTTPException:
+        raise
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={
+                "status": "error",
+                "message": str(e),
+                "error_type": "invalid_cube_query"
+            }
+        )
     except Exception as e:
-        logger.error(f"Error in _get_analytics_data: {e}")
-        return {"error": str(e)}
+        logger.error(f"Error querying cube: {e}")
+        return JSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "message": f"Failed to query cube: {str(e)}"
+            }
+        )
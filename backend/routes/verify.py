@@ -7,8 +7,17 @@ from typing import Dict, Any
 import logging
 
 # Import our modules
-from db import test_db_connection
+from db import test_db_connection_async, get_db_connection
 from auth import verify_token
+from prompt_engine import get_prompt_engine
+from query_governor import get_query_governor
+from ingestion import get_bulk_ingestor
+from eligibility import get_eligibility_simulator
+from cube import get_rollup_cube
+from analytics_tier import get_analytics_tier
+from summary_service import get_summary_service
+from analytics_refresher import get_analytics_refresher
+from singleflight import get_nl2sql_flight, get_execution_flight
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,7 +34,25 @@ async def health_check() -> Dict[str, Any]:
     return {
         "status": "healthy",
         "service": "Data Interpreter API",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "llm_client": get_prompt_engine().get_client_stats(),
+        "prompt_context": get_prompt_engine().get_prompt_stats(),
+        "query_templates": get_prompt_engine().templates.get_stats(),
+        "nl2sql_cache": get_prompt_engine().sql_cache.get_stats(),
+        "semantic_cache": get_prompt_engine().semantic_cache.get_stats(),
+        "result_cache": get_db_connection().result_cache.get_stats(),
+        "query_governor": get_query_governor().get_stats(),
+        "ingestion": get_bulk_ingestor().get_stats(),
+        "eligibility_simulator": get_eligibility_simulator().get_stats(),
+        "rollup_cube": get_rollup_cube().get_stats(),
+        "analytics_tier": get_analytics_tier().get_stats(),
+        "summary_queries": get_summary_service().get_stats(),
+        "analytics_refresher": get_analytics_refresher().get_stats(),
+        "db_pool": get_db_connection().pool_monitor.get_stats(),
+        "singleflight": {
+            "nl2sql": get_nl2sql_flight().get_stats(),
+            "execution": get_execution_flight().get_stats()
+        }
     }
 
 @router.get("/verify/database")
@@ -34,7 +61,9 @@ async def verify_database() -> Dict[str, Any]:
     Verify database connection
     """
     try:
-        is_connected, message = test_db_connection()
+        db_result = await test_db_connection_async()
+        is_connected = db_result["status"] == "success"
+        message = db_result["message"]
         
         return {
             "success": is_connected,
@@ -45,6 +74,17 @@ async def verify_database() -> Dict[str, Any]:
         logger.error(f"Database verification failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Database verification failed: {str(e)}")
 
+@router.get("/verify/pool")
+async def verify_pool() -> Dict[str, Any]:
+    """
+    Connection pool occupancy, checkout latency, wait time and liveness probe state
+    """
+    stats = get_db_connection().pool_monitor.get_stats()
+    return {
+        "success": stats["probe"]["healthy"] is not False,
+        "pool": stats
+    }
+
 @router.get("/verify/auth")
 async def verify_auth() -> Dict[str, Any]:
     """
@@ -74,7 +114,9 @@ async def verify_system() -> Dict[str, Any]:
     """
     try:
         # Test database
-        db_connected, db_message = test_db_connection()
+        db_result = await test_db_connection_async()
+        db_connected = db_result["status"] == "success"
+        db_message = db_result["message"]
         
         # Test auth (basic check)
         auth_status = True
@@ -0,0 +1,143 @@
+"""
+Schema pruning for NL-to-SQL prompts
+Picks the tables a question needs from table keywords and domain synonyms, then
+adds every table on the join path between them (citizens -> villages ->
+districts -> states, citizens -> enrollments -> schemes, ...), so the prompt
+carries the two or three tables a question touches instead of the whole schema.
+Questions that match no table fall back to the full schema.
+"""
+import os
+import re
+import heapq
+import logging
+from typing import Dict, List, Any, Iterable, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Word-prefix patterns per table (matched after a word boundary, case-insensitive)
+TABLE_KEYWORDS = {
+    "citizens": [r"citizen", r"people", r"person", r"beneficiar", r"resident", r"individual", r"applicant",
+                 r"gender", r"male", r"female", r"wom[ae]n\b", r"men\b", r"age\b", r"aged\b", r"ages\b",
+                 r"elderly", r"senior", r"youth", r"aadhaar", r"mobile", r"phone", r"born\b", r"birth",
+                 r"email"],
+    "villages": [r"village", r"rural"],
+    "districts": [r"district"],
+    "states": [r"state\b", r"states\b", r"statewise", r"state-wise", r"region"],
+    "schemes": [r"scheme", r"program", r"pmay", r"housing", r"awas", r"nsap", r"pension", r"mgnrega",
+                r"employment", r"ujjwala", r"gas\b", r"lpg", r"ayushman", r"sector", r"benefit type",
+                r"frequency"],
+    "enrollments": [r"enrol", r"registered", r"registration", r"signed up", r"participat", r"multiple schemes",
+                    r"joined"],
+    "disbursements": [r"disburs", r"paid", r"payment", r"amount", r"fund", r"money", r"rupee", r"lakh",
+                      r"spent", r"spend", r"transfer", r"receiv", r"payout", r"benefits received",
+                      r"maximum benefits"],
+    "health_details": [r"health (?:detail|record|condition|status|data)", r"disab", r"chronic", r"medical", r"condition", r"impair", r"illness"],
+    "bank_accounts": [r"bank", r"account", r"ifsc"],
+    "officers": [r"officer", r"official", r"staff", r"designation"],
+    "verifications": [r"verif", r"approv", r"comment"]
+}
+
+# State and UT names: "citizens in Gujarat" needs the geography chain
+STATE_NAMES = [
+    "andhra", "arunachal", "assam", "bihar", "chhattisgarh", "goa", "gujarat", "haryana", "himachal",
+    "jharkhand", "karnataka", "kerala", "madhya pradesh", "maharashtra", "manipur", "meghalaya", "mizoram",
+    "nagaland", "odisha", "orissa", "punjab", "rajasthan", "sikkim", "tamil nadu", "telangana", "tripura",
+    "uttar pradesh", "uttarakhand", "west bengal", "delhi", "jammu", "kashmir", "ladakh", "puducherry",
+    "chandigarh"
+]
+
+# Join graph with costs; cheaper edges are the canonical joins, so ties and
+# detours prefer citizens -> villages -> districts -> states over officer links
+JOIN_EDGES = [
+    ("citizens", "villages", 1), ("villages", "districts", 1), ("districts", "states", 1),
+    ("citizens", "enrollments", 1), ("enrollments", "schemes", 1),
+    ("citizens", "disbursements", 1), ("disbursements", "schemes", 1),
+    ("citizens", "health_details", 1), ("citizens", "bank_accounts", 1),
+    ("citizens", "verifications", 1), ("verifications", "schemes", 1), ("verifications", "officers", 1),
+    ("officers", "districts", 2), ("enrollments", "officers", 3), ("disbursements", "officers", 3)
+]
+
+class SchemaPruner:
+    """Chooses the tables (and the join path between them) a question needs"""
+
+    def __init__(self, tables: Iterable[str], edges: List[Tuple[str, str, int]] = JOIN_EDGES):
+        self.tables = list(tables)
+        self.enabled = os.getenv("SCHEMA_PRUNING_ENABLED", "true").lower() == "true"
+        self._patterns = {
+            table: re.compile(r"\b(?:" + "|".join(keywords) + ")", re.IGNORECASE)
+            for table, keywords in TABLE_KEYWORDS.items() if table in self.tables
+        }
+        self._state_pattern = re.compile(r"\b(?:" + "|".join(STATE_NAMES) + r")\b", re.IGNORECASE)
+        self._graph: Dict[str, List[Tuple[str, int]]] = {table: [] for table in self.tables}
+        for left, right, cost in edges:
+            if left in self._graph and right in self._graph:
+                self._graph[left].append((right, cost))
+                self._graph[right].append((left, cost))
+
+    def matched_tables(self, question: str) -> List[str]:
+        """Tables named or implied by the question's words, in schema order"""
+        matched = {table for table, pattern in self._patterns.items() if pattern.search(question)}
+        if "states" in self.tables and self._state_pattern.search(question):
+            matched.add("states")
+        return [table for table in self.tables if table in matched]
+
+    def _path(self, tree: set, target: str) -> Tuple[float, List[str]]:
+        """Cheapest (cost, path) from any table already in tree to target"""
+        frontier = [(0, order, table, [table]) for order, table in enumerate(sorted(tree))]
+        heapq.heapify(frontier)
+        counter = len(frontier)
+        settled = set()
+        while frontier:
+            cost, _, table, path = heapq.heappop(frontier)
+            if table == target:
+                return cost, path
+            if table in settled:
+                continue
+            settled.add(table)
+            for neighbour, edge_cost in self._graph[table]:
+                if neighbour not in settled:
+                    counter += 1
+                    heapq.heappush(frontier, (cost + edge_cost, counter, neighbour, path + [neighbour]))
+        return float("inf"), [target]
+
+    def select(self, question: str) -> Dict[str, Any]:
+        """
+        {"tables": [...], "matched": [...], "pruned": bool}; tables is the matched
+        set closed over the join paths that connect it, or every table when
+        pruning is off or nothing matched.
+        """
+        matched = self.matched_tables(question) if self.enabled else []
+        if not matched:
+            return {"tables": list(self.tables), "matched": matched, "pruned": False}
+        # Greedy Steiner tree: repeatedly attach the matched table closest to the
+        # tree, so paths run through tables the question already needs
+        tree = {matched[0]}
+        remaining = [table for table in matched[1:]]
+        while remaining:
+            paths = [self._path(tree, table) for table in remaining]
+            best = min(range(len(paths)), key=lambda index: paths[index][0])
+            tree.update(paths[best][1])
+            remaining = [table for table in remaining if table not in tree]
+        return {"tables": [table for table in self.tables if table in tree], "matched": matched,
+                "pruned": len(tree) < len(self.tables)}
+
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    """Prompt token count with tiktoken when installed, else the ~4 characters per token rule"""
+    global _encoding
+    if tiktoken is not None and _encoding is not False:
+        try:
+            if _encoding is None:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            return len(_encoding.encode(text))
+        except Exception as e:
+            # Encoding files not downloadable (offline); estimate from here on
+            logger.warning(f"tiktoken unavailable, estimating prompt tokens: {e}")
+            _encoding = False
+    return max(1, len(text) // 4)
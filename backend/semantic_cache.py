@@ -0,0 +1,145 @@
+"""
+Paraphrase-tolerant cache for previously validated SQL
+Local token-similarity index over preprocessed queries - no external embedding service
+"""
+import os
+import re
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, FrozenSet, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+")
+
+# Words that carry no meaning for SQL generation
+STOPWORDS = frozenset({
+    "a", "an", "the", "of", "in", "on", "at", "to", "for", "from", "with", "and", "or",
+    "is", "are", "was", "were", "be", "been", "who", "which", "that", "whose", "what",
+    "me", "my", "our", "us", "please", "can", "you", "give", "tell", "there", "their",
+    "do", "does", "did", "have", "has", "had", "aged", "years", "old", "during", "currently"
+})
+
+# Canonical forms so paraphrases share tokens
+SYNONYMS = {
+    "women": "female", "woman": "female", "ladies": "female", "lady": "female", "girls": "female",
+    "men": "male", "man": "male", "boys": "male",
+    "citizen": "citizens", "people": "citizens", "persons": "citizens", "person": "citizens",
+    "beneficiaries": "citizens", "beneficiary": "citizens", "individuals": "citizens",
+    "number": "count", "many": "count", "sum": "total", "avg": "average", "mean": "average",
+    "show": "list", "display": "list", "get": "list", "select": "list", "fetch": "list",
+    "disbursement": "disbursements", "payments": "disbursements", "payment": "disbursements",
+    "enrolled": "enrollments", "enrollment": "enrollments", "enrolments": "enrollments",
+    "enrolment": "enrollments", "enrol": "enrollments", "enroll": "enrollments",
+    "schemes": "scheme", "programs": "scheme", "program": "scheme", "programme": "scheme",
+    "districts": "district", "states": "state", "villages": "village", "officers": "officer",
+    "accounts": "account", "months": "month", "highest": "maximum", "max": "maximum",
+    "lowest": "minimum", "min": "minimum", "no": "without", "lacking": "without",
+    "per": "by", "each": "by", "wise": "by",
+    # Comparisons are guard tokens; only same-direction wordings collapse
+    "over": "above", "exceeding": "above", "older": "above", "below": "under", "younger": "under",
+    # Scheme names collapse to one key per scheme, which stays a guard token
+    "pmay": "housing", "awas": "housing", "nsap": "pension", "mgnrega": "employment", "nrega": "employment",
+    "ujjwala": "gas", "lpg": "gas", "ayushman": "health", "bharat": "health", "pmjay": "health"
+}
+
+# Tokens that imply a fact noun the question leaves out ("count women" counts citizens)
+IMPLIED_TOKENS = {"female": "citizens", "male": "citizens"}
+
+# Filler domain words that may differ between paraphrases; every other token is a guard
+# token (numbers, names, schemes, genders, comparisons, fact nouns, grouping and intent
+# words) that must match exactly
+SOFT_TOKENS = frozenset({
+    "scheme", "records", "details", "data", "information", "list", "age", "rupees"
+})
+
+class SemanticSQLCache:
+    """Token-set similarity index mapping paraphrased questions to validated SQL"""
+
+    def __init__(self, threshold: Optional[float] = None, max_entries: Optional[int] = None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.65"))
+        self.max_entries = max_entries or int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "100000"))
+
+        # features -> entry, in LRU order
+        self._entries: "OrderedDict[FrozenSet[str], Dict[str, Any]]" = OrderedDict()
+        # guard tokens -> set of feature sets sharing them (candidate blocking)
+        self._buckets: Dict[FrozenSet[str], set] = {}
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0, "evictions": 0, "lookup_time_total": 0.0}
+
+    @staticmethod
+    def tokenize(processed_query: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+        """Return (feature tokens, guard tokens) for a preprocessed query"""
+        features = set()
+        for token in TOKEN_PATTERN.findall(processed_query.lower()):
+            token = SYNONYMS.get(token, token)
+            if token in STOPWORDS:
+                continue
+            if len(token) > 4 and token.endswith("s") and not token.endswith("ss") and token not in SOFT_TOKENS:
+                token = SYNONYMS.get(token[:-1], token[:-1])
+            features.add(token)
+        features.update(IMPLIED_TOKENS[token] for token in list(features) if token in IMPLIED_TOKENS)
+        guards = frozenset(t for t in features if t not in SOFT_TOKENS)
+        return frozenset(features), guards
+
+    def add(self, processed_query: str, sql: str, original_query: Optional[str] = None) -> None:
+        """Index validated SQL under the query's token set"""
+        features, guards = self.tokenize(processed_query)
+        if not features:
+            return
+        with self._lock:
+            if features in self._entries:
+                self._entries.move_to_end(features)
+            else:
+                self._buckets.setdefault(guards, set()).add(features)
+            self._entries[features] = {
+                "sql_query": sql,
+                "guards": guards,
+                "original_query": original_query or processed_query,
+                "created_at": time.time()
+            }
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                evicted, entry = self._entries.popitem(last=False)
+                bucket = self._buckets.get(entry["guards"])
+                if bucket is not None:
+                    bucket.discard(evicted)
+                    if not bucket:
+                        del self._buckets[entry["guards"]]
+                self.stats["evictions"] += 1
+
+    def lookup(self, processed_query: str) -> Optional[Dict[str, Any]]:
+        """Return the most similar cached entry above the threshold, or None"""
+        start = time.perf_counter()
+        features, guards = self.tokenize(processed_query)
+        best, best_score = None, 0.0
+        with self._lock:
+            for candidate in self._buckets.get(guards, ()):
+                score = len(features & candidate) / len(features | candidate)
+                if score > best_score:
+                    best, best_score = candidate, score
+            self.stats["lookups"] += 1
+            if best is not None and best_score >= self.threshold:
+                self._entries.move_to_end(best)
+                entry = dict(self._entries[best])
+                entry["similarity"] = round(best_score, 3)
+                self.stats["hits"] += 1
+            else:
+                entry = None
+                self.stats["misses"] += 1
+            self.stats["lookup_time_total"] += time.perf_counter() - start
+        return entry
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Similarity index metrics for monitoring"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["buckets"] = len(self._buckets)
+        total_time = stats.pop("lookup_time_total")
+        stats["avg_lookup_us"] = round(total_time / stats["lookups"] * 1e6, 2) if stats["lookups"] else 0.0
+        stats["hit_ratio"] = round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else 0.0
+        stats["threshold"] = self.threshold
+        return stats
@@ -0,0 +1,83 @@
+"""
+In-flight request coalescing ("singleflight")
+Concurrent callers asking for the same key while a call is running share that
+call's result instead of starting their own. Nothing is kept once the call
+finishes; repeated work across time is the caches' job. Keys are compared
+after the caller's normalization, so the same dashboard question fired by many
+officers at shift start turns into one LLM call and one database execution.
+"""
+import asyncio
+import threading
+import logging
+from typing import Dict, Any, Callable, Awaitable, Hashable, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """Coalesces concurrent async calls that share a key (one event loop)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "executions": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "max_waiters": 0
+        }
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Run func() unless a call for key is already in flight, in which case wait
+        for that one. Returns (result, shared) where shared is True for callers
+        that joined another call. Exceptions reach every caller of the call.
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            call["waiters"] += 1
+            with self._lock:
+                self.stats["calls"] += 1
+                self.stats["coalesced"] += 1
+                self.stats["max_waiters"] = max(self.stats["max_waiters"], call["waiters"])
+            # shield: a follower going away must not cancel the call for everyone else
+            return await asyncio.shield(call["future"]), True
+
+        future = asyncio.ensure_future(func())
+        call = {"future": future, "waiters": 0}
+        self._calls[key] = call
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["executions"] += 1
+        future.add_done_callback(lambda done: self._finish(key, call, done))
+        return await asyncio.shield(future), False
+
+    def _finish(self, key: Hashable, call: Dict[str, Any], future: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not future.cancelled() and future.exception() is not None:
+            with self._lock:
+                self.stats["errors"] += 1
+            logger.debug(f"Singleflight {self.name} call failed for {call['waiters'] + 1} caller(s)")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["in_flight"] = len(self._calls)
+        stats["coalesced_ratio"] = round(stats["coalesced"] / stats["calls"], 3) if stats["calls"] else 0.0
+        return stats
+
+# Global instances: NL-to-SQL conversion and query execution for /query
+nl2sql_flight = SingleFlight("nl2sql")
+execution_flight = SingleFlight("execution")
+
+def get_nl2sql_flight() -> SingleFlight:
+    """Get the process-wide SingleFlight for NL-to-SQL conversions"""
+    return nl2sql_flight
+
+def get_execution_flight() -> SingleFlight:
+    """Get the process-wide SingleFlight for query executions"""
+    return execution_flight
@@ -0,0 +1,156 @@
+"""
+NL to SQL result cache
+Caches generated SQL keyed on the preprocessed query plus a schema fingerprint,
+with LRU/TTL eviction and an optional SQLite backing store that survives restarts
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class NL2SQLCache:
+    """Thread-safe LRU/TTL cache for generated SQL"""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries or int(os.getenv("NL2SQL_CACHE_MAX_ENTRIES", "1000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("NL2SQL_CACHE_TTL", "86400"))
+        self.db_path = db_path or os.getenv("NL2SQL_CACHE_PATH")
+
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+        if self.db_path:
+            self._open_disk_store()
+
+    @staticmethod
+    def make_key(processed_query: str, schema_fingerprint: str) -> str:
+        """Build a cache key from the normalized query and schema fingerprint"""
+        normalized = " ".join(processed_query.split())
+        return hashlib.sha256(f"{schema_fingerprint}|{normalized}".encode("utf-8")).hexdigest()
+
+    def _open_disk_store(self) -> None:
+        """Open (and create if needed) the SQLite backing store"""
+        try:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS nl2sql_cache ("
+                "cache_key TEXT PRIMARY KEY, created_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            if self.ttl_seconds > 0:
+                self._disk.execute("DELETE FROM nl2sql_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._disk.commit()
+            logger.info(f"NL2SQL cache backed by SQLite store at {self.db_path}")
+        except Exception as e:
+            logger.error(f"Failed to open NL2SQL cache store at {self.db_path}: {e}")
+            self._disk = None
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.ttl_seconds > 0 and (time.time() - created_at) > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for key, or None on miss/expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if not self._is_expired(created_at):
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self.stats["expirations"] += 1
+
+            value = self._load_from_disk(key)
+            if value is not None:
+                self.stats["hits"] += 1
+                self.stats["disk_hits"] += 1
+                return value
+
+            self.stats["misses"] += 1
+            return None
+
+    def _load_from_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up key in the backing store and promote it into memory"""
+        if self._disk is None:
+            return None
+        try:
+            row = self._disk.execute(
+                "SELECT created_at, payload FROM nl2sql_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            created_at, payload = row
+            if self._is_expired(created_at):
+                self._disk.execute("DELETE FROM nl2sql_cache WHERE cache_key = ?", (key,))
+                self._disk.commit()
+                self.stats["expirations"] += 1
+                return None
+            value = json.loads(payload)
+            self._store_in_memory(key, created_at, value)
+            return value
+        except Exception as e:
+            logger.error(f"NL2SQL cache disk lookup failed: {e}")
+            return None
+
+    def _store_in_memory(self, key: str, created_at: float, value: Dict[str, Any]) -> None:
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store value under key in memory and, if configured, on disk"""
+        created_at = time.time()
+        with self._lock:
+            self._store_in_memory(key, created_at, value)
+            self.stats["stores"] += 1
+            if self._disk is not None:
+                try:
+                    self._disk.execute(
+                        "INSERT OR REPLACE INTO nl2sql_cache (cache_key, created_at, payload) VALUES (?, ?, ?)",
+                        (key, created_at, json.dumps(value))
+                    )
+                    self._disk.commit()
+                except Exception as e:
+                    logger.error(f"NL2SQL cache disk write failed: {e}")
+
+    def clear(self) -> None:
+        """Drop all cached entries, including the backing store"""
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM nl2sql_cache")
+                self._disk.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics for monitoring"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["persistent"] = self._disk is not None
+        return stats
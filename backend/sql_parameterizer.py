@@ -0,0 +1,123 @@
+"""
+Literal-to-parameter rewriting for generated SQL
+Pulls predicate literals (comparisons, LIKE, BETWEEN, IN lists) out into bound
+parameters so structurally identical queries share one cached plan on SQL Server
+"""
+import os
+import re
+import hashlib
+import logging
+from typing import Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ordered alternation: comments, quoted literals/identifiers, numbers, words, multi-char operators
+TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<nstring>N'(?:[^']|'')*')
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<quoted>\[[^\]]*\]|"[^"]*"|`[^`]*`)
+  | (?P<number>(?<![\w.])\d+(?:\.\d+)?(?![\w.]))
+  | (?P<bind>:\w+|\?|@\w+)
+  | (?P<word>[A-Za-z_][\w$#]*)
+  | (?P<op><>|!=|<=|>=|[=<>])
+  | (?P<space>\s+)
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+COMPARISON_OPERATORS = frozenset({"=", "<>", "!=", "<", ">", "<=", ">="})
+
+class ParameterizedSQL:
+    """Result of parameterizing one statement"""
+
+    __slots__ = ("sql", "params", "fingerprint")
+
+    def __init__(self, sql: str, params: Dict[str, Any], fingerprint: str):
+        self.sql = sql
+        self.params = params
+        self.fingerprint = fingerprint
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"parameterized_sql": self.sql, "sql_params": self.params, "query_fingerprint": self.fingerprint}
+
+def _literal_value(kind: str, text: str) -> Any:
+    if kind == "string":
+        return text[1:-1].replace("''", "'")
+    return float(text) if "." in text else int(text)
+
+def fingerprint_sql(sql: str) -> str:
+    """Stable shape hash of a statement: whitespace collapsed, keywords case-folded outside literals"""
+    parts = []
+    for match in TOKEN_PATTERN.finditer(sql):
+        kind, text = match.lastgroup, match.group()
+        if kind in ("space", "comment"):
+            continue
+        parts.append(text.upper() if kind == "word" else text)
+    return hashlib.sha256(" ".join(parts).encode("utf-8")).hexdigest()[:16]
+
+def parameterize_sql(sql: str, prefix: str = "p") -> ParameterizedSQL:
+    """
+    Replace predicate literals with :p0, :p1 ... bind markers.
+
+    Only literals that are the operand of a comparison, LIKE, BETWEEN ... AND or an
+    IN (...) list are replaced. Literals inside CASE expressions (which may be
+    repeated verbatim in GROUP BY), after TOP, and function arguments such as
+    FORMAT masks are left inline. N'...' literals stay inline as well, since the
+    string parameters are bound as varchar. Statements that already carry bind
+    markers are returned unchanged.
+    """
+    tokens: List[Tuple[str, str]] = [(m.lastgroup, m.group()) for m in TOKEN_PATTERN.finditer(sql)]
+    if any(kind == "bind" for kind, _ in tokens):
+        return ParameterizedSQL(sql, {}, fingerprint_sql(sql))
+
+    params: Dict[str, Any] = {}
+    output: List[str] = []
+    previous = ""          # upper-cased previous significant token
+    case_depth = 0
+    between_state = 0      # 1 after BETWEEN, 2 right after its AND
+    paren_stack: List[bool] = []   # True for parentheses opened by IN
+    after_in = False
+
+    for kind, text in tokens:
+        if kind in ("space", "comment"):
+            output.append(text)
+            continue
+
+        upper = text.upper()
+        replace = False
+        if kind in ("string", "number") and case_depth == 0 and previous != "TOP":
+            in_list = bool(paren_stack) and paren_stack[-1] and previous in ("(", ",")
+            if (previous in COMPARISON_OPERATORS or previous == "LIKE" or previous == "BETWEEN"
+                    or (previous == "AND" and between_state == 2) or in_list):
+                replace = True
+
+        if replace:
+            name = f"{prefix}{len(params)}"
+            params[name] = _literal_value(kind, text)
+            output.append(f":{name}")
+        else:
+            output.append(text)
+
+        if between_state == 2:
+            between_state = 0
+        if kind == "word":
+            if upper == "CASE":
+                case_depth += 1
+            elif upper == "END" and case_depth:
+                case_depth -= 1
+            elif upper == "BETWEEN":
+                between_state = 1
+            elif upper == "AND" and between_state == 1:
+                between_state = 2
+        elif text == "(":
+            paren_stack.append(after_in)
+        elif text == ")" and paren_stack:
+            paren_stack.pop()
+        after_in = kind == "word" and upper == "IN"
+        previous = upper
+
+    parameterized = "".join(output)
+    return ParameterizedSQL(parameterized, params, fingerprint_sql(parameterized))
+
+def parameterization_enabled() -> bool:
+    return os.getenv("SQL_PARAMETERIZE", "true").lower() == "true"
@@ -0,0 +1,221 @@
+"""
+Consolidated summary service for KPI and table-count queries
+Dashboard KPIs come from one batched statement and table sizes from one
+catalog/UNION ALL query instead of a COUNT(*) round trip each. The remaining
+independent queries are fanned out concurrently on the database worker pool,
+and every call reports how long each query took.
+"""
+import time
+import asyncio
+import functools
+import threading
+import logging
+from typing import Dict, Any, Callable, List, Tuple, FrozenSet
+
+from db import get_db_connection
+from cube import get_rollup_cube, CUBE_FACTS
+
+logger = logging.getLogger(__name__)
+
+# Every headline KPI in one round trip (scalar subqueries work on SQL Server and SQLite)
+KPI_SQL = """
+SELECT
+    (SELECT COUNT(*) FROM citizens) AS total_citizens,
+    (SELECT COALESCE(SUM(amount), 0) FROM disbursements) AS total_disbursements,
+    (SELECT COUNT(*) FROM schemes) AS active_schemes,
+    (SELECT COUNT(*) FROM enrollments) AS total_enrollments
+"""
+
+# Per-scheme totals; enrollments and disbursements are aggregated before the join
+# so one scheme's rows are not multiplied by the other table's
+SCHEME_TOTALS_SQL = """
+SELECT s.scheme_id, s.name AS scheme_name,
+       COALESCE(e.total_enrollments, 0) AS total_enrollments,
+       COALESCE(d.total_disbursements, 0) AS total_disbursements
+FROM schemes s
+LEFT JOIN (SELECT scheme_id, COUNT(*) AS total_enrollments FROM enrollments GROUP BY scheme_id) e
+    ON e.scheme_id = s.scheme_id
+LEFT JOIN (SELECT scheme_id, SUM(amount) AS total_disbursements FROM disbursements GROUP BY scheme_id) d
+    ON d.scheme_id = s.scheme_id
+ORDER BY s.scheme_id
+"""
+
+AGE_BUCKET_SQL = """
+CASE
+    WHEN age < 18 THEN 'Under 18'
+    WHEN age BETWEEN 18 AND 30 THEN '18-30'
+    WHEN age BETWEEN 31 AND 50 THEN '31-50'
+    WHEN age BETWEEN 51 AND 65 THEN '51-65'
+    ELSE 'Over 65'
+END"""
+AGE_DISTRIBUTION_SQL = f"""
+SELECT {AGE_BUCKET_SQL} as age_group, COUNT(*) as count
+FROM citizens
+GROUP BY {AGE_BUCKET_SQL}
+ORDER BY count DESC
+"""
+GENDER_DISTRIBUTION_SQL = "SELECT gender, COUNT(*) as count FROM citizens GROUP BY gender"
+MONTHLY_TREND_MEASURES = ["disbursement_count", "disbursed_amount", "beneficiaries", "enrollment_count"]
+
+SUMMARY_TABLES = ["citizens", "officers", "schemes", "enrollments", "disbursements"]
+
+class SummaryService:
+    """Runs summary queries concurrently and keeps per-query latency stats"""
+
+    def __init__(self, db_manager=None):
+        self._db_manager = db_manager
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def db_manager(self):
+        return self._db_manager or get_db_connection()
+
+    def _record(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            entry = self.stats.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+    async def _timed(self, name: str, func: Callable, *args) -> Tuple[str, Any, float]:
+        def run():
+            start = time.perf_counter()
+            try:
+                return func(*args), (time.perf_counter() - start) * 1000
+            except Exception as e:
+                logger.error(f"Summary query {name} failed: {e}")
+                return {"status": "error", "message": str(e)}, (time.perf_counter() - start) * 1000
+
+        result, elapsed_ms = await self.db_manager.run_in_executor(run)
+        self._record(name, elapsed_ms)
+        return name, result, round(elapsed_ms, 2)
+
+    async def gather(self, calls: Dict[str, Tuple]) -> Dict[str, Any]:
+        """
+        Run {name: (func, *args)} concurrently. Returns the results by name plus
+        timings_ms per query and the wall-clock total of the fan-out.
+        """
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(self._timed(name, *call) for name, call in calls.items()))
+        return {
+            "results": {name: result for name, result, _ in outcomes},
+            "timings_ms": {name: elapsed_ms for name, _, elapsed_ms in outcomes},
+            "total_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+
+    def _kpis(self) -> Dict[str, Any]:
+        result = self.db_manager.execute_query(KPI_SQL)
+        if result["status"] != "success" or not result["data"]:
+            return result
+        return {"status": "success", "data": result["data"][0]}
+
+    async def overview(self, tables: List[str] = SUMMARY_TABLES) -> Dict[str, Any]:
+        """Table sizes, headline KPIs and the table list, fetched concurrently"""
+        db_manager = self.db_manager
+        fan_out = await self.gather({
+            "table_counts": (db_manager.table_row_counts, tables),
+            "kpis": (self._kpis,),
+            "table_list": (db_manager.list_tables,)
+        })
+        results = fan_out["results"]
+        overview = {
+            "tables": {},
+            "total_records": 0,
+            "kpis": results["kpis"].get("data") if results["kpis"]["status"] == "success" else None,
+            "database_info": {},
+            "timings_ms": fan_out["timings_ms"],
+            "total_ms": fan_out["total_ms"]
+        }
+
+        counts = results["table_counts"]
+        for table in tables:
+            if counts["status"] == "success":
+                overview["tables"][table] = {"record_count": counts["data"][table], "status": "accessible"}
+                overview["total_records"] += counts["data"][table]
+            else:
+                overview["tables"][table] = {"record_count": 0, "status": "error",
+                                             "message": counts.get("message", "Unknown error")}
+        if counts["status"] == "success":
+            overview["database_info"]["record_count_source"] = counts["source"]
+
+        table_list = results["table_list"]
+        if table_list["status"] == "success":
+            overview["database_info"]["total_tables"] = len(table_list["data"])
+            overview["database_info"]["table_names"] = [t["TABLE_NAME"] for t in table_list["data"]]
+        return overview
+
+    async def dashboard(self) -> Dict[str, Any]:
+        """Headline KPIs and per-scheme totals for the reports dashboard"""
+        fan_out = await self.gather({
+            "kpis": (self._kpis,),
+            "scheme_totals": (self.db_manager.execute_query, SCHEME_TOTALS_SQL)
+        })
+        results = fan_out["results"]
+        failed = {name: result.get("message") for name, result in results.items() if result["status"] != "success"}
+        return {
+            "kpis": results["kpis"].get("data"),
+            "schemes": results["scheme_totals"].get("data", []),
+            "errors": failed,
+            "timings_ms": fan_out["timings_ms"],
+            "total_ms": fan_out["total_ms"]
+        }
+
+    async def analytics(self, changed_tables: FrozenSet[str] = frozenset()) -> Dict[str, Any]:
+        """
+        Demographic distributions from citizens plus scheme, state and monthly
+        rollups from the cube. Contains no timings, so identical data gives an
+        identical payload. If changed_tables includes a cube fact table the cube
+        is refreshed first rather than waiting out its max age.
+        """
+        cube = get_rollup_cube()
+        if changed_tables & CUBE_FACTS.keys():
+            await self.db_manager.run_in_executor(cube.refresh)
+        fan_out = await self.gather({
+            "age_distribution": (self.db_manager.execute_query, AGE_DISTRIBUTION_SQL),
+            "gender_distribution": (self.db_manager.execute_query, GENDER_DISTRIBUTION_SQL),
+            "cube_schemes": (functools.partial(cube.query, level="all", by_scheme=True),),
+            "cube_states": (functools.partial(cube.query, level="state"),),
+            "cube_monthly": (functools.partial(cube.query, level="all", by_month=True,
+                                               measures=MONTHLY_TREND_MEASURES),)
+        })
+        results = fan_out["results"]
+        failed = [name for name, result in results.items() if result.get("status") == "error"]
+        if failed:
+            logger.error(f"Analytics queries failed: {', '.join(failed)}")
+
+        def rows(name: str, key: str) -> Any:
+            return results[name].get(key) if name not in failed else None
+
+        analytics = {
+            "demographic_insights": {
+                "age_distribution": rows("age_distribution", "data"),
+                "gender_distribution": rows("gender_distribution", "data")
+            },
+            "distribution_analysis": {
+                "schemes": rows("cube_schemes", "rows"),
+                "states": rows("cube_states", "rows")
+            },
+            "trends": {
+                "monthly": rows("cube_monthly", "rows")
+            },
+            "cube_watermarks": rows("cube_monthly", "watermarks")
+        }
+        if failed:
+            analytics["errors"] = failed
+        return analytics
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {"calls": entry["calls"], "avg_ms": round(entry["total_ms"] / entry["calls"], 2),
+                       "max_ms": round(entry["max_ms"], 2)}
+                for name, entry in self.stats.items()
+            }
+
+# Global instance
+summary_service = SummaryService()
+
+def get_summary_service() -> SummaryService:
+    """Get the process-wide SummaryService instance"""
+    return summary_service
@@ -0,0 +1,557 @@
+"""
+Deterministic synthetic data generator for the welfare schema
+Scales database/data.sql up to millions of referentially consistent rows,
+writes them as chunked CSV or Parquet files and optionally bulk-loads them into
+SQLite or SQL Server.
+
+Every (table, chunk) pair draws from its own seeded random stream, so the output
+is identical for a given --seed and --scale no matter how many processes run.
+Vocabularies (names, statuses, reasons, banks, ...) and their frequencies come
+from the hand-written sample rows in data.sql.
+
+Usage:
+    python synthetic_data.py --scale 25 --format parquet --out ../database/synthetic
+    python synthetic_data.py --scale 1 --load sqlite --sqlite-path ../database/welfare_large.db
+    python synthetic_data.py --load-only --out ../database/synthetic --load mssql
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import multiprocessing
+from typing import Dict, Any, List, Tuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from local_db import (REPO_ROOT, DEFAULT_SCHEMA_PATH, DEFAULT_DATA_PATH, INSERT_PATTERN,
+                      SYNTHETIC_SOURCE_PREFIX, split_sql_script, _parse_values, _schema_statements)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_DIR = os.path.join(REPO_ROOT, "database", "synthetic")
+CHUNK_ROWS = int(os.getenv("SYNTHETIC_CHUNK_ROWS", "250000"))
+
+# Citizens per unit of scale; every other fact table is sized relative to citizens.
+# --scale 25 gives 2.5M citizens and 10M disbursements.
+CITIZENS_PER_SCALE = 100_000
+ROWS_PER_CITIZEN = {
+    "citizens": 1.0,
+    "health_details": 0.15,
+    "bank_accounts": 1.1,
+    "enrollments": 2.0,
+    "disbursements": 4.0,
+    "eligibility_log": 1.5,
+    "access_log": 0.2,
+}
+CITIZENS_PER_VILLAGE = 2000
+CITIZENS_PER_OFFICER = 10000
+
+# Parent tables first, so loading in this order never violates a foreign key
+TABLE_ORDER = ["states", "districts", "villages", "schemes", "scheme_eligibility", "officers",
+               "citizens", "health_details", "bank_accounts", "enrollments", "disbursements",
+               "eligibility_log", "access_log"]
+FACT_TABLES = list(ROWS_PER_CITIZEN)
+
+# Bijections onto 12-digit Aadhaar and 14-digit account numbers: x -> (a*x + b) mod m is a
+# permutation of [0, m) when gcd(a, m) == 1, so distinct ids always map to distinct numbers
+# (int64 arithmetic holds for ids below ~1.9e8)
+AADHAAR_SPACE, AADHAAR_BASE = 8 * 10 ** 11, 2 * 10 ** 11
+ACCOUNT_SPACE, ACCOUNT_BASE = 9 * 10 ** 13, 10 ** 13
+BIJECTION_MULTIPLIER, BIJECTION_OFFSET = 48_271_000_007, 982_451_653
+
+ENROLLMENT_START, ENROLLMENT_DAYS = np.datetime64("2019-01-01"), 6 * 365
+DISBURSEMENT_START, DISBURSEMENT_DAYS = np.datetime64("2020-01-01"), 5 * 365
+LOG_START, LOG_SECONDS = np.datetime64("2019-01-01T00:00:00"), 6 * 365 * 86400
+EMAIL_DOMAINS = np.array(["gmail.com", "yahoo.com", "outlook.com", "rediffmail.com"], dtype=object)
+
+# Worker state, set once per process by _init_worker
+_CONTEXT: Optional[Dict[str, Any]] = None
+
+def table_row_counts(scale: float) -> Dict[str, int]:
+    """Row counts of the generated fact tables for a scale factor"""
+    citizens = max(1, int(round(scale * CITIZENS_PER_SCALE)))
+    return {table: max(1, int(round(citizens * ratio))) for table, ratio in ROWS_PER_CITIZEN.items()}
+
+def _bijection(ids: np.ndarray, space: int, base: int) -> np.ndarray:
+    return (ids * BIJECTION_MULTIPLIER + BIJECTION_OFFSET) % space + base
+
+def _rng(seed: int, table: str, chunk: int) -> np.random.Generator:
+    return np.random.default_rng([seed, TABLE_ORDER.index(table), chunk])
+
+def _vocabulary(values) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct values and their relative frequencies"""
+    counts = pd.Series(list(values)).value_counts(dropna=False)
+    index = counts.index.to_numpy(dtype=object)
+    index[pd.isna(index)] = None
+    return index, (counts.to_numpy() / counts.sum())
+
+def _choice(rng: np.random.Generator, vocabulary: Tuple[np.ndarray, np.ndarray], size: int) -> np.ndarray:
+    values, weights = vocabulary
+    return values[rng.choice(len(values), size=size, p=weights)]
+
+def _with_nulls(rng: np.random.Generator, values: np.ndarray, null_fraction: float) -> np.ndarray:
+    values = values.astype(object)
+    values[rng.random(len(values)) < null_fraction] = None
+    return values
+
+def _iso_dates(start: np.datetime64, offsets: np.ndarray) -> np.ndarray:
+    return np.datetime_as_string(start + offsets.astype("timedelta64[D]"), unit="D").astype(object)
+
+def _iso_timestamps(start: np.datetime64, offsets: np.ndarray) -> np.ndarray:
+    text = np.datetime_as_string(start + offsets.astype("timedelta64[s]"), unit="s")
+    return np.char.replace(text, "T", " ").astype(object)
+
+def load_seed_data(data_path: str = DEFAULT_DATA_PATH) -> Dict[str, pd.DataFrame]:
+    """Sample rows from data.sql as one DataFrame per table"""
+    with open(data_path, encoding="utf-8") as data_file:
+        statements = split_sql_script(data_file.read())
+    frames: Dict[str, List[pd.DataFrame]] = {}
+    for statement in statements:
+        insert = INSERT_PATTERN.match(statement)
+        if not insert:
+            continue
+        table, columns, values_sql = insert.groups()
+        names = [column.strip() for column in columns.split(",")]
+        frames.setdefault(table, []).append(pd.DataFrame(_parse_values(values_sql), columns=names))
+    return {table: pd.concat(parts, ignore_index=True) for table, parts in frames.items()}
+
+def build_context(seed_data: Dict[str, pd.DataFrame], scale: float, seed: int) -> Dict[str, Any]:
+    """Reference tables plus the vocabularies and sizes the chunk workers need"""
+    counts = table_row_counts(scale)
+    citizens = seed_data["citizens"]
+    split_names = citizens["name"].str.split()
+    first_names, last_names = split_names.str[0], split_names.str[-1]
+
+    reference = {table: seed_data[table] for table in ("states", "districts", "schemes", "scheme_eligibility")}
+
+    # Extra villages and officers keep per-village and per-officer volumes realistic at scale
+    villages = seed_data["villages"]
+    extra_villages = max(0, counts["citizens"] // CITIZENS_PER_VILLAGE - len(villages))
+    if extra_villages:
+        rng = _rng(seed, "villages", 0)
+        districts = seed_data["districts"]
+        picked = districts.iloc[rng.integers(0, len(districts), extra_villages)]
+        ids = np.arange(len(villages) + 1, len(villages) + extra_villages + 1)
+        villages = pd.concat([villages, pd.DataFrame({
+            "village_id": ids,
+            "name": picked["name"].to_numpy(dtype=object) + " Gram " + ids.astype(str).astype(object),
+            "district_id": picked["district_id"].to_numpy()
+        })], ignore_index=True)
+    reference["villages"] = villages
+
+    officers = seed_data["officers"]
+    extra_officers = max(0, counts["citizens"] // CITIZENS_PER_OFFICER - len(officers))
+    if extra_officers:
+        rng = _rng(seed, "officers", 0)
+        ids = np.arange(len(officers) + 1, len(officers) + extra_officers + 1)
+        roles = officers[["designation", "access_level"]].iloc[rng.integers(0, len(officers), extra_officers)]
+        first = first_names.to_numpy(dtype=object)[rng.integers(0, len(first_names), extra_officers)]
+        last = last_names.to_numpy(dtype=object)[rng.integers(0, len(last_names), extra_officers)]
+        officers = pd.concat([officers, pd.DataFrame({
+            "officer_id": ids,
+            "name": first + " " + last,
+            "designation": roles["designation"].to_numpy(),
+            "access_level": roles["access_level"].to_numpy(),
+            "email": np.char.lower((first + "." + last + ids.astype(str).astype(object) + "@gov.in").astype(str)).astype(object),
+            "district_id": seed_data["districts"]["district_id"].to_numpy()[
+                rng.integers(0, len(seed_data["districts"]), extra_officers)]
+        })], ignore_index=True)
+    reference["officers"] = officers
+
+    amounts = seed_data["disbursements"].groupby("scheme_id")["amount"].agg(["min", "max"])
+    schemes = seed_data["schemes"]["scheme_id"].to_numpy()
+    eligibility = seed_data["eligibility_log"]
+    access = seed_data["access_log"]
+    banks = seed_data["bank_accounts"]
+
+    return {
+        "seed": seed,
+        "scale": scale,
+        "counts": counts,
+        "reference": reference,
+        "village_count": len(villages),
+        "officer_count": len(officers),
+        "scheme_ids": schemes,
+        "amount_min": amounts["min"].reindex(schemes).fillna(0).to_numpy(),
+        "amount_max": amounts["max"].reindex(schemes).fillna(0).to_numpy(),
+        "genders": _vocabulary(citizens["gender"]),
+        "first_names": {gender: first_names[citizens["gender"] == gender].unique().astype(object)
+                        for gender in citizens["gender"].unique()},
+        "last_names": last_names.unique().astype(object),
+        "ages": citizens["age"].to_numpy(),
+        "conditions": _vocabulary(seed_data["health_details"]["chronic_conditions"]),
+        "disabilities": _vocabulary(seed_data["health_details"]["disability_status"]),
+        "banks": _vocabulary(banks["bank_name"] + "|" + banks["ifsc_code"].str[:4]),
+        "enrollment_statuses": _vocabulary(seed_data["enrollments"]["status"]),
+        "disbursement_statuses": _vocabulary(seed_data["disbursements"]["status"]),
+        "payment_modes": _vocabulary(seed_data["disbursements"]["payment_mode"]),
+        "eligibility_outcomes": _vocabulary(eligibility["eligibility_result"] + "|" + eligibility["reason"].fillna("")),
+        "access_patterns": _vocabulary(access["entity_accessed"] + "|" + access["action"] + "|" + access["query_text"].fillna("")),
+    }
+
+def _enrollment_parties(enrollment_index: np.ndarray, counts: Dict[str, int], scheme_ids: np.ndarray):
+    """
+    (citizen_id, scheme_id) of 0-based enrollment rows.
+
+    Enrollments are spread evenly over citizens and a citizen's k-th enrollment
+    takes the next scheme after its first, so (citizen, scheme) pairs never repeat
+    and disbursements/eligibility checks can be pointed at real enrollments.
+    """
+    citizens, enrollments = counts["citizens"], counts["enrollments"]
+    citizen_index = enrollment_index * citizens // enrollments
+    first_enrollment = (citizen_index * enrollments + citizens - 1) // citizens
+    slot = enrollment_index - first_enrollment
+    scheme = scheme_ids[(citizen_index + slot) % len(scheme_ids)]
+    return citizen_index + 1, scheme
+
+def _spread_ids(row_index: np.ndarray, rows: int, parents: int) -> np.ndarray:
+    """Map rows evenly onto parent ids 1..parents (distinct per row when rows <= parents)"""
+    return row_index * parents // rows + 1
+
+def _generate_citizens(rng, ctx, ids):
+    size = len(ids)
+    gender = _choice(rng, ctx["genders"], size)
+    first = np.empty(size, dtype=object)
+    for value, pool in ctx["first_names"].items():
+        mask = gender == value
+        first[mask] = pool[rng.integers(0, len(pool), int(mask.sum()))]
+    last = ctx["last_names"][rng.integers(0, len(ctx["last_names"]), size)]
+    id_text = ids.astype(str).astype(object)
+    email = np.char.lower((first + "." + last + id_text + "@").astype(str)).astype(object)
+    email = email + EMAIL_DOMAINS[rng.integers(0, len(EMAIL_DOMAINS), size)]
+    age = ctx["ages"][rng.integers(0, len(ctx["ages"]), size)] + rng.integers(-2, 3, size)
+    return pd.DataFrame({
+        "citizen_id": ids,
+        "aadhaar_no": _bijection(ids, AADHAAR_SPACE, AADHAAR_BASE).astype(str).astype(object),
+        "name": first + " " + last,
+        "gender": gender,
+        "age": np.clip(age, 0, 100),
+        "mobile_no": _with_nulls(rng, rng.integers(6_000_000_000, 10_000_000_000, size).astype(str), 0.05),
+        "email": _with_nulls(rng, email, 0.4),
+        "village_id": rng.integers(1, ctx["village_count"] + 1, size)
+    })
+
+def _generate_health_details(rng, ctx, ids):
+    index = ids - 1
+    return pd.DataFrame({
+        "citizen_id": _spread_ids(index, ctx["counts"]["health_details"], ctx["counts"]["citizens"]),
+        "chronic_conditions": _choice(rng, ctx["conditions"], len(ids)),
+        "disability_status": _choice(rng, ctx["disabilities"], len(ids))
+    })
+
+def _generate_bank_accounts(rng, ctx, ids):
+    size = len(ids)
+    bank, prefix = np.array([value.split("|") for value in _choice(rng, ctx["banks"], size)], dtype=object).T
+    branch = rng.integers(0, 1_000_000, size).astype(str)
+    return pd.DataFrame({
+        "account_id": ids,
+        "citizen_id": _spread_ids(ids - 1, ctx["counts"]["bank_accounts"], ctx["counts"]["citizens"]),
+        "account_no": _bijection(ids, ACCOUNT_SPACE, ACCOUNT_BASE).astype(str).astype(object),
+        "bank_name": bank,
+        "ifsc_code": prefix + "0" + np.char.zfill(branch, 6).astype(object)
+    })
+
+def _generate_enrollments(rng, ctx, ids):
+    size = len(ids)
+    citizen_id, scheme_id = _enrollment_parties(ids - 1, ctx["counts"], ctx["scheme_ids"])
+    enrolled = rng.integers(0, ENROLLMENT_DAYS, size)
+    verified = rng.random(size) >= 0.1
+    verified_on = _iso_dates(ENROLLMENT_START, enrolled + rng.integers(30, 540, size))
+    verified_on[~verified] = None
+    verified_by = rng.integers(1, ctx["officer_count"] + 1, size).astype(object)
+    verified_by[~verified] = None
+    return pd.DataFrame({
+        "enrollment_id": ids,
+        "citizen_id": citizen_id,
+        "scheme_id": scheme_id,
+        "enrollment_date": _iso_dates(ENROLLMENT_START, enrolled),
+        "status": _choice(rng, ctx["enrollment_statuses"], size),
+        "last_verified_on": verified_on,
+        "verified_by": verified_by
+    })
+
+def _generate_disbursements(rng, ctx, ids):
+    size = len(ids)
+    citizen_id, scheme_id = _enrollment_parties(rng.integers(0, ctx["counts"]["enrollments"], size),
+                                                ctx["counts"], ctx["scheme_ids"])
+    scheme_index = np.searchsorted(ctx["scheme_ids"], scheme_id)
+    low, high = ctx["amount_min"][scheme_index], ctx["amount_max"][scheme_index]
+    amount = np.round((low + (high - low) * rng.random(size)) / 50) * 50
+    return pd.DataFrame({
+        "disbursement_id": ids,
+        "citizen_id": citizen_id,
+        "scheme_id": scheme_id,
+        "amount": amount,
+        "status": _choice(rng, ctx["disbursement_statuses"], size),
+        "disbursed_on": _iso_dates(DISBURSEMENT_START, rng.integers(0, DISBURSEMENT_DAYS, size)),
+        "approved_by": _with_nulls(rng, rng.integers(1, ctx["officer_count"] + 1, size), 0.05),
+        "payment_mode": _choice(rng, ctx["payment_modes"], size)
+    })
+
+def _generate_eligibility_log(rng, ctx, ids):
+    size = len(ids)
+    citizen_id, scheme_id = _enrollment_parties(rng.integers(0, ctx["counts"]["enrollments"], size),
+                                                ctx["counts"], ctx["scheme_ids"])
+    result, reason = np.array([value.split("|", 1) for value in _choice(rng, ctx["eligibility_outcomes"], size)],
+                              dtype=object).T
+    reason[reason == ""] = None
+    return pd.DataFrame({
+        "log_id": ids,
+        "citizen_id": citizen_id,
+        "scheme_id": scheme_id,
+        "eligibility_result": result,
+        "reason": reason,
+        "checked_on": _iso_timestamps(LOG_START, rng.integers(0, LOG_SECONDS, size))
+    })
+
+def _generate_access_log(rng, ctx, ids):
+    size = len(ids)
+    entity, action, query_text = np.array([value.split("|", 2) for value in _choice(rng, ctx["access_patterns"], size)],
+                                          dtype=object).T
+    query_text[query_text == ""] = None
+    return pd.DataFrame({
+        "log_id": ids,
+        "officer_id": rng.integers(1, ctx["officer_count"] + 1, size),
+        "entity_accessed": entity,
+        "action": action,
+        "timestamp": _iso_timestamps(LOG_START, rng.integers(0, LOG_SECONDS, size)),
+        "query_text": query_text,
+        "target_id": _with_nulls(rng, rng.integers(1, ctx["counts"]["citizens"] + 1, size), 0.3)
+    })
+
+GENERATORS = {
+    "citizens": _generate_citizens,
+    "health_details": _generate_health_details,
+    "bank_accounts": _generate_bank_accounts,
+    "enrollments": _generate_enrollments,
+    "disbursements": _generate_disbursements,
+    "eligibility_log": _generate_eligibility_log,
+    "access_log": _generate_access_log,
+}
+
+def _write_frame(frame: pd.DataFrame, path: str, file_format: str) -> None:
+    if file_format == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+def _part_path(output_dir: str, table: str, chunk: int, file_format: str) -> str:
+    return os.path.join(output_dir, table, f"part-{chunk:05d}.{file_format}")
+
+def _init_worker(context: Dict[str, Any]) -> None:
+    global _CONTEXT
+    _CONTEXT = context
+
+def _generate_chunk(task: Tuple[str, int, int, int, str, str]) -> Dict[str, Any]:
+    """Generate and write rows [start, stop) of one table; runs in a worker process"""
+    table, chunk, start, stop, output_dir, file_format = task
+    began = time.perf_counter()
+    frame = GENERATORS[table](_rng(_CONTEXT["seed"], table, chunk), _CONTEXT, np.arange(start + 1, stop + 1, dtype=np.int64))
+    path = _part_path(output_dir, table, chunk, file_format)
+    _write_frame(frame, path, file_format)
+    return {"table": table, "chunk": chunk, "rows": len(frame), "path": path,
+            "seconds": round(time.perf_counter() - began, 3)}
+
+def generate_dataset(scale: float, output_dir: str = DEFAULT_OUTPUT_DIR, seed: int = 42,
+                     file_format: str = "csv", processes: Optional[int] = None,
+                     chunk_rows: int = CHUNK_ROWS, data_path: str = DEFAULT_DATA_PATH) -> Dict[str, Any]:
+    """
+    Generate the full dataset into output_dir/<table>/part-NNNNN.<format>.
+
+    Fact-table chunks are generated in parallel across processes. A manifest.json
+    with the seed, scale, row counts and files is written next to the data.
+    """
+    if file_format not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported format: {file_format}")
+    start = time.perf_counter()
+    context = build_context(load_seed_data(data_path), scale, seed)
+    for table in TABLE_ORDER:
+        os.makedirs(os.path.join(output_dir, table), exist_ok=True)
+        for name in os.listdir(os.path.join(output_dir, table)):
+            if name.startswith("part-"):
+                os.remove(os.path.join(output_dir, table, name))
+
+    files: Dict[str, List[str]] = {}
+    for table, frame in context["reference"].items():
+        path = _part_path(output_dir, table, 0, file_format)
+        _write_frame(frame, path, file_format)
+        files[table] = [path]
+
+    tasks = []
+    for table in FACT_TABLES:
+        total = context["counts"][table]
+        for chunk, chunk_start in enumerate(range(0, total, chunk_rows)):
+            tasks.append((table, chunk, chunk_start, min(chunk_start + chunk_rows, total), output_dir, file_format))
+    # Largest tables first so the pool is not left waiting on one big straggler
+    tasks.sort(key=lambda task: task[2] - task[3])
+
+    processes = processes or os.cpu_count() or 1
+    if processes > 1:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(context,)) as pool:
+            results = list(pool.imap_unordered(_generate_chunk, tasks))
+    else:
+        _init_worker(context)
+        results = [_generate_chunk(task) for task in tasks]
+
+    for result in sorted(results, key=lambda result: (result["table"], result["chunk"])):
+        files.setdefault(result["table"], []).append(result["path"])
+
+    row_counts = {table: len(frame) for table, frame in context["reference"].items()}
+    row_counts.update(context["counts"])
+    manifest = {
+        "seed": seed,
+        "scale": scale,
+        "format": file_format,
+        "rows": {table: row_counts[table] for table in TABLE_ORDER},
+        "files": {table: [os.path.relpath(path, output_dir) for path in files[table]] for table in TABLE_ORDER},
+        "generate_seconds": round(time.perf_counter() - start, 3),
+        "processes": processes
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    logger.info(f"Generated {sum(row_counts.values())} rows in {manifest['generate_seconds']}s "
+                f"with {processes} process(es) into {output_dir}")
+    return manifest
+
+# ---------------------------------------------------------------------------
+# Bulk loading
+# ---------------------------------------------------------------------------
+
+def _read_part(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    # Identifiers such as aadhaar_no, mobile_no and account_no must stay text
+    return pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+
+def _frame_rows(frame: pd.DataFrame) -> List[Tuple]:
+    """DataFrame -> list of tuples of plain Python values with None for nulls"""
+    columns = []
+    for name in frame.columns:
+        column = frame[name]
+        if pd.api.types.is_float_dtype(column) and column.dropna().mod(1).eq(0).all() and name != "amount":
+            column = column.astype("Int64")
+        if column.hasnans:
+            columns.append(column.astype(object).where(column.notna(), None).tolist())
+        else:
+            # ndarray.tolist() yields plain Python ints/floats/strs that every DB-API driver binds
+            columns.append(column.to_numpy().tolist())
+    return list(zip(*columns))
+
+def _iter_parts(output_dir: str, manifest: Dict[str, Any]):
+    for table in TABLE_ORDER:
+        for relative in manifest["files"][table]:
+            frame = _read_part(os.path.join(output_dir, relative))
+            yield table, list(frame.columns), _frame_rows(frame)
+
+def load_into_sqlite(output_dir: str, db_path: str, schema_path: str = DEFAULT_SCHEMA_PATH) -> Dict[str, Any]:
+    """
+    Create the schema in a fresh SQLite file and load every part file.
+
+    One transaction with synchronous=OFF, indexes built after the data, then
+    ANALYZE. The file is tagged so the local engine mode reuses it as-is.
+    """
+    start = time.perf_counter()
+    with open(os.path.join(output_dir, "manifest.json"), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    with open(schema_path, encoding="utf-8") as schema_file:
+        creates, indexes = _schema_statements(schema_file.read())
+
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    connection = sqlite3.connect(db_path, isolation_level=None)
+    loaded: Dict[str, int] = {}
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=OFF")
+        connection.execute("BEGIN")
+        for statement in creates:
+            connection.execute(statement)
+        for table, columns, rows in _iter_parts(output_dir, manifest):
+            placeholders = ", ".join("?" * len(columns))
+            connection.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+            loaded[table] = loaded.get(table, 0) + len(rows)
+        for statement in indexes:
+            connection.execute(statement)
+        connection.execute("CREATE TABLE _local_db_meta (source_hash TEXT NOT NULL, loaded_at REAL NOT NULL)")
+        connection.execute("INSERT INTO _local_db_meta VALUES (?, ?)",
+                           (f"{SYNTHETIC_SOURCE_PREFIX}{manifest['seed']}:{manifest['scale']}", time.time()))
+        connection.execute("COMMIT")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("ANALYZE")
+    except Exception:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+    finally:
+        connection.close()
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"Loaded {sum(loaded.values())} rows into SQLite {db_path} in {elapsed:.2f}s")
+    return {"target": "sqlite", "path": db_path, "rows": loaded, "load_seconds": round(elapsed, 3)}
+
+def load_into_sql_server(output_dir: str, batch_rows: int = 50000) -> Dict[str, Any]:
+    """
+    Load every part file into the configured SQL Server database (AZURE_SQL_* settings).
+
+    Tables must already exist and be empty. Rows are sent with pyodbc
+    fast_executemany in batches, committing once per part file.
+    """
+    from sqlalchemy import create_engine
+    from db import DatabaseManager
+
+    start = time.perf_counter()
+    with open(os.path.join(output_dir, "manifest.json"), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    engine = create_engine(DatabaseManager._build_connection_string(), fast_executemany=True)
+    loaded: Dict[str, int] = {}
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.fast_executemany = True
+        for table, columns, rows in _iter_parts(output_dir, manifest):
+            placeholders = ", ".join("?" * len(columns))
+            statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+            for batch_start in range(0, len(rows), batch_rows):
+                cursor.executemany(statement, rows[batch_start:batch_start + batch_rows])
+            connection.commit()
+            loaded[table] = loaded.get(table, 0) + len(rows)
+            logger.info(f"Loaded {loaded[table]} rows into {table}")
+        cursor.close()
+    finally:
+        connection.close()
+        engine.dispose()
+
+    elapsed = time.perf_counter() - start
+    return {"target": "mssql", "rows": loaded, "load_seconds": round(elapsed, 3)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help=f"{CITIZENS_PER_SCALE} citizens per unit; 25 gives 10M disbursements")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--out", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--load", choices=["sqlite", "mssql"], default=None)
+    parser.add_argument("--sqlite-path", default=os.path.join(REPO_ROOT, "database", "welfare_large.db"))
+    parser.add_argument("--load-only", action="store_true", help="Load an existing output directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.load_only:
+        manifest = generate_dataset(args.scale, args.out, args.seed, args.format, args.processes, args.chunk_rows)
+        print(json.dumps({"rows": manifest["rows"], "generate_seconds": manifest["generate_seconds"]}, indent=2))
+    if args.load == "sqlite":
+        print(json.dumps(load_into_sqlite(args.out, args.sqlite_path), indent=2))
+    elif args.load == "mssql":
+        print(json.dumps(load_into_sql_server(args.out), indent=2))
+
+if __name__ == "__main__":
+    main()
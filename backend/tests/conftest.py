@@ -0,0 +1,9 @@
+"""
+Test setup: backend modules import each other as top-level modules, as they do under uvicorn
+"""
+import os
+import sys
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
@@ -0,0 +1,85 @@
+"""
+AnalyticsTier: snapshot answers match the OLTP database, under the governor's row cap and timeout
+"""
+import threading
+
+import pytest
+
+from analytics_tier import AnalyticsTier, translate_tsql_to_duckdb
+from db import DatabaseManager, QueryCancelToken
+
+duckdb = pytest.importorskip("duckdb")
+
+@pytest.fixture(scope="module")
+def db_manager(tmp_path_factory):
+    """DatabaseManager on a fresh SQLite copy of database/schema.sql + data.sql"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DB_ENGINE", "sqlite")
+        patch.setenv("LOCAL_DB_PATH", str(tmp_path_factory.mktemp("oltp") / "welfare.db"))
+        patch.setenv("RESULT_CACHE_MAX_BYTES", "0")
+        manager = DatabaseManager()
+    assert manager.engine is not None
+    yield manager
+    manager.executor.shutdown(wait=False)
+    manager.engine.dispose()
+
+@pytest.fixture(scope="module")
+def tier(db_manager, tmp_path_factory):
+    tier = AnalyticsTier(db_manager, snapshot_dir=str(tmp_path_factory.mktemp("snapshot")))
+    tier.take_snapshot()
+    return tier
+
+def _same_answer(tier, db_manager, sql):
+    snapshot = tier.execute(sql)
+    oltp = db_manager.execute_query(sql, use_cache=False)
+    assert oltp["status"] == "success", oltp.get("message")
+    assert [list(row.values()) for row in snapshot["data"]] == [list(row.values()) for row in oltp["data"]]
+    return snapshot["data"]
+
+@pytest.mark.parametrize("sql, exact", [
+    ("SELECT COUNT(*) AS n FROM citizens WHERE gender = 'female'",
+     "SELECT COUNT(*) AS n FROM citizens WHERE gender = 'Female'"),
+    ("SELECT COUNT(*) AS n FROM citizens WHERE gender IN ('FEMALE')",
+     "SELECT COUNT(*) AS n FROM citizens WHERE gender IN ('Female')"),
+    ("SELECT COUNT(*) AS n FROM disbursements WHERE payment_mode LIKE '%bank%'",
+     "SELECT COUNT(*) AS n FROM disbursements WHERE payment_mode LIKE '%Bank%'"),
+    ("SELECT COUNT(*) AS n FROM disbursements WHERE status NOT LIKE 'completed'",
+     "SELECT COUNT(*) AS n FROM disbursements WHERE status NOT LIKE 'Completed'"),
+])
+def test_string_comparisons_ignore_case(tier, db_manager, sql, exact):
+    # Azure SQL's default collation is case-insensitive; the local SQLite database is not
+    assert tier.execute(sql)["data"] == _same_answer(tier, db_manager, exact)
+    assert tier.execute(sql)["data"][0]["n"] > 0
+
+def test_string_literals_are_not_rewritten():
+    assert translate_tsql_to_duckdb("SELECT COUNT(*) FROM t WHERE note LIKE 'LIKE%'") == \
+        "SELECT COUNT(*) FROM t WHERE note ILIKE 'LIKE%'"
+
+def test_integer_division_truncates(tier, db_manager):
+    rows = _same_answer(tier, db_manager,
+                        "SELECT COUNT(*) * 100 / (SELECT COUNT(*) FROM citizens) AS pct, 7 / 2 AS half "
+                        "FROM citizens WHERE gender = 'Female'")
+    assert rows[0]["half"] == 3 and isinstance(rows[0]["pct"], int)
+
+def test_decimal_division_is_kept(tier):
+    row = tier.execute("SELECT SUM(amount) / COUNT(*) AS average, 7.0 / 2 AS half FROM disbursements")["data"][0]
+    assert float(row["half"]) == 3.5
+
+def test_row_cap_reports_truncation(tier):
+    capped = tier.execute("SELECT citizen_id, COUNT(*) AS n FROM enrollments GROUP BY citizen_id", row_cap=5)
+    assert capped["row_count"] == 5 and capped["truncated"]
+    full = tier.execute("SELECT COUNT(*) AS n FROM enrollments", row_cap=5)
+    assert full["row_count"] == 1 and not full["truncated"]
+
+def test_cancel_token_interrupts_the_statement(tier):
+    cancel_token = QueryCancelToken()
+    threading.Timer(0.2, cancel_token.cancel).start()
+    with pytest.raises(duckdb.InterruptException):
+        tier.execute("SELECT COUNT(*) AS n FROM range(100000000000) r(x) WHERE x % 7 = 3", cancel_token=cancel_token)
+
+def test_cancelled_statement_is_not_counted_as_a_fallback(tier):
+    cancel_token = QueryCancelToken()
+    cancel_token.cancel()
+    fallbacks = tier.get_stats()["fallbacks"]
+    assert tier.try_execute("SELECT COUNT(*) FROM citizens", cancel_token=cancel_token) is None
+    assert tier.get_stats()["fallbacks"] == fallbacks
@@ -0,0 +1,121 @@
+"""
+RollupCube: an incremental refresh gives the same answers as a full rebuild
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cube import RollupCube, MEASURES, parse_month, format_month
+from db import DatabaseManager
+
+SHAPES = [
+    {"level": "all"},
+    {"level": "state", "by_scheme": True},
+    {"level": "district", "by_month": True},
+    {"level": "village", "by_scheme": True, "by_month": True},
+    {"level": "state", "filters": {"scheme_id": 2}},
+    {"level": "district", "by_scheme": True, "from_month": "2024-01", "by_month": True},
+]
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """DatabaseManager on a fresh SQLite copy of database/schema.sql + data.sql"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DB_ENGINE", "sqlite")
+        patch.setenv("LOCAL_DB_PATH", str(tmp_path / "welfare.db"))
+        patch.setenv("RESULT_CACHE_MAX_BYTES", "0")
+        manager = DatabaseManager()
+    assert manager.engine is not None
+    yield manager
+    manager.executor.shutdown(wait=False)
+    manager.engine.dispose()
+
+def _scalar(db_manager, sql):
+    result = db_manager.execute_query(sql, use_cache=False)
+    assert result["status"] == "success", result.get("message")
+    return next(iter(result["data"][0].values()))
+
+def _insert(db_manager, table, row):
+    columns = ", ".join(row)
+    values = ", ".join(f":{column}" for column in row)
+    result = db_manager.execute_query(f"INSERT INTO {table} ({columns}) VALUES ({values})", row)
+    assert result["status"] == "success", result.get("message")
+
+def _day(month: int, offset: int, day: int) -> str:
+    """ISO date `offset` months after the yyyymm `month`"""
+    year, index = divmod(month // 100 * 12 + month % 100 - 1 + offset, 12)
+    return f"{format_month(year * 100 + index + 1)}-{day:02d}"
+
+def _add_events(db_manager, dates):
+    """One disbursement and one enrollment per date: an existing citizen x scheme pair and a new one"""
+    next_disbursement = _scalar(db_manager, "SELECT MAX(disbursement_id) FROM disbursements") + 1
+    next_enrollment = _scalar(db_manager, "SELECT MAX(enrollment_id) FROM enrollments") + 1
+    pair = db_manager.execute_query("SELECT citizen_id, scheme_id FROM disbursements LIMIT 1", use_cache=False)["data"][0]
+    new_citizen = _scalar(db_manager, "SELECT MAX(citizen_id) FROM citizens")
+    for offset, date in enumerate(dates):
+        for citizen_id, scheme_id in ((pair["citizen_id"], pair["scheme_id"]), (new_citizen, 1 + offset % 5)):
+            _insert(db_manager, "disbursements", {
+                "disbursement_id": next_disbursement, "citizen_id": citizen_id, "scheme_id": scheme_id,
+                "amount": 1234.5, "status": "Completed", "disbursed_on": date, "payment_mode": "Bank Transfer"})
+            _insert(db_manager, "enrollments", {
+                "enrollment_id": next_enrollment, "citizen_id": citizen_id, "scheme_id": scheme_id,
+                "enrollment_date": date, "status": "Active"})
+            next_disbursement += 1
+            next_enrollment += 1
+
+def _answers(cube):
+    answers = []
+    for shape in SHAPES:
+        result = cube.query(measures=list(MEASURES), **shape)
+        answers.append((result["rows"], result["unavailable"], result["watermarks"]))
+    return answers
+
+def _rebuilt(db_manager):
+    cube = RollupCube(db_manager, max_age_seconds=3600)
+    cube.refresh(full=True)
+    return cube
+
+def test_incremental_refresh_matches_full_rebuild(db_manager):
+    cube = RollupCube(db_manager, max_age_seconds=3600)
+    cube.refresh()
+    assert cube.stats["full_rebuilds"] == 2
+
+    watermark = max(parse_month(month) for month in cube.watermarks().values())
+    _add_events(db_manager, [_day(watermark, 0, 15), _day(watermark, 1, 3)])
+    cube.refresh()
+    assert cube.stats["incremental_refreshes"] == 2 and cube.stats["full_rebuilds"] == 2
+    assert set(cube.watermarks().values()) == {_day(watermark, 1, 3)[:7]}
+
+    assert _answers(cube) == _answers(_rebuilt(db_manager))
+
+def test_back_dated_rows_trigger_a_full_rebuild(db_manager):
+    cube = RollupCube(db_manager, max_age_seconds=3600)
+    cube.refresh()
+    earliest = _scalar(db_manager, "SELECT MIN(disbursed_on) FROM disbursements")
+    _add_events(db_manager, [str(earliest)[:10]])
+    cube.refresh()
+    assert cube.stats["full_rebuilds"] == 4
+
+    assert _answers(cube) == _answers(_rebuilt(db_manager))
+
+def test_refresh_without_changes_is_stable(db_manager):
+    cube = RollupCube(db_manager, max_age_seconds=3600)
+    cube.refresh()
+    before = _answers(cube)
+    cube.refresh()
+    assert cube.stats["incremental_refreshes"] == 2
+    assert _answers(cube) == before
+
+def test_concurrent_queries_on_a_stale_cube_refresh_once(db_manager):
+    cube = RollupCube(db_manager, max_age_seconds=3600)
+    barrier = threading.Barrier(3)
+
+    def query():
+        barrier.wait()
+        return cube.query(measures=["disbursement_count"], level="state")["rows"]
+
+    with ThreadPoolExecutor(3) as pool:
+        answers = list(pool.map(lambda _: query(), range(3)))
+    assert answers[0] == answers[1] == answers[2]
+    assert cube.stats["full_rebuilds"] == 2 and cube.stats["incremental_refreshes"] == 0
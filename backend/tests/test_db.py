@@ -0,0 +1,113 @@
+"""
+DatabaseManager.table_row_counts: catalog counts, and when a failing catalog view is given up on;
+QueryResultCache entries are not shared with callers
+"""
+import pytest
+
+import db
+from db import DatabaseManager, QueryResultCache, CATALOG_ROW_COUNTS_SQL
+
+PERMISSION_DENIED = ("SQL execution error: (pyodbc.ProgrammingError) ('42000', \"[42000] [Microsoft][ODBC Driver 18 "
+                     "for SQL Server][SQL Server]VIEW DATABASE STATE permission denied in database 'welfare'. (300)\")")
+NOT_FOUND = ("SQL execution error: (pyodbc.ProgrammingError) ('42S02', \"[42S02] [Microsoft][ODBC Driver 18 for SQL "
+             "Server][SQL Server]Invalid object name 'sys.dm_db_partition_stats'. (208)\")")
+TIMEOUT = ("SQL execution error: (pyodbc.OperationalError) ('HYT00', '[HYT00] [Microsoft][ODBC Driver 18 for SQL "
+           "Server]Query timeout expired (0)')")
+
+class Clock:
+    """Stands in for time.monotonic inside db"""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture(scope="module")
+def manager(tmp_path_factory):
+    """DatabaseManager on a fresh SQLite copy of database/schema.sql + data.sql"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("DB_ENGINE", "sqlite")
+        patch.setenv("LOCAL_DB_PATH", str(tmp_path_factory.mktemp("oltp") / "welfare.db"))
+        manager = DatabaseManager()
+    assert manager.engine is not None
+    yield manager
+    manager.executor.shutdown(wait=False)
+    manager.engine.dispose()
+
+@pytest.fixture
+def catalog(manager, monkeypatch):
+    """Treat the manager as SQL Server and script the catalog view's responses"""
+    responses, calls = [], []
+    execute_query = manager.execute_query
+
+    def fake_execute_query(query, params=None, **kwargs):
+        if query != CATALOG_ROW_COUNTS_SQL:
+            return execute_query(query, params, **kwargs)
+        calls.append(query)
+        return responses.pop(0)
+
+    clock = Clock()
+    monkeypatch.setattr(db.time, "monotonic", clock)
+    monkeypatch.setattr(manager, "execute_query", fake_execute_query)
+    monkeypatch.setattr(manager, "use_local_db", False)
+    monkeypatch.setattr(manager, "catalog_row_counts_available", True)
+    monkeypatch.setattr(manager, "catalog_retry_at", 0.0)
+    monkeypatch.setattr(manager, "catalog_retry_seconds", 300.0)
+    return responses, calls, clock
+
+def _error(message):
+    return {"status": "error", "message": message, "data": [], "error_type": "SQLAlchemyError"}
+
+def test_catalog_counts_are_used(manager, catalog):
+    responses, calls, _ = catalog
+    responses.append({"status": "success", "data": [{"table_name": "Citizens", "row_count": 7},
+                                                    {"table_name": "schemes", "row_count": 3}]})
+    result = manager.table_row_counts(["citizens", "schemes"])
+    assert result == {"status": "success", "source": "catalog", "data": {"citizens": 7, "schemes": 3}}
+
+@pytest.mark.parametrize("message", [PERMISSION_DENIED, NOT_FOUND])
+def test_denied_or_missing_catalog_is_not_queried_again(manager, catalog, message):
+    responses, calls, clock = catalog
+    responses.append(_error(message))
+    assert manager.table_row_counts(["schemes"])["source"] == "count"
+    clock.now += 10 ** 6
+    assert manager.table_row_counts(["schemes"])["source"] == "count"
+    assert len(calls) == 1 and not manager.catalog_row_counts_available
+
+def test_transient_failure_is_retried_after_the_backoff(manager, catalog):
+    responses, calls, clock = catalog
+    responses.extend([_error(TIMEOUT), {"status": "success", "data": [{"table_name": "schemes", "row_count": 3}]}])
+    assert manager.table_row_counts(["schemes"])["source"] == "count"
+    clock.now += 299
+    assert manager.table_row_counts(["schemes"])["source"] == "count"
+    assert len(calls) == 1 and manager.catalog_row_counts_available
+    clock.now += 2
+    assert manager.table_row_counts(["schemes"]) == {"status": "success", "source": "catalog", "data": {"schemes": 3}}
+    assert len(calls) == 2
+
+CITIZENS = frozenset({"citizens"})
+
+def _cached(data):
+    cache = QueryResultCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    key = cache.make_key("SELECT name, age FROM citizens", None, "rows")
+    stored = {"status": "success", "data": data, "row_count": 2, "columns": ["name", "age"]}
+    cache.put(key, CITIZENS, stored)
+    return cache, key, stored
+
+def test_cached_rows_are_not_shared_with_callers():
+    cache, key, stored = _cached([{"name": "Asha", "age": 34}, {"name": "Ravi", "age": 61}])
+    stored["data"][0]["name"] = "changed"
+    first = cache.get(key, CITIZENS)
+    first["data"][1]["age"] = 0
+    first["data"].pop()
+    first["columns"].append("extra")
+    second = cache.get(key, CITIZENS)
+    assert second["data"] == [{"name": "Asha", "age": 34}, {"name": "Ravi", "age": 61}]
+    assert second["columns"] == ["name", "age"]
+
+def test_cached_columns_are_not_shared_with_callers():
+    cache, key, stored = _cached({"name": ["Asha", "Ravi"], "age": [34, 61]})
+    stored["data"]["name"][0] = "changed"
+    cache.get(key, CITIZENS)["data"]["age"].clear()
+    assert cache.get(key, CITIZENS)["data"] == {"name": ["Asha", "Ravi"], "age": [34, 61]}
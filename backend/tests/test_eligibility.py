@@ -0,0 +1,41 @@
+"""
+EligibilityEngine: sharded evaluation in spawned workers matches the single-process result
+"""
+import numpy as np
+import pytest
+
+from db import DatabaseManager
+from eligibility import EligibilityEngine
+
+@pytest.fixture(scope="module")
+def db_manager(tmp_path_factory):
+    """DatabaseManager on a fresh SQLite copy of database/schema.sql + data.sql"""
+    with pytest.MonkeyPatch.context() as patch:
+        # Spawned workers read the same environment to open their own copy
+        patch.setenv("DB_ENGINE", "sqlite")
+        patch.setenv("LOCAL_DB_PATH", str(tmp_path_factory.mktemp("oltp") / "welfare.db"))
+        manager = DatabaseManager()
+        assert manager.engine is not None
+        yield manager
+    manager.executor.shutdown(wait=False)
+    manager.engine.dispose()
+
+def _outcomes(result):
+    order = np.lexsort((result.rule_index, result.citizen_id))
+    return list(zip(result.citizen_id[order].tolist(), result.rule_index[order].tolist(),
+                    result.reason_code[order].tolist()))
+
+def test_sharded_evaluation_matches_single_process(db_manager):
+    engine = EligibilityEngine(db_manager)
+    single = engine.evaluate()
+    sharded = engine.evaluate(processes=2)
+    assert len(sharded) == len(single) > 0
+    assert _outcomes(sharded) == _outcomes(single)
+    assert sharded.summary() == single.summary()
+
+def test_sharded_evaluation_keeps_the_parent_pool(db_manager):
+    pool = db_manager.engine.pool
+    with db_manager.engine.connect():
+        pass
+    EligibilityEngine(db_manager).evaluate(processes=2)
+    assert db_manager.engine.pool is pool and pool.checkedin() >= 1
@@ -0,0 +1,124 @@
+"""
+Template slot extraction, template SQL and the cases that must fall through to the LLM
+"""
+import pytest
+
+from query_templates import TemplateEngine, extract_slots
+from schema_pruner import SchemaPruner
+
+TABLES = ["citizens", "villages", "districts", "states", "schemes", "enrollments", "disbursements",
+          "health_details", "bank_accounts", "officers", "verifications"]
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setenv("QUERY_TEMPLATES_ENABLED", "true")
+    monkeypatch.setenv("SCHEMA_PRUNING_ENABLED", "true")
+    return TemplateEngine(SchemaPruner(TABLES))
+
+def test_extract_slots_reads_each_slot():
+    slots, _ = extract_slots("top 5 female citizens aged 18-30 in gujarat enrolled in pmay in march 2024")
+    assert slots == {"limit": 5, "gender": "Female", "age": [18, 30], "state": "Gujarat",
+                     "scheme": "housing", "year": 2024, "month": 3}
+
+@pytest.mark.parametrize("question, slot, value", [
+    ("citizens above 60", "age", [61, None]),
+    ("senior citizens", "age", [60, None]),
+    ("citizens with disability above 70%", "disability", 71),
+    ("disabled citizens", "disability", 0),
+    ("citizens in the pune district", "district", "Pune"),
+    ("schemes in the health sector", "sector", "health"),
+    ("citizens in andhra pradesh state", "state", "Andhra"),
+    ("ayushman bharat enrollments", "scheme", "health"),
+    ("failed disbursements", "status", "failed"),
+    ("enrollments under review", "status", "under_review"),
+    ("amount paid via upi", "payment_mode", "UPI"),
+    ("average age of citizens", "measure", "average_age"),
+    ("average disbursement amount", "measure", "average_amount"),
+])
+def test_extract_slot_values(question, slot, value):
+    slots, _ = extract_slots(question)
+    assert slots[slot] == value
+
+@pytest.mark.parametrize("question", [
+    "housing and pension enrollments",
+    "citizens in bihar and kerala",
+    "disbursements in 2023 and 2024",
+    "failed and completed disbursements",
+])
+def test_two_values_for_one_slot_decline(question):
+    assert extract_slots(question) is None
+
+def test_slot_spans_cover_consumed_words():
+    question = "female citizens aged 18-30 in gujarat"
+    _, spans = extract_slots(question)
+    covered = {question[start:end] for start, end in spans}
+    assert {"female", "aged 18-30", "gujarat"} <= covered
+
+@pytest.mark.parametrize("question, template", [
+    ("Total disbursement amount by scheme in 2024", "aggregate"),
+    ("Verification backlog by officer and scheme", "verification_backlog"),
+    ("Officers with the highest number of verifications in 2024", "officer_verifications"),
+    ("Citizens without bank accounts who received disbursements", "unbanked_citizens"),
+    ("Top 5 beneficiaries in Maharashtra in 2023", "top_beneficiaries"),
+    ("Citizens enrolled in all available schemes", "all_schemes_citizens"),
+    ("Citizens enrolled in multiple schemes with their bank account details", "multi_scheme_citizens"),
+    ("List all schemes in the health sector", "schemes_list"),
+    ("Female citizens aged 18-30 enrolled in MGNREGA employment scheme", "citizen_list"),
+])
+def test_covered_questions_pick_their_template(engine, question, template):
+    match = engine.match(question)
+    assert match is not None and match["template"] == template
+
+@pytest.mark.parametrize("question, fragments", [
+    ("count of disbursements that failed", ["FROM disbursements d", "d.status = 'Failed'"]),
+    ("how many enrollments were rejected", ["FROM enrollments e", "e.status = 'Rejected'"]),
+    ("total amount paid via UPI", ["SUM(d.amount)", "d.payment_mode LIKE '%UPI%'"]),
+    ("average age of citizens enrolled in health scheme", ["AVG(c.age) AS average_age", "FROM enrollments e",
+                                                           "s.name LIKE '%Ayushman%'"]),
+    ("average disbursement amount by state", ["AVG(d.amount) AS average_amount", "st.name AS state_name"]),
+    ("Disbursements in March 2024 by state", ["d.disbursed_on >= '2024-03-01' AND d.disbursed_on < '2024-04-01'"]),
+    ("Enrollment count by status for housing scheme", ["e.status", "GROUP BY e.status"]),
+])
+def test_aggregate_applies_every_slot(engine, question, fragments):
+    match = engine.match(question)
+    assert match is not None and match["template"] == "aggregate"
+    for fragment in fragments:
+        assert fragment in match["sql"]
+
+def test_measure_replaces_default_measures(engine):
+    sql = engine.match("average age of citizens by state")["sql"]
+    assert "AVG(c.age) AS average_age" in sql
+    assert "COUNT(" not in sql
+
+@pytest.mark.parametrize("question", [
+    # words no slot, dimension or template vocabulary accounts for
+    "how many districts are there in Gujarat",
+    "count citizens whose age is above average",
+    "How many schemes are there",
+    "number of villages in Bihar",
+    "Complex multi-scheme analysis - Citizens receiving maximum benefits",
+    # a number that is not a slot
+    "Citizens with amount over 50000",
+    # a status that the fact table does not have
+    "count of approved disbursements",
+    "count active citizens",
+    # a negation the template does not handle
+    "total disbursements not in 2024",
+    # a table the template would not use
+    "total amount paid by bank transfer",
+    # no aggregate shape at all
+    "disbursements",
+])
+def test_uncovered_questions_decline(engine, question):
+    assert engine.match(question) is None
+
+def test_stats_count_hits_and_misses(engine):
+    engine.match("Total disbursement amount by scheme")
+    engine.match("how many districts are there in Gujarat")
+    stats = engine.get_stats()
+    assert stats["lookups"] == 2 and stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["by_template"] == {"aggregate": 1}
+
+def test_disabled_engine_never_matches(monkeypatch):
+    monkeypatch.setenv("QUERY_TEMPLATES_ENABLED", "false")
+    assert TemplateEngine(SchemaPruner(TABLES)).match("Total disbursement amount by scheme") is None
@@ -0,0 +1,50 @@
+"""
+SchemaPruner: matched tables plus the join path between them, full schema when nothing matches
+"""
+import pytest
+
+from schema_pruner import SchemaPruner
+
+TABLES = ["citizens", "villages", "districts", "states", "schemes", "enrollments", "disbursements",
+          "health_details", "bank_accounts", "officers", "verifications"]
+
+@pytest.fixture
+def pruner(monkeypatch):
+    monkeypatch.setenv("SCHEMA_PRUNING_ENABLED", "true")
+    return SchemaPruner(TABLES)
+
+@pytest.mark.parametrize("question, tables", [
+    ("Total disbursement amount by scheme", {"disbursements", "schemes"}),
+    ("Citizens without bank accounts", {"citizens", "bank_accounts"}),
+    ("Officers with the highest number of verifications", {"officers", "verifications"}),
+    # geography is reached through the citizen -> village -> district -> state chain
+    ("Female citizens in Gujarat", {"citizens", "villages", "districts", "states"}),
+    ("Citizens with disability above 70% by state", {"citizens", "villages", "districts", "states", "health_details"}),
+    # villages and enrollments only meet through citizens
+    ("Village-wise enrollment statistics", {"villages", "citizens", "enrollments"}),
+    ("PMAY enrollments per district", {"schemes", "enrollments", "citizens", "villages", "districts"}),
+])
+def test_selects_matched_tables_and_their_join_path(pruner, question, tables):
+    selection = pruner.select(question)
+    assert set(selection["tables"]) == tables
+    assert selection["pruned"]
+
+def test_tables_keep_schema_order(pruner):
+    assert pruner.select("disbursements by scheme for citizens")["tables"] == ["citizens", "schemes", "disbursements"]
+
+def test_state_names_imply_the_states_table(pruner):
+    assert "states" in pruner.matched_tables("enrollments in tamil nadu")
+    assert "states" not in pruner.matched_tables("enrollments in the last month")
+
+def test_unmatched_question_gets_the_full_schema(pruner):
+    selection = pruner.select("hello there")
+    assert selection == {"tables": TABLES, "matched": [], "pruned": False}
+
+def test_disabled_pruning_gets_the_full_schema(monkeypatch):
+    monkeypatch.setenv("SCHEMA_PRUNING_ENABLED", "false")
+    selection = SchemaPruner(TABLES).select("Total disbursement amount by scheme")
+    assert selection["tables"] == TABLES and not selection["pruned"]
+
+def test_unknown_tables_are_ignored():
+    pruner = SchemaPruner(["citizens", "schemes"])
+    assert pruner.select("officers by district")["tables"] == ["citizens", "schemes"]
@@ -0,0 +1,87 @@
+"""
+Semantic SQL cache: paraphrases share a bucket, anything that changes the SQL does not
+"""
+import pytest
+
+from semantic_cache import SemanticSQLCache
+
+# Questions as PromptEngine._preprocess_query leaves them
+HOUSING = "count female citizens enrolled in housing scheme"
+
+@pytest.fixture
+def cache():
+    cache = SemanticSQLCache(threshold=0.65, max_entries=100)
+    cache.add(HOUSING, "SELECT 'housing'")
+    return cache
+
+@pytest.mark.parametrize("paraphrase", [
+    "count women enrolled in PMAY housing scheme",
+    "number of female beneficiaries enrolled in housing schemes",
+    "count female people enrolled in awas",
+])
+def test_paraphrases_hit(cache, paraphrase):
+    entry = cache.lookup(paraphrase)
+    assert entry is not None and entry["sql_query"] == "SELECT 'housing'"
+
+@pytest.mark.parametrize("question", [
+    "count female citizens enrolled in pension scheme",
+    "count female citizens enrolled in NSAP pension scheme",
+    "count female citizens enrolled in employment scheme",
+    "count female citizens enrolled in gas scheme",
+    "count female citizens enrolled in Ayushman Bharat health scheme",
+    "count female citizens enrolled in scheme",
+])
+def test_a_different_scheme_never_hits(cache, question):
+    assert cache.lookup(question) is None
+
+def test_schemes_are_guard_tokens():
+    _, housing = SemanticSQLCache.tokenize(HOUSING)
+    _, pension = SemanticSQLCache.tokenize("count female citizens enrolled in pension scheme")
+    assert "housing" in housing and "pension" in pension and housing != pension
+
+def test_scheme_acronyms_share_the_scheme_key():
+    for acronym, key in [("pmay", "housing"), ("nsap", "pension"), ("mgnrega", "employment"),
+                         ("ujjwala", "gas"), ("ayushman", "health")]:
+        _, guards = SemanticSQLCache.tokenize(f"count {acronym} enrollments")
+        assert key in guards and acronym not in guards
+
+@pytest.mark.parametrize("question", [
+    "count male citizens enrolled in housing scheme",
+    "count female citizens enrolled in housing scheme in 2024",
+    "list female citizens enrolled in housing scheme by district",
+])
+def test_changed_guard_tokens_miss(cache, question):
+    assert cache.lookup(question) is None
+
+def test_lru_eviction_drops_the_bucket():
+    cache = SemanticSQLCache(threshold=0.65, max_entries=2)
+    cache.add("count citizens in gujarat", "A")
+    cache.add("count citizens in kerala", "B")
+    cache.lookup("count citizens in gujarat")
+    cache.add("count citizens in bihar", "C")
+    assert cache.lookup("count citizens in kerala") is None
+    assert cache.lookup("count citizens in gujarat")["sql_query"] == "A"
+    stats = cache.get_stats()
+    assert stats["entries"] == 2 and stats["buckets"] == 2 and stats["evictions"] == 1
+
+@pytest.mark.parametrize("cached, question", [
+    ("how many citizens aged 30", "how many citizens under 30"),
+    ("how many citizens aged 30", "how many citizens over 30"),
+    ("how many citizens above 60", "how many citizens below 60"),
+    ("how many citizens aged between 18 and 30", "how many citizens aged 18 and 30"),
+    ("how many citizens aged at least 60", "how many citizens aged 60"),
+    ("how many female citizens in gujarat by district", "how many female enrollments in gujarat by district"),
+    ("total disbursements in gujarat by district", "total enrollments in gujarat by district"),
+    ("count citizens registered in housing scheme", "count citizens in housing scheme"),
+    ("list all citizens without bank account", "list citizens without bank account"),
+    ("list citizens without any disbursements", "list citizens without disbursements"),
+])
+def test_different_questions_miss(cached, question):
+    cache = SemanticSQLCache(threshold=0.65, max_entries=100)
+    cache.add(cached, "SELECT 'cached'")
+    assert cache.lookup(question) is None
+
+def test_same_direction_comparisons_hit():
+    cache = SemanticSQLCache(threshold=0.65, max_entries=100)
+    cache.add("how many citizens over 60 in kerala", "SELECT 'cached'")
+    assert cache.lookup("how many people above 60 in kerala")["sql_query"] == "SELECT 'cached'"
@@ -0,0 +1,96 @@
+"""
+SingleFlight: concurrent calls for one key share one execution, its result and its exception
+"""
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight, calls = SingleFlight("test"), []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "sql"
+
+        results = await asyncio.gather(*(flight.do("question", work) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = run(scenario())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["sql"] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    stats = flight.get_stats()
+    assert stats["executions"] == 1 and stats["coalesced"] == 4 and stats["max_waiters"] == 4
+    assert stats["in_flight"] == 0
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        return flight, await asyncio.gather(flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b")))
+
+    flight, results = run(scenario())
+    assert results == [("a", False), ("b", False)]
+    assert flight.get_stats()["executions"] == 2
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("LLM unavailable")
+
+        results = await asyncio.gather(*(flight.do("question", failing) for _ in range(3)), return_exceptions=True)
+        return flight, results
+
+    flight, results = run(scenario())
+    assert all(isinstance(result, RuntimeError) and str(result) == "LLM unavailable" for result in results)
+    stats = flight.get_stats()
+    assert stats["executions"] == 1 and stats["errors"] == 1 and stats["in_flight"] == 0
+
+def test_finished_calls_are_not_reused():
+    async def scenario():
+        flight, calls = SingleFlight("test"), []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        first = await flight.do("question", work)
+        second = await flight.do("question", work)
+        return first, second
+
+    assert run(scenario()) == ((1, False), (2, False))
+
+def test_cancelled_follower_does_not_cancel_the_call():
+    async def scenario():
+        flight = SingleFlight("test")
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "sql"
+
+        leader = asyncio.ensure_future(flight.do("question", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("question", work))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        release.set()
+        return await leader
+
+    assert run(scenario()) == ("sql", False)
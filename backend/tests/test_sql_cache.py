@@ -0,0 +1,110 @@
+"""
+NL2SQLCache: keys, LRU eviction, TTL expiry and the SQLite backing store
+"""
+import pytest
+
+import sql_cache
+from prompt_engine import PromptEngine
+from sql_cache import NL2SQLCache
+
+class Clock:
+    """Stands in for time.time inside sql_cache"""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sql_cache.time, "time", clock)
+    return clock
+
+def test_key_ignores_whitespace_but_not_schema():
+    key = NL2SQLCache.make_key("count  citizens\nby state", "schema-1")
+    assert key == NL2SQLCache.make_key("count citizens by state", "schema-1")
+    assert key != NL2SQLCache.make_key("count citizens by state", "schema-2")
+    assert key != NL2SQLCache.make_key("count citizens by district", "schema-1")
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = NL2SQLCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", {"sql_query": "A"})
+    cache.put("b", {"sql_query": "B"})
+    assert cache.get("a") == {"sql_query": "A"}
+    cache.put("c", {"sql_query": "C"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sql_query": "A"} and cache.get("c") == {"sql_query": "C"}
+    assert cache.get_stats()["evictions"] == 1
+
+def test_entries_expire_after_ttl(clock):
+    cache = NL2SQLCache(max_entries=10, ttl_seconds=60)
+    cache.put("a", {"sql_query": "A"})
+    clock.now += 59
+    assert cache.get("a") is not None
+    clock.now += 2
+    assert cache.get("a") is None
+    stats = cache.get_stats()
+    assert stats["expirations"] == 1 and stats["entries"] == 0 and stats["hits"] == 1 and stats["misses"] == 1
+
+def test_zero_ttl_never_expires(clock):
+    cache = NL2SQLCache(max_entries=10, ttl_seconds=0)
+    cache.put("a", {"sql_query": "A"})
+    clock.now += 10 ** 9
+    assert cache.get("a") == {"sql_query": "A"}
+
+def test_disk_store_survives_a_restart(clock, tmp_path):
+    path = str(tmp_path / "nl2sql.db")
+    NL2SQLCache(max_entries=10, ttl_seconds=60, db_path=path).put("a", {"sql_query": "A"})
+    restarted = NL2SQLCache(max_entries=10, ttl_seconds=60, db_path=path)
+    assert restarted.get("a") == {"sql_query": "A"}
+    stats = restarted.get_stats()
+    assert stats["disk_hits"] == 1 and stats["entries"] == 1 and stats["persistent"]
+
+def test_expired_disk_entries_are_not_served(clock, tmp_path):
+    path = str(tmp_path / "nl2sql.db")
+    NL2SQLCache(max_entries=10, ttl_seconds=60, db_path=path).put("a", {"sql_query": "A"})
+    clock.now += 61
+    assert NL2SQLCache(max_entries=10, ttl_seconds=60, db_path=path).get("a") is None
+
+def test_clear_empties_memory_and_disk(clock, tmp_path):
+    path = str(tmp_path / "nl2sql.db")
+    cache = NL2SQLCache(max_entries=10, ttl_seconds=60, db_path=path)
+    cache.put("a", {"sql_query": "A"})
+    cache.clear()
+    assert cache.get("a") is None
+    assert NL2SQLCache(max_entries=10, ttl_seconds=60, db_path=path).get("a") is None
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = PromptEngine()
+    engine.sql_cache = NL2SQLCache(max_entries=10, ttl_seconds=60)
+    llm_calls = []
+    def fake_llm(query, prompt_info=None, on_token=None):
+        llm_calls.append(query)
+        return f"SELECT '{len(llm_calls)}' AS answer"
+    monkeypatch.setattr(engine, "_try_azure_openai", fake_llm)
+    engine.llm_calls = llm_calls
+    return engine
+
+QUESTION = "which officer approved the most disbursements last quarter"
+
+def test_llm_sql_is_not_cached_before_it_executes(engine):
+    first = engine.convert_to_sql(QUESTION)
+    assert first["method"] == "azure_openai"
+    # The SQL never ran (or failed), so the LLM is asked again
+    second = engine.convert_to_sql(QUESTION)
+    assert second["method"] == "azure_openai" and len(engine.llm_calls) == 2
+    assert engine.sql_cache.get_stats()["stores"] == 0
+
+def test_executed_llm_sql_is_served_from_the_cache(engine):
+    result = engine.convert_to_sql(QUESTION)
+    engine.remember_validated_sql(QUESTION, result["sql_query"], result["method"])
+    repeat = engine.convert_to_sql(QUESTION)
+    assert repeat["method"] == "cache" and repeat["sql_query"] == result["sql_query"]
+    assert len(engine.llm_calls) == 1
+
+def test_only_llm_answers_enter_the_exact_cache(engine):
+    engine.remember_validated_sql(QUESTION, "SELECT 1", "pattern_based")
+    assert engine.sql_cache.get_stats()["stores"] == 0
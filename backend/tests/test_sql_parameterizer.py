@@ -0,0 +1,102 @@
+"""
+parameterize_sql: bound statements return the same rows as the literal ones
+"""
+import sqlite3
+
+import pytest
+from sqlalchemy import String, create_engine
+from sqlalchemy.types import NullType
+
+from db import DatabaseManager
+from sql_parameterizer import parameterize_sql, fingerprint_sql
+
+@pytest.fixture(scope="module")
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE citizens (citizen_id INTEGER PRIMARY KEY, name TEXT, gender TEXT, age INTEGER);
+        CREATE TABLE disbursements (disbursement_id INTEGER PRIMARY KEY, citizen_id INTEGER, amount REAL,
+                                    status TEXT, disbursed_on TEXT);
+    """)
+    conn.executemany("INSERT INTO citizens VALUES (?, ?, ?, ?)", [
+        (1, "Asha", "Female", 34), (2, "Ravi", "Male", 61), (3, "O'Brien", "Female", 72), (4, "Meena", "Female", 19)
+    ])
+    conn.executemany("INSERT INTO disbursements VALUES (?, ?, ?, ?, ?)", [
+        (1, 1, 1500.5, "Completed", "2024-01-15"), (2, 2, 20000, "Failed", "2024-03-02"),
+        (3, 3, 999.99, "Completed", "2023-12-31"), (4, 4, 50000, "Pending", "2024-06-30")
+    ])
+    yield conn
+    conn.close()
+
+ROUND_TRIPS = [
+    "SELECT name FROM citizens WHERE gender = 'Female' AND age > 30 ORDER BY citizen_id",
+    "SELECT name FROM citizens WHERE name = 'O''Brien'",
+    "SELECT name FROM citizens WHERE name LIKE '%ee%'",
+    "SELECT citizen_id FROM citizens WHERE age BETWEEN 18 AND 40 ORDER BY citizen_id",
+    "SELECT citizen_id FROM citizens WHERE citizen_id IN (1, 3, 4) ORDER BY citizen_id",
+    "SELECT SUM(amount) AS total FROM disbursements WHERE amount >= 999.99 AND status <> 'Failed'",
+    "SELECT COUNT(*) AS n FROM disbursements WHERE disbursed_on >= '2024-01-01' AND disbursed_on < '2025-01-01'",
+    "SELECT CASE WHEN age < 18 THEN 'Minor' WHEN age >= 60 THEN 'Senior' ELSE 'Adult' END AS band, COUNT(*) "
+    "FROM citizens GROUP BY CASE WHEN age < 18 THEN 'Minor' WHEN age >= 60 THEN 'Senior' ELSE 'Adult' END "
+    "ORDER BY band",
+    "SELECT c.name, d.amount FROM citizens c JOIN disbursements d ON d.citizen_id = c.citizen_id "
+    "WHERE d.status = 'Completed' -- 'Failed' is excluded\nORDER BY d.amount DESC",
+]
+
+@pytest.mark.parametrize("sql", ROUND_TRIPS)
+def test_round_trip_returns_the_same_rows(conn, sql):
+    bound = parameterize_sql(sql)
+    assert conn.execute(bound.sql, bound.params).fetchall() == conn.execute(sql).fetchall()
+
+def test_predicate_literals_become_parameters():
+    bound = parameterize_sql("SELECT * FROM citizens WHERE gender = 'Female' AND age BETWEEN 18 AND 30 "
+                             "AND citizen_id IN (1, 2) AND name LIKE 'A%'")
+    assert bound.sql == ("SELECT * FROM citizens WHERE gender = :p0 AND age BETWEEN :p1 AND :p2 "
+                         "AND citizen_id IN (:p3, :p4) AND name LIKE :p5")
+    assert bound.params == {"p0": "Female", "p1": 18, "p2": 30, "p3": 1, "p4": 2, "p5": "A%"}
+
+@pytest.mark.parametrize("sql", [
+    "SELECT TOP 10 name FROM citizens",
+    "SELECT FORMAT(disbursed_on, 'yyyy-MM') AS month FROM disbursements",
+    "SELECT CASE WHEN age < 18 THEN 'Minor' ELSE 'Adult' END FROM citizens",
+    "SELECT name FROM citizens WHERE name = N'आशा'",
+    "SELECT name FROM citizens WHERE gender = :gender",
+])
+def test_literals_outside_predicates_stay_inline(sql):
+    bound = parameterize_sql(sql)
+    assert bound.sql == sql and bound.params == {}
+
+def test_queries_differing_only_in_literals_share_a_fingerprint():
+    first = parameterize_sql("SELECT name FROM citizens WHERE age > 60 AND gender = 'Male'")
+    second = parameterize_sql("select name  from citizens where age > 18 and gender = 'Female'")
+    assert first.fingerprint == second.fingerprint
+    assert first.fingerprint != parameterize_sql("SELECT name FROM citizens WHERE age < 60").fingerprint
+
+def test_fingerprint_keeps_literal_case():
+    assert fingerprint_sql("SELECT 'a'") != fingerprint_sql("SELECT 'A'")
+
+def test_to_dict():
+    bound = parameterize_sql("SELECT name FROM citizens WHERE age > 60")
+    assert bound.to_dict() == {"parameterized_sql": "SELECT name FROM citizens WHERE age > :p0",
+                               "sql_params": {"p0": 60}, "query_fingerprint": bound.fingerprint}
+
+def test_string_parameters_are_bound_as_varchar():
+    bound = parameterize_sql("SELECT name FROM citizens WHERE gender = 'Female' AND age > 30")
+    binds = DatabaseManager._statement(bound.sql, bound.params).compile().binds
+    assert isinstance(binds["p0"].type, String)
+    assert isinstance(binds["p1"].type, NullType)
+    assert str(DatabaseManager._statement("SELECT 1")) == "SELECT 1"
+
+def test_parameters_missing_from_the_statement_are_ignored():
+    statement = DatabaseManager._statement("SELECT 1 WHERE a = :a", {"a": "x", "b": "y", "c": 3})
+    binds = statement.compile().binds
+    assert set(binds) == {"a"} and isinstance(binds["a"].type, String)
+
+def test_extra_parameters_execute():
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        connection.exec_driver_sql("CREATE TABLE citizens (name TEXT, gender TEXT, age INTEGER)")
+        connection.exec_driver_sql("INSERT INTO citizens VALUES ('Asha', 'Female', 34), ('Meena', 'Female', 19)")
+        params = {"gender": "Female", "age": 30, "state": "Gujarat"}
+        statement = DatabaseManager._statement("SELECT name FROM citizens WHERE gender = :gender AND age > :age", params)
+        assert connection.execute(statement, params).fetchall() == [("Asha",)]
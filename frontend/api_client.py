@@ -0,0 +1,124 @@
+"""
+FastAPI backend client for the Streamlit frontend
+Requests query results as an Arrow IPC stream (or column-oriented JSON when
+pyarrow is unavailable) and builds DataFrames without re-pivoting row dicts,
+or follows /query/stream Server-Sent Events for incremental rendering
+"""
+import json
+import time
+import logging
+import requests
+import pandas as pd
+import streamlit as st
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND_URL = "https://welfare-app-anech0dsctemhwbq.centralindia-01.azurewebsites.net"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+def get_backend_url():
+    """Backend URL discovered by the API connection check"""
+    return st.session_state.get('backend_url', DEFAULT_BACKEND_URL)
+
+def _decode_arrow(payload):
+    """Arrow IPC stream -> (DataFrame, response metadata)"""
+    table = pa.ipc.open_stream(payload).read_all()
+    metadata = json.loads((table.schema.metadata or {}).get(b"response", b"{}"))
+    df = table.to_pandas(split_blocks=True, self_destruct=True, date_as_object=False)
+    return df, metadata
+
+def _decode_json(payload):
+    """Columnar or row-oriented JSON -> (DataFrame, response metadata)"""
+    metadata = json.loads(payload)
+    data = metadata.pop("data", [])
+    if metadata.get("data_format") == "columnar":
+        df = pd.DataFrame(data, columns=metadata.get("columns"))
+    else:
+        df = pd.DataFrame(data)
+    return df, metadata
+
+def decode_query_response(response):
+    """
+    Turn a /query or /query/execute response into a result dict whose "data" is a
+    DataFrame and whose "transfer" reports payload size, server encode time and
+    client decode time
+    """
+    start = time.perf_counter()
+    if response.headers.get('content-type', '').startswith(ARROW_MEDIA_TYPE):
+        df, metadata = _decode_arrow(response.content)
+    else:
+        df, metadata = _decode_json(response.content)
+    decode_ms = (time.perf_counter() - start) * 1000
+
+    metadata['data'] = df
+    metadata['transfer'] = {
+        'format': response.headers.get('x-result-format', 'json'),
+        'payload_bytes': len(response.content),
+        'encode_ms': float(response.headers.get('x-encode-ms', 0) or 0),
+        'decode_ms': round(decode_ms, 2)
+    }
+    return metadata
+
+def query_backend(user_query, token=None, timeout=60):
+    """Run a natural language query through the FastAPI backend; returns None on failure"""
+    payload = {"query": user_query, "response_format": "arrow" if pa is not None else "columnar"}
+    headers = {"Accept": f"{ARROW_MEDIA_TYPE}, application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    try:
+        response = requests.post(f"{get_backend_url()}/query", json=payload, headers=headers, timeout=timeout)
+        if response.status_code != 200:
+            logger.error(f"Backend query failed with status {response.status_code}")
+            return None
+        return decode_query_response(response)
+    except Exception as e:
+        logger.error(f"Backend query failed: {str(e)}")
+        return None
+
+def stream_query_events(user_query, token=None, timeout=60):
+    """
+    Run a natural language query through /query/stream and yield (event, data)
+    pairs as they arrive: token, sql, rows, done or error
+    """
+    headers = {"Accept": "text/event-stream"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    with requests.post(f"{get_backend_url()}/query/stream", json={"query": user_query},
+                       headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            yield "error", {"message": f"Backend returned status {response.status_code}"}
+            return
+        event, data_lines = "message", []
+        # chunk_size=None hands over each chunk as it arrives instead of waiting for 512 bytes
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if line is None:
+                continue
+            if not line:
+                if data_lines:
+                    yield event, json.loads("\n".join(data_lines))
+                event, data_lines = "message", []
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].lstrip())
+
+def get_cube(params=None, token=None, timeout=30):
+    """Pre-aggregated rollups from /summary/cube; returns None on failure"""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    try:
+        response = requests.get(f"{get_backend_url()}/summary/cube", params=params or {}, headers=headers, timeout=timeout)
+        if response.status_code != 200:
+            logger.error(f"Cube query failed with status {response.status_code}")
+            return None
+        return response.json()
+    except Exception as e:
+        logger.error(f"Cube query failed: {str(e)}")
+        return None
@@ -13,6 +13,7 @@ import hashlib
 # Import our modules
 from azure_db import init_database_connection, test_connection, execute_query
 from azure_openai import natural_language_to_sql, test_openai_connection
+from api_client import query_backend, stream_query_events, get_cube
 
 # Try to import database module with fallback
 try:
@@ -372,6 +373,56 @@ def create_sidebar():
 
 
 # Main pages
+def render_streamed_query(query):
+    """
+    Follow the backend's /query/stream events: show the SQL while the model writes
+    it, then the result table growing batch by batch. Returns a result dict with
+    a DataFrame under 'data' and the stream timings, or None if the backend could
+    not be streamed from.
+    """
+    status = st.empty()
+    sql_box = st.empty()
+    table_box = st.empty()
+    status.info("Generating SQL...")
+    sql_text, chunks, columns = "", [], []
+    result, timings = {}, {}
+    try:
+        for event, data in stream_query_events(query):
+            if event == "token":
+                timings.setdefault('first_token_ms', data['elapsed_ms'])
+                sql_text += data['text']
+                sql_box.code(sql_text, language="sql")
+            elif event == "sql":
+                timings['sql_ms'] = data['elapsed_ms']
+                result.update(data)
+                sql_box.code(data['sql_query'], language="sql")
+                status.info(f"Running query ({data['method']})...")
+            elif event == "rows":
+                timings.setdefault('first_row_ms', data['elapsed_ms'])
+                columns = data['columns']
+                if data['rows']:
+                    chunks.append(pd.DataFrame(data['rows'], columns=columns))
+                    table_box.dataframe(pd.concat(chunks, ignore_index=True), use_container_width=True)
+                status.info(f"Received {data['offset'] + len(data['rows']):,} rows...")
+            elif event == "done":
+                timings['total_ms'] = data['elapsed_ms']
+                result.update(data)
+            elif event == "error":
+                status.error(f"API Error: {data.get('message', 'Query failed')}")
+                return {'success': False, 'message': data.get('message')}
+    except Exception as e:
+        status.warning(f"Streaming unavailable, retrying without it: {str(e)}")
+        return None
+    
+    # The finished result is shown in the query history below
+    status.empty()
+    sql_box.empty()
+    table_box.empty()
+    result['success'] = 'total_ms' in timings
+    result['data'] = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+    result['timings'] = timings
+    return result
+
 def ask_page(selected_schemes):
     st.header("Database Query Interface")
     
@@ -512,55 +563,93 @@ def ask_page(selected_schemes):
             'source': 'azure_openai'
         })
         
-        # Get response using Azure OpenAI + Azure SQL
-        with st.spinner("Converting natural language to SQL..."):
-            # Step 1: Convert natural language to SQL using Azure OpenAI
-            openai_result = natural_language_to_sql(query, show_reasoning=True)
+        # Prefer the FastAPI backend: stream the SQL and rows as they are produced, and fall back
+        # to the Arrow/columnar /query response if the stream cannot be opened
+        backend_result = None
+        if api_connected:
+            backend_result = render_streamed_query(query)
+            if backend_result is None:
+                with st.spinner("Running query through the FastAPI backend..."):
+                    backend_result = query_backend(query)
+        
+        if backend_result and backend_result.get('success'):
+            df = backend_result['data']
+            transfer = backend_result.get('transfer')
+            timings = backend_result.get('timings')
+            sql_query = backend_result.get('sql_query', '')
+            st.info(f"Generated SQL: `{sql_query}`")
             
-            if "error" in openai_result:
-                error_msg = openai_result['error']
-                st.error(f"OpenAI Error: {error_msg}")
-                st.session_state.chat_history.pop()
-            else:
-                sql_query = openai_result.get('sql_query', '')
-                explanation = openai_result.get('explanation', 'Query executed')
+            st.session_state.chat_history[-1]['source'] = 'api'
+            st.session_state.chat_history[-1]['response'] = {
+                'summary': f"✅ Query answered by the backend ({backend_result.get('method', 'ai')}). Found {len(df)} results.",
+                'data': df,
+                'sql': sql_query,
+                'chart_type': backend_result.get('chart_type') or 'table',
+                'transfer': transfer,
+                'timings': timings
+            }
+            st.success(f"Query executed successfully! {len(df)} results found.")
+            if timings:
+                st.caption(" · ".join(
+                    f"{label} {timings[key]:,.0f} ms" for key, label in
+                    [('first_token_ms', 'first token'), ('sql_ms', 'SQL ready'),
+                     ('first_row_ms', 'first rows'), ('total_ms', 'total')] if key in timings
+                ))
+            if transfer:
+                st.caption(
+                    f"{transfer['format']} payload: {transfer['payload_bytes'] / 1024:,.1f} KB · "
+                    f"encode {transfer['encode_ms']:.1f} ms · decode {transfer['decode_ms']:.1f} ms"
+                )
+        else:
+            # Fall back to Azure OpenAI + Azure SQL directly from Streamlit
+            with st.spinner("Converting natural language to SQL..."):
+                # Step 1: Convert natural language to SQL using Azure OpenAI
+                openai_result = natural_language_to_sql(query, show_reasoning=True)
+            
+                if "error" in openai_result:
+                    error_msg = openai_result['error']
+                    st.error(f"OpenAI Error: {error_msg}")
+                    st.session_state.chat_history.pop()
+                else:
+                    sql_query = openai_result.get('sql_query', '')
+                    explanation = openai_result.get('explanation', 'Query executed')
                 
-                st.info(f"Generated SQL: `{sql_query}`")
+                    st.info(f"Generated SQL: `{sql_query}`")
                 
-                # Step 2: Execute the SQL query against Azure SQL Database
-                with st.spinner("Executing SQL query..."):
-                    try:
-                        query_result = execute_query(sql_query)
+                    # Step 2: Execute the SQL query against Azure SQL Database
+                    with st.spinner("Executing SQL query..."):
+                        try:
+                            query_result = execute_query(sql_query)
                         
-                        if query_result:
-                            # Convert to DataFrame for display
-                            df = pd.DataFrame(query_result)
+                            if query_result:
+                                # Convert to DataFrame for display
+                                df = pd.DataFrame(query_result)
                             
-                            response = {
-                                'summary': f"✅ {explanation}. Found {len(df)} results.",
-                                'data': df,
-                                'sql': sql_query,
-                                'chart_type': 'table',
-                                'openai_explanation': explanation
-                            }
+                                response = {
+                                    'summary': f"✅ {explanation}. Found {len(df)} results.",
+                                    'data': df,
+                                    'sql': sql_query,
+                                    'chart_type': 'table',
+                                    'openai_explanation': explanation
+                                }
                             
-                            st.session_state.chat_history[-1]['response'] = response
-                            st.success(f"Query executed successfully! {len(df)} results found.")
+                                st.session_state.chat_history[-1]['response'] = response
+                                st.success(f"Query executed successfully! {len(df)} results found.")
                             
-                        else:
-                            st.warning("Query executed but returned no results.")
-                            response = {
-                                'summary': f"✅ {explanation}. No results found.",
-                                'data': pd.DataFrame(),
-                                'sql': sql_query,
-                                'chart_type': 'table',
-                                'openai_explanation': explanation
-                            }
-                            st.session_state.chat_history[-1]['response'] = response
+                            else:
+                                st.warning("Query executed but returned no results.")
+                                response = {
+                                    'summary': f"✅ {explanation}. No results found.",
+                                    'data': pd.DataFrame(),
+                                    'sql': sql_query,
+                                    'chart_type': 'table',
+                                    'openai_explanation': explanation
+                                }
+                                st.session_state.chat_history[-1]['response'] = response
                             
-                    except Exception as e:
-                        st.error(f"SQL Execution Error: {str(e)}")
-                        st.session_state.chat_history.pop()
+                        except Exception as e:
+                            st.error(f"SQL Execution Error: {str(e)}")
+                            st.session_state.chat_history.pop()
     
     # Display query results
     st.subheader(" Query Results")
@@ -736,27 +825,105 @@ def ask_page(selected_schemes):
                     elif source == 'api':
                         st.write("**Data Source:** FastAPI Backend")
                         st.write("**Processing:** Enhanced AI Query Processing")
+                        transfer = chat['response'].get('transfer')
+                        if transfer:
+                            st.write(f"**Result Format:** {transfer['format']} ({transfer['payload_bytes']:,} bytes)")
+                            st.write(f"**Encode / Decode:** {transfer['encode_ms']:.1f} ms / {transfer['decode_ms']:.1f} ms")
+                        timings = chat['response'].get('timings')
+                        if timings:
+                            st.write(f"**Streamed:** first token {timings.get('first_token_ms', 0):,.0f} ms, "
+                                     f"total {timings.get('total_ms', 0):,.0f} ms")
                     else:
                         st.write("**Data Source:** Direct Database Connection")
                         st.write("**Processing:** Local Query Processing")
                     st.write(f"**Filters Applied:** {', '.join(selected_schemes) if selected_schemes else 'None'}")
                     st.write(f"**Timestamp:** {chat['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}")
 
+def cube_drilldown_section():
+    """Regional drill-down (state -> district -> village) and monthly trend from the rollup cube"""
+    st.subheader("Regional Drill-down")
+    
+    params = {"level": "state", "measures": "disbursed_amount,disbursement_count,beneficiaries,enrollment_count"}
+    states = get_cube(params)
+    if not states or not states.get("rows"):
+        st.info("Regional rollups not available")
+        return
+    
+    state_names = {row["state"]: row["state_id"] for row in states["rows"]}
+    selected_state = st.selectbox("State", ["All states"] + sorted(state_names), key="cube_state")
+    level_data, region_col, trend_filter = states, "state", {}
+    
+    if selected_state != "All states":
+        trend_filter = {"state_id": state_names[selected_state]}
+        level_data = get_cube({**params, "level": "district", **trend_filter}) or {"rows": []}
+        region_col = "district"
+        district_names = {row["district"]: row["district_id"] for row in level_data["rows"]}
+        selected_district = st.selectbox("District", ["All districts"] + sorted(district_names), key="cube_district")
+        if selected_district != "All districts":
+            trend_filter = {"district_id": district_names[selected_district]}
+            level_data = get_cube({**params, "level": "village", **trend_filter}) or {"rows": []}
+            region_col = "village"
+    
+    regions = pd.DataFrame(level_data["rows"])
+    if not regions.empty:
+        fig = px.bar(regions.sort_values("disbursed_amount", ascending=False), x=region_col, y="disbursed_amount",
+                     hover_data=["disbursement_count", "beneficiaries", "enrollment_count"],
+                     title=f"Disbursements by {region_col.title()}")
+        st.plotly_chart(fig, use_container_width=True)
+    
+    trend = get_cube({"level": "all", "by_month": "true",
+                      "measures": "disbursed_amount,beneficiaries", **trend_filter})
+    if trend and trend.get("rows"):
+        fig = px.line(pd.DataFrame(trend["rows"]), x="month", y="disbursed_amount",
+                      hover_data=["beneficiaries"], title="Monthly Disbursements")
+        st.plotly_chart(fig, use_container_width=True)
+
 def reports_page():
     st.header("Reports & Dashboards")
     
+    # Prefer the backend's pre-aggregated cube over GROUP BYs on the live tables
+    cube_totals = get_cube({"level": "all"}) if st.session_state.get('api_connected', False) else None
+    cube_schemes = get_cube({"level": "all", "by_scheme": "true"}) if cube_totals is not None else None
+    
     # Get real data if database is connected
     db = get_database()
-    if db is not None and st.session_state.get('db_connected', False):
+    if cube_totals is not None and cube_schemes is not None and cube_totals.get("rows"):
+        totals = cube_totals["rows"][0]
+        chart_data = pd.DataFrame(cube_schemes["rows"]).rename(columns={
+            "scheme": "scheme_name",
+            "enrollment_count": "total_enrollments",
+            "disbursed_amount": "total_disbursements"
+        })
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric("Beneficiaries", f"{totals['beneficiaries']:,}", "Real Data")
+        
+        with col2:
+            st.metric("Total Disbursements", f"₹{totals['disbursed_amount']:,.2f}", "Real Data")
+        
+        with col3:
+            st.metric("Active Schemes", str(len(chart_data)), "Real Data")
+        
+        with col4:
+            st.metric("Total Enrollments", f"{totals['enrollment_count']:,}", "Real Data")
+        
+        watermark = cube_totals.get("watermarks", {}).get("disbursements")
+        st.success(f"Displaying pre-aggregated data{' through ' + watermark if watermark else ''}")
+        
+    elif db is not None and st.session_state.get('db_connected', False):
         try:
-            # Load real metrics from database using new methods
-            total_citizens = db.get_citizens_count()
-            total_disbursements = db.get_total_disbursements()
-            active_schemes = db.get_active_schemes_count()
-            total_enrollments = db.get_total_enrollments()
+            # Load all dashboard metrics in one batched round trip
+            summary = db.get_dashboard_summary()
+            if summary is None:
+                raise RuntimeError("Dashboard summary unavailable")
+            total_citizens = summary['total_citizens']
+            total_disbursements = summary['total_disbursements']
+            active_schemes = summary['active_schemes']
+            total_enrollments = summary['total_enrollments']
             
-            schemes_real = db.get_schemes()
-            disbursements_real = db.get_disbursements_summary()
+            schemes_real = summary['schemes']
             
             # KPI Cards with real data
             col1, col2, col3, col4 = st.columns(4)
@@ -774,6 +941,7 @@ def reports_page():
                 st.metric("Total Enrollments", f"{total_enrollments:,}", "Real Data")
             
             st.success("Displaying real-time data from connected database")
+            st.caption("Query time: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in summary['timings_ms'].items()))
             
             # Use real data for charts
             chart_data = schemes_real if not schemes_real.empty else schemes_data
@@ -844,6 +1012,10 @@ def reports_page():
         else:
             st.info("Disbursement data not available")
     
+    if cube_totals is not None:
+        st.divider()
+        cube_drilldown_section()
+    
     # Export dashboard
     if st.button("Export Dashboard"):
         st.success("Dashboard export feature will be implemented")
@@ -2,6 +2,7 @@ import pyodbc
 import pandas as pd
 import streamlit as st
 import os
+import time
 from typing import Optional, List
 import logging
 
@@ -23,6 +24,30 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Per-scheme totals; each table is aggregated before the join so enrollments
+# and disbursements of the same scheme are not multiplied together
+SCHEME_TOTALS_SQL = """
+SELECT s.name as scheme_name,
+       COALESCE(e.total_enrollments, 0) as total_enrollments,
+       COALESCE(d.total_disbursements, 0) as total_disbursements
+FROM schemes s
+LEFT JOIN (SELECT scheme_id, COUNT(*) as total_enrollments FROM enrollments GROUP BY scheme_id) e
+    ON e.scheme_id = s.scheme_id
+LEFT JOIN (SELECT scheme_id, SUM(amount) as total_disbursements FROM disbursements GROUP BY scheme_id) d
+    ON d.scheme_id = s.scheme_id
+ORDER BY s.scheme_id
+"""
+
+# Everything the reports page needs in one batch: the KPI row, then per-scheme totals
+DASHBOARD_BATCH_SQL = """
+SET NOCOUNT ON;
+SELECT
+    (SELECT COUNT(*) FROM citizens) as total_citizens,
+    (SELECT COALESCE(SUM(amount), 0) FROM disbursements) as total_disbursements,
+    (SELECT COUNT(*) FROM schemes) as active_schemes,
+    (SELECT COUNT(*) FROM enrollments) as total_enrollments;
+""" + SCHEME_TOTALS_SQL + ";"
+
 class WelfareDatabase:
     def __init__(self):
         self.connection_string = None
@@ -87,16 +112,7 @@ class WelfareDatabase:
                 connection.close()
     
     def get_schemes(self) -> pd.DataFrame:
-        query = """
-        SELECT s.name as scheme_name, 
-               COUNT(DISTINCT e.enrollment_id) as total_enrollments, 
-               COALESCE(SUM(d.amount), 0) as total_disbursements 
-        FROM schemes s 
-        LEFT JOIN enrollments e ON s.scheme_id = e.scheme_id 
-        LEFT JOIN disbursements d ON s.scheme_id = d.scheme_id 
-        GROUP BY s.scheme_id, s.name
-        """
-        result = self.execute_query(query)
+        result = self.execute_query(SCHEME_TOTALS_SQL)
         return result if result is not None else pd.DataFrame()
     
     def get_citizens_count(self) -> int:
@@ -138,6 +154,54 @@ class WelfareDatabase:
             return int(result.iloc[0]['total_enrollments'])
         return 0
     
+    def get_dashboard_summary(self) -> Optional[dict]:
+        """
+        KPIs and per-scheme totals for the reports page from one batch on one
+        connection, reading each result set in turn with nextset().
+        Returns None when the database is unavailable.
+        """
+        connection = None
+        try:
+            if not self.connection_string:
+                return None
+            timings = {}
+            start = time.perf_counter()
+            connection = pyodbc.connect(self.connection_string)
+            timings['connect'] = (time.perf_counter() - start) * 1000
+            
+            cursor = connection.cursor()
+            start = time.perf_counter()
+            cursor.execute(DASHBOARD_BATCH_SQL)
+            timings['execute'] = (time.perf_counter() - start) * 1000
+            
+            frames = {}
+            for name in ('kpis', 'schemes'):
+                start = time.perf_counter()
+                columns = [desc[0] for desc in cursor.description]
+                frames[name] = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+                timings[name] = (time.perf_counter() - start) * 1000
+                if name != 'schemes' and not cursor.nextset():
+                    raise RuntimeError("Dashboard batch returned fewer result sets than expected")
+            
+            kpis = frames['kpis'].iloc[0]
+            schemes = frames['schemes']
+            return {
+                'total_citizens': int(kpis['total_citizens']),
+                'total_disbursements': float(kpis['total_disbursements']),
+                'active_schemes': int(kpis['active_schemes']),
+                'total_enrollments': int(kpis['total_enrollments']),
+                'schemes': schemes,
+                'disbursements': schemes[['scheme_name', 'total_disbursements']].rename(
+                    columns={'total_disbursements': 'total_amount'}),
+                'timings_ms': {name: round(ms, 1) for name, ms in timings.items()}
+            }
+        except Exception as e:
+            logger.error(f"Dashboard summary error: {e}")
+            return None
+        finally:
+            if connection:
+                connection.close()
+    
     def search_citizens(self, search_term=None, district=None):
         """Search citizens by name, Aadhaar, or district"""
         try: